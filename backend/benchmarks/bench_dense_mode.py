@@ -0,0 +1,192 @@
+"""
+Custo de latência do modo denso (max_det maior + NMS por classe) nos maiores
+diagramas do dataset, comparado com a inferência padrão.
+
+Para cada imagem (as `--top` com mais anotações em `--dataset`) roda os dois
+modos e mede predict, NMS por classe, grafo e STRIDE, além de quantas
+detecções/setas/arestas cada modo recupera e se o limite foi atingido.
+
+Uso (a partir de backend/):
+    python -m benchmarks.bench_dense_mode --model-name yolo11m-pose_manual_v3_v1 \\
+        --dataset ../ml/datasets/manual_v3/val --top 5
+    # Sem pesos: StubYOLO com um diagrama sintético bem denso
+    python -m benchmarks.bench_dense_mode --stub --nodes 400 --arrows 1200
+"""
+
+import argparse
+import json
+import statistics
+import sys
+import time
+from pathlib import Path
+from typing import Dict, List, Tuple
+
+import cv2
+import numpy as np
+
+from models.yolo_loader import YOLOModel
+from services.dense_detection import DEFAULT_MAX_DET, DenseDetector
+from services.graph_builder import GraphBuilder
+from services.stride_analyzer import StrideAnalyzer
+
+ARROW_CLASS = 9
+
+
+def largest_images(dataset: Path, top: int) -> List[Path]:
+    """Imagens com mais linhas de label (proxy para os diagramas mais densos)."""
+    counts: List[Tuple[int, Path]] = []
+    for image_path in sorted((dataset / "images").glob("*")):
+        label = dataset / "labels" / f"{image_path.stem}.txt"
+        n = len(label.read_text().splitlines()) if label.exists() else 0
+        counts.append((n, image_path))
+    counts.sort(key=lambda item: -item[0])
+    return [path for _, path in counts[:top]]
+
+
+def run_mode(
+    image: np.ndarray, dense: bool, args, detector: DenseDetector
+) -> Dict[str, float]:
+    builder, analyzer = GraphBuilder(), StrideAnalyzer()
+    kwargs = detector.predict_kwargs(args.max_det) if dense else {}
+    max_det = kwargs.get("max_det", DEFAULT_MAX_DET)
+
+    start = time.perf_counter()
+    results = YOLOModel.predict(
+        image, conf_threshold=args.conf, model_name=args.model_name, **kwargs
+    )
+    predict_ms = (time.perf_counter() - start) * 1000
+
+    nms_ms = 0.0
+    raw_count = len(results.boxes)
+    if dense:
+        start = time.perf_counter()
+        processed = detector.process(results, max_det)
+        nms_ms = (time.perf_counter() - start) * 1000
+        results = processed.detections
+
+    start = time.perf_counter()
+    graph = builder.build_graph(results)
+    graph_ms = (time.perf_counter() - start) * 1000
+
+    start = time.perf_counter()
+    stride = analyzer.analyze(graph)
+    stride_ms = (time.perf_counter() - start) * 1000
+
+    cls_ids = results.boxes.cls.cpu().numpy()
+    return {
+        "predict_ms": predict_ms,
+        "class_nms_ms": nms_ms,
+        "graph_ms": graph_ms,
+        "stride_ms": stride_ms,
+        "total_ms": predict_ms + nms_ms + graph_ms + stride_ms,
+        "detections": len(cls_ids),
+        "arrows": int((cls_ids == ARROW_CLASS).sum()),
+        "edges": len(graph.edges),
+        "threats": stride.summary.total_threats,
+        "cap_hit": raw_count >= max_det,
+    }
+
+
+def median_point(runs: List[Dict]) -> Dict:
+    point = {}
+    for key in runs[0]:
+        values = [run[key] for run in runs]
+        if key == "cap_hit":
+            point[key] = any(values)
+        elif key.endswith("_ms"):
+            point[key] = round(statistics.median(values), 2)
+        else:
+            point[key] = values[-1]
+    return point
+
+
+def main(args) -> Dict:
+    if args.stub:
+        from benchmarks.stub_model import StubYOLO
+
+        YOLOModel.register_model(
+            "stub",
+            StubYOLO(
+                n_nodes=args.nodes,
+                n_arrows=args.arrows,
+                n_boundaries=args.boundaries,
+            ),
+        )
+        args.model_name = "stub"
+        w, h = (int(v) for v in args.image_size.lower().split("x"))
+        images = [("synthetic", np.full((h, w, 3), 255, dtype=np.uint8))]
+    else:
+        images = [
+            (path.name, cv2.imread(str(path)))
+            for path in largest_images(Path(args.dataset), args.top)
+        ]
+
+    detector = DenseDetector()
+    report = {"model": args.model_name, "images": []}
+    for name, image in images:
+        print(f"Benchmarking {name}...", file=sys.stderr)
+        entry = {"image": name}
+        for mode, dense in (("default", False), ("dense", True)):
+            for _ in range(args.warmup):
+                run_mode(image, dense, args, detector)
+            runs = [run_mode(image, dense, args, detector) for _ in range(args.repeat)]
+            entry[mode] = median_point(runs)
+        entry["overhead_ms"] = round(
+            entry["dense"]["total_ms"] - entry["default"]["total_ms"], 2
+        )
+        report["images"].append(entry)
+    return report
+
+
+def markdown_table(report: Dict) -> str:
+    lines = [
+        "| image | mode | total (ms) | predict | class_nms | graph | stride "
+        "| detections | arrows | edges | cap hit |",
+        "|---|---|---|---|---|---|---|---|---|---|---|",
+    ]
+    for entry in report["images"]:
+        for mode in ("default", "dense"):
+            p = entry[mode]
+            lines.append(
+                f"| {entry['image']} | {mode} | {p['total_ms']} | {p['predict_ms']} "
+                f"| {p['class_nms_ms']} | {p['graph_ms']} | {p['stride_ms']} "
+                f"| {p['detections']} | {p['arrows']} | {p['edges']} "
+                f"| {'yes' if p['cap_hit'] else 'no'} |"
+            )
+    return "\n".join(lines)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Dense mode latency cost")
+    parser.add_argument("--model-name", type=str, default=None, help="Model to use")
+    parser.add_argument(
+        "--dataset",
+        type=str,
+        default="../ml/datasets/manual_v3/val",
+        help="YOLO split with images/ and labels/",
+    )
+    parser.add_argument("--top", type=int, default=5, help="Largest images to use")
+    parser.add_argument("--conf", type=float, default=0.25, help="conf_threshold")
+    parser.add_argument(
+        "--max-det", type=int, default=None, help="Dense max_det (default: settings)"
+    )
+    parser.add_argument("--repeat", type=int, default=5, help="Measured runs per mode")
+    parser.add_argument("--warmup", type=int, default=1, help="Warmup runs per mode")
+    parser.add_argument("--stub", action="store_true", help="Use StubYOLO, no weights")
+    parser.add_argument("--nodes", type=int, default=400, help="Stub: component count")
+    parser.add_argument("--arrows", type=int, default=1200, help="Stub: arrow count")
+    parser.add_argument(
+        "--boundaries", type=int, default=10, help="Stub: boundary count"
+    )
+    parser.add_argument(
+        "--image-size", type=str, default="4000x3000", help="Stub: image size WxH"
+    )
+    parser.add_argument(
+        "--output", type=str, default=None, help="Write the JSON report to this file"
+    )
+    args = parser.parse_args()
+
+    report = main(args)
+    if args.output:
+        Path(args.output).write_text(json.dumps(report, indent=2))
+    print(markdown_table(report))
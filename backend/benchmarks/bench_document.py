@@ -0,0 +1,146 @@
+"""
+Rasterização de PDFs multipágina: sequencial x pool de processos com lotes.
+
+Modo "sequential": renderiza cada página no próprio processo, no DPI fixo
+de `--sequential-dpi` (como um conversor PDF→PNG genérico), e roda o modelo
+página a página. Modo "pooled": DocumentRasterizer (DPI pelo tamanho de
+entrada do modelo, páginas renderizando em paralelo) com inferência em lotes
+enquanto as próximas páginas renderizam. O modelo é o StubYOLO, com latência
+fixa por chamada.
+
+O PDF de teste repete as páginas de docs/IADT - Fase 5 - Hackaton.pdf.
+
+Uso (a partir de backend/):
+    python -m benchmarks.bench_document --pages 24 --latency-ms 60
+"""
+
+import argparse
+import asyncio
+import io
+import json
+import sys
+import time
+from pathlib import Path
+from typing import Dict
+
+import pypdfium2 as pdfium
+from starlette.concurrency import run_in_threadpool
+
+from benchmarks.stub_model import StubYOLO
+from services.document_rasterizer import DocumentRasterizer
+
+SAMPLE_PDF = (
+    Path(__file__).parent.parent.parent / "docs" / "IADT - Fase 5 - Hackaton.pdf"
+)
+
+
+def build_pdf(pages: int) -> bytes:
+    source = pdfium.PdfDocument(str(SAMPLE_PDF))
+    indices = [i % len(source) for i in range(pages)]
+    document = pdfium.PdfDocument.new()
+    document.import_pages(source, indices)
+    buffer = io.BytesIO()
+    document.save(buffer)
+    return buffer.getvalue()
+
+
+def run_sequential(data: bytes, model: StubYOLO, dpi: float) -> Dict:
+    start = time.perf_counter()
+    render_ms = 0.0
+    document = pdfium.PdfDocument(data)
+    for index in range(len(document)):
+        render_start = time.perf_counter()
+        image = document[index].render(scale=dpi / 72.0).to_numpy()[:, :, :3]
+        render_ms += (time.perf_counter() - render_start) * 1000
+        model(image, conf=0.5, verbose=False)
+    return {
+        "total_ms": round((time.perf_counter() - start) * 1000, 1),
+        "render_ms": round(render_ms, 1),
+        "image_size": list(image.shape[1::-1]),
+    }
+
+
+async def run_pooled(
+    data: bytes,
+    model: StubYOLO,
+    rasterizer: DocumentRasterizer,
+    target: int,
+    batch: int,
+) -> Dict:
+    start = time.perf_counter()
+    wait_ms, pages = 0.0, []
+    rendered = rasterizer.pages(
+        data, "pdf", target, ahead=batch + rasterizer.max_workers
+    )
+    while True:
+        wait_start = time.perf_counter()
+        page = await anext(rendered, None)
+        wait_ms += (time.perf_counter() - wait_start) * 1000
+        if page is not None:
+            pages.append(page.image)
+        if pages and (page is None or len(pages) == batch):
+            await run_in_threadpool(model, pages, conf=0.5, verbose=False)
+            last_size = list(pages[-1].shape[1::-1])
+            pages = []
+        if page is None:
+            break
+    return {
+        "total_ms": round((time.perf_counter() - start) * 1000, 1),
+        "render_wait_ms": round(wait_ms, 1),
+        "image_size": last_size,
+    }
+
+
+async def main(args) -> Dict:
+    data = build_pdf(args.pages)
+    model = StubYOLO(latency_ms=args.latency_ms)
+    rasterizer = DocumentRasterizer(max_workers=args.workers)
+    target = rasterizer.target_side(args.input_size)
+
+    # Sobe os processos do pool antes de medir (custo único por worker da API)
+    rasterizer.warmup()
+
+    print("Running sequential...", file=sys.stderr)
+    report = {
+        "pages": args.pages,
+        "sequential": run_sequential(data, model, args.sequential_dpi),
+    }
+    print("Running pooled...", file=sys.stderr)
+    report["pooled"] = await run_pooled(
+        data, model, rasterizer, target, args.batch_size
+    )
+    report["speedup"] = round(
+        report["sequential"]["total_ms"] / report["pooled"]["total_ms"], 2
+    )
+    rasterizer.shutdown()
+    return report
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(
+        description="Multi-page document rasterization benchmark"
+    )
+    parser.add_argument("--pages", type=int, default=24, help="Pages in the test PDF")
+    parser.add_argument(
+        "--latency-ms", type=float, default=60, help="Stub model latency per call"
+    )
+    parser.add_argument("--workers", type=int, default=4, help="Rasterizer processes")
+    parser.add_argument(
+        "--batch-size", type=int, default=4, help="Pages per model call"
+    )
+    parser.add_argument("--input-size", type=int, default=640, help="Model input size")
+    parser.add_argument(
+        "--sequential-dpi",
+        type=float,
+        default=150,
+        help="Fixed DPI of the sequential mode",
+    )
+    parser.add_argument(
+        "--output", type=str, default=None, help="Write the JSON report to this file"
+    )
+    args = parser.parse_args()
+
+    text = json.dumps(asyncio.run(main(args)), indent=2)
+    if args.output:
+        Path(args.output).write_text(text)
+    print(text)
@@ -0,0 +1,166 @@
+"""
+Latência e acurácia do diff de grafos (GraphDiffer) em diagramas grandes.
+
+Para cada tamanho, gera um grafo sintético e uma "nova versão" reescalada,
+com outra margem, ruído nas posições, ids embaralhados e uma fração de nós
+removidos/adicionados; mede o tempo do diff e confere os pares casados
+contra o gabarito.
+
+Uso (a partir de backend/):
+    python -m benchmarks.bench_graph_diff --sizes 100 1000 5000
+"""
+
+import argparse
+import json
+import random
+import statistics
+import sys
+import time
+from pathlib import Path
+from typing import Dict, Tuple
+
+from benchmarks.synthetic import COMPONENT_TYPES, make_graph
+from schemas.api_models import Edge, Graph, Node, Position
+from services.graph_diff import GraphDiffer
+from services.stride_analyzer import StrideAnalyzer
+
+
+def _transform(node: Node, new_id: str, scale: float, offset, jitter, rng) -> Node:
+    dx, dy = rng.uniform(-jitter, jitter), rng.uniform(-jitter, jitter)
+    x1, y1, x2, y2 = (
+        node.bbox[0] * scale + offset[0] + dx,
+        node.bbox[1] * scale + offset[1] + dy,
+        node.bbox[2] * scale + offset[0] + dx,
+        node.bbox[3] * scale + offset[1] + dy,
+    )
+    return node.model_copy(
+        update={
+            "id": new_id,
+            "position": Position(x=(x1 + x2) / 2, y=(y1 + y2) / 2),
+            "bbox": [x1, y1, x2, y2],
+            "width": x2 - x1,
+            "height": y2 - y1,
+            "area": (x2 - x1) * (y2 - y1),
+            "children": [],
+        }
+    )
+
+
+def make_revision(graph: Graph, args, seed: int) -> Tuple[Graph, Dict[str, str]]:
+    """Nova versão do diagrama e o gabarito (id antes -> id depois)."""
+    rng = random.Random(seed)
+    components = [n for n in graph.nodes if n.type != "boundary"]
+    removed = {n.id for n in rng.sample(components, int(len(components) * args.churn))}
+
+    kept = [n for n in graph.nodes if n.id not in removed]
+    new_ids = [f"node_{i}" for i in range(len(kept) + len(removed))]
+    rng.shuffle(new_ids)
+    truth = {n.id: new_ids[k] for k, n in enumerate(kept)}
+
+    nodes = []
+    for node in kept:
+        moved = _transform(
+            node,
+            truth[node.id],
+            args.scale,
+            (args.offset, args.offset),
+            args.jitter,
+            rng,
+        )
+        if node.parent_id:
+            moved.parent_id = truth.get(node.parent_id)
+        nodes.append(moved)
+
+    # Componentes novos no lugar dos removidos (posições aleatórias)
+    extent = max(n.bbox[2] for n in nodes)
+    for k in range(len(removed)):
+        x, y = rng.uniform(0, extent), rng.uniform(0, extent / 10)
+        size = 80 * args.scale
+        nodes.append(
+            Node(
+                id=new_ids[len(kept) + k],
+                type=rng.choice(COMPONENT_TYPES),
+                position=Position(x=x + size / 2, y=y + size / 2),
+                confidence=0.9,
+                bbox=[x, y, x + size, y + size],
+                width=size,
+                height=size,
+                area=size * size,
+            )
+        )
+
+    edges = [
+        Edge(
+            id=f"edge_{k}",
+            source=truth[e.source],
+            target=truth[e.target],
+            keypoints=[],
+            cross_boundary=e.cross_boundary,
+        )
+        for k, e in enumerate(graph.edges)
+        if e.source in truth and e.target in truth
+    ]
+    return Graph(nodes=nodes, edges=edges), truth
+
+
+def run_size(n_nodes: int, args) -> Dict:
+    analyzer = StrideAnalyzer()
+    before = make_graph(
+        n_nodes=n_nodes, n_boundaries=max(1, n_nodes // 50), seed=args.seed
+    )
+    after, truth = make_revision(before, args, args.seed + 1)
+    before_stride, after_stride = analyzer.analyze(before), analyzer.analyze(after)
+
+    differ = GraphDiffer()
+    samples, diff = [], None
+    for _ in range(args.repeat):
+        start = time.perf_counter()
+        diff = differ.diff(before, after, before_stride, after_stride)
+        samples.append((time.perf_counter() - start) * 1000)
+
+    correct = sum(1 for m in diff.nodes.matched if truth.get(m.before_id) == m.after_id)
+    return {
+        "nodes": len(before.nodes),
+        "edges": len(before.edges),
+        "threats": len(before_stride.threats),
+        "diff_p50_ms": round(statistics.median(samples), 2),
+        "diff_max_ms": round(max(samples), 2),
+        "match_precision": round(correct / max(len(diff.nodes.matched), 1), 4),
+        "match_recall": round(correct / max(len(truth), 1), 4),
+        "nodes_added": len(diff.nodes.added),
+        "nodes_removed": len(diff.nodes.removed),
+        "edges_added": len(diff.edges.added),
+        "edges_removed": len(diff.edges.removed),
+        "threats_added": len(diff.threats.added),
+        "threats_removed": len(diff.threats.removed),
+        "scale": diff.alignment.scale,
+    }
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Graph diff benchmark")
+    parser.add_argument(
+        "--sizes", type=int, nargs="+", default=[100, 1000, 5000], help="Node counts"
+    )
+    parser.add_argument("--scale", type=float, default=1.5, help="Revision rescale")
+    parser.add_argument(
+        "--offset", type=float, default=40.0, help="Revision margin (px)"
+    )
+    parser.add_argument("--jitter", type=float, default=4.0, help="Position noise (px)")
+    parser.add_argument("--churn", type=float, default=0.05, help="Fraction replaced")
+    parser.add_argument("--repeat", type=int, default=5, help="Runs per size")
+    parser.add_argument("--seed", type=int, default=0, help="Synthetic data seed")
+    parser.add_argument(
+        "--output", type=str, default=None, help="Write the JSON report to this file"
+    )
+    args = parser.parse_args()
+
+    report = []
+    for size in args.sizes:
+        print(f"Diffing {size} nodes...", file=sys.stderr)
+        report.append(run_size(size, args))
+
+    text = json.dumps(report, indent=2)
+    if args.output:
+        Path(args.output).write_text(text)
+    print(text)
@@ -0,0 +1,382 @@
+"""
+Micro-benchmark de escalabilidade do GraphBuilder e do StrideAnalyzer.
+
+Gera detecções sintéticas (boundaries aninhadas e setas densas) de 10 a 100k
+nós e mede cada etapa separadamente: `_extract_nodes`, `_build_hierarchy`,
+`_extract_edges`, os três níveis de análise STRIDE e `_deduplicate_threats`.
+Reporta a mediana das execuções, o ruído medido (desvio absoluto mediano),
+o pico de memória (tracemalloc) e o expoente empírico de complexidade
+(inclinação log-log entre tamanhos).
+
+A velocidade da VM varia bastante entre execuções (±40% num laço fixo em
+poucos segundos), então cada amostra é precedida por uma carga de referência
+fixa e o gate compara a mediana de tempo_da_etapa / tempo_da_referência, não
+o tempo absoluto. Só acusa regressão acima de `--threshold` mais o ruído
+medido nas duas execuções.
+
+Uso (a partir de backend/):
+    python -m benchmarks.bench_graph_stride --sizes 10 100 1000 10000 100000
+    python -m benchmarks.bench_graph_stride --update-baseline
+    python -m benchmarks.bench_graph_stride --threshold 0.25   # falha se regredir >25%
+"""
+
+import argparse
+import json
+import math
+import platform
+import statistics
+import sys
+import time
+import tracemalloc
+from pathlib import Path
+from typing import Callable, Dict, List, Optional, Tuple
+
+from benchmarks.synthetic import make_detections, make_graph
+from services.graph_builder import GraphBuilder
+from services.stride_analyzer import StrideAnalyzer
+
+DEFAULT_BASELINE = Path(__file__).parent / "baselines" / "graph_stride.json"
+
+# ~10 ms em Python puro: curta o bastante para rodar antes de cada amostra
+REFERENCE_ITERATIONS = 40_000
+
+STAGES = [
+    "extract_nodes",
+    "build_hierarchy",
+    "extract_edges",
+    "stride_components",
+    "stride_flows",
+    "stride_architecture",
+    "deduplicate_threats",
+]
+
+
+def build_inputs(n_nodes: int, args):
+    """Prepara as entradas de cada etapa (fora da medição)."""
+    n_boundaries = max(1, int(n_nodes * args.boundary_ratio))
+    detections = make_detections(
+        width=max(1000, int(math.sqrt(n_nodes) * 200)),
+        height=max(800, int(math.sqrt(n_nodes) * 150)),
+        n_nodes=n_nodes,
+        n_arrows=int(n_nodes * args.arrow_ratio),
+        n_boundaries=n_boundaries,
+        nesting=args.nesting,
+        seed=args.seed,
+    )
+    builder = GraphBuilder()
+    analyzer = StrideAnalyzer()
+
+    # As entradas de cada etapa são geradas em tempo linear para que o setup
+    # não dependa das etapas quadráticas que estão sendo medidas
+    nodes = builder._extract_nodes(detections)
+    graph = make_graph(
+        n_nodes=n_nodes,
+        n_edges=int(n_nodes * args.arrow_ratio),
+        n_boundaries=n_boundaries,
+        seed=args.seed,
+    )
+    node_map = {node.id: node for node in graph.nodes}
+    threats = (
+        analyzer._analyze_components(graph.nodes)
+        + analyzer._analyze_flows(graph, node_map)
+        + analyzer._analyze_architecture(graph, node_map)
+    )
+
+    # Cada etapa é (setup, fn): o setup roda fora da medição
+    no_setup = lambda: None
+    stages: Dict[str, Tuple[Callable, Callable]] = {
+        "extract_nodes": (no_setup, lambda _: builder._extract_nodes(detections)),
+        # _build_hierarchy altera os nós, então cada execução recebe uma cópia
+        "build_hierarchy": (
+            lambda: [n.model_copy(update={"children": []}) for n in nodes],
+            builder._build_hierarchy,
+        ),
+        "extract_edges": (
+            no_setup,
+            # parent_id não altera o custo da busca, só a flag cross_boundary
+            lambda _: builder._extract_edges(detections, nodes),
+        ),
+        "stride_components": (
+            no_setup,
+            lambda _: analyzer._analyze_components(graph.nodes),
+        ),
+        "stride_flows": (no_setup, lambda _: analyzer._analyze_flows(graph, node_map)),
+        "stride_architecture": (
+            no_setup,
+            lambda _: analyzer._analyze_architecture(graph, node_map),
+        ),
+        "deduplicate_threats": (
+            no_setup,
+            lambda _: analyzer._deduplicate_threats(threats),
+        ),
+    }
+    sizes = {
+        "detections": len(detections),
+        "nodes": len(nodes),
+        "graph_nodes": len(graph.nodes),
+        "graph_edges": len(graph.edges),
+        "threats": len(threats),
+    }
+    return stages, sizes
+
+
+def reference_workload() -> float:
+    """Tempo (ms) de uma carga fixa de dicts/floats, a régua da velocidade da VM."""
+    start = time.perf_counter()
+    totals: Dict[int, float] = {}
+    for i in range(REFERENCE_ITERATIONS):
+        key = i % 997
+        totals[key] = totals.get(key, 0.0) + i * 0.5
+    sorted(totals.values())
+    return (time.perf_counter() - start) * 1000
+
+
+def median_and_mad(values: List[float]) -> Tuple[float, float]:
+    median = statistics.median(values)
+    return median, statistics.median(abs(v - median) for v in values)
+
+
+def measure(setup: Callable, fn: Callable, repeat: int) -> Dict[str, float]:
+    """
+    Mediana, melhor tempo e ruído de `repeat` execuções, tempo relativo à
+    carga de referência medida logo antes de cada uma e pico de memória.
+    """
+    samples, relative = [], []
+    for _ in range(repeat):
+        arg = setup()
+        reference = reference_workload()
+        start = time.perf_counter()
+        fn(arg)
+        samples.append((time.perf_counter() - start) * 1000)
+        relative.append(samples[-1] / reference)
+    median, mad = median_and_mad(samples)
+    relative_median, relative_mad = median_and_mad(relative)
+
+    arg = setup()
+    tracemalloc.start()
+    fn(arg)
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    return {
+        "time_ms": round(median, 3),
+        "best_ms": round(min(samples), 3),
+        "mad_ms": round(mad, 3),
+        "relative": round(relative_median, 5),
+        "relative_mad": round(relative_mad, 5),
+        "peak_kb": round(peak / 1024, 1),
+    }
+
+
+def predicted_seconds(previous: Optional[Dict], n_prev: int, n_next: int) -> float:
+    """Estimativa (pior caso quadrático) para decidir se a etapa cabe no orçamento."""
+    if not previous or "time_ms" not in previous:
+        return 0.0
+    exponent = max(previous.get("exponent", 2.0), 1.0)
+    return previous["time_ms"] / 1000 * (n_next / n_prev) ** exponent
+
+
+def complexity_exponent(points: List[Dict]) -> Optional[float]:
+    """Inclinação log-log por mínimos quadrados (1 ~ linear, 2 ~ quadrático)."""
+    valid = [(p["n"], p["time_ms"]) for p in points if p.get("time_ms", 0) > 0]
+    if len(valid) < 2:
+        return None
+    xs = [math.log(n) for n, _ in valid]
+    ys = [math.log(t) for _, t in valid]
+    mean_x, mean_y = sum(xs) / len(xs), sum(ys) / len(ys)
+    var_x = sum((x - mean_x) ** 2 for x in xs)
+    if var_x == 0:
+        return None
+    cov = sum((x - mean_x) * (y - mean_y) for x, y in zip(xs, ys))
+    return round(cov / var_x, 2)
+
+
+def run(args) -> Dict:
+    curves: Dict[str, List[Dict]] = {stage: [] for stage in STAGES}
+    inputs: Dict[int, Dict] = {}
+    last: Dict[str, Dict] = {}
+
+    for n in sorted(args.sizes):
+        print(f"Preparing synthetic detections for {n} nodes...", file=sys.stderr)
+        stages, sizes = build_inputs(n, args)
+        inputs[n] = sizes
+
+        for stage in STAGES:
+            prev = last.get(stage)
+            estimate = predicted_seconds(prev, prev["n"], n) if prev else 0.0
+            if estimate > args.max_seconds:
+                curves[stage].append(
+                    {"n": n, "skipped": f"estimated {estimate:.1f}s > budget"}
+                )
+                continue
+
+            result = measure(*stages[stage], args.repeat)
+            point = {"n": n, **result}
+            curves[stage].append(point)
+
+            exponent = complexity_exponent(curves[stage])
+            last[stage] = {**point, "exponent": exponent or 2.0}
+            print(
+                f"  {stage:<22} n={n:<7} {result['time_ms']:>10.2f} ms "
+                f"peak {result['peak_kb']:>10.1f} KB",
+                file=sys.stderr,
+            )
+
+    return {
+        "machine": {
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+        },
+        "config": {
+            "sizes": sorted(args.sizes),
+            "arrow_ratio": args.arrow_ratio,
+            "boundary_ratio": args.boundary_ratio,
+            "nesting": args.nesting,
+            "repeat": args.repeat,
+            "max_seconds": args.max_seconds,
+        },
+        "inputs": {str(n): sizes for n, sizes in inputs.items()},
+        "stages": {
+            stage: {"exponent": complexity_exponent(points), "points": points}
+            for stage, points in curves.items()
+        },
+    }
+
+
+def relative_noise(point: Dict, key: str, mad_key: str) -> float:
+    """Ruído de um ponto como fração da mediana (MAD escalado para ~1 desvio)."""
+    if not point.get(key):
+        return 0.0
+    return 1.4826 * point.get(mad_key, 0.0) / point[key]
+
+
+def compare_with_baseline(
+    report: Dict, baseline: Dict, threshold: float, min_ms: float, noise_k: float
+) -> List[str]:
+    """
+    Lista as etapas/tamanhos cuja mediana (relativa à carga de referência,
+    quando os dois lados a têm) ficou mais lenta que a do baseline além de
+    `threshold` + `noise_k` vezes o ruído das duas medições.
+    """
+    regressions = []
+    for stage, data in report["stages"].items():
+        base_points = {
+            p["n"]: p
+            for p in baseline.get("stages", {}).get(stage, {}).get("points", [])
+            if "time_ms" in p
+        }
+        for point in data["points"]:
+            base = base_points.get(point["n"])
+            if not base or "time_ms" not in point:
+                continue
+            # Tempos muito pequenos são dominados por ruído
+            if base["time_ms"] < min_ms:
+                continue
+            key, mad_key = (
+                ("relative", "relative_mad")
+                if "relative" in base and "relative" in point
+                else ("time_ms", "mad_ms")
+            )
+            ratio = point[key] / base[key]
+            allowed = threshold + noise_k * math.hypot(
+                relative_noise(base, key, mad_key), relative_noise(point, key, mad_key)
+            )
+            if ratio > 1 + allowed:
+                regressions.append(
+                    f"{stage} n={point['n']}: {base['time_ms']:.2f} ms -> "
+                    f"{point['time_ms']:.2f} ms ({(ratio - 1) * 100:+.0f}%, "
+                    f"allowed {allowed * 100:.0f}%)"
+                )
+    return regressions
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="GraphBuilder/StrideAnalyzer scaling")
+    parser.add_argument(
+        "--sizes",
+        type=int,
+        nargs="+",
+        default=[10, 100, 1000, 10000, 100000],
+        help="Component counts to benchmark",
+    )
+    parser.add_argument(
+        "--arrow-ratio", type=float, default=2.0, help="Arrows per component"
+    )
+    parser.add_argument(
+        "--boundary-ratio",
+        type=float,
+        default=0.02,
+        help="Boundaries per component (per nesting level)",
+    )
+    parser.add_argument("--nesting", type=int, default=3, help="Nested boundary levels")
+    parser.add_argument(
+        "--repeat", type=int, default=7, help="Runs per measurement (median)"
+    )
+    parser.add_argument(
+        "--max-seconds",
+        type=float,
+        default=30.0,
+        help="Skip a stage when its extrapolated time exceeds this budget",
+    )
+    parser.add_argument("--seed", type=int, default=0, help="Synthetic data seed")
+    parser.add_argument(
+        "--baseline", type=str, default=str(DEFAULT_BASELINE), help="Baseline file"
+    )
+    parser.add_argument(
+        "--update-baseline",
+        action="store_true",
+        help="Store this run as the new baseline",
+    )
+    parser.add_argument(
+        "--threshold",
+        type=float,
+        default=0.25,
+        help="Allowed median slowdown vs. baseline before failing (0.25 = 25%%)",
+    )
+    parser.add_argument(
+        "--noise-k",
+        type=float,
+        default=3.0,
+        help="Extra allowance per unit of measured noise (scaled MAD of both runs)",
+    )
+    parser.add_argument(
+        "--min-ms",
+        type=float,
+        default=1.0,
+        help="Ignore baseline points faster than this (noise floor)",
+    )
+    parser.add_argument(
+        "--output", type=str, default=None, help="Write the JSON report to this file"
+    )
+    args = parser.parse_args()
+
+    report = run(args)
+    text = json.dumps(report, indent=2)
+    if args.output:
+        Path(args.output).write_text(text)
+    print(text)
+
+    baseline_path = Path(args.baseline)
+    if args.update_baseline:
+        baseline_path.parent.mkdir(parents=True, exist_ok=True)
+        baseline_path.write_text(text)
+        print(f"Baseline written to {baseline_path}", file=sys.stderr)
+    elif baseline_path.exists():
+        regressions = compare_with_baseline(
+            report,
+            json.loads(baseline_path.read_text()),
+            args.threshold,
+            args.min_ms,
+            args.noise_k,
+        )
+        if regressions:
+            print("Performance regressions detected:", file=sys.stderr)
+            for line in regressions:
+                print(f"  - {line}", file=sys.stderr)
+            sys.exit(1)
+        print("No regressions against baseline.", file=sys.stderr)
+    else:
+        print(
+            f"No baseline at {baseline_path}; run with --update-baseline to create one.",
+            file=sys.stderr,
+        )
@@ -0,0 +1,206 @@
+"""
+Benchmark do histórico de análises (SQLite): vazão de escrita em lote e
+latência das consultas paginadas sobre centenas de milhares de análises.
+
+Popula um banco temporário com grafos sintéticos (tamanhos variados, datas
+espalhadas em `--days` dias) e mede cada consulta típica do time de
+segurança, inclusive páginas profundas via cursor.
+
+Uso (a partir de backend/):
+    python -m benchmarks.bench_history --analyses 200000
+    python -m benchmarks.bench_history --db /tmp/history.db --reuse   # sem repopular
+"""
+
+import argparse
+import json
+import os
+import statistics
+import sys
+import tempfile
+import time
+from pathlib import Path
+from typing import Callable, Dict, List
+
+from benchmarks.synthetic import make_graph
+from schemas.api_models import InferenceResponse, Metadata
+from services.history_store import HistoryStore
+from services.stride_analyzer import StrideAnalyzer
+
+
+def make_templates(n_templates: int, seed: int) -> List[InferenceResponse]:
+    """Respostas completas (grafo + STRIDE) reaproveitadas na população."""
+    analyzer = StrideAnalyzer()
+    templates = []
+    for i in range(n_templates):
+        # Tamanho dos diagramas reais do dataset (~8-40 componentes)
+        n_nodes = 8 + (i * 7) % 33
+        graph = make_graph(
+            n_nodes=n_nodes,
+            n_edges=int(n_nodes * 1.5),
+            n_boundaries=1 + i % 4,
+            seed=seed + i,
+        )
+        stride = analyzer.analyze(graph)
+        metadata = Metadata(
+            processing_time_ms=100.0 + i,
+            model_version=f"yolo11m-pose_manual_v{1 + i % 3}_v1",
+            total_detections=len(graph.nodes) + len(graph.edges),
+            confidence_threshold=0.5,
+        )
+        templates.append(
+            InferenceResponse(graph=graph, stride_analysis=stride, metadata=metadata)
+        )
+    return templates
+
+
+def populate(store: HistoryStore, n: int, days: float, args) -> float:
+    """Grava `n` análises em lotes; retorna análises/s."""
+    templates = make_templates(args.templates, args.seed)
+    store._ensure_schema()
+    conn = store._connect()
+    start_ts = time.time() - days * 86400
+    step = days * 86400 / max(n, 1)
+
+    start = time.perf_counter()
+    batch = []
+    for i in range(n):
+        batch.append(
+            (store.new_id(), start_ts + i * step, templates[i % len(templates)])
+        )
+        if len(batch) >= store.batch_size:
+            store._write_batch(conn, batch)
+            batch = []
+        if i and i % 50000 == 0:
+            print(f"  {i} analyses written...", file=sys.stderr)
+    if batch:
+        store._write_batch(conn, batch)
+    elapsed = time.perf_counter() - start
+    conn.execute("ANALYZE")
+    conn.close()
+    return n / elapsed
+
+
+def time_query(fn: Callable, repeat: int) -> Dict[str, float]:
+    samples = []
+    result = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = fn()
+        samples.append((time.perf_counter() - start) * 1000)
+    return {
+        "p50_ms": round(statistics.median(samples), 3),
+        "max_ms": round(max(samples), 3),
+        "items": len(result.items),
+    }
+
+
+def deep_page(fn: Callable, pages: int):
+    """Segue o cursor por `pages` páginas e devolve a consulta da última."""
+    cursor = None
+    for _ in range(pages):
+        page = fn(cursor)
+        if page.next_cursor is None:
+            break
+        cursor = page.next_cursor
+    return lambda: fn(cursor)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="History store benchmark")
+    parser.add_argument(
+        "--analyses", type=int, default=200000, help="Analyses to store"
+    )
+    parser.add_argument("--days", type=float, default=90, help="Time span of the data")
+    parser.add_argument("--templates", type=int, default=32, help="Distinct graphs")
+    parser.add_argument("--repeat", type=int, default=20, help="Runs per query")
+    parser.add_argument("--limit", type=int, default=50, help="Page size")
+    parser.add_argument("--db", type=str, default=None, help="Database file")
+    parser.add_argument(
+        "--reuse", action="store_true", help="Query an existing --db without populating"
+    )
+    parser.add_argument("--seed", type=int, default=0, help="Synthetic data seed")
+    parser.add_argument(
+        "--output", type=str, default=None, help="Write the JSON report to this file"
+    )
+    args = parser.parse_args()
+
+    db_path = args.db or os.path.join(tempfile.mkdtemp(), "history.db")
+    store = HistoryStore(path=db_path)
+    report: Dict = {"db": db_path, "analyses": args.analyses}
+
+    if not args.reuse:
+        if Path(db_path).exists():
+            Path(db_path).unlink()
+        print(f"Populating {args.analyses} analyses in {db_path}...", file=sys.stderr)
+        report["write_analyses_per_s"] = round(
+            populate(store, args.analyses, args.days, args), 1
+        )
+    else:
+        report["analyses"] = store._read("SELECT COUNT(*) AS n FROM analyses", [])[0][
+            "n"
+        ]
+    report["db_size_mb"] = round(Path(db_path).stat().st_size / 1e6, 1)
+
+    last_month = time.time() - 30 * 86400
+    limit = args.limit
+    queries = {
+        "critical_elevation_of_privilege": lambda: store.query_analyses(
+            category="Elevation of Privilege", severity="Critical", limit=limit
+        ),
+        "analyses_with_database": lambda: store.query_analyses(
+            node_type="database", limit=limit
+        ),
+        "user_to_database_last_month": lambda: store.query_edges(
+            source_type="user", target_type="database", since=last_month, limit=limit
+        ),
+        "high_threats": lambda: store.query_threats(severity="High", limit=limit),
+        # Um filtro só (primeira coluna do índice composto): sem índice próprio
+        # o SQLite ordena todas as linhas da categoria/tipo em memória
+        "tampering_threats": lambda: store.query_threats(
+            category="Tampering", limit=limit
+        ),
+        "edges_from_user": lambda: store.query_edges(source_type="user", limit=limit),
+        "analyses_with_tampering": lambda: store.query_analyses(
+            category="Tampering", limit=limit
+        ),
+        "analyses_with_edges_from_user": lambda: store.query_analyses(
+            source_type="user", limit=limit
+        ),
+        "analyses_user_to_database_with_critical": lambda: store.query_analyses(
+            severity="Critical",
+            source_type="user",
+            target_type="database",
+            limit=limit,
+        ),
+        "latest_analyses": lambda: store.query_analyses(limit=limit),
+        # Sem resultados: pior caso para filtros combinados
+        "no_match": lambda: store.query_analyses(
+            category="Repudiation", severity="Critical", node_type="monitoring"
+        ),
+    }
+    queries["high_threats_page_100"] = deep_page(
+        lambda cursor: store.query_threats(severity="High", limit=limit, cursor=cursor),
+        100,
+    )
+    queries["tampering_threats_page_100"] = deep_page(
+        lambda cursor: store.query_threats(
+            category="Tampering", limit=limit, cursor=cursor
+        ),
+        100,
+    )
+    queries["analyses_with_database_page_100"] = deep_page(
+        lambda cursor: store.query_analyses(
+            node_type="database", limit=limit, cursor=cursor
+        ),
+        100,
+    )
+
+    report["queries"] = {}
+    for name, fn in queries.items():
+        report["queries"][name] = time_query(fn, args.repeat)
+        print(f"  {name:<42} {report['queries'][name]}", file=sys.stderr)
+
+    text = json.dumps(report, indent=2)
+    if args.output:
+        Path(args.output).write_text(text)
+    print(text)
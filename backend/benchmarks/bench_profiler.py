@@ -0,0 +1,124 @@
+"""
+Custo do profiling por amostragem em /api/v1/inference (API em processo,
+StubYOLO com CPU ocupada para o predict aparecer no perfil).
+
+Modos:
+    disabled    sem profile=true e AUTOSTRIDE_PROFILE_RATE=0 (nenhuma thread)
+    profiled    profile=true com token de admin (amostragem a cada
+                AUTOSTRIDE_PROFILE_INTERVAL_MS)
+
+Imprime também as etapas e funções com mais amostras do último perfil.
+
+Uso (a partir de backend/):
+    python -m benchmarks.bench_profiler --requests 30 --cpu-ms 80
+"""
+
+import argparse
+import json
+import os
+import statistics
+import sys
+import tempfile
+import time
+from collections import Counter
+from pathlib import Path
+from typing import Dict, List
+
+import cv2
+import numpy as np
+
+TOKEN = "bench-admin-token"
+
+
+def timed(send, n: int) -> List[float]:
+    samples = []
+    for _ in range(n):
+        start = time.perf_counter()
+        send()
+        samples.append((time.perf_counter() - start) * 1000)
+    return samples
+
+
+def summarize(samples: List[float]) -> Dict:
+    return {
+        "p50_ms": round(statistics.median(samples), 2),
+        "mean_ms": round(statistics.mean(samples), 2),
+    }
+
+
+def top_frames(folded: str, depth: int, top: int) -> Dict[str, int]:
+    """Amostras por prefixo da pilha (etapa + `depth` frames a partir da folha)."""
+    counts = Counter()
+    for line in folded.splitlines():
+        stack, count = line.rsplit(" ", 1)
+        frames = stack.split(";")
+        counts[f"{frames[0]} :: {';'.join(frames[-depth:])}"] += int(count)
+    return dict(counts.most_common(top))
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Sampling profiler overhead")
+    parser.add_argument("--requests", type=int, default=30, help="Requests per mode")
+    parser.add_argument("--cpu-ms", type=float, default=80, help="Stub model CPU time")
+    parser.add_argument("--nodes", type=int, default=200, help="Stub: component count")
+    parser.add_argument("--arrows", type=int, default=400, help="Stub: arrow count")
+    parser.add_argument(
+        "--output", type=str, default=None, help="Write the JSON report to this file"
+    )
+    args = parser.parse_args()
+
+    os.environ.setdefault("AUTOSTRIDE_HISTORY_DB", "")
+    os.environ["AUTOSTRIDE_ADMIN_TOKEN"] = TOKEN
+    os.environ["AUTOSTRIDE_PROFILE_DIR"] = tempfile.mkdtemp(prefix="profiles-")
+    os.environ["AUTOSTRIDE_STUB_CPU_MS"] = str(args.cpu_ms)
+    os.environ["AUTOSTRIDE_STUB_NODES"] = str(args.nodes)
+    os.environ["AUTOSTRIDE_STUB_ARROWS"] = str(args.arrows)
+
+    from fastapi.testclient import TestClient
+
+    from benchmarks.stub_app import app
+
+    client = TestClient(app)
+    image = cv2.imencode(".png", np.full((1080, 1920, 3), 255, dtype=np.uint8))[
+        1
+    ].tobytes()
+    files = {"file": ("diagram.png", image, "image/png")}
+
+    def disabled():
+        client.post("/api/v1/inference?model_name=stub", files=files).raise_for_status()
+
+    def profiled():
+        response = client.post(
+            "/api/v1/inference?model_name=stub&profile=true",
+            files=files,
+            headers={"X-Admin-Token": TOKEN},
+        )
+        response.raise_for_status()
+        return response.json()["metadata"]["profile_id"]
+
+    disabled()  # aquecimento
+    report = {}
+    print("Running disabled...", file=sys.stderr)
+    report["disabled"] = summarize(timed(disabled, args.requests))
+    print("Running profiled...", file=sys.stderr)
+    report["profiled"] = summarize(timed(profiled, args.requests))
+    report["overhead_pct"] = round(
+        100 * (report["profiled"]["mean_ms"] / report["disabled"]["mean_ms"] - 1), 1
+    )
+
+    headers = {"X-Admin-Token": TOKEN}
+    profile_id = profiled()
+    info = client.get("/api/v1/admin/profiles?limit=1", headers=headers).json()[
+        "items"
+    ][0]
+    folded = client.get(f"/api/v1/admin/profiles/{profile_id}", headers=headers).text
+    report["last_profile"] = {
+        "samples": info["samples"],
+        "duration_ms": info["duration_ms"],
+        "top_stacks": top_frames(folded, depth=1, top=8),
+    }
+
+    text = json.dumps(report, indent=2)
+    if args.output:
+        Path(args.output).write_text(text)
+    print(text)
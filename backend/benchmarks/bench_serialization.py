@@ -0,0 +1,108 @@
+"""
+Compara o caminho padrão do FastAPI (response_model + jsonable_encoder) com o
+caminho rápido do ResponseEncoder em um grafo sintético grande.
+
+Uso (a partir de backend/):
+    python -m benchmarks.bench_serialization --nodes 800 --repeat 50
+"""
+
+import argparse
+import json
+import statistics
+import time
+
+from fastapi import FastAPI, Request
+from fastapi.testclient import TestClient
+
+from benchmarks.synthetic import make_graph
+from schemas.api_models import InferenceResponse, Metadata
+from services.response_encoder import ResponseEncoder
+from services.stride_analyzer import StrideAnalyzer
+
+
+def build_response(n_nodes: int) -> InferenceResponse:
+    graph = make_graph(n_nodes=n_nodes)
+    stride_analysis = StrideAnalyzer().analyze(graph)
+    metadata = Metadata(
+        processing_time_ms=0.0,
+        model_version="synthetic",
+        total_detections=len(graph.nodes) + len(graph.edges),
+        confidence_threshold=0.5,
+    )
+    return InferenceResponse(
+        graph=graph, stride_analysis=stride_analysis, metadata=metadata
+    )
+
+
+def build_app(response: InferenceResponse) -> FastAPI:
+    app = FastAPI()
+    encoder = ResponseEncoder()
+
+    @app.get("/default", response_model=InferenceResponse)
+    async def default_path():
+        return response
+
+    @app.get("/fast")
+    async def fast_path(request: Request):
+        fast = InferenceResponse.model_construct(**dict(response))
+        return encoder.encode(
+            fast,
+            accept=request.headers.get("accept"),
+            accept_encoding=request.headers.get("accept-encoding"),
+        )
+
+    return app
+
+
+def time_requests(client: TestClient, path: str, headers: dict, repeat: int):
+    # Aquecimento
+    client.get(path, headers=headers)
+    samples = []
+    size = 0
+    for _ in range(repeat):
+        start = time.perf_counter()
+        res = client.get(path, headers=headers)
+        samples.append((time.perf_counter() - start) * 1000)
+        size = int(res.headers.get("content-length", len(res.content)))
+    return {
+        "mean_ms": round(statistics.mean(samples), 3),
+        "p50_ms": round(statistics.median(samples), 3),
+        "min_ms": round(min(samples), 3),
+        "wire_bytes": size,
+    }
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark response serialization")
+    parser.add_argument("--nodes", type=int, default=800, help="Synthetic node count")
+    parser.add_argument("--repeat", type=int, default=50, help="Requests per case")
+    args = parser.parse_args()
+
+    response = build_response(args.nodes)
+    client = TestClient(build_app(response))
+
+    cases = {
+        "default_json": ("/default", {"accept-encoding": "identity"}),
+        "fast_json": ("/fast", {"accept-encoding": "identity"}),
+        "fast_json_gzip": ("/fast", {"accept-encoding": "gzip"}),
+        "fast_json_br": ("/fast", {"accept-encoding": "br"}),
+        "fast_msgpack": (
+            "/fast",
+            {"accept": "application/msgpack", "accept-encoding": "identity"},
+        ),
+        "fast_msgpack_br": (
+            "/fast",
+            {"accept": "application/msgpack", "accept-encoding": "br"},
+        ),
+    }
+
+    report = {
+        "nodes": len(response.graph.nodes),
+        "edges": len(response.graph.edges),
+        "threats": len(response.stride_analysis.threats),
+        "results": {
+            name: time_requests(client, path, headers, args.repeat)
+            for name, (path, headers) in cases.items()
+        },
+    }
+    print(json.dumps(report, indent=2))
@@ -0,0 +1,117 @@
+"""
+Interação via sessão WebSocket x upload multipart a cada mudança.
+
+Simula um usuário ajustando o threshold várias vezes sobre o mesmo diagrama:
+no modo "upload" cada ajuste é um POST /api/v1/inference completo; no modo
+"session" a imagem vai uma vez e cada ajuste é uma mensagem respondida com
+um delta a partir das detecções guardadas no servidor. Mede latência por
+interação e bytes trafegados (API em processo, StubYOLO).
+
+Uso (a partir de backend/):
+    python -m benchmarks.bench_session --latency-ms 150 --steps 20
+"""
+
+import argparse
+import json
+import os
+import statistics
+import sys
+import time
+from pathlib import Path
+from typing import Dict, List
+
+import cv2
+import numpy as np
+
+
+def thresholds(steps: int) -> List[float]:
+    # Vai e volta entre 0.3 e 0.8, como um slider
+    return [round(0.3 + 0.5 * abs((i % 10) - 5) / 5, 2) for i in range(steps)]
+
+
+def summarize(samples: List[float], sent: int, received: int) -> Dict:
+    return {
+        "p50_ms": round(statistics.median(samples), 2),
+        "max_ms": round(max(samples), 2),
+        "bytes_sent": sent,
+        "bytes_received": received,
+    }
+
+
+def run_upload(client, image: bytes, steps: int) -> Dict:
+    samples, received = [], 0
+    for conf in thresholds(steps):
+        start = time.perf_counter()
+        response = client.post(
+            f"/api/v1/inference?model_name=stub&conf_threshold={conf}",
+            files={"file": ("diagram.png", image, "image/png")},
+        )
+        samples.append((time.perf_counter() - start) * 1000)
+        received += len(response.content)
+    return summarize(samples, len(image) * steps, received)
+
+
+def run_session(client, image: bytes, steps: int) -> Dict:
+    samples, sent, received = [], len(image), 0
+    with client.websocket_connect("/api/v1/session?model_name=stub") as ws:
+        start = time.perf_counter()
+        ws.send_bytes(image)
+        for _ in range(2):  # "session" + "analysis"
+            received += len(ws.receive_text())
+        initial_ms = (time.perf_counter() - start) * 1000
+        for conf in thresholds(steps):
+            message = json.dumps({"type": "threshold", "conf_threshold": conf})
+            start = time.perf_counter()
+            ws.send_text(message)
+            received += len(ws.receive_text())
+            samples.append((time.perf_counter() - start) * 1000)
+            sent += len(message)
+    result = summarize(samples, sent, received)
+    result["initial_upload_ms"] = round(initial_ms, 2)
+    return result
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="WebSocket session vs re-upload")
+    parser.add_argument("--steps", type=int, default=20, help="Threshold changes")
+    parser.add_argument(
+        "--latency-ms", type=float, default=150, help="Stub model latency"
+    )
+    parser.add_argument("--nodes", type=int, default=60, help="Stub: component count")
+    parser.add_argument("--arrows", type=int, default=90, help="Stub: arrow count")
+    parser.add_argument(
+        "--image-size", type=str, default="1920x1080", help="Image size WxH"
+    )
+    parser.add_argument(
+        "--output", type=str, default=None, help="Write the JSON report to this file"
+    )
+    args = parser.parse_args()
+
+    os.environ.setdefault("AUTOSTRIDE_HISTORY_DB", "")
+    os.environ["AUTOSTRIDE_STUB_NODES"] = str(args.nodes)
+    os.environ["AUTOSTRIDE_STUB_ARROWS"] = str(args.arrows)
+    os.environ["AUTOSTRIDE_STUB_LATENCY_MS"] = str(args.latency_ms)
+
+    from fastapi.testclient import TestClient
+
+    from benchmarks.stub_app import app
+
+    w, h = (int(v) for v in args.image_size.lower().split("x"))
+    rng = np.random.default_rng(0)
+    canvas = np.full((h, w, 3), 255, dtype=np.uint8)
+    # Algum conteúdo para o PNG não ficar trivialmente pequeno
+    for _ in range(200):
+        x, y = int(rng.integers(0, w - 80)), int(rng.integers(0, h - 40))
+        cv2.rectangle(canvas, (x, y), (x + 80, y + 40), (0, 0, 0), 2)
+    image = cv2.imencode(".png", canvas)[1].tobytes()
+
+    client = TestClient(app)
+    print("Running upload mode...", file=sys.stderr)
+    report = {"upload": run_upload(client, image, args.steps)}
+    print("Running session mode...", file=sys.stderr)
+    report["session"] = run_session(client, image, args.steps)
+
+    text = json.dumps(report, indent=2)
+    if args.output:
+        Path(args.output).write_text(text)
+    print(text)
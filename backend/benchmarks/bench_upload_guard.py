@@ -0,0 +1,134 @@
+"""
+Rejeição antecipada de uploads: latência e memória para recusar arquivos
+grandes demais, não-imagens e decompression bombs, comparadas a um upload
+válido (API em processo, StubYOLO).
+
+Casos:
+    valid_png            PNG 1920x1080 normal (200)
+    oversized_declared   corpo acima do limite do middleware, com Content-Length
+                         (413 sem ler o corpo)
+    oversized_chunked    o mesmo sem Content-Length (413 pela contagem de bytes)
+    fake_png             texto enviado como image/png (415 pelos magic bytes)
+    png_bomb             PNG de ~200 KB que declara 40000x40000 (413 pelo IHDR)
+
+Uso (a partir de backend/):
+    python -m benchmarks.bench_upload_guard
+"""
+
+import argparse
+import json
+import os
+import resource
+import statistics
+import struct
+import sys
+import time
+import uuid
+import zlib
+from pathlib import Path
+from typing import Dict, Iterator
+
+import cv2
+import numpy as np
+
+
+def png_bomb(width: int, height: int) -> bytes:
+    """PNG 1-bit válido, todo preto: poucos KB comprimido, gigabytes em RGB."""
+
+    def chunk(kind: bytes, data: bytes) -> bytes:
+        body = kind + data
+        return struct.pack(">I", len(data)) + body + struct.pack(">I", zlib.crc32(body))
+
+    row = b"\x00" * (1 + (width + 7) // 8)
+    compressor = zlib.compressobj(9)
+    parts = [compressor.compress(row * 1000) for _ in range(height // 1000)]
+    parts.append(compressor.compress(row * (height % 1000)))
+    parts.append(compressor.flush())
+    return (
+        b"\x89PNG\r\n\x1a\n"
+        + chunk(b"IHDR", struct.pack(">IIBBBBB", width, height, 1, 0, 0, 0, 0))
+        + chunk(b"IDAT", b"".join(parts))
+        + chunk(b"IEND", b"")
+    )
+
+
+def multipart_stream(
+    payload: bytes, boundary: str, block: int = 2**20
+) -> Iterator[bytes]:
+    yield (
+        f'--{boundary}\r\nContent-Disposition: form-data; name="file"; '
+        f'filename="big.png"\r\nContent-Type: image/png\r\n\r\n'
+    ).encode()
+    for start in range(0, len(payload), block):
+        yield payload[start : start + block]
+    yield f"\r\n--{boundary}--\r\n".encode()
+
+
+def measure(send, repeat: int) -> Dict:
+    samples, status = [], None
+    rss_before = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    for _ in range(repeat):
+        start = time.perf_counter()
+        status = send()
+        samples.append((time.perf_counter() - start) * 1000)
+    rss_after = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return {
+        "status": status,
+        "p50_ms": round(statistics.median(samples), 2),
+        "max_rss_growth_mb": round((rss_after - rss_before) / 1024, 1),
+    }
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Upload rejection benchmark")
+    parser.add_argument("--repeat", type=int, default=5, help="Requests per case")
+    parser.add_argument(
+        "--output", type=str, default=None, help="Write the JSON report to this file"
+    )
+    args = parser.parse_args()
+
+    os.environ.setdefault("AUTOSTRIDE_HISTORY_DB", "")
+    from fastapi.testclient import TestClient
+
+    from benchmarks.stub_app import app
+    from main import upload_guard
+
+    client = TestClient(app)
+    url = "/api/v1/inference?model_name=stub"
+    valid = cv2.imencode(".png", np.full((1080, 1920, 3), 255, dtype=np.uint8))[
+        1
+    ].tobytes()
+    # Começa como PNG para passar pelo formato e cair só no limite de bytes
+    big = b"\x89PNG\r\n\x1a\n" + os.urandom(upload_guard.request_limit() + 2**20)
+    bomb = png_bomb(40000, 40000)
+    boundary = uuid.uuid4().hex
+
+    cases = {
+        "valid_png": lambda: client.post(
+            url, files={"file": ("a.png", valid, "image/png")}
+        ).status_code,
+        "oversized_declared": lambda: client.post(
+            url, files={"file": ("big.png", big, "image/png")}
+        ).status_code,
+        "oversized_chunked": lambda: client.post(
+            url,
+            content=multipart_stream(big, boundary),
+            headers={"Content-Type": f"multipart/form-data; boundary={boundary}"},
+        ).status_code,
+        "fake_png": lambda: client.post(
+            url, files={"file": ("a.png", b"not an image" * 1000, "image/png")}
+        ).status_code,
+        "png_bomb": lambda: client.post(
+            url, files={"file": ("bomb.png", bomb, "image/png")}
+        ).status_code,
+    }
+
+    report = {"png_bomb_bytes": len(bomb), "cases": {}}
+    for name, send in cases.items():
+        print(f"Running {name}...", file=sys.stderr)
+        report["cases"][name] = measure(send, args.repeat)
+
+    text = json.dumps(report, indent=2)
+    if args.output:
+        Path(args.output).write_text(text)
+    print(text)
@@ -0,0 +1,282 @@
+"""
+Teste de carga ponta a ponta de /api/v1/inference.
+
+Sem `--url`, sobe a API em processo com o StubYOLO no lugar do modelo real,
+então não precisa de GPU nem de pesos. Com `--url`, dispara contra um servidor
+já em execução (modelo real ou stub).
+
+Uso (a partir de backend/):
+    python -m benchmarks.load_test --requests 200 --concurrency 8 \
+        --image-size 1600x1000 --nodes 30 --arrows 40 --output report.json
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import statistics
+import subprocess
+import time
+from typing import Dict, List, Optional
+
+import cv2
+import httpx
+import numpy as np
+
+STUB_MODEL_NAME = "stub"
+
+
+def percentile(values: List[float], pct: float) -> float:
+    """Percentil por nearest-rank (0 para lista vazia)."""
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    rank = max(0, min(len(ordered) - 1, int(round(pct / 100 * len(ordered))) - 1))
+    return round(ordered[rank], 2)
+
+
+def summarize(values: List[float]) -> Dict[str, float]:
+    return {
+        "mean": round(statistics.mean(values), 2) if values else 0.0,
+        "p50": percentile(values, 50),
+        "p90": percentile(values, 90),
+        "p99": percentile(values, 99),
+        "max": round(max(values), 2) if values else 0.0,
+    }
+
+
+def make_upload(
+    width: int, height: int, image_format: str, noise: bool, seed: int
+) -> bytes:
+    """Gera uma imagem de diagrama falsa (caixas e linhas) codificada em PNG/JPEG."""
+    rng = np.random.default_rng(seed)
+    image = np.full((height, width, 3), 255, dtype=np.uint8)
+    for _ in range(40):
+        x1, y1 = int(rng.integers(0, width - 60)), int(rng.integers(0, height - 60))
+        x2, y2 = x1 + int(rng.integers(30, 120)), y1 + int(rng.integers(30, 120))
+        color = tuple(int(c) for c in rng.integers(0, 200, size=3))
+        cv2.rectangle(image, (x1, y1), (x2, y2), color, 2)
+        cv2.line(
+            image,
+            (x2, y1),
+            (int(rng.integers(0, width)), int(rng.integers(0, height))),
+            color,
+            2,
+        )
+    if noise:
+        # Ruído aumenta o tamanho do arquivo (simula screenshots/fotos)
+        image = cv2.add(image, rng.integers(0, 24, size=image.shape, dtype=np.uint8))
+
+    ext = ".jpg" if image_format == "jpeg" else ".png"
+    ok, encoded = cv2.imencode(ext, image)
+    if not ok:
+        raise RuntimeError("Failed to encode synthetic upload")
+    return encoded.tobytes()
+
+
+def build_inprocess_app(args):
+    """Registra o StubYOLO e importa a app FastAPI em processo."""
+    from benchmarks.stub_model import StubYOLO
+    from models.yolo_loader import YOLOModel
+
+    YOLOModel.register_model(
+        STUB_MODEL_NAME,
+        StubYOLO(
+            n_nodes=args.nodes,
+            n_arrows=args.arrows,
+            n_boundaries=args.boundaries,
+            latency_ms=args.stub_latency_ms,
+        ),
+    )
+    # Sem histórico: o writer do SQLite entraria na medição (e no banco de dev)
+    os.environ["AUTOSTRIDE_HISTORY_DB"] = ""
+    import main
+
+    return main.app
+
+
+def git_revision() -> Optional[str]:
+    try:
+        return (
+            subprocess.check_output(
+                ["git", "rev-parse", "--short", "HEAD"], stderr=subprocess.DEVNULL
+            )
+            .decode()
+            .strip()
+        )
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+async def run_load(
+    client: httpx.AsyncClient, args, upload: bytes, content_type: str
+) -> Dict:
+    params = {
+        "conf_threshold": args.conf_threshold,
+        "include_visualization": str(args.visualization).lower(),
+    }
+    if args.model_name:
+        params["model_name"] = args.model_name
+
+    headers = {}
+    if args.deadline_ms:
+        headers["X-Request-Deadline-Ms"] = str(args.deadline_ms)
+
+    latencies: List[float] = []
+    stages: Dict[str, List[float]] = {}
+    errors: Dict[str, int] = {}
+    degradations: Dict[str, int] = {}
+    queue: asyncio.Queue = asyncio.Queue()
+    for i in range(args.requests):
+        queue.put_nowait(i)
+
+    async def worker():
+        while True:
+            try:
+                queue.get_nowait()
+            except asyncio.QueueEmpty:
+                return
+            start = time.perf_counter()
+            try:
+                res = await client.post(
+                    "/api/v1/inference",
+                    params=params,
+                    headers=headers,
+                    files={"file": ("diagram", upload, content_type)},
+                )
+            except httpx.HTTPError as e:
+                errors[type(e).__name__] = errors.get(type(e).__name__, 0) + 1
+                continue
+            elapsed = (time.perf_counter() - start) * 1000
+            if res.status_code != 200:
+                errors[str(res.status_code)] = errors.get(str(res.status_code), 0) + 1
+                continue
+            latencies.append(elapsed)
+            metadata = res.json().get("metadata", {})
+            for stage, value in metadata.get("stage_timings_ms", {}).items():
+                stages.setdefault(stage, []).append(value)
+            for item in metadata.get("degradations", []):
+                degradations[item] = degradations.get(item, 0) + 1
+
+    # Aquecimento (carga do modelo, caches de import)
+    for _ in range(args.warmup):
+        await client.post(
+            "/api/v1/inference",
+            params=params,
+            files={"file": ("diagram", upload, content_type)},
+        )
+
+    wall_start = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(args.concurrency)))
+    wall = time.perf_counter() - wall_start
+
+    return {
+        "completed": len(latencies),
+        "errors": errors,
+        "duration_s": round(wall, 3),
+        "requests_per_s": round(len(latencies) / wall, 2) if wall > 0 else 0.0,
+        "latency_ms": summarize(latencies),
+        "stages_ms": {stage: summarize(values) for stage, values in stages.items()},
+        "degradations": degradations,
+    }
+
+
+async def main_async(args) -> Dict:
+    width, height = (int(v) for v in args.image_size.lower().split("x"))
+    upload = make_upload(width, height, args.format, args.noise, args.seed)
+    content_type = "image/jpeg" if args.format == "jpeg" else "image/png"
+
+    if args.url:
+        transport = None
+        base_url = args.url
+    else:
+        transport = httpx.ASGITransport(app=build_inprocess_app(args))
+        base_url = "http://autostride.bench"
+
+    limits = httpx.Limits(max_connections=args.concurrency)
+    async with httpx.AsyncClient(
+        transport=transport, base_url=base_url, timeout=args.timeout, limits=limits
+    ) as client:
+        results = await run_load(client, args, upload, content_type)
+
+    return {
+        "revision": git_revision(),
+        "config": {
+            "target": args.url or "in-process stub",
+            "requests": args.requests,
+            "concurrency": args.concurrency,
+            "image_size": [width, height],
+            "upload_bytes": len(upload),
+            "format": args.format,
+            "visualization": args.visualization,
+            "nodes": args.nodes,
+            "arrows": args.arrows,
+            "stub_latency_ms": args.stub_latency_ms,
+            "deadline_ms": args.deadline_ms,
+        },
+        "results": results,
+    }
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Load test /api/v1/inference")
+    parser.add_argument(
+        "--url", type=str, default=None, help="Target server (default: in-process stub)"
+    )
+    parser.add_argument("--requests", type=int, default=100, help="Total requests")
+    parser.add_argument("--concurrency", type=int, default=4, help="Concurrent clients")
+    parser.add_argument(
+        "--warmup", type=int, default=2, help="Warmup requests (not measured)"
+    )
+    parser.add_argument(
+        "--image-size", type=str, default="1600x1000", help="Upload size WxH"
+    )
+    parser.add_argument(
+        "--format", choices=["png", "jpeg"], default="png", help="Upload encoding"
+    )
+    parser.add_argument(
+        "--noise", action="store_true", help="Add noise to inflate upload size"
+    )
+    parser.add_argument(
+        "--visualization", action="store_true", help="Request visualization image"
+    )
+    parser.add_argument(
+        "--conf-threshold", type=float, default=0.5, help="conf_threshold query value"
+    )
+    parser.add_argument(
+        "--model-name", type=str, default=None, help="model_name query value"
+    )
+    parser.add_argument("--nodes", type=int, default=30, help="Stub: component count")
+    parser.add_argument("--arrows", type=int, default=40, help="Stub: arrow count")
+    parser.add_argument(
+        "--boundaries", type=int, default=3, help="Stub: boundary count"
+    )
+    parser.add_argument(
+        "--stub-latency-ms",
+        type=float,
+        default=0.0,
+        help="Stub: simulated forward time",
+    )
+    parser.add_argument(
+        "--deadline-ms",
+        type=float,
+        default=None,
+        help="Send X-Request-Deadline-Ms with this budget",
+    )
+    parser.add_argument(
+        "--timeout", type=float, default=120.0, help="Per-request timeout (s)"
+    )
+    parser.add_argument(
+        "--seed", type=int, default=0, help="Seed for the synthetic upload"
+    )
+    parser.add_argument(
+        "--output", type=str, default=None, help="Write the JSON report to this file"
+    )
+    args = parser.parse_args()
+
+    report = asyncio.run(main_async(args))
+    text = json.dumps(report, indent=2)
+    if args.output:
+        with open(args.output, "w") as f:
+            f.write(text)
+    print(text)
@@ -0,0 +1,204 @@
+"""
+Replay das requisições capturadas (AUTOSTRIDE_CAPTURE_DIR) contra o código
+atual, para validar um novo GraphBuilder/StrideAnalyzer ou modelo com
+tráfego real antes do rollout.
+
+Cada captura é reenviada a /api/v1/inference com os mesmos pixels e
+parâmetros (o modelo pode ser trocado com `--model-name`). O relatório traz
+a latência capturada x replay (`processing_time_ms` do servidor) e, por
+captura, o que mudou no grafo e nas ameaças (GraphDiffer: nós por tipo e
+posição, arestas e ameaças). O resultado não depende da concorrência: as
+capturas são reenviadas e reportadas na ordem de captura, sem reuso de
+quase-duplicatas nem deadline.
+
+Sem `--url`, a API roda em processo com os modelos locais (ou o StubYOLO,
+com `--stub`); com `--url`, o replay vai para um servidor já em execução
+(outro runtime, GPU...). Nesse caso, desligue a captura no servidor.
+
+Uso (a partir de backend/):
+    python -m benchmarks.replay_captures data/captures --concurrency 4 \\
+        --model-name yolo11m-pose_manual_v4_v1 --output replay.json
+    python -m benchmarks.replay_captures data/captures --fail-on-change   # CI
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import sys
+import time
+from pathlib import Path
+from typing import Dict, List, Optional
+
+import httpx
+
+from benchmarks.load_test import summarize
+
+
+def diff_counts(differ, captured: Dict, replayed: Dict) -> Dict[str, int]:
+    from schemas.api_models import Graph, StrideAnalysisResult
+
+    diff = differ.diff(
+        Graph.model_validate(captured["graph"]),
+        Graph.model_validate(replayed["graph"]),
+        StrideAnalysisResult.model_validate(captured["stride_analysis"]),
+        StrideAnalysisResult.model_validate(replayed["stride_analysis"]),
+    )
+    return {
+        "nodes_added": len(diff.nodes.added),
+        "nodes_removed": len(diff.nodes.removed),
+        "parents_changed": sum(m.parent_changed for m in diff.nodes.matched),
+        "edges_added": len(diff.edges.added),
+        "edges_removed": len(diff.edges.removed),
+        "threats_added": len(diff.threats.added),
+        "threats_removed": len(diff.threats.removed),
+        "severity_changed": len(diff.threats.severity_changed),
+    }
+
+
+async def replay(
+    client: httpx.AsyncClient,
+    directory: str,
+    captures: List[Dict],
+    model_name: Optional[str],
+    concurrency: int,
+) -> List[Dict]:
+    from services.graph_diff import GraphDiffer
+    from services.request_capture import read_image, read_output
+
+    differ = GraphDiffer()
+    semaphore = asyncio.Semaphore(concurrency)
+
+    async def run_one(capture: Dict) -> Dict:
+        params = {k: v for k, v in capture["params"].items() if v is not None}
+        if model_name:
+            params["model_name"] = model_name
+        row = {
+            "capture_id": capture["capture_id"],
+            "model": params.get("model_name"),
+            "captured_ms": capture["processing_time_ms"],
+        }
+        image = read_image(directory, capture)
+        async with semaphore:
+            start = time.perf_counter()
+            response = await client.post(
+                "/api/v1/inference",
+                params=params,
+                files={"file": (f"{capture['image']}.png", image, "image/png")},
+            )
+            row["client_ms"] = round((time.perf_counter() - start) * 1000, 2)
+        if response.status_code != 200:
+            row["error"] = f"{response.status_code}: {response.text[:200]}"
+            return row
+
+        replayed = response.json()
+        row["replay_ms"] = replayed["metadata"]["processing_time_ms"]
+        row["delta_ms"] = round(row["replay_ms"] - row["captured_ms"], 2)
+        captured = await asyncio.to_thread(read_output, directory, capture)
+        row["changes"] = await asyncio.to_thread(
+            diff_counts, differ, captured, replayed
+        )
+        row["changed"] = any(row["changes"].values())
+        return row
+
+    return await asyncio.gather(*(run_one(c) for c in captures))
+
+
+def build_report(rows: List[Dict], corpus: int) -> Dict:
+    ok = [r for r in rows if "error" not in r]
+    changed = [r for r in ok if r["changed"]]
+    totals: Dict[str, int] = {}
+    for row in ok:
+        for key, value in row["changes"].items():
+            totals[key] = totals.get(key, 0) + value
+    return {
+        "corpus": corpus,
+        "replayed": len(ok),
+        "errors": len(rows) - len(ok),
+        "changed": len(changed),
+        "latency_ms": {
+            "captured": summarize([r["captured_ms"] for r in ok]),
+            "replay": summarize([r["replay_ms"] for r in ok]),
+            "delta": summarize([r["delta_ms"] for r in ok]),
+        },
+        "change_totals": totals,
+        "captures": rows,
+    }
+
+
+async def main(args) -> Dict:
+    from services.request_capture import load_captures
+
+    captures = load_captures(args.capture_dir)
+    if args.limit:
+        captures = captures[: args.limit]
+    if not captures:
+        raise SystemExit(f"No captures found in {args.capture_dir}")
+
+    if args.url:
+        transport, base_url = None, args.url
+    else:
+        # API em processo, sem histórico e sem recapturar o próprio replay
+        os.environ["AUTOSTRIDE_HISTORY_DB"] = ""
+        os.environ["AUTOSTRIDE_CAPTURE_DIR"] = ""
+        if args.stub:
+            from benchmarks.stub_app import app
+        else:
+            from main import app
+        transport, base_url = httpx.ASGITransport(app=app), "http://replay"
+
+    model_name = "stub" if args.stub else args.model_name
+    async with httpx.AsyncClient(
+        transport=transport, base_url=base_url, timeout=300
+    ) as client:
+        rows = await replay(
+            client, args.capture_dir, captures, model_name, args.concurrency
+        )
+    return build_report(rows, len(captures))
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Replay captured requests")
+    parser.add_argument(
+        "capture_dir", type=str, help="AUTOSTRIDE_CAPTURE_DIR of the server"
+    )
+    parser.add_argument(
+        "--url", type=str, default=None, help="Replay against a running server"
+    )
+    parser.add_argument(
+        "--model-name",
+        type=str,
+        default=None,
+        help="Model to replay with (default: captured)",
+    )
+    parser.add_argument(
+        "--stub", action="store_true", help="In-process API with the StubYOLO"
+    )
+    parser.add_argument("--concurrency", type=int, default=4, help="Requests in flight")
+    parser.add_argument(
+        "--limit", type=int, default=None, help="Replay only the first N captures"
+    )
+    parser.add_argument(
+        "--fail-on-change",
+        action="store_true",
+        help="Exit with status 1 if any graph or threat output changed",
+    )
+    parser.add_argument(
+        "--output", type=str, default=None, help="Write the JSON report to this file"
+    )
+    args = parser.parse_args()
+
+    report = asyncio.run(main(args))
+    text = json.dumps(report, indent=2)
+    if args.output:
+        Path(args.output).write_text(text)
+        summary = {k: v for k, v in report.items() if k != "captures"}
+        print(json.dumps(summary, indent=2))
+    else:
+        print(text)
+    for row in report["captures"]:
+        if "error" in row or row["changed"]:
+            detail = row.get("error") or {k: v for k, v in row["changes"].items() if v}
+            print(f"{row['capture_id']}: {detail}", file=sys.stderr)
+    if args.fail_on_change and (report["changed"] or report["errors"]):
+        sys.exit(1)
@@ -0,0 +1,32 @@
+"""
+App FastAPI com o StubYOLO registrado como modelo "stub", para medir o
+servidor de vários workers (gunicorn_conf.py) sem pesos nem GPU.
+
+Uso (a partir de backend/):
+    AUTOSTRIDE_PRELOAD_MODELS=stub AUTOSTRIDE_WORKERS=4 \\
+        gunicorn -c gunicorn_conf.py benchmarks.stub_app:app
+
+Variáveis de ambiente: AUTOSTRIDE_STUB_NODES, AUTOSTRIDE_STUB_ARROWS,
+AUTOSTRIDE_STUB_BOUNDARIES, AUTOSTRIDE_STUB_LATENCY_MS e AUTOSTRIDE_STUB_CPU_MS.
+"""
+
+import os
+
+# Sem histórico: o writer do SQLite entraria na medição (e no banco de dev)
+os.environ["AUTOSTRIDE_HISTORY_DB"] = ""
+
+from benchmarks.stub_model import StubYOLO  # noqa: E402
+from models.yolo_loader import YOLOModel  # noqa: E402
+
+YOLOModel.register_model(
+    "stub",
+    StubYOLO(
+        n_nodes=int(os.environ.get("AUTOSTRIDE_STUB_NODES", 30)),
+        n_arrows=int(os.environ.get("AUTOSTRIDE_STUB_ARROWS", 40)),
+        n_boundaries=int(os.environ.get("AUTOSTRIDE_STUB_BOUNDARIES", 3)),
+        latency_ms=float(os.environ.get("AUTOSTRIDE_STUB_LATENCY_MS", 0)),
+        cpu_ms=float(os.environ.get("AUTOSTRIDE_STUB_CPU_MS", 0)),
+    ),
+)
+
+from main import app  # noqa: E402
@@ -0,0 +1,69 @@
+import time
+
+import numpy as np
+
+from benchmarks.synthetic import make_detections
+
+
+class StubYOLO:
+    """
+    Substituto determinístico do modelo YOLO para benchmarks sem GPU nem pesos.
+
+    Recebe a imagem como o modelo real (`model(image, conf=..., verbose=...)`)
+    e devolve detecções sintéticas escaladas para o tamanho da imagem.
+    """
+
+    def __init__(
+        self,
+        n_nodes: int = 30,
+        n_arrows: int = 40,
+        n_boundaries: int = 3,
+        latency_ms: float = 0.0,
+        cpu_ms: float = 0.0,
+        seed: int = 0,
+    ):
+        self.n_nodes = n_nodes
+        self.n_arrows = n_arrows
+        self.n_boundaries = n_boundaries
+        self.latency_ms = latency_ms
+        self.cpu_ms = cpu_ms
+        self.seed = seed
+
+    def __call__(self, image, conf: float = 0.25, verbose: bool = True, **kwargs):
+        if isinstance(image, list):
+            # Lote: uma única latência simulada, como um forward em batch
+            results = [self._predict(img, conf, **kwargs) for img in image]
+            self._simulate_forward()
+            return results
+        self._simulate_forward()
+        return [self._predict(image, conf, **kwargs)]
+
+    def _simulate_forward(self) -> None:
+        if self.latency_ms > 0:
+            # Simula o tempo de forward do modelo
+            time.sleep(self.latency_ms / 1000)
+        if self.cpu_ms > 0:
+            # Ocupa a CPU (e o GIL) como um forward real em CPU, para que o
+            # throughput só escale com processos, não com threads
+            end = time.perf_counter() + self.cpu_ms / 1000
+            while time.perf_counter() < end:
+                pass
+
+    def _predict(self, image: np.ndarray, conf: float, **kwargs):
+        height, width = image.shape[:2]
+        detections = make_detections(
+            width=width,
+            height=height,
+            n_nodes=self.n_nodes,
+            n_arrows=self.n_arrows,
+            n_boundaries=self.n_boundaries,
+            seed=self.seed,
+        ).filter(conf)
+        # 300 é o max_det padrão do Ultralytics
+        max_det = kwargs.get("max_det") or 300
+        if len(detections) > max_det:
+            # Mesmo corte do NMS real: mantém as de maior confiança
+            order = np.argsort(-detections.boxes.conf.numpy(), kind="stable")
+            detections = detections.take(np.sort(order[:max_det]))
+        detections.orig_img = image
+        return detections
@@ -0,0 +1,181 @@
+import math
+import random
+from typing import Optional
+
+import numpy as np
+
+from models.detections import Detections
+from schemas.api_models import Graph, Node, Edge, Position
+from services.graph_builder import CLASS_NAMES
+
+COMPONENT_TYPES = [CLASS_NAMES[i] for i in range(1, 9)]
+
+
+def make_graph(
+    n_nodes: int = 500,
+    n_edges: Optional[int] = None,
+    n_boundaries: int = 10,
+    seed: int = 0,
+) -> Graph:
+    """
+    Gera um grafo sintético com boundaries, componentes e fluxos aleatórios.
+
+    Args:
+        n_nodes: Número de componentes (sem contar boundaries)
+        n_edges: Número de arestas. Se None, usa 2x o número de nós
+        n_boundaries: Número de boundaries que agrupam os componentes
+        seed: Semente para reprodutibilidade
+
+    Returns:
+        Graph pronto para o StrideAnalyzer
+    """
+    rng = random.Random(seed)
+    n_edges = n_nodes * 2 if n_edges is None else n_edges
+
+    nodes = []
+    boundaries = []
+    for b in range(n_boundaries):
+        x1, y1 = b * 1000.0, 0.0
+        boundary = Node(
+            id=f"node_b{b}",
+            type="boundary",
+            position=Position(x=x1 + 500, y=500),
+            confidence=0.9,
+            bbox=[x1, y1, x1 + 1000, 1000],
+            width=1000,
+            height=1000,
+            area=1_000_000,
+        )
+        boundaries.append(boundary)
+        nodes.append(boundary)
+
+    for i in range(n_nodes):
+        parent = boundaries[i % n_boundaries] if boundaries else None
+        ox = parent.bbox[0] if parent else 0.0
+        x1, y1 = ox + rng.uniform(10, 900), rng.uniform(10, 900)
+        node = Node(
+            id=f"node_{i}",
+            type=rng.choice(COMPONENT_TYPES),
+            position=Position(x=x1 + 40, y=y1 + 40),
+            confidence=rng.uniform(0.5, 1.0),
+            bbox=[x1, y1, x1 + 80, y1 + 80],
+            width=80,
+            height=80,
+            area=6400,
+            parent_id=parent.id if parent else None,
+        )
+        if parent:
+            parent.children.append(node.id)
+        nodes.append(node)
+
+    components = nodes[n_boundaries:]
+    edges = []
+    for e in range(n_edges if len(components) > 1 else 0):
+        source, target = rng.sample(components, 2)
+        edges.append(
+            Edge(
+                id=f"edge_{e}",
+                source=source.id,
+                target=target.id,
+                keypoints=[
+                    [source.position.x, source.position.y],
+                    [target.position.x, target.position.y],
+                ],
+                cross_boundary=source.parent_id != target.parent_id,
+            )
+        )
+
+    return Graph(nodes=nodes, edges=edges)
+
+
+def make_detections(
+    width: int = 1600,
+    height: int = 1000,
+    n_nodes: int = 30,
+    n_arrows: int = 40,
+    n_boundaries: int = 3,
+    nesting: int = 1,
+    seed: int = 0,
+) -> Detections:
+    """
+    Gera detecções sintéticas no formato consumido pelo GraphBuilder.
+
+    Os componentes são distribuídos em uma grade, as boundaries envolvem faixas
+    verticais da grade (com `nesting` níveis aninhados) e as setas ligam pares
+    aleatórios de componentes com keypoints nas bordas das caixas.
+
+    Args:
+        width: Largura da imagem em pixels
+        height: Altura da imagem em pixels
+        n_nodes: Número de componentes (classes 1-8)
+        n_arrows: Número de setas (classe 9, com 2 keypoints)
+        n_boundaries: Número de boundaries por nível
+        nesting: Profundidade de aninhamento das boundaries
+        seed: Semente para reprodutibilidade
+
+    Returns:
+        Detections com boxes, confianças, classes e keypoints
+    """
+    rng = np.random.default_rng(seed)
+    cols = max(1, math.ceil(math.sqrt(n_nodes * width / max(height, 1))))
+    rows = max(1, math.ceil(n_nodes / cols))
+    cell_w, cell_h = width / cols, height / rows
+    box_w, box_h = cell_w * 0.5, cell_h * 0.5
+
+    idx = np.arange(n_nodes)
+    cx = (idx % cols + 0.5) * cell_w
+    cy = (idx // cols + 0.5) * cell_h
+    nodes_xyxy = np.stack(
+        [cx - box_w / 2, cy - box_h / 2, cx + box_w / 2, cy + box_h / 2], axis=1
+    )
+    nodes_cls = rng.integers(1, 9, size=n_nodes)
+
+    # Boundaries: faixas verticais, cada nível um pouco mais estreito que o anterior
+    boundary_boxes = []
+    for level in range(nesting if n_boundaries else 0):
+        strip_w = width / n_boundaries
+        margin = 2.0 + level * min(cell_w, cell_h) * 0.1
+        for b in range(n_boundaries):
+            boundary_boxes.append(
+                [
+                    b * strip_w + margin,
+                    margin,
+                    (b + 1) * strip_w - margin,
+                    height - margin,
+                ]
+            )
+    boundary_xyxy = np.asarray(boundary_boxes, dtype=np.float32).reshape(-1, 4)
+
+    # Setas: ligam a borda direita da origem à borda esquerda do destino
+    arrows_xyxy = np.zeros((0, 4), dtype=np.float32)
+    arrow_kpts = np.zeros((0, 2, 3), dtype=np.float32)
+    if n_nodes > 1 and n_arrows > 0:
+        src = rng.integers(0, n_nodes, size=n_arrows)
+        dst = (src + rng.integers(1, n_nodes, size=n_arrows)) % n_nodes
+        tail = np.stack([nodes_xyxy[src, 2], cy[src]], axis=1)
+        head = np.stack([nodes_xyxy[dst, 0], cy[dst]], axis=1)
+        arrows_xyxy = np.concatenate(
+            [np.minimum(tail, head) - 5, np.maximum(tail, head) + 5], axis=1
+        )
+        vis = rng.uniform(0.5, 1.0, size=(n_arrows, 2, 1))
+        arrow_kpts = np.concatenate([np.stack([tail, head], axis=1), vis], axis=2)
+
+    n_boundary = len(boundary_xyxy)
+    xyxy = np.concatenate([boundary_xyxy, nodes_xyxy, arrows_xyxy]).astype(np.float32)
+    cls = np.concatenate(
+        [np.zeros(n_boundary), nodes_cls, np.full(len(arrows_xyxy), 9)]
+    ).astype(np.float32)
+    conf = rng.uniform(0.55, 0.99, size=len(xyxy)).astype(np.float32)
+
+    # Componentes não têm keypoints visíveis (mesmo formato dos labels YOLO-pose)
+    keypoints = np.zeros((len(xyxy), 2, 3), dtype=np.float32)
+    keypoints[n_boundary + n_nodes :] = arrow_kpts
+
+    return Detections(
+        xyxy=xyxy,
+        conf=conf,
+        cls=cls,
+        keypoints=keypoints,
+        orig_shape=(height, width),
+        names=dict(CLASS_NAMES),
+    )
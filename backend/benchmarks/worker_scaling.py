@@ -0,0 +1,183 @@
+"""
+Mede como o throughput escala com o número de workers do gunicorn.
+
+Para cada contagem de workers sobe `gunicorn -c gunicorn_conf.py <app>`,
+espera o /health responder, roda o load_test contra o servidor e imprime uma
+tabela markdown (workers, requests/s, p50, p99, RSS total dos processos).
+
+Por padrão usa o StubYOLO (benchmarks.stub_app) com carga de CPU simulada;
+use `--app main:app` para medir o modelo real.
+
+Uso (a partir de backend/):
+    python -m benchmarks.worker_scaling --workers 1 2 4 8 --requests 200
+"""
+
+import argparse
+import json
+import os
+import subprocess
+import sys
+import time
+from pathlib import Path
+from typing import Dict, List, Optional
+
+import httpx
+
+BACKEND_DIR = Path(__file__).resolve().parent.parent
+
+
+def wait_ready(url: str, timeout: float) -> bool:
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        try:
+            if httpx.get(f"{url}/health", timeout=1.0).status_code == 200:
+                return True
+        except httpx.HTTPError:
+            pass
+        time.sleep(0.2)
+    return False
+
+
+def process_tree_rss_mb(pid: int) -> Optional[float]:
+    """RSS do master + workers (Linux); None se /proc não estiver disponível."""
+    try:
+        children = subprocess.check_output(
+            ["pgrep", "-P", str(pid)], stderr=subprocess.DEVNULL
+        ).split()
+    except (OSError, subprocess.CalledProcessError):
+        children = []
+
+    total_kb = 0
+    for proc in [str(pid)] + [c.decode() for c in children]:
+        try:
+            for line in Path(f"/proc/{proc}/status").read_text().splitlines():
+                if line.startswith("VmRSS:"):
+                    total_kb += int(line.split()[1])
+        except OSError:
+            return None
+    return round(total_kb / 1024, 1)
+
+
+def run_point(n_workers: int, args) -> Dict:
+    url = f"http://127.0.0.1:{args.port}"
+    env = {
+        **os.environ,
+        "AUTOSTRIDE_WORKERS": str(n_workers),
+        "AUTOSTRIDE_BIND": f"127.0.0.1:{args.port}",
+        "AUTOSTRIDE_STUB_CPU_MS": str(args.stub_cpu_ms),
+    }
+    if args.app.startswith("benchmarks.stub_app"):
+        env.setdefault("AUTOSTRIDE_PRELOAD_MODELS", "stub")
+
+    server = subprocess.Popen(
+        [sys.executable, "-m", "gunicorn", "-c", "gunicorn_conf.py", args.app],
+        cwd=BACKEND_DIR,
+        env=env,
+        stdout=subprocess.DEVNULL,
+        stderr=subprocess.DEVNULL if not args.verbose else None,
+    )
+    try:
+        if not wait_ready(url, args.startup_timeout):
+            raise RuntimeError(f"Server with {n_workers} workers did not start")
+
+        cmd = [
+            sys.executable,
+            "-m",
+            "benchmarks.load_test",
+            "--url",
+            url,
+            "--requests",
+            str(args.requests),
+            "--concurrency",
+            str(max(args.concurrency_per_worker * n_workers, 1)),
+            "--image-size",
+            args.image_size,
+            "--warmup",
+            str(n_workers * 2),
+        ]
+        if args.model_name:
+            cmd += ["--model-name", args.model_name]
+        report = json.loads(subprocess.check_output(cmd, cwd=BACKEND_DIR, env=env))
+        rss = process_tree_rss_mb(server.pid)
+    finally:
+        server.terminate()
+        try:
+            server.wait(timeout=30)
+        except subprocess.TimeoutExpired:
+            server.kill()
+
+    results = report["results"]
+    return {
+        "workers": n_workers,
+        "requests_per_s": results["requests_per_s"],
+        "p50_ms": results["latency_ms"]["p50"],
+        "p99_ms": results["latency_ms"]["p99"],
+        "errors": results["errors"],
+        "rss_mb": rss,
+    }
+
+
+def markdown_table(points: List[Dict]) -> str:
+    base = points[0]["requests_per_s"] if points else 0
+    lines = [
+        "| workers | req/s | speedup | p50 (ms) | p99 (ms) | RSS total (MB) |",
+        "|---|---|---|---|---|---|",
+    ]
+    for p in points:
+        speedup = p["requests_per_s"] / base if base else 0
+        lines.append(
+            f"| {p['workers']} | {p['requests_per_s']} | {speedup:.2f}x | "
+            f"{p['p50_ms']} | {p['p99_ms']} | {p['rss_mb']} |"
+        )
+    return "\n".join(lines)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="gunicorn worker scaling")
+    parser.add_argument(
+        "--workers", type=int, nargs="+", default=[1, 2, 4], help="Worker counts"
+    )
+    parser.add_argument(
+        "--app",
+        type=str,
+        default="benchmarks.stub_app:app",
+        help="ASGI app (main:app for the real model)",
+    )
+    parser.add_argument("--model-name", type=str, default=None, help="model_name")
+    parser.add_argument("--requests", type=int, default=200, help="Requests per point")
+    parser.add_argument(
+        "--concurrency-per-worker",
+        type=int,
+        default=2,
+        help="Client concurrency per server worker",
+    )
+    parser.add_argument(
+        "--image-size", type=str, default="1600x1000", help="Upload size WxH"
+    )
+    parser.add_argument(
+        "--stub-cpu-ms",
+        type=float,
+        default=50.0,
+        help="Stub: CPU-bound forward time per request",
+    )
+    parser.add_argument("--port", type=int, default=8765, help="Server port")
+    parser.add_argument(
+        "--startup-timeout",
+        type=float,
+        default=120.0,
+        help="Seconds to wait for /health",
+    )
+    parser.add_argument("--verbose", action="store_true", help="Show gunicorn logs")
+    parser.add_argument(
+        "--output", type=str, default=None, help="Write the JSON points to this file"
+    )
+    args = parser.parse_args()
+
+    points = []
+    for n in args.workers:
+        print(f"Measuring {n} worker(s)...", file=sys.stderr)
+        points.append(run_point(n, args))
+
+    if args.output:
+        Path(args.output).write_text(json.dumps(points, indent=2))
+    print(markdown_table(points))
@@ -0,0 +1,99 @@
+"""
+Configuração do gunicorn para servir a API com vários workers em CPU.
+
+O app é importado uma vez no processo master (`preload_app`), que também
+carrega os pesos (AUTOSTRIDE_PRELOAD_MODELS). Os workers são criados por
+fork e compartilham essas páginas de memória copy-on-write, em vez de cada
+um carregar a sua cópia do modelo. Cada worker recebe uma fatia fixa de CPUs
+e o mesmo número de threads do PyTorch, para não haver oversubscription.
+
+Uso (a partir de backend/):
+    AUTOSTRIDE_WORKERS=4 gunicorn -c gunicorn_conf.py main:app
+
+Variáveis de ambiente:
+    AUTOSTRIDE_WORKERS: número de workers (padrão: 1 por CPU, até 4)
+    AUTOSTRIDE_TORCH_THREADS: threads do PyTorch por worker (padrão: CPUs / workers)
+    AUTOSTRIDE_CPU_AFFINITY: "0" desativa o pinning de CPUs
+    AUTOSTRIDE_PRELOAD_MODELS: "default", "all" ou lista separada por vírgulas
+    AUTOSTRIDE_BIND: endereço de escuta (padrão: 0.0.0.0:8000)
+"""
+
+import gc
+import os
+
+# O master só carrega pesos: sem threads OpenMP nele, o fork fica seguro
+# (libgomp não sobrevive a um fork depois de abrir o pool de threads)
+os.environ.setdefault("OMP_NUM_THREADS", "1")
+os.environ.setdefault("AUTOSTRIDE_PRELOAD_MODELS", "default")
+
+
+def _available_cpus():
+    if hasattr(os, "sched_getaffinity"):
+        return sorted(os.sched_getaffinity(0))
+    return list(range(os.cpu_count() or 1))
+
+
+_CPUS = _available_cpus()
+
+bind = os.environ.get("AUTOSTRIDE_BIND", "0.0.0.0:8000")
+workers = int(os.environ.get("AUTOSTRIDE_WORKERS", min(len(_CPUS), 4)))
+worker_class = "uvicorn_worker.UvicornWorker"
+preload_app = True
+# Inferências grandes em CPU podem passar do timeout padrão de 30s
+timeout = int(os.environ.get("AUTOSTRIDE_WORKER_TIMEOUT", 120))
+graceful_timeout = 30
+
+torch_threads = int(
+    os.environ.get("AUTOSTRIDE_TORCH_THREADS", max(1, len(_CPUS) // max(workers, 1)))
+)
+cpu_affinity = os.environ.get("AUTOSTRIDE_CPU_AFFINITY", "1") != "0"
+
+
+def when_ready(server):
+    # Move tudo o que o master alocou para a geração permanente: o GC dos
+    # workers não toca mais nesses objetos, então as páginas continuam
+    # compartilhadas em vez de serem copiadas ao atualizar contadores do GC
+    gc.freeze()
+    server.log.info(
+        "Preloaded app frozen (%d objects); %d workers x %d torch threads",
+        gc.get_freeze_count(),
+        workers,
+        torch_threads,
+    )
+
+
+def pre_fork(server, worker):
+    # Slot estável por worker: um worker reiniciado reaproveita a fatia de
+    # CPUs do que morreu em vez de se sobrepor a um worker vivo
+    used = {getattr(w, "autostride_slot", None) for w in server.WORKERS.values()}
+    worker.autostride_slot = next(
+        slot for slot in range(len(used) + 1) if slot not in used
+    )
+
+
+def post_fork(server, worker):
+    slot = worker.autostride_slot
+    cpus = _CPUS
+    if cpu_affinity and hasattr(os, "sched_setaffinity") and len(cpus) > 1:
+        start = (slot * torch_threads) % len(cpus)
+        cpus = [
+            cpus[(start + i) % len(cpus)] for i in range(min(torch_threads, len(cpus)))
+        ]
+        os.sched_setaffinity(0, cpus)
+
+    import cv2
+
+    cv2.setNumThreads(torch_threads)
+    try:
+        import torch
+    except ImportError:  # benchmarks.stub_app roda sem PyTorch
+        pass
+    else:
+        torch.set_num_threads(torch_threads)
+    server.log.info(
+        "Worker %s (slot %d): %d torch threads on CPUs %s",
+        worker.pid,
+        slot,
+        torch_threads,
+        ",".join(str(cpu) for cpu in cpus),
+    )
@@ -1,4 +1,14 @@
-from fastapi import FastAPI, UploadFile, File, HTTPException, Query
+from fastapi import (
+    FastAPI,
+    UploadFile,
+    File,
+    HTTPException,
+    Query,
+    Request,
+    WebSocket,
+    WebSocketDisconnect,
+)
+from fastapi.responses import FileResponse, StreamingResponse
 from fastapi.middleware.cors import CORSMiddleware
 from typing import Optional
 import cv2
@@ -6,13 +16,71 @@ import numpy as np
 from PIL import Image
 import io
 import base64
-import time
+import json
+import os
+import asyncio
+from collections import Counter
+from contextlib import aclosing
+from datetime import datetime
 from pathlib import Path
+from starlette.concurrency import run_in_threadpool
 
 from models.yolo_loader import YOLOModel
 from services.graph_builder import GraphBuilder
 from services.stride_analyzer import StrideAnalyzer
-from schemas.api_models import InferenceResponse, Metadata
+from services.response_encoder import ResponseEncoder
+from services.stage_timer import StageTimer
+from services.near_duplicate_index import ImageFingerprint, NearDuplicateIndex
+from services.dense_detection import DEFAULT_MAX_DET, MAX_DET_LIMIT, DenseDetector
+from services.progressive_inference import PRELIMINARY_INPUT_SIZE, ProgressiveRefiner
+from services.history_store import HistoryStore
+from services.upload_guard import (
+    DOCUMENT_FORMATS,
+    ImageHeader,
+    UploadGuard,
+    UploadLimitMiddleware,
+    UploadRejected,
+)
+from services.graph_diff import GraphDiffer
+from services.document_rasterizer import DocumentError, DocumentRasterizer, RasterPage
+from services.request_capture import RequestCapture
+from services.request_profiler import (
+    ADMIN_TOKEN_HEADER,
+    ProfilingDisabled,
+    RequestProfiler,
+)
+from services.session_store import (
+    RAW_CONF_THRESHOLD,
+    InteractiveSession,
+    SessionStore,
+    compact_delta,
+)
+from services.inference_queue import InferenceQueue, RequestCancelled
+from services.deadline_planner import (
+    DEADLINE_HEADER,
+    Deadline,
+    DeadlinePlanner,
+    DegradationPlan,
+)
+from models.detections import Detections
+from schemas.api_models import (
+    AnalysisPage,
+    DocumentInferenceResponse,
+    DocumentMetadata,
+    DocumentPage,
+    EdgePage,
+    GraphDiffResponse,
+    InferenceResponse,
+    Metadata,
+    NearDuplicateMatch,
+    ProfileInfo,
+    ProfileList,
+    ProgressiveTimings,
+    SessionDelta,
+    StoredAnalysis,
+    ThreatPage,
+    ThreatSummary,
+)
 
 # Initialize FastAPI app
 app = FastAPI(
@@ -21,6 +89,22 @@ app = FastAPI(
     version="1.0.0",
 )
 
+# Reject oversized request bodies before the multipart parser buffers them
+# (added before CORS so its responses still carry CORS headers)
+upload_guard = UploadGuard()
+app.add_middleware(
+    UploadLimitMiddleware,
+    limits={
+        "/api/v1/inference": upload_guard.request_limit(),
+        "/api/v1/inference/progressive": upload_guard.request_limit(),
+        "/api/v1/inference/document": upload_guard.request_limit(document=True),
+        "/api/v1/diff": upload_guard.request_limit(files=2),
+    },
+    default_bytes=upload_guard.request_limit(),
+)
+# Pillow's own decompression-bomb check, in case the header check is bypassed
+Image.MAX_IMAGE_PIXELS = upload_guard.max_pixels
+
 # Configure CORS
 app.add_middleware(
     CORSMiddleware,
@@ -33,10 +117,104 @@ app.add_middleware(
 # Initialize services
 graph_builder = GraphBuilder()
 stride_analyzer = StrideAnalyzer()
+response_encoder = ResponseEncoder()
+near_duplicate_index = NearDuplicateIndex()
+inference_queue = InferenceQueue()
+deadline_planner = DeadlinePlanner()
+dense_detector = DenseDetector()
+progressive_refiner = ProgressiveRefiner()
+history_store = HistoryStore()
+graph_differ = GraphDiffer()
+session_store = SessionStore()
+document_rasterizer = DocumentRasterizer(max_pixels=upload_guard.max_pixels)
+request_profiler = RequestProfiler()
+request_capture = RequestCapture()
 
 # Initialize YOLO model manager on startup
 YOLOModel.initialize()
 
+# Optionally load weights at import time, so a pre-fork server (gunicorn
+# --preload, see gunicorn_conf.py) shares them copy-on-write across workers
+if os.environ.get("AUTOSTRIDE_PRELOAD_MODELS"):
+    YOLOModel.preload(os.environ["AUTOSTRIDE_PRELOAD_MODELS"])
+
+
+async def _read_upload(file: UploadFile, timer: StageTimer):
+    """
+    Read the upload in chunks and validate it before any decoding.
+
+    The format comes from the magic bytes (the declared content type is not
+    trusted) and the image dimensions from the header, so oversized files,
+    non-images and decompression bombs are rejected early.
+
+    Returns:
+        (contents, ImageHeader) tuple
+    """
+    with timer.stage("upload"):
+        try:
+            return await upload_guard.read(file)
+        except UploadRejected as e:
+            raise HTTPException(status_code=e.status_code, detail=e.detail)
+
+
+async def _load_image(
+    contents: bytes, header: ImageHeader, model_name: Optional[str]
+) -> np.ndarray:
+    """
+    Decode an image upload, or rasterize a single-page PDF/SVG.
+
+    Documents are rendered so their longest side matches the model input
+    size; multi-page PDFs go through `/api/v1/inference/document`.
+    """
+    if header.format not in DOCUMENT_FORMATS:
+        return await run_in_threadpool(_decode_image, contents)
+    try:
+        target_side = document_rasterizer.target_side(YOLOModel.input_size(model_name))
+        return await document_rasterizer.render_single(
+            contents, header.format, target_side
+        )
+    except DocumentError as e:
+        raise HTTPException(status_code=e.status_code, detail=e.detail)
+
+
+def _decode_image(contents: bytes) -> np.ndarray:
+    """Decode uploaded bytes into a BGR numpy array."""
+    # Convert uploaded file to image
+    image = Image.open(io.BytesIO(contents))
+
+    # Convert RGBA to RGB if necessary
+    if image.mode == "RGBA":
+        # Create a white background
+        background = Image.new("RGB", image.size, (255, 255, 255))
+        # Paste the image on the background using alpha channel as mask
+        background.paste(image, mask=image.split()[3])  # 3 is the alpha channel
+        image = background
+    elif image.mode != "RGB":
+        # Convert any other mode to RGB
+        image = image.convert("RGB")
+
+    image_np = np.array(image)
+
+    # Convert RGB to BGR for OpenCV compatibility (YOLO expects BGR)
+    if len(image_np.shape) == 3 and image_np.shape[2] == 3:
+        image_np = cv2.cvtColor(image_np, cv2.COLOR_RGB2BGR)
+    return image_np
+
+
+def _render_visualization(yolo_results) -> str:
+    """Draw detections and return them as a base64 PNG data URL."""
+    # Plot YOLO results
+    im_array = yolo_results.plot()
+    # Convert BGR to RGB
+    im_array = cv2.cvtColor(im_array, cv2.COLOR_BGR2RGB)
+    # Convert to PIL Image
+    pil_img = Image.fromarray(im_array)
+    # Encode to base64
+    buffered = io.BytesIO()
+    pil_img.save(buffered, format="PNG")
+    img_str = base64.b64encode(buffered.getvalue()).decode()
+    return f"data:image/png;base64,{img_str}"
+
 
 @app.get("/health")
 async def health_check():
@@ -55,6 +233,7 @@ async def list_models():
 
 @app.post("/api/v1/inference", response_model=InferenceResponse)
 async def inference(
+    request: Request,
     file: UploadFile = File(..., description="Architecture diagram image"),
     conf_threshold: float = Query(
         0.5, ge=0.1, le=1.0, description="Confidence threshold for detections"
@@ -66,98 +245,246 @@ async def inference(
         None,
         description="YOLO model to use (e.g., 'yolo11m-pose_manual_v3_v1'). If not specified, uses default model.",
     ),
+    fast_response: bool = Query(
+        False,
+        description="Skip response re-validation and serialize with the fast encoder (JSON or MessagePack via Accept, gzip/brotli via Accept-Encoding)",
+    ),
+    reuse_near_duplicates: bool = Query(
+        False,
+        description="Reuse detections from a perceptually near-identical image analyzed by the same model instead of running inference (and store this request's detections for reuse)",
+    ),
+    dense_mode: bool = Query(
+        False,
+        description="Dense-diagram mode: raise max_det and apply per-class NMS IoU (looser for arrows)",
+    ),
+    max_detections: Optional[int] = Query(
+        None,
+        ge=1,
+        le=MAX_DET_LIMIT,
+        description="Detection cap in dense mode (default: AUTOSTRIDE_DENSE_MAX_DET)",
+    ),
+    profile: bool = Query(
+        False,
+        description="Run the request under the sampling profiler (requires the X-Admin-Token header)",
+    ),
 ):
     """
     Process an architecture diagram and return graph + STRIDE analysis.
 
     Args:
-        file: Uploaded image file (PNG, JPG, JPEG)
+        file: Uploaded image file (PNG, JPG, JPEG, or a single-page PDF/SVG)
         conf_threshold: Detection confidence threshold (0.1 to 1.0)
         include_visualization: Whether to include visualization with detections
         model_name: Name of YOLO model to use. If None, uses default model.
+        fast_response: Whether to bypass response_model validation and use the fast encoder.
+            A MessagePack Accept header also enables this path.
+        reuse_near_duplicates: Whether a near-duplicate hit may replace model inference.
+        dense_mode: Whether to use dense-diagram detection settings.
+        max_detections: Detection cap for dense mode.
+        profile: Whether to sample this request with the profiler (admin only).
+
+    The optional `X-Request-Deadline-Ms` header carries the latency budget. Under a
+    short budget or a long model queue the pipeline degrades (smaller input size,
+    lighter model, no visualization, no architecture-level analysis) and reports it
+    in `metadata.degradations`. Requests whose client disconnected are dropped
+    before reaching the model.
+
+    With `AUTOSTRIDE_CAPTURE_DIR` set, full-quality requests are captured
+    (image pixels, parameters, detections and output) for
+    `benchmarks/replay_captures.py`.
+
+    Profiled requests (`profile=true`, or sampled at `AUTOSTRIDE_PROFILE_RATE`)
+    report `metadata.profile_id`; the profile is listed at `/api/v1/admin/profiles`.
 
     Returns:
         InferenceResponse with graph, STRIDE analysis, and metadata
     """
-    start_time = time.time()
+    timer = StageTimer()
+    deadline = Deadline.from_header(request.headers.get(DEADLINE_HEADER))
 
-    # Validate file type
-    if not file.content_type in ["image/png", "image/jpeg", "image/jpg"]:
+    contents, header = await _read_upload(file, timer)
+
+    try:
+        profile_session = request_profiler.start(
+            timer, "/api/v1/inference", profile, request.headers.get(ADMIN_TOKEN_HEADER)
+        )
+    except ProfilingDisabled:
         raise HTTPException(
-            status_code=400,
-            detail=f"Invalid file type: {file.content_type}. Only PNG, JPG, and JPEG are supported.",
+            status_code=403, detail="Profiling requires a valid admin token"
         )
 
-    # Validate file size (10 MB limit)
-    contents = await file.read()
-    if len(contents) > 10 * 1024 * 1024:
-        raise HTTPException(status_code=400, detail="File size exceeds 10 MB limit")
-
     try:
-        # Convert uploaded file to image
-        image = Image.open(io.BytesIO(contents))
-
-        # Convert RGBA to RGB if necessary
-        if image.mode == "RGBA":
-            # Create a white background
-            background = Image.new("RGB", image.size, (255, 255, 255))
-            # Paste the image on the background using alpha channel as mask
-            background.paste(image, mask=image.split()[3])  # 3 is the alpha channel
-            image = background
-        elif image.mode != "RGB":
-            # Convert any other mode to RGB
-            image = image.convert("RGB")
-
-        image_np = np.array(image)
-
-        # Convert RGB to BGR for OpenCV compatibility (YOLO expects BGR)
-        if len(image_np.shape) == 3 and image_np.shape[2] == 3:
-            image_np = cv2.cvtColor(image_np, cv2.COLOR_RGB2BGR)
+        with timer.stage("decode"):
+            image_np = await _load_image(contents, header, model_name)
 
         print(
             f"DEBUG: Image shape after conversion: {image_np.shape}, dtype: {image_np.dtype}"
         )
 
-        # Run YOLO inference with selected model
-        yolo_results = YOLOModel.predict(
-            image_np, conf_threshold=conf_threshold, model_name=model_name
+        used_model = model_name if model_name else YOLOModel.get_default_model()
+        predict_kwargs = (
+            dense_detector.predict_kwargs(max_detections) if dense_mode else {}
         )
+        max_det = predict_kwargs.get("max_det", DEFAULT_MAX_DET)
+        # Dense and default detections differ (and so do dense caps), so they
+        # are cached separately
+        cache_key = f"{used_model}:dense:{max_det}" if dense_mode else used_model
+
+        # Perceptual fingerprint to find re-exports/re-screenshots of known
+        # diagrams. Only requests that opt into reuse look up and feed the
+        # index, so the others skip the fingerprint (~15 ms at 800x600)
+        fingerprint, near_duplicate, detection_cap_hit = None, None, False
+        if reuse_near_duplicates and near_duplicate_index.max_entries > 0:
+            with timer.stage("fingerprint"):
+                fingerprint = await run_in_threadpool(
+                    ImageFingerprint.from_image, image_np
+                )
+            hit = await run_in_threadpool(
+                near_duplicate_index.lookup,
+                fingerprint,
+                cache_key,
+                conf_threshold,
+                image=image_np,
+            )
+            if hit is not None:
+                yolo_results = hit.detections
+                detection_cap_hit = hit.cap_hit
+                near_duplicate = NearDuplicateMatch(
+                    similarity=hit.similarity,
+                    hamming_distance=hit.hamming_distance,
+                    scale=list(hit.scale),
+                )
+
+        plan = DegradationPlan(model_name=used_model)
+        if near_duplicate is None:
+            if deadline is not None and deadline.remaining_ms() <= 0:
+                raise HTTPException(
+                    status_code=504, detail="Request deadline exceeded before inference"
+                )
 
-        # Build graph from detections
-        graph = graph_builder.build_graph(yolo_results)
+            # Adapt model/input size to the deadline and the current queue
+            plan = deadline_planner.plan(
+                deadline, used_model, inference_queue.depth, include_visualization
+            )
 
-        # Perform STRIDE analysis
-        stride_analysis = stride_analyzer.analyze(graph)
+            # Run YOLO inference with selected model (skipped if the client left)
+            yolo_results = await inference_queue.run(
+                plan.model_name,
+                YOLOModel.predict,
+                image_np,
+                conf_threshold=conf_threshold,
+                model_name=plan.model_name,
+                imgsz=plan.imgsz,
+                is_cancelled=request.is_disconnected,
+                timer=timer,
+                **predict_kwargs,
+            )
+
+            if dense_mode:
+                with timer.stage("class_nms"):
+                    dense = await run_in_threadpool(
+                        dense_detector.process, yolo_results, max_det
+                    )
+                yolo_results = dense.detections
+                detection_cap_hit = dense.cap_hit
+            else:
+                boxes = yolo_results.boxes
+                detection_cap_hit = boxes is not None and len(boxes) >= max_det
+
+            # Only full-quality detections are worth reusing later
+            if fingerprint is not None and (
+                not plan.degradations or plan.degradations == ["skip_visualization"]
+            ):
+                near_duplicate_index.add(
+                    fingerprint,
+                    cache_key,
+                    conf_threshold,
+                    Detections.from_results(yolo_results),
+                    cap_hit=detection_cap_hit,
+                )
+
+        # Build graph from detections (CPU-bound stages run off the event loop,
+        # so one request's analysis does not stall the others' deadlines)
+        with timer.stage("graph"):
+            graph = await run_in_threadpool(graph_builder.build_graph, yolo_results)
+
+        # Perform STRIDE analysis (architecture level is dropped on a low budget)
+        include_architecture = not deadline_planner.should_skip_architecture(deadline)
+        if not include_architecture:
+            plan.degradations.append("skip_architecture_analysis")
+        with timer.stage("stride"):
+            stride_analysis = await run_in_threadpool(
+                stride_analyzer.analyze,
+                graph,
+                include_architecture=include_architecture,
+            )
 
         # Generate visualization if requested
         visualization = None
-        if include_visualization:
-            # Plot YOLO results
-            im_array = yolo_results.plot()
-            # Convert BGR to RGB
-            im_array = cv2.cvtColor(im_array, cv2.COLOR_BGR2RGB)
-            # Convert to PIL Image
-            pil_img = Image.fromarray(im_array)
-            # Encode to base64
-            buffered = io.BytesIO()
-            pil_img.save(buffered, format="PNG")
-            img_str = base64.b64encode(buffered.getvalue()).decode()
-            visualization = f"data:image/png;base64,{img_str}"
+        if include_visualization and not plan.skip_visualization:
+            with timer.stage("visualization"):
+                visualization = await run_in_threadpool(
+                    _render_visualization, yolo_results
+                )
 
         # Calculate processing time
-        processing_time = (time.time() - start_time) * 1000  # in milliseconds
+        processing_time = timer.elapsed_ms()  # in milliseconds
 
         # Count total detections
         total_detections = len(graph.nodes) + len(graph.edges)
 
         # Create metadata
-        used_model = model_name if model_name else YOLOModel.get_default_model()
+        if near_duplicate is None:
+            deadline_planner.record(timer.timings, plan.model_name, plan.imgsz)
         metadata = Metadata(
             processing_time_ms=round(processing_time, 2),
-            model_version=used_model,
+            model_version=plan.model_name,
             total_detections=total_detections,
             confidence_threshold=conf_threshold,
+            stage_timings_ms=timer.timings,
+            near_duplicate=near_duplicate,
+            dense_mode=dense_mode,
+            max_detections=max_det,
+            detection_cap_hit=detection_cap_hit,
+            degradations=plan.degradations,
+            deadline_remaining_ms=(
+                round(deadline.remaining_ms(), 2) if deadline is not None else None
+            ),
+            analysis_id=history_store.new_id() if history_store.enabled else None,
+            profile_id=profile_session.profile_id if profile_session else None,
+        )
+
+        # Only full-quality results are captured for replay
+        capture = (
+            near_duplicate is None
+            and (not plan.degradations or plan.degradations == ["skip_visualization"])
+            and request_capture.should_capture()
         )
+        capture_params = {
+            "conf_threshold": conf_threshold,
+            "model_name": plan.model_name,
+            "dense_mode": dense_mode,
+            "max_detections": max_detections,
+        }
+
+        accept = request.headers.get("accept")
+        if fast_response or response_encoder.wants_msgpack(accept):
+            # All parts were already validated when built, so skip a second pass
+            response = InferenceResponse.model_construct(
+                graph=graph,
+                stride_analysis=stride_analysis,
+                metadata=metadata,
+                visualization=visualization,
+            )
+            # Persisted by the history writer thread, off the request path
+            history_store.submit(metadata.analysis_id, response)
+            if capture:
+                request_capture.submit(image_np, capture_params, yolo_results, response)
+            return response_encoder.encode(
+                response,
+                accept=accept,
+                accept_encoding=request.headers.get("accept-encoding"),
+            )
 
         # Create response
         response = InferenceResponse(
@@ -166,13 +493,932 @@ async def inference(
             metadata=metadata,
             visualization=visualization,
         )
+        history_store.submit(metadata.analysis_id, response)
+        if capture:
+            request_capture.submit(image_np, capture_params, yolo_results, response)
 
         return response
 
+    except HTTPException:
+        raise
+    except RequestCancelled:
+        # 499: client closed request (nginx convention)
+        raise HTTPException(status_code=499, detail="Client disconnected")
     except FileNotFoundError as e:
         raise HTTPException(status_code=500, detail=f"Model file not found: {str(e)}")
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Error processing image: {str(e)}")
+    finally:
+        if profile_session is not None:
+            await run_in_threadpool(
+                request_profiler.finish,
+                profile_session,
+                model_name or YOLOModel.get_default_model(),
+            )
+
+
+@app.post("/api/v1/inference/progressive")
+async def progressive_inference(
+    request: Request,
+    file: UploadFile = File(..., description="Architecture diagram image"),
+    conf_threshold: float = Query(
+        0.5, ge=0.1, le=1.0, description="Confidence threshold for detections"
+    ),
+    include_visualization: bool = Query(
+        False, description="Include visualization image in the final result"
+    ),
+    model_name: Optional[str] = Query(
+        None,
+        description="YOLO model to use. If not specified, uses default model.",
+    ),
+    preliminary_size: int = Query(
+        PRELIMINARY_INPUT_SIZE,
+        ge=160,
+        le=640,
+        description="Input size of the low-resolution first pass",
+    ),
+    refine: str = Query(
+        "full",
+        pattern="^(full|regions)$",
+        description="Refine with a full-resolution pass ('full') or only re-run crops around low-confidence detections ('regions')",
+    ),
+    refine_below: float = Query(
+        0.7,
+        ge=0.1,
+        le=1.0,
+        description="In 'regions' mode, detections below this confidence are re-checked at full resolution",
+    ),
+    stream: bool = Query(
+        True,
+        description="Stream NDJSON (preliminary, then final). If false, return only the final result",
+    ),
+):
+    """
+    Coarse-to-fine inference for interactive use.
+
+    A low-resolution pass produces a preliminary graph + STRIDE analysis quickly;
+    a refinement pass (full image or only low-confidence regions) produces the
+    final result, which replaces the preliminary one.
+
+    With `stream=true` the response is `application/x-ndjson`: one line per
+    stage (`{"stage": "preliminary", ...}` then `{"stage": "final", ...}`), each
+    with the InferenceResponse fields. `metadata.progressive` carries both
+    latencies. Errors after the first line are sent as `{"stage": "error"}`.
+
+    Returns:
+        NDJSON stream, or the final InferenceResponse when `stream=false`
+    """
+    timer = StageTimer()
+    contents, header = await _read_upload(file, timer)
+
+    used_model = model_name if model_name else YOLOModel.get_default_model()
+    if used_model not in YOLOModel.get_available_models():
+        raise HTTPException(
+            status_code=400,
+            detail=f"Model '{used_model}' not available. "
+            f"Available models: {', '.join(YOLOModel.get_available_models())}",
+        )
+
+    try:
+        with timer.stage("decode"):
+            image_np = await _load_image(contents, header, used_model)
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Error processing image: {str(e)}")
+
+    # Anything re-checked must include everything below the output threshold
+    refine_below = max(refine_below, conf_threshold)
+    # In 'regions' mode the coarse pass also keeps weak detections, so regions
+    # the low-resolution model was unsure about still get re-checked
+    coarse_conf = (
+        max(0.1, conf_threshold / 2) if refine == "regions" else conf_threshold
+    )
+
+    async def build_response(results, stage, timings, visualization=None):
+        # Graph and STRIDE run off the event loop, as in /api/v1/inference
+        graph = await run_in_threadpool(graph_builder.build_graph, results)
+        stride_analysis = await run_in_threadpool(stride_analyzer.analyze, graph)
+        metadata = Metadata(
+            processing_time_ms=round(timer.elapsed_ms(), 2),
+            model_version=used_model,
+            total_detections=len(graph.nodes) + len(graph.edges),
+            confidence_threshold=conf_threshold,
+            stage_timings_ms=dict(timer.timings),
+            progressive=timings.model_copy(update={"stage": stage}),
+        )
+        return InferenceResponse(
+            graph=graph,
+            stride_analysis=stride_analysis,
+            metadata=metadata,
+            visualization=visualization,
+        )
+
+    async def run_passes():
+        raw = Detections.from_results(
+            await inference_queue.run(
+                used_model,
+                YOLOModel.predict,
+                image_np,
+                conf_threshold=coarse_conf,
+                model_name=used_model,
+                imgsz=preliminary_size,
+                is_cancelled=request.is_disconnected,
+                timer=timer,
+            )
+        )
+        preliminary = raw.filter(conf_threshold)
+        with timer.stage("preliminary_analysis"):
+            timings = ProgressiveTimings(
+                stage="preliminary",
+                preliminary_input_size=preliminary_size,
+                preliminary_latency_ms=0.0,
+            )
+            response = await build_response(preliminary, "preliminary", timings)
+        timings.preliminary_latency_ms = round(timer.elapsed_ms(), 2)
+        response.metadata.progressive.preliminary_latency_ms = (
+            timings.preliminary_latency_ms
+        )
+        yield "preliminary", response
+
+        plan = progressive_refiner.plan(raw, refine, refine_below)
+        if plan.mode == "full":
+            final = await inference_queue.run(
+                used_model,
+                YOLOModel.predict,
+                image_np,
+                conf_threshold=conf_threshold,
+                model_name=used_model,
+                is_cancelled=request.is_disconnected,
+                timer=timer,
+            )
+        elif plan.mode == "regions":
+            # All crops go through the model in one batch
+            region_results = await inference_queue.run(
+                used_model,
+                YOLOModel.predict_batch,
+                [image_np[y1:y2, x1:x2] for x1, y1, x2, y2 in plan.regions],
+                conf_threshold=conf_threshold,
+                model_name=used_model,
+                is_cancelled=request.is_disconnected,
+                timer=timer,
+            )
+            with timer.stage("merge"):
+                final = await run_in_threadpool(
+                    progressive_refiner.merge,
+                    raw,
+                    plan.regions,
+                    region_results,
+                    refine_below,
+                    orig_img=image_np,
+                )
+        else:
+            final = preliminary
+
+        with timer.stage("final_analysis"):
+            visualization = None
+            if include_visualization:
+                visualization = await run_in_threadpool(_render_visualization, final)
+            timings.refinement = plan.label
+            response = await build_response(final, "final", timings, visualization)
+        response.metadata.progressive.final_latency_ms = round(timer.elapsed_ms(), 2)
+        # Only the final result goes to the history store
+        if history_store.enabled:
+            response.metadata.analysis_id = history_store.new_id()
+            history_store.submit(response.metadata.analysis_id, response)
+        yield "final", response
+
+    if not stream:
+        response = None
+        try:
+            async for _, response in run_passes():
+                pass
+        except RequestCancelled:
+            raise HTTPException(status_code=499, detail="Client disconnected")
+        except Exception as e:
+            raise HTTPException(
+                status_code=500, detail=f"Error processing image: {str(e)}"
+            )
+        return response
+
+    async def ndjson():
+        try:
+            async for stage, response in run_passes():
+                yield response_encoder.dumps(
+                    {"stage": stage, **response.model_dump()}
+                ) + b"\n"
+        except RequestCancelled:
+            return
+        except Exception as e:
+            yield response_encoder.dumps(
+                {"stage": "error", "detail": f"Error processing image: {str(e)}"}
+            ) + b"\n"
+
+    return StreamingResponse(ndjson(), media_type="application/x-ndjson")
+
+
+def _merge_summaries(summaries) -> ThreatSummary:
+    """Add up per-page threat counts into one summary."""
+    by_severity, by_category = Counter(), Counter()
+    for summary in summaries:
+        by_severity.update(summary.by_severity)
+        by_category.update(summary.by_category)
+    return ThreatSummary(
+        total_threats=sum(s.total_threats for s in summaries),
+        by_severity=dict(by_severity),
+        by_category=dict(by_category),
+    )
+
+
+@app.post("/api/v1/inference/document", response_model=DocumentInferenceResponse)
+async def document_inference(
+    request: Request,
+    file: UploadFile = File(
+        ..., description="Architecture diagram document (PDF or SVG)"
+    ),
+    conf_threshold: float = Query(
+        0.5, ge=0.1, le=1.0, description="Confidence threshold for detections"
+    ),
+    model_name: Optional[str] = Query(
+        None,
+        description="YOLO model to use. If not specified, uses default model.",
+    ),
+    batch_size: int = Query(
+        4, ge=1, le=16, description="Pages sent to the model per inference call"
+    ),
+    merge_summary: bool = Query(
+        True, description="Include a threat summary over all pages"
+    ),
+    stream: bool = Query(
+        False,
+        description="Stream NDJSON (one line per page, then the summary) instead of a single response",
+    ),
+):
+    """
+    Analyze every page of a PDF (or an SVG) as a separate diagram.
+
+    Pages are rasterized in a process pool at the DPI that makes their
+    longest side match the model input size, and sent to the model in
+    batches; the next pages render while the current batch is inferred.
+    Each page gets its own graph, STRIDE analysis and history entry.
+
+    With `stream=true` the response is `application/x-ndjson`: one
+    `{"type": "page", ...}` line per page (DocumentPage fields) as soon as
+    its batch is done, then `{"type": "summary", "summary": ..., "metadata": ...}`.
+    Errors after the first line are sent as `{"type": "error"}`.
+
+    Returns:
+        DocumentInferenceResponse, or the NDJSON stream when `stream=true`
+    """
+    timer = StageTimer()
+    contents, header = await _read_upload(file, timer)
+    if header.format not in DOCUMENT_FORMATS:
+        raise HTTPException(
+            status_code=415,
+            detail="Expected a PDF or SVG document; use /api/v1/inference for images",
+        )
+
+    used_model = model_name if model_name else YOLOModel.get_default_model()
+    if used_model not in YOLOModel.get_available_models():
+        raise HTTPException(
+            status_code=400,
+            detail=f"Model '{used_model}' not available. "
+            f"Available models: {', '.join(YOLOModel.get_available_models())}",
+        )
+
+    try:
+        page_count = document_rasterizer.page_count(contents, header.format)
+        input_size = YOLOModel.input_size(used_model)
+    except DocumentError as e:
+        raise HTTPException(status_code=e.status_code, detail=e.detail)
+    except FileNotFoundError as e:
+        raise HTTPException(status_code=500, detail=f"Model file not found: {str(e)}")
+    target_side = document_rasterizer.target_side(input_size)
+
+    def analyze_batch(batch, results):
+        pages = []
+        for page, page_results in zip(batch, results):
+            graph = graph_builder.build_graph(page_results)
+            stride_analysis = stride_analyzer.analyze(graph)
+            metadata = Metadata(
+                processing_time_ms=round(timer.elapsed_ms(), 2),
+                model_version=used_model,
+                total_detections=len(graph.nodes) + len(graph.edges),
+                confidence_threshold=conf_threshold,
+                analysis_id=history_store.new_id() if history_store.enabled else None,
+            )
+            # Each page is stored as its own analysis
+            history_store.submit(
+                metadata.analysis_id,
+                InferenceResponse(
+                    graph=graph, stride_analysis=stride_analysis, metadata=metadata
+                ),
+            )
+            height, width = page.image.shape[:2]
+            pages.append(
+                DocumentPage(
+                    page=page.index + 1,
+                    width=width,
+                    height=height,
+                    dpi=round(page.dpi, 2),
+                    graph=graph,
+                    stride_analysis=stride_analysis,
+                    metadata=metadata,
+                )
+            )
+        return pages
+
+    async def run_pages():
+        batch: list[RasterPage] = []
+        rendered = document_rasterizer.pages(
+            contents,
+            header.format,
+            target_side,
+            page_count,
+            # Keep the next batch rendering while this one is inferred
+            ahead=batch_size + document_rasterizer.max_workers,
+        )
+        async with aclosing(rendered) as pages:
+            while True:
+                # Only the time spent waiting for the pool (not overlapped)
+                with timer.stage("rasterize_wait"):
+                    page = await anext(pages, None)
+                if page is not None:
+                    batch.append(page)
+                if batch and (page is None or len(batch) == batch_size):
+                    results = await inference_queue.run(
+                        used_model,
+                        YOLOModel.predict_batch,
+                        [p.image for p in batch],
+                        conf_threshold=conf_threshold,
+                        model_name=used_model,
+                        is_cancelled=request.is_disconnected,
+                        timer=timer,
+                    )
+                    with timer.stage("analysis"):
+                        analyzed = await run_in_threadpool(
+                            analyze_batch, batch, results
+                        )
+                    for item in analyzed:
+                        yield item
+                    batch = []
+                if page is None:
+                    return
+
+    def build_metadata() -> DocumentMetadata:
+        return DocumentMetadata(
+            processing_time_ms=round(timer.elapsed_ms(), 2),
+            model_version=used_model,
+            confidence_threshold=conf_threshold,
+            format=header.format,
+            page_count=page_count,
+            input_size=input_size,
+            stage_timings_ms=timer.timings,
+        )
+
+    if not stream:
+        try:
+            pages = [page async for page in run_pages()]
+        except DocumentError as e:
+            raise HTTPException(status_code=e.status_code, detail=e.detail)
+        except RequestCancelled:
+            raise HTTPException(status_code=499, detail="Client disconnected")
+        except Exception as e:
+            raise HTTPException(
+                status_code=500, detail=f"Error processing document: {str(e)}"
+            )
+        return DocumentInferenceResponse(
+            pages=pages,
+            summary=(
+                _merge_summaries([p.stride_analysis.summary for p in pages])
+                if merge_summary
+                else None
+            ),
+            metadata=build_metadata(),
+        )
+
+    async def ndjson():
+        summaries = []
+        try:
+            async for page in run_pages():
+                summaries.append(page.stride_analysis.summary)
+                yield response_encoder.dumps(
+                    {"type": "page", **page.model_dump()}
+                ) + b"\n"
+        except RequestCancelled:
+            return
+        except Exception as e:
+            yield response_encoder.dumps(
+                {"type": "error", "detail": f"Error processing document: {str(e)}"}
+            ) + b"\n"
+            return
+        yield response_encoder.dumps(
+            {
+                "type": "summary",
+                "summary": (
+                    _merge_summaries(summaries).model_dump() if merge_summary else None
+                ),
+                "metadata": build_metadata().model_dump(),
+            }
+        ) + b"\n"
+
+    return StreamingResponse(ndjson(), media_type="application/x-ndjson")
+
+
+def _epoch(value: Optional[datetime]) -> Optional[float]:
+    return value.timestamp() if value is not None else None
+
+
+def _require_history():
+    if not history_store.enabled:
+        raise HTTPException(status_code=404, detail="History store is disabled")
+
+
+@app.get("/api/v1/history/analyses", response_model=AnalysisPage)
+async def history_analyses(
+    category: Optional[str] = Query(
+        None, description="Has a threat of this STRIDE category"
+    ),
+    severity: Optional[str] = Query(
+        None, description="Has a threat of this severity (combined with category)"
+    ),
+    node_type: Optional[str] = Query(None, description="Has a node of this type"),
+    source_type: Optional[str] = Query(
+        None, description="Has an edge from this node type"
+    ),
+    target_type: Optional[str] = Query(
+        None, description="Has an edge to this node type (combined with source_type)"
+    ),
+    model_version: Optional[str] = Query(None, description="Analyzed by this model"),
+    since: Optional[datetime] = Query(None, description="Analyzed at or after"),
+    until: Optional[datetime] = Query(None, description="Analyzed before"),
+    limit: int = Query(50, ge=1, le=500, description="Page size"),
+    cursor: Optional[str] = Query(None, description="next_cursor of the previous page"),
+):
+    """
+    List stored analyses, newest first, matching all given filters.
+
+    Example: `?category=Elevation of Privilege&severity=Critical`.
+    """
+    _require_history()
+    try:
+        page = await run_in_threadpool(
+            history_store.query_analyses,
+            category=category,
+            severity=severity,
+            node_type=node_type,
+            source_type=source_type,
+            target_type=target_type,
+            model_version=model_version,
+            since=_epoch(since),
+            until=_epoch(until),
+            limit=limit,
+            cursor=cursor,
+        )
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    return AnalysisPage(items=page.items, next_cursor=page.next_cursor)
+
+
+@app.get("/api/v1/history/analyses/{analysis_id}", response_model=StoredAnalysis)
+async def history_analysis(analysis_id: str):
+    """Return the stored graph, STRIDE analysis and metadata of one analysis."""
+    _require_history()
+    stored = await run_in_threadpool(history_store.get_analysis, analysis_id)
+    if stored is None:
+        raise HTTPException(
+            status_code=404, detail=f"Analysis '{analysis_id}' not found"
+        )
+    return stored
+
+
+@app.get("/api/v1/history/threats", response_model=ThreatPage)
+async def history_threats(
+    category: Optional[str] = Query(None, description="STRIDE category"),
+    severity: Optional[str] = Query(None, description="Critical, High, Medium or Low"),
+    since: Optional[datetime] = Query(None, description="Analyzed at or after"),
+    until: Optional[datetime] = Query(None, description="Analyzed before"),
+    limit: int = Query(50, ge=1, le=500, description="Page size"),
+    cursor: Optional[str] = Query(None, description="next_cursor of the previous page"),
+):
+    """List stored threats, newest first, by category and/or severity."""
+    _require_history()
+    try:
+        page = await run_in_threadpool(
+            history_store.query_threats,
+            category=category,
+            severity=severity,
+            since=_epoch(since),
+            until=_epoch(until),
+            limit=limit,
+            cursor=cursor,
+        )
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    return ThreatPage(items=page.items, next_cursor=page.next_cursor)
+
+
+@app.get("/api/v1/history/edges", response_model=EdgePage)
+async def history_edges(
+    source_type: Optional[str] = Query(
+        None, description="Source node type (e.g. user)"
+    ),
+    target_type: Optional[str] = Query(
+        None, description="Target node type (e.g. database)"
+    ),
+    since: Optional[datetime] = Query(None, description="Analyzed at or after"),
+    until: Optional[datetime] = Query(None, description="Analyzed before"),
+    limit: int = Query(50, ge=1, le=500, description="Page size"),
+    cursor: Optional[str] = Query(None, description="next_cursor of the previous page"),
+):
+    """List stored edges, newest first, by source→target node type pair."""
+    _require_history()
+    try:
+        page = await run_in_threadpool(
+            history_store.query_edges,
+            source_type=source_type,
+            target_type=target_type,
+            since=_epoch(since),
+            until=_epoch(until),
+            limit=limit,
+            cursor=cursor,
+        )
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    return EdgePage(items=page.items, next_cursor=page.next_cursor)
+
+
+async def _analyze_for_diff(
+    request: Request,
+    file: UploadFile,
+    used_model: str,
+    conf_threshold: float,
+    timer: StageTimer,
+) -> InferenceResponse:
+    """Run detection, graph building and STRIDE on one diff upload."""
+    contents, header = await _read_upload(file, timer)
+    try:
+        with timer.stage("decode"):
+            image_np = await _load_image(contents, header, used_model)
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Error processing image: {str(e)}")
+
+    yolo_results = await inference_queue.run(
+        used_model,
+        YOLOModel.predict,
+        image_np,
+        conf_threshold=conf_threshold,
+        model_name=used_model,
+        is_cancelled=request.is_disconnected,
+        timer=timer,
+    )
+    with timer.stage("graph"):
+        graph = await run_in_threadpool(graph_builder.build_graph, yolo_results)
+    with timer.stage("stride"):
+        stride_analysis = await run_in_threadpool(stride_analyzer.analyze, graph)
+    metadata = Metadata(
+        processing_time_ms=round(timer.elapsed_ms(), 2),
+        model_version=used_model,
+        total_detections=len(graph.nodes) + len(graph.edges),
+        confidence_threshold=conf_threshold,
+        analysis_id=history_store.new_id() if history_store.enabled else None,
+    )
+    response = InferenceResponse(
+        graph=graph, stride_analysis=stride_analysis, metadata=metadata
+    )
+    history_store.submit(metadata.analysis_id, response)
+    return response
+
+
+@app.post("/api/v1/diff", response_model=GraphDiffResponse)
+async def diff_uploads(
+    request: Request,
+    before: UploadFile = File(..., description="Previous version of the diagram"),
+    after: UploadFile = File(..., description="New version of the diagram"),
+    conf_threshold: float = Query(
+        0.5, ge=0.1, le=1.0, description="Confidence threshold for detections"
+    ),
+    model_name: Optional[str] = Query(
+        None,
+        description="YOLO model to use for both images. If not specified, uses default model.",
+    ),
+):
+    """
+    Analyze two versions of a diagram and return what changed between them.
+
+    Nodes are matched by type and position after aligning the two diagrams
+    (rescaling and margins are tolerated), so node ids do not need to match.
+    Both analyses are stored in the history when it is enabled.
+
+    Returns:
+        GraphDiffResponse with added/removed nodes, edges and threats
+    """
+    timer = StageTimer()
+    used_model = model_name if model_name else YOLOModel.get_default_model()
+    if used_model not in YOLOModel.get_available_models():
+        raise HTTPException(
+            status_code=400,
+            detail=f"Model '{used_model}' not available. "
+            f"Available models: {', '.join(YOLOModel.get_available_models())}",
+        )
+
+    try:
+        old = await _analyze_for_diff(
+            request, before, used_model, conf_threshold, timer
+        )
+        new = await _analyze_for_diff(request, after, used_model, conf_threshold, timer)
+        with timer.stage("diff"):
+            diff = await run_in_threadpool(
+                graph_differ.diff,
+                old.graph,
+                new.graph,
+                old.stride_analysis,
+                new.stride_analysis,
+            )
+    except HTTPException:
+        raise
+    except RequestCancelled:
+        raise HTTPException(status_code=499, detail="Client disconnected")
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Error processing image: {str(e)}")
+
+    return GraphDiffResponse(
+        before_analysis_id=old.metadata.analysis_id,
+        after_analysis_id=new.metadata.analysis_id,
+        processing_time_ms=round(timer.elapsed_ms(), 2),
+        diff=diff,
+    )
+
+
+@app.get("/api/v1/history/diff", response_model=GraphDiffResponse)
+async def diff_stored(
+    before: str = Query(..., description="analysis_id of the previous version"),
+    after: str = Query(..., description="analysis_id of the new version"),
+):
+    """Diff two stored analyses (see `POST /api/v1/diff`)."""
+    _require_history()
+    timer = StageTimer()
+    analyses = []
+    for analysis_id in (before, after):
+        stored = await run_in_threadpool(history_store.get_analysis, analysis_id)
+        if stored is None:
+            raise HTTPException(
+                status_code=404, detail=f"Analysis '{analysis_id}' not found"
+            )
+        analyses.append(StoredAnalysis.model_validate(stored))
+    old, new = analyses
+
+    with timer.stage("diff"):
+        diff = await run_in_threadpool(
+            graph_differ.diff,
+            old.graph,
+            new.graph,
+            old.stride_analysis,
+            new.stride_analysis,
+        )
+    return GraphDiffResponse(
+        before_analysis_id=before,
+        after_analysis_id=after,
+        processing_time_ms=round(timer.elapsed_ms(), 2),
+        diff=diff,
+    )
+
+
+async def _session_send(websocket: WebSocket, payload: dict) -> None:
+    await websocket.send_text(response_encoder.dumps(payload).decode())
+
+
+async def _session_detect(session: InteractiveSession, model_name: str) -> None:
+    """Run the model once per session and model, keeping all raw detections."""
+    if model_name in session.raw_detections:
+        return
+    results = await inference_queue.run(
+        model_name,
+        YOLOModel.predict,
+        session.image,
+        conf_threshold=RAW_CONF_THRESHOLD,
+        model_name=model_name,
+    )
+    session.raw_detections[model_name] = Detections.from_results(results)
+    session_store.touch(session)
+
+
+def _session_analyze(session: InteractiveSession, rebuild: bool):
+    """Rebuild the graph from detections (or keep the edited one) and rerun STRIDE."""
+    graph = graph_builder.build_graph(session.detections) if rebuild else session.graph
+    return graph, stride_analyzer.analyze(graph)
+
+
+async def _session_update(
+    websocket: WebSocket, session: InteractiveSession, cause: str, rebuild: bool
+) -> None:
+    """Recompute the session state and send only what changed."""
+    timer = StageTimer()
+    old_graph, old_stride = session.graph, session.stride_analysis
+    with timer.stage("analysis"):
+        graph, stride_analysis = await run_in_threadpool(
+            _session_analyze, session, rebuild
+        )
+    with timer.stage("diff"):
+        diff = await run_in_threadpool(
+            graph_differ.diff, old_graph, graph, old_stride, stride_analysis
+        )
+    edits_discarded = session.edits if rebuild else 0
+    session.graph, session.stride_analysis = graph, stride_analysis
+    if rebuild:
+        session.edits = 0
+    delta = SessionDelta(
+        cause=cause,
+        diff=compact_delta(diff),
+        summary=stride_analysis.summary,
+        model_version=session.model_name,
+        confidence_threshold=session.conf_threshold,
+        processing_time_ms=round(timer.elapsed_ms(), 2),
+        edits_discarded=edits_discarded,
+    )
+    await _session_send(websocket, delta.model_dump())
+
+
+async def _session_full_state(websocket: WebSocket, session: InteractiveSession):
+    await _session_send(
+        websocket,
+        {
+            "type": "session",
+            "session_id": session.session_id,
+            "idle_timeout_s": session_store.idle_timeout_s,
+        },
+    )
+    await _session_send(
+        websocket,
+        {
+            "type": "analysis",
+            "graph": session.graph.model_dump(),
+            "stride_analysis": session.stride_analysis.model_dump(),
+            "model_version": session.model_name,
+            "confidence_threshold": session.conf_threshold,
+        },
+    )
+
+
+@app.websocket("/api/v1/session")
+async def interactive_session(
+    websocket: WebSocket,
+    session_id: Optional[str] = Query(None, description="Resume an existing session"),
+    conf_threshold: float = Query(0.5, ge=0.1, le=1.0),
+    model_name: Optional[str] = Query(None),
+):
+    """
+    Interactive analysis over a WebSocket, with server-held image and detections.
+
+    The client sends the image (or a single-page PDF/SVG) once as a binary message. The server keeps the
+    decoded image and the raw detections (at the lowest allowed threshold) and
+    answers later JSON messages from that state:
+
+    - `{"type": "threshold", "conf_threshold": 0.6}`: filter, no inference
+    - `{"type": "model", "model_name": "..."}`: inference once per model
+    - `{"type": "edit", "op": "add_node|remove_node|update_node|add_edge|remove_edge", ...}`
+    - `{"type": "overlay"}`: detections drawn on the image (base64 PNG)
+
+    Changes are answered with a `delta` message (SessionDelta): only added,
+    removed or renamed nodes, edges and threats. A threshold or model change
+    rebuilds the graph from the detections and drops manual edits. Sessions
+    expire after `AUTOSTRIDE_SESSION_IDLE_S` without messages and the least
+    recently used are evicted above `AUTOSTRIDE_SESSION_MAX_MB`; pass
+    `session_id` to resume after a reconnect.
+    """
+    await websocket.accept()
+    used_model = model_name if model_name else YOLOModel.get_default_model()
+    session = session_store.get(session_id) if session_id else None
+    if session is not None:
+        await _session_full_state(websocket, session)
+    elif session_id:
+        await _session_send(
+            websocket,
+            {"type": "error", "detail": f"Session '{session_id}' expired or not found"},
+        )
+
+    try:
+        while True:
+            try:
+                message = await asyncio.wait_for(
+                    websocket.receive(), timeout=session_store.idle_timeout_s
+                )
+            except asyncio.TimeoutError:
+                await websocket.close(code=1000, reason="Idle timeout")
+                return
+            if message["type"] == "websocket.disconnect":
+                return
+
+            try:
+                if message.get("bytes") is not None:
+                    contents = message["bytes"]
+                    header = upload_guard.inspect(contents)
+                    if used_model not in YOLOModel.get_available_models():
+                        raise ValueError(f"Model '{used_model}' not available")
+                    if header.format in DOCUMENT_FORMATS:
+                        image_np = await _load_image(contents, header, used_model)
+                    else:
+                        image_np = await run_in_threadpool(_decode_image, contents)
+                    if session is not None:
+                        session_store.remove(session.session_id)
+                    session = session_store.create(image_np, used_model, conf_threshold)
+                    await _session_detect(session, used_model)
+                    session.graph, session.stride_analysis = await run_in_threadpool(
+                        _session_analyze, session, True
+                    )
+                    await _session_full_state(websocket, session)
+                    continue
+
+                command = json.loads(message.get("text") or "{}")
+                kind = command.get("type")
+                if session is None or session_store.get(session.session_id) is None:
+                    session = None
+                    raise ValueError("No active session: send an image first")
+
+                if kind == "threshold":
+                    value = float(command["conf_threshold"])
+                    if not 0.1 <= value <= 1.0:
+                        raise ValueError("conf_threshold must be between 0.1 and 1.0")
+                    session.conf_threshold = value
+                    await _session_update(websocket, session, "threshold", rebuild=True)
+                elif kind == "model":
+                    name = command.get("model_name")
+                    if name not in YOLOModel.get_available_models():
+                        raise ValueError(
+                            f"Model '{name}' not available. Available models: "
+                            f"{', '.join(YOLOModel.get_available_models())}"
+                        )
+                    await _session_detect(session, name)
+                    session.model_name = name
+                    await _session_update(websocket, session, "model", rebuild=True)
+                elif kind == "edit":
+                    session.apply_edit(command)
+                    await _session_update(websocket, session, "edit", rebuild=False)
+                elif kind == "overlay":
+                    detections = session.detections
+                    detections.orig_img = session.image
+                    visualization = await run_in_threadpool(
+                        _render_visualization, detections
+                    )
+                    await _session_send(
+                        websocket, {"type": "overlay", "visualization": visualization}
+                    )
+                else:
+                    raise ValueError(f"Unknown message type: {kind}")
+            except WebSocketDisconnect:
+                raise
+            except (ValueError, KeyError, TypeError, UploadRejected) as e:
+                await _session_send(websocket, {"type": "error", "detail": str(e)})
+            except HTTPException as e:
+                await _session_send(websocket, {"type": "error", "detail": e.detail})
+            except Exception as e:
+                await _session_send(
+                    websocket,
+                    {"type": "error", "detail": f"Error processing message: {str(e)}"},
+                )
+    except WebSocketDisconnect:
+        return
+
+
+def _require_admin(request: Request):
+    if not request_profiler.is_admin(request.headers.get(ADMIN_TOKEN_HEADER)):
+        raise HTTPException(status_code=403, detail="Admin token required")
+
+
+@app.get("/api/v1/admin/profiles", response_model=ProfileList)
+async def list_profiles(
+    request: Request,
+    limit: int = Query(50, ge=1, le=500, description="Number of profiles"),
+):
+    """List the most recent request profiles (admin only)."""
+    _require_admin(request)
+    profiles = await run_in_threadpool(request_profiler.list_profiles, limit)
+    return ProfileList(items=[ProfileInfo.model_validate(p) for p in profiles])
+
+
+@app.get("/api/v1/admin/profiles/{profile_id}")
+async def download_profile(request: Request, profile_id: str):
+    """
+    Download a profile in folded-stack format (admin only).
+
+    One line per unique stack (`root;...;leaf count`), rooted at the pipeline
+    stage that was running. Open it with speedscope or `flamegraph.pl`.
+    """
+    _require_admin(request)
+    path = request_profiler.profile_path(profile_id)
+    if path is None:
+        raise HTTPException(status_code=404, detail=f"Profile '{profile_id}' not found")
+    return FileResponse(path, media_type="text/plain", filename=path.name)
+
+
+@app.on_event("shutdown")
+def flush_history():
+    """Write pending history entries before the process exits."""
+    history_store.close()
+    request_capture.close()
+    document_rasterizer.shutdown()
 
 
 @app.get("/")
@@ -185,6 +1431,12 @@ async def root():
             "health": "/health",
             "models": "/api/v1/models",
             "inference": "/api/v1/inference",
+            "progressive_inference": "/api/v1/inference/progressive",
+            "document_inference": "/api/v1/inference/document",
+            "history": "/api/v1/history/analyses",
+            "diff": "/api/v1/diff",
+            "session": "/api/v1/session (WebSocket)",
+            "profiles": "/api/v1/admin/profiles",
             "docs": "/docs",
         },
     }
@@ -0,0 +1,277 @@
+import numpy as np
+import cv2
+from typing import Any, Dict, List, Optional, Tuple
+
+
+class _Array(np.ndarray):
+    """NumPy array exposing the `.cpu().numpy()` interface of torch tensors."""
+
+    def cpu(self) -> "_Array":
+        return self
+
+    def numpy(self) -> np.ndarray:
+        return self.view(np.ndarray)
+
+
+def _wrap(values, dtype=np.float32, shape: Optional[Tuple[int, ...]] = None) -> _Array:
+    array = np.asarray(values, dtype=dtype)
+    if shape is not None:
+        array = array.reshape(shape)
+    return array.view(_Array)
+
+
+class DetectionBoxes:
+    """Box container compatible with `ultralytics.engine.results.Boxes` iteration."""
+
+    def __init__(self, xyxy: np.ndarray, conf: np.ndarray, cls: np.ndarray):
+        self.xyxy = _wrap(xyxy, shape=(-1, 4))
+        self.conf = _wrap(conf, shape=(-1,))
+        self.cls = _wrap(cls, shape=(-1,))
+
+    def __len__(self) -> int:
+        return len(self.conf)
+
+    def __getitem__(self, idx) -> "DetectionBoxes":
+        if isinstance(idx, (int, np.integer)):
+            idx = slice(idx, idx + 1)
+        return DetectionBoxes(self.xyxy[idx], self.conf[idx], self.cls[idx])
+
+    def __iter__(self):
+        for i in range(len(self)):
+            yield self[i]
+
+
+class DetectionKeypoints:
+    """Keypoint container compatible with `ultralytics.engine.results.Keypoints`."""
+
+    def __init__(self, data: np.ndarray):
+        self.data = _wrap(data)
+
+    @property
+    def xy(self) -> _Array:
+        return self.data[..., :2]
+
+    @property
+    def conf(self) -> _Array:
+        return self.data[..., 2]
+
+    def __len__(self) -> int:
+        return len(self.data)
+
+
+class Detections:
+    """
+    Lightweight, NumPy-backed detection set.
+
+    Mirrors the subset of the Ultralytics `Results` interface consumed by
+    `GraphBuilder` (`boxes`, `keypoints`, `plot()`), so it can be produced by a
+    real model, a stub model or a cache, and can be rescaled or serialized.
+    """
+
+    def __init__(
+        self,
+        xyxy: np.ndarray,
+        conf: np.ndarray,
+        cls: np.ndarray,
+        keypoints: Optional[np.ndarray] = None,
+        orig_shape: Tuple[int, int] = (0, 0),
+        names: Optional[Dict[int, str]] = None,
+        orig_img: Optional[np.ndarray] = None,
+    ):
+        self.boxes = DetectionBoxes(xyxy, conf, cls)
+        self.keypoints = (
+            DetectionKeypoints(keypoints) if keypoints is not None else None
+        )
+        self.orig_shape = tuple(int(v) for v in orig_shape)
+        self.names = names or {}
+        self.orig_img = orig_img
+
+    def __len__(self) -> int:
+        return len(self.boxes)
+
+    @classmethod
+    def from_results(cls, results) -> "Detections":
+        """
+        Copy an Ultralytics `Results` object into a `Detections` instance.
+
+        Args:
+            results: Single YOLO result (e.g. `YOLOModel.predict` output)
+
+        Returns:
+            Detections holding NumPy copies of boxes and keypoints
+        """
+        if isinstance(results, Detections):
+            return results
+
+        boxes = results.boxes
+        if boxes is None or len(boxes) == 0:
+            xyxy = np.zeros((0, 4), dtype=np.float32)
+            conf = np.zeros((0,), dtype=np.float32)
+            cls_ids = np.zeros((0,), dtype=np.float32)
+        else:
+            xyxy = boxes.xyxy.cpu().numpy()
+            conf = boxes.conf.cpu().numpy()
+            cls_ids = boxes.cls.cpu().numpy()
+
+        keypoints = None
+        if getattr(results, "keypoints", None) is not None:
+            keypoints = results.keypoints.data.cpu().numpy()
+
+        return cls(
+            xyxy=xyxy,
+            conf=conf,
+            cls=cls_ids,
+            keypoints=keypoints,
+            orig_shape=results.orig_shape,
+            names=dict(getattr(results, "names", {}) or {}),
+            orig_img=getattr(results, "orig_img", None),
+        )
+
+    def scaled(
+        self,
+        scale_x: float,
+        scale_y: float,
+        offset_x: float = 0.0,
+        offset_y: float = 0.0,
+        orig_img: Optional[np.ndarray] = None,
+    ) -> "Detections":
+        """
+        Return a copy with coordinates mapped as `x * scale + offset`.
+
+        Args:
+            scale_x: Horizontal scale factor
+            scale_y: Vertical scale factor
+            offset_x: Horizontal translation applied after scaling
+            offset_y: Vertical translation applied after scaling
+            orig_img: Image the rescaled detections refer to (for `plot()`)
+
+        Returns:
+            Rescaled Detections
+        """
+        factors = np.array([scale_x, scale_y, scale_x, scale_y], dtype=np.float32)
+        offsets = np.array([offset_x, offset_y, offset_x, offset_y], dtype=np.float32)
+        keypoints = None
+        if self.keypoints is not None:
+            keypoints = self.keypoints.data.numpy().copy()
+            # Keypoints at (0, 0) mark "not visible" and must stay there
+            visible = keypoints[..., 2] > 0
+            keypoints[..., 0] = np.where(
+                visible, keypoints[..., 0] * scale_x + offset_x, keypoints[..., 0]
+            )
+            keypoints[..., 1] = np.where(
+                visible, keypoints[..., 1] * scale_y + offset_y, keypoints[..., 1]
+            )
+
+        height, width = self.orig_shape
+        return Detections(
+            xyxy=self.boxes.xyxy.numpy() * factors + offsets,
+            conf=self.boxes.conf.numpy().copy(),
+            cls=self.boxes.cls.numpy().copy(),
+            keypoints=keypoints,
+            orig_shape=(round(height * scale_y), round(width * scale_x)),
+            names=self.names,
+            orig_img=orig_img,
+        )
+
+    def filter(self, min_conf: float) -> "Detections":
+        """Return only detections with confidence >= `min_conf`."""
+        return self.take(self.boxes.conf.numpy() >= min_conf)
+
+    def take(self, indices: np.ndarray) -> "Detections":
+        """Return the detections selected by an index array or boolean mask."""
+        keypoints = (
+            self.keypoints.data.numpy()[indices] if self.keypoints is not None else None
+        )
+        return Detections(
+            xyxy=self.boxes.xyxy.numpy()[indices],
+            conf=self.boxes.conf.numpy()[indices],
+            cls=self.boxes.cls.numpy()[indices],
+            keypoints=keypoints,
+            orig_shape=self.orig_shape,
+            names=self.names,
+            orig_img=self.orig_img,
+        )
+
+    def to_dict(self) -> Dict[str, Any]:
+        """Serialize to plain Python types (JSON/MessagePack friendly)."""
+        return {
+            "xyxy": self.boxes.xyxy.numpy().tolist(),
+            "conf": self.boxes.conf.numpy().tolist(),
+            "cls": self.boxes.cls.numpy().tolist(),
+            "keypoints": (
+                self.keypoints.data.numpy().tolist()
+                if self.keypoints is not None
+                else None
+            ),
+            "orig_shape": list(self.orig_shape),
+            "names": {str(k): v for k, v in self.names.items()},
+        }
+
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any]) -> "Detections":
+        """Inverse of `to_dict`."""
+        keypoints = data.get("keypoints")
+        return cls(
+            xyxy=np.asarray(data["xyxy"], dtype=np.float32).reshape(-1, 4),
+            conf=np.asarray(data["conf"], dtype=np.float32),
+            cls=np.asarray(data["cls"], dtype=np.float32),
+            keypoints=(
+                np.asarray(keypoints, dtype=np.float32)
+                if keypoints is not None
+                else None
+            ),
+            orig_shape=tuple(data.get("orig_shape", (0, 0))),
+            names={int(k): v for k, v in (data.get("names") or {}).items()},
+        )
+
+    def plot(self) -> np.ndarray:
+        """
+        Draw boxes and arrow keypoints on a copy of the original image.
+
+        Returns:
+            BGR image as numpy array (same convention as `Results.plot()`)
+        """
+        if self.orig_img is not None:
+            canvas = self.orig_img.copy()
+        else:
+            height, width = self.orig_shape
+            canvas = np.full((max(height, 1), max(width, 1), 3), 255, dtype=np.uint8)
+
+        kpts = self.keypoints.data.numpy() if self.keypoints is not None else None
+        for i, (x1, y1, x2, y2) in enumerate(self.boxes.xyxy.numpy()):
+            cls_id = int(self.boxes.cls[i])
+            color = _color_for(cls_id)
+            cv2.rectangle(canvas, (int(x1), int(y1)), (int(x2), int(y2)), color, 2)
+            label = f"{self.names.get(cls_id, cls_id)} {float(self.boxes.conf[i]):.2f}"
+            cv2.putText(
+                canvas,
+                label,
+                (int(x1), max(int(y1) - 4, 10)),
+                cv2.FONT_HERSHEY_SIMPLEX,
+                0.4,
+                color,
+                1,
+            )
+            if kpts is not None and i < len(kpts) and len(kpts[i]) >= 2:
+                (tx, ty, tv), (hx, hy, hv) = kpts[i][0], kpts[i][1]
+                if tv > 0 and hv > 0:
+                    cv2.arrowedLine(
+                        canvas, (int(tx), int(ty)), (int(hx), int(hy)), color, 2
+                    )
+        return canvas
+
+
+def _color_for(cls_id: int) -> Tuple[int, int, int]:
+    palette: List[Tuple[int, int, int]] = [
+        (56, 56, 255),
+        (151, 157, 255),
+        (31, 112, 255),
+        (29, 178, 255),
+        (49, 210, 207),
+        (10, 249, 72),
+        (23, 204, 146),
+        (134, 219, 61),
+        (211, 188, 0),
+        (255, 115, 100),
+    ]
+    return palette[cls_id % len(palette)]
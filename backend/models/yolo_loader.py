@@ -1,8 +1,13 @@
 from ultralytics.models import YOLO
 from pathlib import Path
+import re
 import numpy as np
 from typing import Optional, Dict, List
 
+# YOLO size letters from lightest to heaviest (e.g. yolo11n-pose, yolo11m-pose)
+MODEL_SIZES = ["n", "s", "m", "l", "x"]
+_SIZE_PATTERN = re.compile(r"^(?P<family>yolo\w*?\d+)(?P<size>[nsmlx])(?P<rest>-.*)$")
+
 
 class YOLOModel:
     """Manager class for loading and managing multiple YOLO models."""
@@ -54,6 +59,24 @@ class YOLOModel:
             else:
                 raise FileNotFoundError("No YOLO models found in expected locations")
 
+    @classmethod
+    def register_model(cls, model_name: str, model) -> None:
+        """
+        Register an already constructed model under a name.
+
+        Useful for stub models in benchmarks: once registered, discovery is
+        skipped and `predict` calls the registered object directly.
+
+        Args:
+            model_name: Name used to select the model
+            model: Callable with the YOLO interface (`model(image, conf=..., verbose=...)`)
+        """
+        cls._models[model_name] = model
+        if model_name not in cls._available_models:
+            cls._available_models.append(model_name)
+        if cls._default_model is None:
+            cls._default_model = model_name
+
     @classmethod
     def get_available_models(cls) -> List[str]:
         """Get list of available model names."""
@@ -133,12 +156,103 @@ class YOLOModel:
         print(f"Model '{model_name}' loaded successfully")
         return model
 
+    @classmethod
+    def preload(cls, spec: str = "default") -> List[str]:
+        """
+        Load and fuse model weights ahead of the first request.
+
+        Meant to run in a pre-fork parent (gunicorn `preload_app`): forked
+        workers then share the weight tensors copy-on-write instead of each
+        loading its own copy.
+
+        Args:
+            spec: "default", "all" or a comma-separated list of model names
+
+        Returns:
+            Names of the models that were loaded
+        """
+        if spec == "all":
+            names = cls.get_available_models()
+        elif spec == "default":
+            names = [cls.get_default_model()]
+        else:
+            names = [name.strip() for name in spec.split(",") if name.strip()]
+
+        for name in names:
+            model = cls.load_model(name)
+            # Fusing here avoids every worker rewriting (and un-sharing) the
+            # conv/bn weights on its first prediction
+            if hasattr(model, "fuse"):
+                model.fuse()
+        return names
+
+    @classmethod
+    def get_lighter_variant(cls, model_name: Optional[str] = None) -> Optional[str]:
+        """
+        Find the lightest available model that is smaller than the given one.
+
+        Models trained on the same dataset (same name apart from the size
+        letter, e.g. yolo11n-pose_manual_v3_v1 for yolo11m-pose_manual_v3_v1)
+        are preferred over other smaller models.
+
+        Args:
+            model_name: Reference model. If None, uses default model.
+
+        Returns:
+            Name of a lighter model, or None if there is none
+        """
+        if model_name is None:
+            model_name = cls.get_default_model()
+
+        match = _SIZE_PATTERN.match(model_name or "")
+        if not match:
+            return None
+        size_rank = MODEL_SIZES.index(match.group("size"))
+
+        same_dataset, others = [], []
+        for candidate in cls.get_available_models():
+            other = _SIZE_PATTERN.match(candidate)
+            if not other or MODEL_SIZES.index(other.group("size")) >= size_rank:
+                continue
+            rank = MODEL_SIZES.index(other.group("size"))
+            if other.group("rest") == match.group("rest"):
+                same_dataset.append((rank, candidate))
+            else:
+                others.append((rank, candidate))
+
+        pool = same_dataset or others
+        return min(pool)[1] if pool else None
+
+    @classmethod
+    def input_size(cls, model_name: Optional[str] = None, default: int = 640) -> int:
+        """
+        Input size the model was trained with (the `imgsz` it predicts at).
+
+        Args:
+            model_name: Name of model to use. If None, uses default model.
+            default: Size returned when the model does not record one
+
+        Returns:
+            Longest image side, in pixels, fed to the network
+        """
+        model = cls.load_model(model_name)
+        train_args = getattr(getattr(model, "model", None), "args", None)
+        imgsz = (getattr(model, "overrides", None) or {}).get("imgsz")
+        if imgsz is None and isinstance(train_args, dict):
+            imgsz = train_args.get("imgsz")
+        if isinstance(imgsz, (list, tuple)):
+            imgsz = max(imgsz)
+        return int(imgsz) if imgsz else default
+
     @classmethod
     def predict(
         cls,
         image: np.ndarray,
         conf_threshold: float = 0.5,
         model_name: Optional[str] = None,
+        imgsz: Optional[int] = None,
+        max_det: Optional[int] = None,
+        iou: Optional[float] = None,
     ):
         """
         Run inference on an image using specified model.
@@ -147,10 +261,44 @@ class YOLOModel:
             image: Image as numpy array (BGR format from OpenCV or RGB from PIL)
             conf_threshold: Confidence threshold for detections
             model_name: Name of model to use. If None, uses default model.
+            imgsz: Inference input size. If None, uses the model's training size.
+            max_det: Maximum detections kept after NMS. If None, uses the Ultralytics default (300).
+            iou: NMS IoU threshold. If None, uses the Ultralytics default (0.7).
 
         Returns:
             YOLO prediction results
         """
         model = cls.load_model(model_name)
-        results = model(image, conf=conf_threshold, verbose=False)
+        kwargs = {"imgsz": imgsz} if imgsz else {}
+        if max_det:
+            kwargs["max_det"] = max_det
+        if iou is not None:
+            kwargs["iou"] = iou
+        results = model(image, conf=conf_threshold, verbose=False, **kwargs)
         return results[0]  # Return first result
+
+    @classmethod
+    def predict_batch(
+        cls,
+        images: List[np.ndarray],
+        conf_threshold: float = 0.5,
+        model_name: Optional[str] = None,
+        imgsz: Optional[int] = None,
+    ) -> list:
+        """
+        Run inference on several images in a single model call.
+
+        Args:
+            images: Images as numpy arrays (BGR)
+            conf_threshold: Confidence threshold for detections
+            model_name: Name of model to use. If None, uses default model.
+            imgsz: Inference input size. If None, uses the model's training size.
+
+        Returns:
+            One YOLO result per image, in order
+        """
+        if not images:
+            return []
+        model = cls.load_model(model_name)
+        kwargs = {"imgsz": imgsz} if imgsz else {}
+        return list(model(list(images), conf=conf_threshold, verbose=False, **kwargs))
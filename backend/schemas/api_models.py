@@ -1,4 +1,5 @@
 from pydantic import BaseModel, Field
+from datetime import datetime
 from typing import List, Dict, Optional, Any
 
 
@@ -58,11 +59,77 @@ class StrideAnalysisResult(BaseModel):
     summary: ThreatSummary
 
 
+class NearDuplicateMatch(BaseModel):
+    similarity: float = Field(
+        description="1 - hamming_distance / 64 of the perceptual hashes"
+    )
+    hamming_distance: int
+    scale: List[float] = Field(
+        description="Scale [sx, sy] applied to the reused detections"
+    )
+
+
+class ProgressiveTimings(BaseModel):
+    stage: str = Field(description="preliminary or final")
+    preliminary_input_size: int = Field(
+        description="Input size of the low-resolution first pass"
+    )
+    preliminary_latency_ms: float = Field(
+        description="Time from request start to the preliminary result"
+    )
+    final_latency_ms: Optional[float] = Field(
+        None, description="Time from request start to the refined result"
+    )
+    refinement: Optional[str] = Field(
+        None,
+        description="How the final result was refined: full, regions:<count> or none",
+    )
+
+
 class Metadata(BaseModel):
     processing_time_ms: float
     model_version: Optional[str]
     total_detections: int
     confidence_threshold: float
+    stage_timings_ms: Dict[str, float] = Field(
+        default_factory=dict,
+        description="Time spent in each pipeline stage (upload, decode, predict, graph, stride, visualization)",
+    )
+    degradations: List[str] = Field(
+        default_factory=list,
+        description="Degradations applied to meet the request deadline or queue pressure (e.g. input_size:320, model:<name>, skip_visualization, skip_architecture_analysis)",
+    )
+    deadline_remaining_ms: Optional[float] = Field(
+        None,
+        description="Budget left from X-Request-Deadline-Ms when the response was built",
+    )
+    near_duplicate: Optional[NearDuplicateMatch] = Field(
+        None,
+        description="Set when detections were reused from a near-duplicate image instead of running the model",
+    )
+    dense_mode: bool = Field(
+        False,
+        description="Whether dense-diagram mode (higher max_det, per-class NMS IoU) was used",
+    )
+    max_detections: Optional[int] = Field(
+        None, description="Detection cap (max_det) applied by the model's NMS"
+    )
+    analysis_id: Optional[str] = Field(
+        None,
+        description="Id of this analysis in the history store (GET /api/v1/history/analyses/{analysis_id})",
+    )
+    progressive: Optional[ProgressiveTimings] = Field(
+        None,
+        description="Coarse-to-fine timings (only for /api/v1/inference/progressive)",
+    )
+    detection_cap_hit: bool = Field(
+        False,
+        description="True when the model returned max_detections boxes, so detections may have been dropped",
+    )
+    profile_id: Optional[str] = Field(
+        None,
+        description="Id of the sampling profile of this request (GET /api/v1/admin/profiles/{profile_id})",
+    )
 
 
 class InferenceResponse(BaseModel):
@@ -72,3 +139,185 @@ class InferenceResponse(BaseModel):
     visualization: Optional[str] = Field(
         None, description="Base64 encoded image with detections (optional)"
     )
+
+
+class AnalysisSummary(BaseModel):
+    analysis_id: str
+    created_at: datetime
+    model_version: Optional[str]
+    confidence_threshold: Optional[float]
+    processing_time_ms: Optional[float]
+    node_count: int
+    edge_count: int
+    threat_count: int
+    max_severity: Optional[str] = Field(
+        None, description="Highest threat severity in the analysis"
+    )
+
+
+class AnalysisPage(BaseModel):
+    items: List[AnalysisSummary]
+    next_cursor: Optional[str] = Field(
+        None,
+        description="Pass as `cursor` to fetch the next page (null on the last page)",
+    )
+
+
+class StoredAnalysis(BaseModel):
+    analysis_id: str
+    created_at: datetime
+    graph: Graph
+    stride_analysis: StrideAnalysisResult
+    metadata: Metadata
+
+
+class ThreatRecord(BaseModel):
+    analysis_id: str
+    created_at: datetime
+    category: str
+    severity: str
+    affected_components: List[str]
+    description: str
+
+
+class ThreatPage(BaseModel):
+    items: List[ThreatRecord]
+    next_cursor: Optional[str] = None
+
+
+class EdgeRecord(BaseModel):
+    analysis_id: str
+    created_at: datetime
+    edge_id: str
+    source: str
+    target: str
+    source_type: str
+    target_type: str
+    cross_boundary: bool
+
+
+class EdgePage(BaseModel):
+    items: List[EdgeRecord]
+    next_cursor: Optional[str] = None
+
+
+class NodeMatch(BaseModel):
+    before_id: str
+    after_id: str
+    type: str
+    displacement: float = Field(
+        description="Center distance after alignment, in median node sizes"
+    )
+    parent_changed: bool = Field(
+        False, description="Whether the node moved to a different boundary"
+    )
+
+
+class NodeDiff(BaseModel):
+    added: List[Node]
+    removed: List[Node]
+    matched: List[NodeMatch]
+
+
+class EdgeDiff(BaseModel):
+    added: List[Edge]
+    removed: List[Edge]
+    unchanged: int
+
+
+class ThreatChange(BaseModel):
+    before: ThreatAnalysis
+    after: ThreatAnalysis
+
+
+class ThreatDiff(BaseModel):
+    added: List[ThreatAnalysis]
+    removed: List[ThreatAnalysis]
+    severity_changed: List[ThreatChange]
+    unchanged: int
+
+
+class DiffAlignment(BaseModel):
+    scale: List[float] = Field(
+        description="(sx, sy) mapping before → after coordinates"
+    )
+    offset: List[float] = Field(
+        description="(dx, dy) mapping before → after coordinates"
+    )
+
+
+class GraphDiff(BaseModel):
+    nodes: NodeDiff
+    edges: EdgeDiff
+    threats: ThreatDiff
+    alignment: DiffAlignment
+
+
+class GraphDiffResponse(BaseModel):
+    before_analysis_id: Optional[str] = None
+    after_analysis_id: Optional[str] = None
+    processing_time_ms: float
+    diff: GraphDiff
+
+
+class SessionDelta(BaseModel):
+    type: str = "delta"
+    cause: str = Field(description="threshold, model or edit")
+    diff: GraphDiff = Field(
+        description="Changes since the previous state (unchanged nodes omitted)"
+    )
+    summary: ThreatSummary
+    model_version: str
+    confidence_threshold: float
+    processing_time_ms: float
+    edits_discarded: int = Field(
+        0, description="Manual edits dropped because the graph was rebuilt"
+    )
+
+
+class DocumentPage(BaseModel):
+    page: int = Field(description="1-based page number")
+    width: int = Field(description="Rendered width in pixels")
+    height: int = Field(description="Rendered height in pixels")
+    dpi: float = Field(description="DPI the page was rendered at")
+    graph: Graph
+    stride_analysis: StrideAnalysisResult
+    metadata: Metadata
+
+
+class DocumentMetadata(BaseModel):
+    processing_time_ms: float
+    model_version: Optional[str]
+    confidence_threshold: float
+    format: str = Field(description="pdf or svg")
+    page_count: int
+    input_size: int = Field(
+        description="Model input size the pages were rasterized for (longest side)"
+    )
+    stage_timings_ms: Dict[str, float] = Field(default_factory=dict)
+
+
+class DocumentInferenceResponse(BaseModel):
+    pages: List[DocumentPage]
+    summary: Optional[ThreatSummary] = Field(
+        None, description="Threat counts over all pages (merge_summary=true)"
+    )
+    metadata: DocumentMetadata
+
+
+class ProfileInfo(BaseModel):
+    profile_id: str
+    created_at: datetime
+    endpoint: str
+    reason: str = Field(
+        description="requested (profile=true) or sampled (AUTOSTRIDE_PROFILE_RATE)"
+    )
+    model_version: Optional[str] = None
+    duration_ms: float
+    samples: int
+    interval_ms: float
+    stage_timings_ms: Dict[str, float] = Field(default_factory=dict)
+
+
+class ProfileList(BaseModel):
+    items: List[ProfileInfo]
@@ -0,0 +1,170 @@
+import os
+import threading
+import time
+from dataclasses import dataclass, field
+from typing import Dict, List, Optional, Sequence, Tuple
+
+from models.yolo_loader import YOLOModel
+
+DEADLINE_HEADER = "X-Request-Deadline-Ms"
+
+# Tamanho de entrada usado no treino (imgsz=640 em ml/src/train.py)
+FULL_INPUT_SIZE = 640
+
+
+class Deadline:
+    """Orçamento de latência de uma requisição, a partir da sua chegada."""
+
+    def __init__(self, budget_ms: float):
+        self.budget_ms = budget_ms
+        self._start = time.perf_counter()
+
+    @classmethod
+    def from_header(cls, value: Optional[str]) -> Optional["Deadline"]:
+        """Interpreta o header `X-Request-Deadline-Ms` (orçamento restante em ms)."""
+        if value is None:
+            return None
+        try:
+            budget = float(value)
+        except ValueError:
+            return None
+        return cls(budget) if budget > 0 else cls(0.0)
+
+    def remaining_ms(self) -> float:
+        return self.budget_ms - (time.perf_counter() - self._start) * 1000
+
+
+@dataclass
+class DegradationPlan:
+    model_name: str
+    imgsz: Optional[int] = None
+    skip_visualization: bool = False
+    degradations: List[str] = field(default_factory=list)
+
+
+class DeadlinePlanner:
+    """
+    Decide quais degradações aplicar para cumprir o orçamento de latência.
+
+    Mantém médias móveis (EWMA) do custo de cada etapa por modelo e tamanho de
+    entrada, e aplica, em ordem: entrada menor, modelo mais leve, sem
+    visualização e, já com o grafo pronto, sem a análise arquitetural.
+    """
+
+    def __init__(
+        self,
+        queue_threshold: int = int(os.environ.get("AUTOSTRIDE_DEGRADE_QUEUE", 4)),
+        input_sizes: Sequence[int] = (FULL_INPUT_SIZE, 480, 320),
+        low_budget_ms: float = float(
+            os.environ.get("AUTOSTRIDE_DEGRADE_LOW_BUDGET_MS", 50)
+        ),
+        smoothing: float = 0.2,
+    ):
+        self.queue_threshold = queue_threshold
+        self.input_sizes = list(input_sizes)
+        self.low_budget_ms = low_budget_ms
+        self.smoothing = smoothing
+        self._costs: Dict[Tuple[str, str, int], float] = {}
+        self._lock = threading.Lock()
+
+    def record(
+        self, timings: Dict[str, float], model_name: str, imgsz: Optional[int]
+    ) -> None:
+        """Atualiza as estimativas com os tempos medidos de uma requisição."""
+        size = imgsz or FULL_INPUT_SIZE
+        with self._lock:
+            for stage, value in timings.items():
+                key = (stage, model_name, size)
+                previous = self._costs.get(key)
+                self._costs[key] = (
+                    value
+                    if previous is None
+                    else previous + self.smoothing * (value - previous)
+                )
+
+    def estimate(self, stage: str, model_name: str, imgsz: Optional[int]) -> float:
+        """
+        Custo estimado de uma etapa em ms (0 se nunca foi medida).
+
+        Sem medição para o tamanho pedido, extrapola a partir do tamanho
+        completo assumindo custo proporcional ao número de pixels.
+        """
+        size = imgsz or FULL_INPUT_SIZE
+        value = self._costs.get((stage, model_name, size))
+        if value is not None:
+            return value
+        full = self._costs.get((stage, model_name, FULL_INPUT_SIZE))
+        if full is not None and stage == "predict":
+            return full * (size / FULL_INPUT_SIZE) ** 2
+        return full or 0.0
+
+    def plan(
+        self,
+        deadline: Optional[Deadline],
+        model_name: str,
+        queue_depth: int,
+        include_visualization: bool,
+    ) -> DegradationPlan:
+        """
+        Escolhe modelo, tamanho de entrada e se a visualização será gerada.
+
+        Args:
+            deadline: Orçamento da requisição (None se não houver header)
+            model_name: Modelo pedido pelo cliente
+            queue_depth: Requisições à frente na fila do modelo
+            include_visualization: Se o cliente pediu visualização
+
+        Returns:
+            DegradationPlan com as degradações aplicadas
+        """
+        plan = DegradationPlan(model_name=model_name)
+        queue_long = queue_depth >= self.queue_threshold
+        if deadline is None and not queue_long:
+            return plan
+
+        def fits(candidate_model: str, size: Optional[int]) -> bool:
+            if deadline is None:
+                return False
+            predict = self.estimate("predict", candidate_model, size)
+            rest = sum(
+                self.estimate(stage, candidate_model, size)
+                for stage in ("graph", "stride")
+            )
+            # Quem está na fila à frente usa o mesmo modelo
+            wait = queue_depth * predict
+            return wait + predict + rest <= deadline.remaining_ms()
+
+        if queue_long or not fits(model_name, None):
+            # 1. A primeira entrada menor que cabe no orçamento
+            chosen = next(
+                (size for size in self.input_sizes[1:] if fits(model_name, size)),
+                None,
+            )
+            if chosen is None and deadline is None:
+                # Só a fila está longa: reduz um degrau
+                chosen = self.input_sizes[1]
+            elif chosen is None:
+                # 2. Nem a menor entrada cabe: menor entrada com modelo mais leve
+                chosen = self.input_sizes[-1]
+                lighter = YOLOModel.get_lighter_variant(model_name)
+                if lighter:
+                    plan.model_name = lighter
+                    plan.degradations.append(f"model:{lighter}")
+            plan.imgsz = chosen
+            plan.degradations.insert(0, f"input_size:{chosen}")
+
+        if include_visualization and (
+            queue_long
+            or deadline.remaining_ms()
+            < self.estimate("predict", plan.model_name, plan.imgsz)
+            + self.estimate("visualization", plan.model_name, plan.imgsz)
+            + self.low_budget_ms
+        ):
+            plan.skip_visualization = True
+            plan.degradations.append("skip_visualization")
+
+        return plan
+
+    def should_skip_architecture(self, deadline: Optional[Deadline]) -> bool:
+        """A análise arquitetural é descartada quando sobra pouco orçamento."""
+        return deadline is not None and deadline.remaining_ms() < self.low_budget_ms
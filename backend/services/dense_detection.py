@@ -0,0 +1,163 @@
+import os
+from dataclasses import dataclass, field
+from typing import Dict, Optional
+
+import numpy as np
+
+from models.detections import Detections
+from services.graph_builder import CLASS_NAMES
+
+# Padrões do Ultralytics para `model.predict`
+DEFAULT_MAX_DET = 300
+DEFAULT_IOU = 0.7
+
+# Limite absoluto de detecções: acima disso o NMS e o GraphBuilder
+# (busca quadrática de setas x nós) dominam a latência
+MAX_DET_LIMIT = 3000
+
+# Setas são caixas longas e finas que se sobrepõem em diagramas densos
+# (setas paralelas, leques saindo de um load balancer): IoU mais permissivo
+DEFAULT_CLASS_IOU = "fluxo_seta=0.9"
+
+
+def parse_class_iou(spec: str) -> Dict[int, float]:
+    """
+    Interpreta "classe=iou,classe=iou" (nome ou id da classe).
+
+    Raises:
+        ValueError: Classe desconhecida ou IoU fora de (0, 1]
+    """
+    ids_by_name = {name: cls_id for cls_id, name in CLASS_NAMES.items()}
+    thresholds: Dict[int, float] = {}
+    for item in spec.split(","):
+        if not item.strip():
+            continue
+        name, _, value = item.partition("=")
+        name = name.strip()
+        cls_id = int(name) if name.isdigit() else ids_by_name.get(name)
+        if cls_id is None:
+            raise ValueError(f"Unknown class in IoU spec: {name}")
+        iou = float(value)
+        if not 0 < iou <= 1:
+            raise ValueError(f"IoU for {name} must be in (0, 1], got {iou}")
+        thresholds[cls_id] = iou
+    return thresholds
+
+
+def _box_iou(box: np.ndarray, boxes: np.ndarray) -> np.ndarray:
+    """IoU de uma caixa xyxy contra N caixas xyxy."""
+    x1 = np.maximum(box[0], boxes[:, 0])
+    y1 = np.maximum(box[1], boxes[:, 1])
+    x2 = np.minimum(box[2], boxes[:, 2])
+    y2 = np.minimum(box[3], boxes[:, 3])
+    inter = np.clip(x2 - x1, 0, None) * np.clip(y2 - y1, 0, None)
+    area = (box[2] - box[0]) * (box[3] - box[1])
+    areas = (boxes[:, 2] - boxes[:, 0]) * (boxes[:, 3] - boxes[:, 1])
+    return inter / np.maximum(area + areas - inter, 1e-9)
+
+
+def nms_indices(xyxy: np.ndarray, conf: np.ndarray, iou_threshold: float) -> np.ndarray:
+    """NMS guloso; retorna os índices mantidos em ordem de confiança."""
+    order = np.argsort(-conf, kind="stable")
+    keep = []
+    while order.size:
+        current = order[0]
+        keep.append(current)
+        if order.size == 1:
+            break
+        rest = order[1:]
+        order = rest[_box_iou(xyxy[current], xyxy[rest]) <= iou_threshold]
+    return np.asarray(keep, dtype=np.int64)
+
+
+@dataclass
+class DenseModeSettings:
+    """Configuração do modo denso (via env: AUTOSTRIDE_DENSE_*)."""
+
+    max_det: int = int(os.environ.get("AUTOSTRIDE_DENSE_MAX_DET", 1000))
+    default_iou: float = float(os.environ.get("AUTOSTRIDE_DENSE_IOU", DEFAULT_IOU))
+    class_iou: Dict[int, float] = field(
+        default_factory=lambda: parse_class_iou(
+            os.environ.get("AUTOSTRIDE_DENSE_CLASS_IOU", DEFAULT_CLASS_IOU)
+        )
+    )
+
+    @property
+    def model_iou(self) -> float:
+        """IoU passado ao NMS do modelo: o mais permissivo entre as classes."""
+        return max([self.default_iou, *self.class_iou.values()])
+
+
+@dataclass
+class DenseResult:
+    detections: Detections
+    max_det: int
+    raw_count: int
+
+    @property
+    def cap_hit(self) -> bool:
+        return self.raw_count >= self.max_det
+
+
+class DenseDetector:
+    """
+    Modo denso: roda o modelo com `max_det` maior e um NMS permissivo, e depois
+    aplica o NMS por classe com os limites de IoU configurados.
+
+    O NMS do Ultralytics usa um único IoU para todas as classes; aqui ele roda
+    com o maior IoU configurado (suprime o mínimo) e cada classe com limite
+    mais restrito passa por um segundo NMS em NumPy.
+    """
+
+    def __init__(self, settings: Optional[DenseModeSettings] = None):
+        self.settings = settings or DenseModeSettings()
+
+    def resolve_max_det(self, requested: Optional[int]) -> int:
+        max_det = requested or self.settings.max_det
+        return max(1, min(int(max_det), MAX_DET_LIMIT))
+
+    def predict_kwargs(self, requested_max_det: Optional[int] = None) -> Dict:
+        """Argumentos extras para `YOLOModel.predict` no modo denso."""
+        return {
+            "max_det": self.resolve_max_det(requested_max_det),
+            "iou": self.settings.model_iou,
+        }
+
+    def apply_class_nms(self, detections: Detections) -> Detections:
+        """Aplica o IoU de cada classe às detecções já filtradas pelo modelo."""
+        loosest = self.settings.model_iou
+        cls_ids = detections.boxes.cls.numpy().astype(np.int64)
+        xyxy = detections.boxes.xyxy.numpy()
+        conf = detections.boxes.conf.numpy()
+
+        keep = []
+        for cls_id in np.unique(cls_ids):
+            idx = np.flatnonzero(cls_ids == cls_id)
+            iou = self.settings.class_iou.get(int(cls_id), self.settings.default_iou)
+            if iou >= loosest:
+                # Já passou pelo NMS do modelo com esse limite
+                keep.append(idx)
+            else:
+                keep.append(idx[nms_indices(xyxy[idx], conf[idx], iou)])
+
+        if not keep:
+            return detections
+        return detections.take(np.sort(np.concatenate(keep)))
+
+    def process(self, results, max_det: int) -> DenseResult:
+        """
+        Pós-processa a saída do modelo rodado com `predict_kwargs`.
+
+        Args:
+            results: Resultado do YOLO (ou Detections)
+            max_det: `max_det` usado na inferência
+
+        Returns:
+            DenseResult com as detecções finais e se o limite foi atingido
+        """
+        detections = Detections.from_results(results)
+        return DenseResult(
+            detections=self.apply_class_nms(detections),
+            max_det=max_det,
+            raw_count=len(detections),
+        )
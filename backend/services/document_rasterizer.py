@@ -0,0 +1,317 @@
+import asyncio
+import os
+import re
+import tempfile
+from collections import OrderedDict, deque
+from contextlib import aclosing
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from dataclasses import dataclass
+from multiprocessing import get_context
+from typing import AsyncIterator, Optional, Tuple
+
+import cv2
+import numpy as np
+
+from services.upload_guard import MAX_IMAGE_PIXELS
+
+try:
+    import pypdfium2 as pdfium
+except ImportError:  # pragma: no cover - PDF fica indisponível
+    pdfium = None
+
+try:
+    import cairosvg
+except (
+    ImportError,
+    OSError,
+):  # pragma: no cover - sem cairosvg/libcairo, SVG fica indisponível
+    cairosvg = None
+
+# Limites do raster: um PDF pequeno pode ter centenas de páginas
+MAX_PAGES = int(os.environ.get("AUTOSTRIDE_MAX_PAGES", 50))
+MAX_DPI = 600
+
+_SVG_ROOT = re.compile(rb"<svg\b[^>]*>", re.S)
+_SVG_ATTR = re.compile(rb'\b(width|height|viewBox)\s*=\s*["\']([^"\']*)["\']')
+_SVG_LENGTH = re.compile(rb"^\s*([\d.]+)\s*(px)?\s*$")
+
+
+class DocumentError(Exception):
+    """Documento inválido, vazio, com páginas demais ou formato indisponível."""
+
+    def __init__(self, detail: str, status_code: int = 400):
+        super().__init__(detail)
+        self.status_code = status_code
+        self.detail = detail
+
+    def __reduce__(self):
+        # Levantado nos processos do pool: o status precisa sobreviver ao pickle
+        return type(self), (self.detail, self.status_code)
+
+
+@dataclass
+class RasterPage:
+    index: int  # 0-based
+    image: np.ndarray  # BGR
+    dpi: float
+
+
+def _dpi_for(size_pt: Tuple[float, float], target_side: int, unit_dpi: float) -> float:
+    """
+    DPI em que o maior lado da página vira `target_side` pixels.
+
+    Sem piso: uma página enorme (um SVG de 87000x87000 em poucos bytes) é
+    reduzida até caber em `target_side`, nunca renderizada no tamanho real.
+    """
+    longest = max(size_pt) or 1.0
+    return min(unit_dpi * target_side / longest, MAX_DPI)
+
+
+def _output_size(
+    size_pt: Tuple[float, float], dpi: float, unit_dpi: float, max_pixels: int
+) -> Tuple[int, int]:
+    """Largura e altura do raster; recusa antes de alocar acima de `max_pixels`."""
+    scale = dpi / unit_dpi
+    width, height = (max(1, round(side * scale)) for side in size_pt)
+    if width * height > max_pixels:
+        raise DocumentError(
+            f"Rendered page {width}x{height} exceeds the {max_pixels} pixel limit",
+            status_code=413,
+        )
+    return width, height
+
+
+# Documentos abertos em cada processo do pool, por caminho: a primeira página
+# de um documento paga o carregamento de fontes e recursos compartilhados,
+# que ficam em cache no PdfDocument para as páginas seguintes
+_open_documents: "OrderedDict[str, object]" = OrderedDict()
+_MAX_OPEN_DOCUMENTS = 4
+
+
+def _open_pdf(path: str):
+    document = _open_documents.pop(path, None)
+    if document is None:
+        document = pdfium.PdfDocument(path)
+        while len(_open_documents) >= _MAX_OPEN_DOCUMENTS:
+            _open_documents.popitem(last=False)[1].close()
+    _open_documents[path] = document
+    return document
+
+
+def _render_pdf_page(
+    path: str, index: int, target_side: int, max_pixels: int
+) -> RasterPage:
+    # Roda nos processos do pool: o pdfium não é thread-safe
+    page = _open_pdf(path)[index]
+    try:
+        size = page.get_size()
+        dpi = _dpi_for(size, target_side, 72.0)
+        _output_size(size, dpi, 72.0, max_pixels)
+        bitmap = page.render(scale=dpi / 72.0)
+        image = np.ascontiguousarray(bitmap.to_numpy()[:, :, :3])
+        return RasterPage(index=index, image=image, dpi=dpi)
+    finally:
+        page.close()
+
+
+def _svg_size(data: bytes) -> Optional[Tuple[float, float]]:
+    """Tamanho intrínseco (px CSS) do elemento <svg>, por width/height ou viewBox."""
+    root = _SVG_ROOT.search(data[:65536])
+    if root is None:
+        return None
+    attrs = dict(_SVG_ATTR.findall(root.group(0)))
+    width, height = (
+        _SVG_LENGTH.match(attrs.get(k, b"")) for k in (b"width", b"height")
+    )
+    if width and height:
+        return float(width.group(1)), float(height.group(1))
+    view_box = attrs.get(b"viewBox", b"").replace(b",", b" ").split()
+    if len(view_box) == 4:
+        return float(view_box[2]), float(view_box[3])
+    return None
+
+
+def _render_svg(data: bytes, target_side: int, max_pixels: int) -> RasterPage:
+    size = _svg_size(data) or (float(target_side), float(target_side))
+    dpi = _dpi_for(size, target_side, 96.0)
+    width, height = _output_size(size, dpi, 96.0, max_pixels)
+    # unsafe=False (padrão): sem entidades XML nem arquivos/URLs externos
+    png = cairosvg.svg2png(
+        bytestring=data,
+        output_width=width,
+        output_height=height,
+        background_color="white",
+    )
+    image = cv2.imdecode(np.frombuffer(png, dtype=np.uint8), cv2.IMREAD_COLOR)
+    return RasterPage(index=0, image=image, dpi=dpi)
+
+
+class DocumentRasterizer:
+    """
+    Rasteriza PDFs (pypdfium2) e SVGs (cairosvg) em um pool de processos.
+
+    O DPI de cada página é escolhido para que o maior lado tenha o tamanho
+    de entrada do modelo (vezes `oversample`): renderizar maior que isso só
+    gasta tempo, já que o YOLO reduz a imagem para `imgsz`.
+
+    `pages` mantém algumas páginas em renderização à frente do consumidor,
+    então a inferência de um lote acontece enquanto o pool renderiza o
+    próximo.
+    """
+
+    def __init__(
+        self,
+        max_workers: int = int(
+            os.environ.get("AUTOSTRIDE_RASTER_WORKERS", min(os.cpu_count() or 1, 4))
+        ),
+        max_pages: int = MAX_PAGES,
+        max_pixels: int = MAX_IMAGE_PIXELS,
+        oversample: float = float(os.environ.get("AUTOSTRIDE_RASTER_OVERSAMPLE", 1.0)),
+    ):
+        self.max_workers = max(1, max_workers)
+        self.max_pages = max_pages
+        self.max_pixels = max_pixels
+        self.oversample = oversample
+        self._pool: Optional[ProcessPoolExecutor] = None
+        self._pool_pid: Optional[int] = None
+
+    def target_side(self, input_size: int) -> int:
+        return int(input_size * self.oversample)
+
+    def _get_pool(self) -> ProcessPoolExecutor:
+        # Criado no primeiro uso de cada processo (workers do gunicorn); spawn
+        # porque o processo da API tem threads (fork com threads não é seguro)
+        if self._pool is None or self._pool_pid != os.getpid():
+            self._pool = ProcessPoolExecutor(
+                max_workers=self.max_workers, mp_context=get_context("spawn")
+            )
+            self._pool_pid = os.getpid()
+        return self._pool
+
+    def warmup(self) -> None:
+        """Sobe todos os processos do pool (o spawn importa numpy/cv2 em cada um)."""
+        pool = self._get_pool()
+        for future in [pool.submit(os.getpid) for _ in range(self.max_workers)]:
+            future.result()
+
+    @staticmethod
+    def check_available(fmt: str) -> None:
+        if fmt == "pdf" and pdfium is None:
+            raise DocumentError("PDF input requires pypdfium2", status_code=415)
+        if fmt == "svg" and cairosvg is None:
+            raise DocumentError(
+                "SVG input requires cairosvg (and libcairo)", status_code=415
+            )
+
+    def page_count(self, data: bytes, fmt: str) -> int:
+        """
+        Número de páginas do documento.
+
+        Raises:
+            DocumentError: Formato indisponível, documento inválido ou vazio,
+                ou mais páginas que `max_pages`
+        """
+        self.check_available(fmt)
+        if fmt == "svg":
+            return 1
+        try:
+            document = pdfium.PdfDocument(data)
+        except pdfium.PdfiumError as e:
+            raise DocumentError(f"Invalid PDF: {e}")
+        try:
+            count = len(document)
+        finally:
+            document.close()
+        if count == 0:
+            raise DocumentError("PDF has no pages")
+        if count > self.max_pages:
+            raise DocumentError(
+                f"PDF has {count} pages; at most {self.max_pages} are supported"
+            )
+        return count
+
+    async def pages(
+        self,
+        data: bytes,
+        fmt: str,
+        target_side: int,
+        count: Optional[int] = None,
+        ahead: Optional[int] = None,
+    ) -> AsyncIterator[RasterPage]:
+        """
+        Renderiza as páginas em paralelo e as entrega em ordem.
+
+        Args:
+            data: Bytes do PDF ou SVG
+            fmt: "pdf" ou "svg"
+            target_side: Maior lado de cada página renderizada, em pixels
+            count: Número de páginas, se já conhecido (`page_count`)
+            ahead: Páginas em renderização à frente do consumidor (padrão:
+                2 por processo); para lotes, ao menos o tamanho do lote
+
+        Yields:
+            RasterPage, da primeira à última página
+        """
+        count = count or self.page_count(data, fmt)
+        ahead = ahead or self.max_workers * 2
+        pool = self._get_pool()
+        path = None
+        if fmt == "pdf":
+            # Os processos abrem o arquivo em vez de receber os bytes a cada página
+            with tempfile.NamedTemporaryFile(suffix=".pdf", delete=False) as tmp:
+                tmp.write(data)
+                path = tmp.name
+
+        pending = deque()
+        next_index = 0
+        try:
+            while next_index < count or pending:
+                while next_index < count and len(pending) < ahead:
+                    if fmt == "pdf":
+                        future = pool.submit(
+                            _render_pdf_page,
+                            path,
+                            next_index,
+                            target_side,
+                            self.max_pixels,
+                        )
+                    else:
+                        future = pool.submit(
+                            _render_svg, data, target_side, self.max_pixels
+                        )
+                    pending.append(asyncio.wrap_future(future))
+                    next_index += 1
+                try:
+                    page = await pending.popleft()
+                except BrokenProcessPool:
+                    self._pool = None
+                    raise DocumentError("Rasterizer process crashed")
+                except DocumentError:
+                    raise
+                except Exception as e:
+                    raise DocumentError(f"Could not render page: {e}")
+                yield page
+        finally:
+            for future in pending:
+                future.cancel()
+            if path is not None:
+                os.unlink(path)
+
+    async def render_single(
+        self, data: bytes, fmt: str, target_side: int
+    ) -> np.ndarray:
+        """Imagem de um documento de uma página (SVG ou PDF de página única)."""
+        count = self.page_count(data, fmt)
+        if count > 1:
+            raise DocumentError(
+                f"PDF has {count} pages; use /api/v1/inference/document for multi-page documents"
+            )
+        async with aclosing(self.pages(data, fmt, target_side, count)) as pages:
+            async for page in pages:
+                return page.image
+
+    def shutdown(self) -> None:
+        if self._pool is not None and self._pool_pid == os.getpid():
+            self._pool.shutdown(wait=False, cancel_futures=True)
+        self._pool = None
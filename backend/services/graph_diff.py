@@ -0,0 +1,290 @@
+from collections import defaultdict
+from typing import Dict, List, Sequence, Tuple
+
+import numpy as np
+
+from schemas.api_models import (
+    DiffAlignment,
+    EdgeDiff,
+    Graph,
+    GraphDiff,
+    Node,
+    NodeDiff,
+    NodeMatch,
+    StrideAnalysisResult,
+    ThreatChange,
+    ThreatDiff,
+)
+from services.stride_analyzer import StrideAnalyzer
+
+# Prefixo dos ids de nós novos no referencial do grafo "antes": evita colisão
+# com ids iguais (node_3) que o GraphBuilder gera nas duas versões
+ADDED_PREFIX = "after:"
+
+
+class GraphDiffer:
+    """
+    Compara duas versões de um diagrama: casa os nós por tipo e posição
+    normalizada e, com esse mapeamento de ids, compara arestas e ameaças.
+
+    As posições do grafo "antes" são levadas ao referencial do "depois" por
+    escala + deslocamento em cada eixo (re-exportação em outra resolução ou
+    com outra margem). A primeira estimativa usa o tamanho mediano dos nós e
+    o canto da extensão do diagrama; as seguintes, mínimos quadrados sobre os
+    pares já casados.
+
+    O casamento usa um hash espacial (grade com célula do tamanho do raio de
+    busca, separada por tipo) e atribuição gulosa pela menor distância: O(n)
+    para diagramas com milhares de nós.
+    """
+
+    def __init__(
+        self,
+        tolerance: float = 0.5,
+        coarse_tolerance: float = 2.0,
+        refine_iterations: int = 2,
+    ):
+        # Raios de busca em tamanhos medianos de nó (largura/altura)
+        self.tolerance = tolerance
+        self.coarse_tolerance = coarse_tolerance
+        self.refine_iterations = refine_iterations
+
+    def diff(
+        self,
+        before: Graph,
+        after: Graph,
+        before_stride: StrideAnalysisResult,
+        after_stride: StrideAnalysisResult,
+    ) -> GraphDiff:
+        """
+        Diferença entre duas versões do grafo e das ameaças STRIDE.
+
+        Args:
+            before: Grafo da versão anterior
+            after: Grafo da versão nova
+            before_stride: Análise STRIDE de `before`
+            after_stride: Análise STRIDE de `after`
+
+        Returns:
+            GraphDiff com nós, arestas e ameaças adicionados/removidos
+        """
+        matches, displacement, scale, offset = self.match_nodes(
+            before.nodes, after.nodes
+        )
+
+        # Ids do "depois" traduzidos para o referencial do "antes"
+        rename = {node.id: ADDED_PREFIX + node.id for node in after.nodes}
+        for i, j in matches.items():
+            rename[after.nodes[j].id] = before.nodes[i].id
+
+        matched_after = set(matches.values())
+        node_matches = []
+        for i, j in sorted(matches.items()):
+            old, new = before.nodes[i], after.nodes[j]
+            new_parent = rename.get(new.parent_id) if new.parent_id else None
+            node_matches.append(
+                NodeMatch(
+                    before_id=old.id,
+                    after_id=new.id,
+                    type=old.type,
+                    displacement=round(displacement[i], 3),
+                    parent_changed=new_parent != old.parent_id,
+                )
+            )
+        nodes = NodeDiff(
+            added=[n for j, n in enumerate(after.nodes) if j not in matched_after],
+            removed=[n for i, n in enumerate(before.nodes) if i not in matches],
+            matched=node_matches,
+        )
+
+        return GraphDiff(
+            nodes=nodes,
+            edges=self._diff_edges(before, after, rename),
+            threats=self._diff_threats(before_stride, after_stride, rename),
+            alignment=DiffAlignment(
+                scale=[round(float(v), 6) for v in scale],
+                offset=[round(float(v), 3) for v in offset],
+            ),
+        )
+
+    def match_nodes(
+        self, before: Sequence[Node], after: Sequence[Node]
+    ) -> Tuple[Dict[int, int], Dict[int, float], np.ndarray, np.ndarray]:
+        """
+        Casa nós do mesmo tipo pela posição, tolerando reescala e margem.
+
+        Returns:
+            (índice antes -> índice depois, deslocamento de cada par em
+            tamanhos de nó, escala (sx, sy), deslocamento (dx, dy))
+        """
+        scale, offset = np.ones(2), np.zeros(2)
+        if not before or not after:
+            return {}, {}, scale, offset
+
+        src, src_types, src_size, src_min = _geometry(before)
+        dst, dst_types, dst_size, dst_min = _geometry(after)
+
+        # Estimativa inicial: razão dos tamanhos medianos e cantos alinhados
+        scale = np.full(2, dst_size / src_size)
+        offset = dst_min - scale * src_min
+
+        radius = self.coarse_tolerance * dst_size
+        matches, distances = _assign(
+            src * scale + offset, dst, src_types, dst_types, radius
+        )
+        for _ in range(self.refine_iterations):
+            fitted = _fit_axes(src, dst, matches)
+            if fitted is not None:
+                scale, offset = fitted
+            radius = self.tolerance * dst_size
+            matches, distances = _assign(
+                src * scale + offset, dst, src_types, dst_types, radius
+            )
+
+        displacement = {i: distances[i] / dst_size for i in matches}
+        return matches, displacement, scale, offset
+
+    @staticmethod
+    def _diff_edges(before: Graph, after: Graph, rename: Dict[str, str]) -> EdgeDiff:
+        # Multiconjunto por (origem, destino): setas paralelas contam separadamente
+        remaining = defaultdict(list)
+        for edge in before.edges:
+            remaining[(edge.source, edge.target)].append(edge)
+
+        added = []
+        for edge in after.edges:
+            key = (
+                rename.get(edge.source, edge.source),
+                rename.get(edge.target, edge.target),
+            )
+            if remaining.get(key):
+                remaining[key].pop()
+            else:
+                added.append(edge)
+
+        removed = [edge for edges in remaining.values() for edge in edges]
+        return EdgeDiff(
+            added=added,
+            removed=removed,
+            unchanged=len(after.edges) - len(added),
+        )
+
+    @staticmethod
+    def _diff_threats(
+        before: StrideAnalysisResult,
+        after: StrideAnalysisResult,
+        rename: Dict[str, str],
+    ) -> ThreatDiff:
+        # Mesma assinatura da deduplicação do StrideAnalyzer
+        old = {StrideAnalyzer._threat_signature(t): t for t in before.threats}
+        new = {StrideAnalyzer._threat_signature(t, rename): t for t in after.threats}
+
+        changed, unchanged = [], 0
+        for sig in old.keys() & new.keys():
+            if old[sig].severity != new[sig].severity:
+                changed.append(ThreatChange(before=old[sig], after=new[sig]))
+            else:
+                unchanged += 1
+        return ThreatDiff(
+            added=[t for sig, t in new.items() if sig not in old],
+            removed=[t for sig, t in old.items() if sig not in new],
+            severity_changed=changed,
+            unchanged=unchanged,
+        )
+
+
+def _geometry(nodes: Sequence[Node]):
+    """Centros (N, 2), tipos, tamanho mediano e canto mínimo da extensão."""
+    centers = np.array([[n.position.x, n.position.y] for n in nodes], dtype=np.float64)
+    bboxes = np.array([n.bbox for n in nodes], dtype=np.float64).reshape(-1, 4)
+    sizes = np.maximum(bboxes[:, 2] - bboxes[:, 0], bboxes[:, 3] - bboxes[:, 1])
+    size = float(np.median(sizes)) if len(sizes) else 1.0
+    return centers, [n.type for n in nodes], max(size, 1e-6), bboxes[:, :2].min(axis=0)
+
+
+def _assign(
+    src: np.ndarray,
+    dst: np.ndarray,
+    src_types: List[str],
+    dst_types: List[str],
+    radius: float,
+) -> Tuple[Dict[int, int], Dict[int, float]]:
+    """Atribuição gulosa pela menor distância entre candidatos do hash espacial."""
+    codes = {t: k for k, t in enumerate(sorted(set(src_types) | set(dst_types)))}
+    src_cells = np.floor(src / radius).astype(np.int64)
+    dst_cells = np.floor(dst / radius).astype(np.int64)
+    # Chave única por (tipo, célula x, célula y), com folga para os vizinhos
+    low = np.minimum(src_cells.min(axis=0), dst_cells.min(axis=0)) - 1
+    span = np.maximum(src_cells.max(axis=0), dst_cells.max(axis=0)) - low + 2
+    src_cells -= low
+    dst_cells -= low
+
+    def cell_key(types, cells):
+        return (types * span[0] + cells[:, 0]) * span[1] + cells[:, 1]
+
+    src_codes = np.array([codes[t] for t in src_types], dtype=np.int64)
+    dst_codes = np.array([codes[t] for t in dst_types], dtype=np.int64)
+    dst_keys = cell_key(dst_codes, dst_cells)
+    order = np.argsort(dst_keys, kind="stable")
+    sorted_keys = dst_keys[order]
+
+    src_idx, dst_idx = [], []
+    for ox in (-1, 0, 1):
+        for oy in (-1, 0, 1):
+            keys = cell_key(src_codes, src_cells + (ox, oy))
+            lo = np.searchsorted(sorted_keys, keys, side="left")
+            counts = np.searchsorted(sorted_keys, keys, side="right") - lo
+            if not counts.any():
+                continue
+            # Expande cada nó de origem nos candidatos da célula vizinha
+            rows = np.repeat(np.arange(len(src)), counts)
+            starts = np.repeat(lo - np.cumsum(counts) + counts, counts)
+            src_idx.append(rows)
+            dst_idx.append(order[starts + np.arange(len(rows))])
+
+    if not src_idx:
+        return {}, {}
+    i_all, j_all = np.concatenate(src_idx), np.concatenate(dst_idx)
+    d_all = np.hypot(*(src[i_all] - dst[j_all]).T)
+    within = d_all <= radius
+    i_all, j_all, d_all = i_all[within], j_all[within], d_all[within]
+    by_distance = np.argsort(d_all, kind="stable")
+
+    matches: Dict[int, int] = {}
+    distances: Dict[int, float] = {}
+    used = set()
+    for i, j, d in zip(
+        i_all[by_distance].tolist(),
+        j_all[by_distance].tolist(),
+        d_all[by_distance].tolist(),
+    ):
+        if i in matches or j in used:
+            continue
+        matches[i] = j
+        distances[i] = d
+        used.add(j)
+    return matches, distances
+
+
+def _fit_axes(src: np.ndarray, dst: np.ndarray, matches: Dict[int, int]):
+    """Escala e deslocamento por eixo (mínimos quadrados) a partir dos pares."""
+    if len(matches) < 3:
+        return None
+    idx = np.fromiter(matches.keys(), dtype=np.int64)
+    a, b = src[idx], dst[np.fromiter(matches.values(), dtype=np.int64)]
+    scale, offset = np.ones(2), np.zeros(2)
+    for axis in range(2):
+        x, y = a[:, axis], b[:, axis]
+        if np.ptp(x) <= 0:
+            offset[axis] = float(np.median(y - x))
+            continue
+        s, o = np.polyfit(x, y, 1)
+        # Refaz sem os 20% piores resíduos (pares errados da passada larga)
+        residual = np.abs(y - (s * x + o))
+        keep = residual <= np.percentile(residual, 80)
+        if keep.sum() >= 2 and np.ptp(x[keep]) > 0:
+            s, o = np.polyfit(x[keep], y[keep], 1)
+        if s <= 0:
+            return None
+        scale[axis], offset[axis] = s, o
+    return scale, offset
@@ -0,0 +1,705 @@
+import base64
+import json
+import os
+import queue
+import sqlite3
+import threading
+import time
+import uuid
+import zlib
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Tuple
+
+try:
+    import orjson
+except ImportError:  # pragma: no cover - fallback para o json da stdlib
+    orjson = None
+
+DEFAULT_DB_PATH = os.environ.get(
+    "AUTOSTRIDE_HISTORY_DB", str(Path(__file__).parent.parent / "data" / "history.db")
+)
+
+# Retenção: sem ela o banco cresce sem limite em toda instalação (0 desativa)
+MAX_ANALYSES = int(os.environ.get("AUTOSTRIDE_HISTORY_MAX_ANALYSES", 100_000))
+MAX_AGE_DAYS = float(os.environ.get("AUTOSTRIDE_HISTORY_MAX_AGE_DAYS", 90))
+
+SEVERITY_RANK = {"Low": 1, "Medium": 2, "High": 3, "Critical": 4}
+
+# created_at é desnormalizado nas tabelas filhas para que cada índice já
+# entregue as linhas na ordem da paginação (keyset), sem ordenar em memória.
+# As tabelas filhas referenciam a análise pelo `seq` inteiro, não pelo id
+# público (uuid), o que reduz bastante o tamanho das linhas e dos índices.
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS analyses (
+    seq INTEGER PRIMARY KEY,
+    id TEXT NOT NULL UNIQUE,
+    created_at REAL NOT NULL,
+    model_version TEXT,
+    confidence_threshold REAL,
+    processing_time_ms REAL,
+    node_count INTEGER NOT NULL,
+    edge_count INTEGER NOT NULL,
+    threat_count INTEGER NOT NULL,
+    max_severity INTEGER NOT NULL,
+    payload BLOB NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_analyses_created ON analyses (created_at, seq);
+
+CREATE TABLE IF NOT EXISTS threats (
+    analysis_seq INTEGER NOT NULL,
+    created_at REAL NOT NULL,
+    category TEXT NOT NULL,
+    severity TEXT NOT NULL,
+    affected_components TEXT NOT NULL,
+    description_id INTEGER NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_threats_category
+    ON threats (category, severity, created_at, analysis_seq);
+-- Só categoria: sem este índice o SQLite ordena todas as ameaças da categoria
+CREATE INDEX IF NOT EXISTS idx_threats_category_created
+    ON threats (category, created_at, analysis_seq);
+CREATE INDEX IF NOT EXISTS idx_threats_severity
+    ON threats (severity, created_at, analysis_seq);
+CREATE INDEX IF NOT EXISTS idx_threats_analysis ON threats (analysis_seq);
+
+-- Descrições se repetem muito entre análises (vêm da base de regras)
+CREATE TABLE IF NOT EXISTS threat_texts (
+    id INTEGER PRIMARY KEY,
+    text TEXT NOT NULL UNIQUE
+);
+
+CREATE TABLE IF NOT EXISTS nodes (
+    analysis_seq INTEGER NOT NULL,
+    created_at REAL NOT NULL,
+    node_id TEXT NOT NULL,
+    type TEXT NOT NULL,
+    parent_id TEXT
+);
+CREATE INDEX IF NOT EXISTS idx_nodes_type ON nodes (type, created_at, analysis_seq);
+CREATE INDEX IF NOT EXISTS idx_nodes_analysis ON nodes (analysis_seq);
+
+CREATE TABLE IF NOT EXISTS edges (
+    analysis_seq INTEGER NOT NULL,
+    created_at REAL NOT NULL,
+    edge_id TEXT NOT NULL,
+    source TEXT NOT NULL,
+    target TEXT NOT NULL,
+    source_type TEXT NOT NULL,
+    target_type TEXT NOT NULL,
+    cross_boundary INTEGER NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_edges_types
+    ON edges (source_type, target_type, created_at, analysis_seq);
+CREATE INDEX IF NOT EXISTS idx_edges_source
+    ON edges (source_type, created_at, analysis_seq);
+CREATE INDEX IF NOT EXISTS idx_edges_target
+    ON edges (target_type, created_at, analysis_seq);
+CREATE INDEX IF NOT EXISTS idx_edges_analysis ON edges (analysis_seq);
+"""
+
+
+def _dumps(payload: Any) -> bytes:
+    if orjson is not None:
+        return orjson.dumps(payload)
+    return json.dumps(payload, separators=(",", ":")).encode("utf-8")
+
+
+def _loads(data: bytes) -> Any:
+    if orjson is not None:
+        return orjson.loads(data)
+    return json.loads(data)
+
+
+def encode_cursor(created_at: float, key: Any) -> str:
+    """Cursor opaco de paginação (posição da última linha da página)."""
+    return base64.urlsafe_b64encode(f"{created_at!r}|{key}".encode()).decode()
+
+
+def decode_cursor(cursor: str) -> Tuple[float, str]:
+    """
+    Raises:
+        ValueError: Cursor malformado
+    """
+    try:
+        created_at, key = (
+            base64.urlsafe_b64decode(cursor.encode()).decode().split("|", 1)
+        )
+        return float(created_at), key
+    except Exception as e:
+        raise ValueError(f"Invalid cursor: {cursor}") from e
+
+
+@dataclass
+class HistoryPage:
+    items: List[Dict[str, Any]]
+    next_cursor: Optional[str]
+
+
+class HistoryStore:
+    """
+    Histórico persistente (SQLite) de análises: grafo, ameaças e metadados.
+
+    As escritas vão para uma fila e são gravadas em lote por uma thread
+    própria, fora do caminho da requisição. As consultas abrem conexões de
+    leitura (WAL permite ler enquanto a thread escreve) e paginam por keyset
+    sobre (created_at, id), então o custo não cresce com o número da página.
+
+    A mesma thread aplica a retenção a cada `prune_interval` segundos:
+    apaga as análises mais velhas que `max_age_days` e as que passam de
+    `max_analyses`, em lotes pequenos para não segurar o lock de escrita.
+    """
+
+    def __init__(
+        self,
+        path: Optional[str] = DEFAULT_DB_PATH,
+        batch_size: int = 256,
+        flush_interval: float = 0.5,
+        max_pending: int = 10000,
+        max_analyses: int = MAX_ANALYSES,
+        max_age_days: float = MAX_AGE_DAYS,
+        prune_interval: float = 60.0,
+        prune_batch: int = 5000,
+    ):
+        self.path = path
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.max_analyses = max_analyses
+        self.max_age_days = max_age_days
+        self.prune_interval = prune_interval
+        self.prune_batch = prune_batch
+        self._next_prune = 0.0
+        self.dropped = 0
+        self._queue: "queue.Queue" = queue.Queue(maxsize=max_pending)
+        self._thread: Optional[threading.Thread] = None
+        self._pid: Optional[int] = None
+        self._lock = threading.Lock()
+        self._schema_ready = False
+        self._text_ids: Dict[str, int] = {}
+
+    @property
+    def enabled(self) -> bool:
+        return bool(self.path)
+
+    def _connect(self) -> sqlite3.Connection:
+        conn = sqlite3.connect(self.path, timeout=30, check_same_thread=False)
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute("PRAGMA synchronous=NORMAL")
+        return conn
+
+    def _ensure_schema(self) -> None:
+        if self._schema_ready:
+            return
+        Path(self.path).parent.mkdir(parents=True, exist_ok=True)
+        conn = self._connect()
+        try:
+            conn.executescript(SCHEMA)
+        finally:
+            conn.close()
+        self._schema_ready = True
+
+    # ---- escrita ----
+
+    @staticmethod
+    def new_id() -> str:
+        return uuid.uuid4().hex
+
+    def submit(self, analysis_id: str, response) -> bool:
+        """
+        Enfileira uma InferenceResponse para gravação (não bloqueia).
+
+        Args:
+            analysis_id: Id já retornado ao cliente em `metadata.analysis_id`
+            response: InferenceResponse da análise
+
+        Returns:
+            False se o histórico está desativado ou a fila está cheia
+        """
+        if not self.enabled:
+            return False
+        self._ensure_writer()
+        try:
+            self._queue.put_nowait((analysis_id, time.time(), response))
+        except queue.Full:
+            # Sob sobrecarga o histórico perde entradas, a requisição não espera
+            self.dropped += 1
+            return False
+        return True
+
+    def _ensure_writer(self) -> None:
+        # Depois de um fork (gunicorn --preload) a thread do pai não existe
+        # no filho: cada processo sobe o seu próprio writer
+        if self._thread is not None and self._pid == os.getpid():
+            return
+        with self._lock:
+            if self._thread is not None and self._pid == os.getpid():
+                return
+            self._ensure_schema()
+            self._pid = os.getpid()
+            self._thread = threading.Thread(
+                target=self._writer_loop, name="history-writer", daemon=True
+            )
+            self._thread.start()
+
+    def _writer_loop(self) -> None:
+        conn = self._connect()
+        while True:
+            item = self._queue.get()
+            if item is None:
+                self._queue.task_done()
+                break
+            batch = [item]
+            deadline = time.monotonic() + self.flush_interval
+            stop = False
+            while len(batch) < self.batch_size:
+                timeout = deadline - time.monotonic()
+                if timeout <= 0:
+                    break
+                try:
+                    nxt = self._queue.get(timeout=timeout)
+                except queue.Empty:
+                    break
+                if nxt is None:
+                    stop = True
+                    self._queue.task_done()
+                    break
+                batch.append(nxt)
+            try:
+                self._write_batch(conn, batch)
+            except sqlite3.Error as e:
+                print(f"History store write failed ({len(batch)} analyses): {e}")
+            finally:
+                for _ in batch:
+                    self._queue.task_done()
+            if time.monotonic() >= self._next_prune:
+                self._next_prune = time.monotonic() + self.prune_interval
+                try:
+                    self.prune(conn)
+                except sqlite3.Error as e:
+                    print(f"History store prune failed: {e}")
+            if stop:
+                break
+        conn.close()
+
+    def _text_id_map(self, conn: sqlite3.Connection, texts) -> Dict[str, int]:
+        """Ids em `threat_texts`, inserindo os textos ainda não vistos."""
+        missing = [text for text in set(texts) if text not in self._text_ids]
+        if missing:
+            conn.executemany(
+                "INSERT OR IGNORE INTO threat_texts (text) VALUES (?)",
+                [(text,) for text in missing],
+            )
+            for i in range(0, len(missing), 500):
+                chunk = missing[i : i + 500]
+                rows = conn.execute(
+                    "SELECT id, text FROM threat_texts WHERE text IN "
+                    f"({', '.join('?' for _ in chunk)})",
+                    chunk,
+                )
+                self._text_ids.update({text: text_id for text_id, text in rows})
+        return self._text_ids
+
+    def _write_batch(self, conn: sqlite3.Connection, batch) -> None:
+        with conn:
+            for analysis_id, created_at, response in batch:
+                self._write_analysis(conn, analysis_id, created_at, response)
+
+    def _write_analysis(
+        self, conn: sqlite3.Connection, analysis_id: str, created_at: float, response
+    ) -> None:
+        graph, stride, metadata = (
+            response.graph,
+            response.stride_analysis,
+            response.metadata,
+        )
+        payload = {
+            "graph": graph.model_dump(),
+            "stride_analysis": stride.model_dump(),
+            "metadata": metadata.model_dump(),
+        }
+        seq = conn.execute(
+            "INSERT INTO analyses (id, created_at, model_version, "
+            "confidence_threshold, processing_time_ms, node_count, edge_count, "
+            "threat_count, max_severity, payload) "
+            "VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+            (
+                analysis_id,
+                created_at,
+                metadata.model_version,
+                metadata.confidence_threshold,
+                metadata.processing_time_ms,
+                len(graph.nodes),
+                len(graph.edges),
+                len(stride.threats),
+                max(
+                    (SEVERITY_RANK.get(t.severity, 0) for t in stride.threats),
+                    default=0,
+                ),
+                zlib.compress(_dumps(payload), 6),
+            ),
+        ).lastrowid
+
+        text_ids = self._text_id_map(conn, [t.description for t in stride.threats])
+        conn.executemany(
+            "INSERT INTO threats VALUES (?, ?, ?, ?, ?, ?)",
+            [
+                (
+                    seq,
+                    created_at,
+                    t.category,
+                    t.severity,
+                    ",".join(t.affected_components),
+                    text_ids[t.description],
+                )
+                for t in stride.threats
+            ],
+        )
+        conn.executemany(
+            "INSERT INTO nodes VALUES (?, ?, ?, ?, ?)",
+            [(seq, created_at, n.id, n.type, n.parent_id) for n in graph.nodes],
+        )
+        types = {node.id: node.type for node in graph.nodes}
+        conn.executemany(
+            "INSERT INTO edges VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+            [
+                (
+                    seq,
+                    created_at,
+                    e.id,
+                    e.source,
+                    e.target,
+                    types.get(e.source, "unknown"),
+                    types.get(e.target, "unknown"),
+                    int(e.cross_boundary),
+                )
+                for e in graph.edges
+            ],
+        )
+
+    def prune(self, conn: sqlite3.Connection) -> int:
+        """
+        Aplica a retenção (`max_age_days` e `max_analyses`).
+
+        Returns:
+            Número de análises apagadas
+        """
+        conditions, params = [], []
+        if self.max_age_days:
+            conditions.append("created_at < ?")
+            params.append(time.time() - self.max_age_days * 86400)
+        if self.max_analyses:
+            conditions.append(
+                "seq IN (SELECT seq FROM analyses "
+                "ORDER BY created_at DESC, seq DESC LIMIT -1 OFFSET ?)"
+            )
+            params.append(self.max_analyses)
+        if not conditions:
+            return 0
+
+        removed = 0
+        conn.execute(
+            "CREATE TEMP TABLE IF NOT EXISTS expired (seq INTEGER PRIMARY KEY)"
+        )
+        while True:
+            # Uma transação por lote: as outras escritas não esperam a limpeza toda
+            with conn:
+                conn.execute("DELETE FROM expired")
+                conn.execute(
+                    "INSERT INTO expired SELECT seq FROM analyses "
+                    f"WHERE {' OR '.join(conditions)} ORDER BY seq LIMIT ?",
+                    [*params, self.prune_batch],
+                )
+                for table in ("threats", "nodes", "edges"):
+                    conn.execute(
+                        f"DELETE FROM {table} "
+                        "WHERE analysis_seq IN (SELECT seq FROM expired)"
+                    )
+                count = conn.execute(
+                    "DELETE FROM analyses WHERE seq IN (SELECT seq FROM expired)"
+                ).rowcount
+            removed += count
+            if count < self.prune_batch:
+                return removed
+
+    def flush(self, timeout: float = 30.0) -> None:
+        """Espera a fila atual ser gravada."""
+        if self._thread is None:
+            return
+        end = time.monotonic() + timeout
+        while self._queue.unfinished_tasks and time.monotonic() < end:
+            time.sleep(0.01)
+
+    def close(self) -> None:
+        """Grava o que estiver pendente e encerra a thread de escrita."""
+        if self._thread is None or self._pid != os.getpid():
+            return
+        self._queue.put(None)
+        self._thread.join(timeout=30)
+        self._thread = None
+
+    # ---- leitura ----
+
+    def _read(self, sql: str, params: List[Any]) -> List[sqlite3.Row]:
+        self._ensure_schema()
+        conn = sqlite3.connect(f"file:{self.path}?mode=ro", uri=True, timeout=30)
+        conn.row_factory = sqlite3.Row
+        try:
+            return conn.execute(sql, params).fetchall()
+        finally:
+            conn.close()
+
+    @staticmethod
+    def _time_filters(
+        column: str, since: Optional[float], until: Optional[float], where, params
+    ) -> None:
+        if since is not None:
+            where.append(f"{column} >= ?")
+            params.append(since)
+        if until is not None:
+            where.append(f"{column} < ?")
+            params.append(until)
+
+    def get_analysis(self, analysis_id: str) -> Optional[Dict[str, Any]]:
+        """Resposta completa (graph, stride_analysis, metadata) de uma análise."""
+        rows = self._read(
+            "SELECT created_at, payload FROM analyses WHERE id = ?", [analysis_id]
+        )
+        if not rows:
+            return None
+        payload = _loads(zlib.decompress(rows[0]["payload"]))
+        payload["analysis_id"] = analysis_id
+        payload["created_at"] = rows[0]["created_at"]
+        return payload
+
+    def query_analyses(
+        self,
+        category: Optional[str] = None,
+        severity: Optional[str] = None,
+        node_type: Optional[str] = None,
+        source_type: Optional[str] = None,
+        target_type: Optional[str] = None,
+        model_version: Optional[str] = None,
+        since: Optional[float] = None,
+        until: Optional[float] = None,
+        limit: int = 50,
+        cursor: Optional[str] = None,
+    ) -> HistoryPage:
+        """
+        Análises (mais recentes primeiro) que satisfazem todos os filtros.
+
+        Com filtros de ameaça, aresta ou nó, a consulta percorre o índice da
+        tabela filtrada (já em ordem de created_at) e confere os demais
+        filtros com EXISTS; assim tanto filtros raros quanto comuns param
+        logo após encher a página.
+        """
+        groups = []
+        if category or severity:
+            groups.append(("threats", {"category": category, "severity": severity}))
+        if source_type or target_type:
+            groups.append(
+                ("edges", {"source_type": source_type, "target_type": target_type})
+            )
+        if node_type:
+            groups.append(("nodes", {"type": node_type}))
+
+        if not groups:
+            driver, driver_filters, id_column = "analyses", {}, "seq"
+        else:
+            (driver, driver_filters), groups = groups[0], groups[1:]
+            id_column = "analysis_seq"
+
+        where, params = [], []
+        for column, value in driver_filters.items():
+            if value is not None:
+                where.append(f"d.{column} = ?")
+                params.append(value)
+        self._time_filters("d.created_at", since, until, where, params)
+        for table, filters in groups:
+            sub = [f"x.analysis_seq = d.{id_column}"]
+            for column, value in filters.items():
+                if value is not None:
+                    sub.append(f"x.{column} = ?")
+                    params.append(value)
+            # Índice por análise fixo: sem estatísticas atualizadas o SQLite
+            # pode escolher o índice por tipo e varrer milhões de linhas
+            where.append(
+                f"EXISTS (SELECT 1 FROM {table} x INDEXED BY idx_{table}_analysis "
+                f"WHERE {' AND '.join(sub)})"
+            )
+        if model_version:
+            if driver == "analyses":
+                where.append("d.model_version = ?")
+            else:
+                where.append(
+                    "EXISTS (SELECT 1 FROM analyses x "
+                    "WHERE x.seq = d.analysis_seq AND x.model_version = ?)"
+                )
+            params.append(model_version)
+        if cursor:
+            created_at, key = decode_cursor(cursor)
+            if not key.isdigit():
+                raise ValueError(f"Invalid cursor: {cursor}")
+            where.append(f"(d.created_at, d.{id_column}) < (?, ?)")
+            params.extend([created_at, int(key)])
+
+        matches = self._read(
+            f"SELECT DISTINCT d.{id_column} AS seq, d.created_at FROM {driver} d"
+            + (f" WHERE {' AND '.join(where)}" if where else "")
+            + f" ORDER BY d.created_at DESC, d.{id_column} DESC LIMIT ?",
+            params + [limit + 1],
+        )
+        if not matches:
+            return HistoryPage(items=[], next_cursor=None)
+
+        seqs = [r["seq"] for r in matches]
+        sql = (
+            "SELECT a.seq, a.id, a.created_at, a.model_version, a.confidence_threshold, "
+            "a.processing_time_ms, a.node_count, a.edge_count, a.threat_count, "
+            "a.max_severity FROM analyses a "
+            f"WHERE a.seq IN ({', '.join('?' for _ in seqs)}) "
+            "ORDER BY a.created_at DESC, a.seq DESC"
+        )
+        params = seqs
+        rows = self._read(sql, params)
+        ranks = {rank: name for name, rank in SEVERITY_RANK.items()}
+        items = [
+            {
+                "analysis_id": r["id"],
+                "created_at": r["created_at"],
+                "model_version": r["model_version"],
+                "confidence_threshold": r["confidence_threshold"],
+                "processing_time_ms": r["processing_time_ms"],
+                "node_count": r["node_count"],
+                "edge_count": r["edge_count"],
+                "threat_count": r["threat_count"],
+                "max_severity": ranks.get(r["max_severity"]),
+            }
+            for r in rows[:limit]
+        ]
+        next_cursor = None
+        if len(rows) > limit:
+            last = rows[limit - 1]
+            next_cursor = encode_cursor(last["created_at"], last["seq"])
+        return HistoryPage(items=items, next_cursor=next_cursor)
+
+    def _query_rows(
+        self,
+        table: str,
+        columns: str,
+        filters: Dict[str, Any],
+        since: Optional[float],
+        until: Optional[float],
+        limit: int,
+        cursor: Optional[str],
+    ) -> Tuple[List[sqlite3.Row], Optional[str]]:
+        where, params = [], []
+        for column, value in filters.items():
+            if value is not None:
+                where.append(f"{column} = ?")
+                params.append(value)
+        self._time_filters("created_at", since, until, where, params)
+        if cursor:
+            created_at, key = decode_cursor(cursor)
+            seq, _, rowid = key.partition(":")
+            if not (seq.isdigit() and rowid.isdigit()):
+                raise ValueError(f"Invalid cursor: {cursor}")
+            where.append("(created_at, analysis_seq, rowid) < (?, ?, ?)")
+            params.extend([created_at, int(seq), int(rowid)])
+        # Mesma ordem das colunas dos índices: a página sai direto do índice
+        sql = (
+            f"SELECT rowid, analysis_seq, {columns}, "
+            f"(SELECT id FROM analyses a WHERE a.seq = {table}.analysis_seq) "
+            f"AS analysis_id FROM {table}"
+            + (f" WHERE {' AND '.join(where)}" if where else "")
+            + " ORDER BY created_at DESC, analysis_seq DESC, rowid DESC LIMIT ?"
+        )
+        rows = self._read(sql, params + [limit + 1])
+        next_cursor = None
+        if len(rows) > limit:
+            last = rows[limit - 1]
+            next_cursor = encode_cursor(
+                last["created_at"], f"{last['analysis_seq']}:{last['rowid']}"
+            )
+        return rows[:limit], next_cursor
+
+    def query_threats(
+        self,
+        category: Optional[str] = None,
+        severity: Optional[str] = None,
+        since: Optional[float] = None,
+        until: Optional[float] = None,
+        limit: int = 50,
+        cursor: Optional[str] = None,
+    ) -> HistoryPage:
+        """Ameaças (mais recentes primeiro) por categoria e/ou severidade."""
+        rows, next_cursor = self._query_rows(
+            "threats",
+            "created_at, category, severity, affected_components, description_id",
+            {"category": category, "severity": severity},
+            since,
+            until,
+            limit,
+            cursor,
+        )
+        texts: Dict[int, str] = {}
+        text_ids = sorted({r["description_id"] for r in rows})
+        if text_ids:
+            texts = {
+                row["id"]: row["text"]
+                for row in self._read(
+                    "SELECT id, text FROM threat_texts WHERE id IN "
+                    f"({', '.join('?' for _ in text_ids)})",
+                    text_ids,
+                )
+            }
+        items = [
+            {
+                "analysis_id": r["analysis_id"],
+                "created_at": r["created_at"],
+                "category": r["category"],
+                "severity": r["severity"],
+                "affected_components": (
+                    r["affected_components"].split(",")
+                    if r["affected_components"]
+                    else []
+                ),
+                "description": texts.get(r["description_id"], ""),
+            }
+            for r in rows
+        ]
+        return HistoryPage(items=items, next_cursor=next_cursor)
+
+    def query_edges(
+        self,
+        source_type: Optional[str] = None,
+        target_type: Optional[str] = None,
+        since: Optional[float] = None,
+        until: Optional[float] = None,
+        limit: int = 50,
+        cursor: Optional[str] = None,
+    ) -> HistoryPage:
+        """Arestas (mais recentes primeiro) por par de tipos origem→destino."""
+        rows, next_cursor = self._query_rows(
+            "edges",
+            "created_at, edge_id, source, target, source_type, target_type, "
+            "cross_boundary",
+            {"source_type": source_type, "target_type": target_type},
+            since,
+            until,
+            limit,
+            cursor,
+        )
+        items = [
+            {
+                "analysis_id": r["analysis_id"],
+                "created_at": r["created_at"],
+                "edge_id": r["edge_id"],
+                "source": r["source"],
+                "target": r["target"],
+                "source_type": r["source_type"],
+                "target_type": r["target_type"],
+                "cross_boundary": bool(r["cross_boundary"]),
+            }
+            for r in rows
+        ]
+        return HistoryPage(items=items, next_cursor=next_cursor)
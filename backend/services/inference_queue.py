@@ -0,0 +1,80 @@
+import asyncio
+from typing import Awaitable, Callable, Dict, Optional
+
+from starlette.concurrency import run_in_threadpool
+
+from services.stage_timer import StageTimer
+
+
+class RequestCancelled(Exception):
+    """O cliente desconectou enquanto a requisição aguardava o modelo."""
+
+
+class InferenceQueue:
+    """
+    Fila de acesso aos modelos YOLO.
+
+    O predictor do Ultralytics não é thread-safe, então cada modelo atende uma
+    requisição por vez; a inferência roda em uma thread para não bloquear o
+    event loop. A profundidade da fila alimenta as decisões de degradação e o
+    cliente é verificado logo antes de chegar ao modelo.
+    """
+
+    def __init__(self):
+        self._locks: Dict[str, asyncio.Lock] = {}
+        self.waiting = 0
+        self.running = 0
+
+    @property
+    def depth(self) -> int:
+        """Requisições aguardando ou executando inferência."""
+        return self.waiting + self.running
+
+    async def run(
+        self,
+        model_name: str,
+        fn: Callable,
+        /,
+        *args,
+        is_cancelled: Optional[Callable[[], Awaitable[bool]]] = None,
+        timer: Optional[StageTimer] = None,
+        **kwargs,
+    ):
+        """
+        Executa `fn(*args, **kwargs)` com acesso exclusivo ao modelo.
+
+        Args:
+            model_name: Modelo usado (uma fila por modelo)
+            fn: Função síncrona de inferência
+            is_cancelled: Corrotina que retorna True se o cliente desconectou
+            timer: Se informado, mede as etapas `queue` e `predict`
+
+        Returns:
+            Resultado de `fn`
+
+        Raises:
+            RequestCancelled: Se o cliente desconectou antes da inferência
+        """
+        timer = timer or StageTimer()
+        lock = self._locks.setdefault(model_name, asyncio.Lock())
+        self.waiting += 1
+        waiting = True
+        try:
+            with timer.stage("queue"):
+                await lock.acquire()
+            try:
+                self.waiting -= 1
+                waiting = False
+                if is_cancelled is not None and await is_cancelled():
+                    raise RequestCancelled()
+                self.running += 1
+                try:
+                    with timer.stage("predict"):
+                        return await run_in_threadpool(fn, *args, **kwargs)
+                finally:
+                    self.running -= 1
+            finally:
+                lock.release()
+        finally:
+            if waiting:
+                self.waiting -= 1
@@ -0,0 +1,236 @@
+import os
+import threading
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Dict, Optional, Set, Tuple
+
+import cv2
+import numpy as np
+
+from models.detections import Detections
+
+HASH_BITS = 64
+# O hash é dividido em bandas para a busca por multi-index hashing:
+# se a distância de Hamming é < N_BANDS, ao menos uma banda é idêntica.
+N_BANDS = 8
+BAND_BITS = HASH_BITS // N_BANDS
+BAND_MASK = (1 << BAND_BITS) - 1
+
+
+@dataclass
+class ImageFingerprint:
+    """dHash de 64 bits do conteúdo da imagem, sem as bordas uniformes."""
+
+    hash: int
+    # Retângulo do conteúdo (x1, y1, x2, y2) na imagem original
+    content_box: Tuple[int, int, int, int]
+    shape: Tuple[int, int]
+
+    @property
+    def content_size(self) -> Tuple[int, int]:
+        x1, y1, x2, y2 = self.content_box
+        return x2 - x1, y2 - y1
+
+    @classmethod
+    def from_image(cls, image: np.ndarray, border_tolerance: int = 12):
+        """
+        Calcula o fingerprint de uma imagem BGR.
+
+        As bordas com a cor do canto superior esquerdo são removidas antes do
+        hash, então re-exportações com alguns pixels de margem geram o mesmo
+        hash e o deslocamento fica registrado em `content_box`.
+
+        Args:
+            image: Imagem BGR (ou grayscale) como numpy array
+            border_tolerance: Diferença máxima de intensidade para considerar borda
+
+        Returns:
+            ImageFingerprint
+        """
+        gray = image if image.ndim == 2 else cv2.cvtColor(image, cv2.COLOR_BGR2GRAY)
+        height, width = gray.shape[:2]
+
+        # Bounding box de tudo que difere da cor de fundo (canto)
+        background = np.full_like(gray, gray[0, 0])
+        mask = cv2.absdiff(gray, background) > border_tolerance
+        rows = np.flatnonzero(mask.any(axis=1))
+        cols = np.flatnonzero(mask.any(axis=0))
+        if len(rows) and len(cols):
+            box = (int(cols[0]), int(rows[0]), int(cols[-1]) + 1, int(rows[-1]) + 1)
+        else:
+            box = (0, 0, width, height)
+
+        x1, y1, x2, y2 = box
+        # dHash: 9x8 em escala de cinza, compara pixels vizinhos na horizontal
+        small = cv2.resize(gray[y1:y2, x1:x2], (9, 8), interpolation=cv2.INTER_AREA)
+        bits = (small[:, 1:] > small[:, :-1]).flatten()
+        value = 0
+        for bit in bits:
+            value = (value << 1) | int(bit)
+
+        return cls(hash=value, content_box=box, shape=(height, width))
+
+
+@dataclass
+class NearDuplicateHit:
+    detections: Detections
+    hamming_distance: int
+    similarity: float
+    scale: Tuple[float, float]
+    # O resultado reaproveitado bateu no limite de detecções (max_det)
+    cap_hit: bool = False
+
+
+@dataclass
+class _Entry:
+    fingerprint: ImageFingerprint
+    model_name: str
+    conf_threshold: float
+    detections: Detections
+    cap_hit: bool = False
+
+
+class NearDuplicateIndex:
+    """
+    Índice em memória (LRU) de fingerprints perceptuais com busca por
+    distância de Hamming, usado para reaproveitar detecções de imagens
+    quase idênticas (re-screenshots, re-exportações, outra compressão).
+    """
+
+    def __init__(
+        self,
+        max_entries: int = int(os.environ.get("AUTOSTRIDE_NEAR_DUP_CACHE_SIZE", 512)),
+        min_similarity: float = float(
+            os.environ.get("AUTOSTRIDE_NEAR_DUP_SIMILARITY", 0.9)
+        ),
+        max_aspect_delta: float = 0.05,
+    ):
+        self.max_entries = max_entries
+        # Com N_BANDS bandas a busca é exata até N_BANDS - 1 bits de diferença
+        self.max_distance = min(int((1 - min_similarity) * HASH_BITS), N_BANDS - 1)
+        self.max_aspect_delta = max_aspect_delta
+        self._entries: "OrderedDict[int, _Entry]" = OrderedDict()
+        self._bands: Dict[Tuple[int, int], Set[int]] = {}
+        self._next_id = 0
+        self._lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    @staticmethod
+    def _band_keys(value: int):
+        for band in range(N_BANDS):
+            yield band, (value >> (band * BAND_BITS)) & BAND_MASK
+
+    def add(
+        self,
+        fingerprint: ImageFingerprint,
+        model_name: str,
+        conf_threshold: float,
+        detections: Detections,
+        cap_hit: bool = False,
+    ) -> None:
+        """
+        Registra as detecções de uma imagem (sem manter a imagem em memória).
+
+        `cap_hit` indica que a inferência bateu no limite de detecções; um
+        hit devolve o mesmo valor, já que as detecções podem estar truncadas.
+        """
+        if self.max_entries <= 0:
+            return
+        # Cópia sem a imagem original (scaled sempre devolve um novo objeto)
+        detections = detections.scaled(1.0, 1.0)
+
+        with self._lock:
+            entry_id = self._next_id
+            self._next_id += 1
+            self._entries[entry_id] = _Entry(
+                fingerprint, model_name, conf_threshold, detections, cap_hit
+            )
+            for key in self._band_keys(fingerprint.hash):
+                self._bands.setdefault(key, set()).add(entry_id)
+
+            while len(self._entries) > self.max_entries:
+                old_id, old = self._entries.popitem(last=False)
+                for key in self._band_keys(old.fingerprint.hash):
+                    bucket = self._bands.get(key)
+                    if bucket is not None:
+                        bucket.discard(old_id)
+                        if not bucket:
+                            del self._bands[key]
+
+    def lookup(
+        self,
+        fingerprint: ImageFingerprint,
+        model_name: str,
+        conf_threshold: float,
+        image: Optional[np.ndarray] = None,
+    ) -> Optional[NearDuplicateHit]:
+        """
+        Procura uma imagem quase idêntica analisada pelo mesmo modelo.
+
+        Só reaproveita entradas geradas com confiança menor ou igual à pedida
+        (as detecções são então filtradas) e com a mesma proporção de conteúdo.
+
+        Args:
+            fingerprint: Fingerprint da nova imagem
+            model_name: Modelo que seria usado na inferência
+            conf_threshold: Threshold de confiança da requisição
+            image: Nova imagem, anexada às detecções para `plot()`
+
+        Returns:
+            NearDuplicateHit com detecções reescaladas, ou None
+        """
+        new_w, new_h = fingerprint.content_size
+        if new_w <= 0 or new_h <= 0:
+            return None
+
+        with self._lock:
+            candidates: Set[int] = set()
+            for key in self._band_keys(fingerprint.hash):
+                candidates |= self._bands.get(key, set())
+
+            best_id, best_entry, best_distance = None, None, HASH_BITS + 1
+            for entry_id in candidates:
+                entry = self._entries[entry_id]
+                if entry.model_name != model_name:
+                    continue
+                if entry.conf_threshold > conf_threshold:
+                    continue
+                old_w, old_h = entry.fingerprint.content_size
+                if old_w <= 0 or old_h <= 0:
+                    continue
+                if abs(old_w / old_h - new_w / new_h) > self.max_aspect_delta * (
+                    new_w / new_h
+                ):
+                    continue
+                distance = bin(entry.fingerprint.hash ^ fingerprint.hash).count("1")
+                if distance <= self.max_distance and distance < best_distance:
+                    best_id, best_entry, best_distance = entry_id, entry, distance
+
+            if best_entry is None:
+                return None
+            self._entries.move_to_end(best_id)
+
+        # Mapeia o retângulo de conteúdo antigo para o novo
+        old_x1, old_y1, _, _ = best_entry.fingerprint.content_box
+        new_x1, new_y1, _, _ = fingerprint.content_box
+        old_w, old_h = best_entry.fingerprint.content_size
+        scale_x, scale_y = new_w / old_w, new_h / old_h
+
+        detections = best_entry.detections.filter(conf_threshold).scaled(
+            scale_x,
+            scale_y,
+            offset_x=new_x1 - old_x1 * scale_x,
+            offset_y=new_y1 - old_y1 * scale_y,
+            orig_img=image,
+        )
+        detections.orig_shape = fingerprint.shape
+
+        return NearDuplicateHit(
+            detections=detections,
+            hamming_distance=best_distance,
+            similarity=round(1 - best_distance / HASH_BITS, 4),
+            scale=(round(scale_x, 4), round(scale_y, 4)),
+            cap_hit=best_entry.cap_hit,
+        )
@@ -0,0 +1,218 @@
+from dataclasses import dataclass
+from typing import List, Optional, Tuple
+
+import numpy as np
+
+from models.detections import Detections
+from services.dense_detection import DEFAULT_IOU, nms_indices
+
+# Entrada da primeira passada (rápida); o refinamento usa o tamanho do treino
+PRELIMINARY_INPUT_SIZE = 320
+
+Box = Tuple[int, int, int, int]
+
+
+@dataclass
+class RefinementPlan:
+    """Como refinar o resultado preliminar: imagem inteira ou só regiões."""
+
+    mode: str  # "full", "regions" ou "none"
+    regions: List[Box]
+
+    @property
+    def label(self) -> str:
+        if self.mode == "regions":
+            return f"regions:{len(self.regions)}"
+        return self.mode
+
+
+class ProgressiveRefiner:
+    """
+    Inferência coarse-to-fine: uma passada em baixa resolução gera o grafo
+    preliminar e o refinamento roda em resolução cheia na imagem inteira ou
+    apenas nos recortes em volta das detecções de baixa confiança.
+    """
+
+    def __init__(
+        self,
+        padding: float = 0.5,
+        min_region: int = 96,
+        max_region_coverage: float = 0.5,
+        iou: float = DEFAULT_IOU,
+    ):
+        self.padding = padding
+        self.min_region = min_region
+        self.max_region_coverage = max_region_coverage
+        self.iou = iou
+
+    def plan(
+        self, preliminary: Detections, mode: str, refine_below: float
+    ) -> RefinementPlan:
+        """
+        Decide o refinamento a partir das detecções preliminares.
+
+        No modo "regions", recortes que somados cobrem mais que
+        `max_region_coverage` da imagem viram uma passada completa (mais
+        barata que vários recortes grandes).
+
+        Args:
+            preliminary: Detecções da passada em baixa resolução
+            mode: "full" ou "regions"
+            refine_below: Detecções abaixo desta confiança são re-verificadas
+
+        Returns:
+            RefinementPlan
+        """
+        if mode == "full":
+            return RefinementPlan("full", [])
+
+        height, width = preliminary.orig_shape
+        uncertain = preliminary.boxes.conf.numpy() < refine_below
+        if not uncertain.any():
+            return RefinementPlan("none", [])
+
+        regions = self._merge_regions(
+            [
+                self._pad(box, width, height)
+                for box in preliminary.boxes.xyxy.numpy()[uncertain]
+            ]
+        )
+        covered = sum((x2 - x1) * (y2 - y1) for x1, y1, x2, y2 in regions)
+        if covered > self.max_region_coverage * width * height:
+            return RefinementPlan("full", [])
+        return RefinementPlan("regions", regions)
+
+    def _pad(self, box: np.ndarray, width: int, height: int) -> Box:
+        x1, y1, x2, y2 = box
+        # Margem proporcional ao tamanho para dar contexto (pontas das setas)
+        pad_x = max((x2 - x1) * self.padding, (self.min_region - (x2 - x1)) / 2, 0)
+        pad_y = max((y2 - y1) * self.padding, (self.min_region - (y2 - y1)) / 2, 0)
+        return (
+            int(max(0, x1 - pad_x)),
+            int(max(0, y1 - pad_y)),
+            int(min(width, x2 + pad_x)),
+            int(min(height, y2 + pad_y)),
+        )
+
+    @staticmethod
+    def _merge_regions(regions: List[Box]) -> List[Box]:
+        """Une recortes que se sobrepõem até não sobrar interseção."""
+        merged = list(regions)
+        changed = True
+        while changed:
+            changed = False
+            result: List[Box] = []
+            for box in merged:
+                for i, other in enumerate(result):
+                    if (
+                        box[0] < other[2]
+                        and other[0] < box[2]
+                        and box[1] < other[3]
+                        and other[1] < box[3]
+                    ):
+                        result[i] = (
+                            min(box[0], other[0]),
+                            min(box[1], other[1]),
+                            max(box[2], other[2]),
+                            max(box[3], other[3]),
+                        )
+                        changed = True
+                        break
+                else:
+                    result.append(box)
+            merged = result
+        return merged
+
+    def merge(
+        self,
+        preliminary: Detections,
+        regions: List[Box],
+        region_results: List[Detections],
+        refine_below: float,
+        orig_img: Optional[np.ndarray] = None,
+    ) -> Detections:
+        """
+        Substitui as detecções incertas de cada região pelas do recorte.
+
+        Detecções preliminares confiáveis são mantidas; as detecções dos
+        recortes voltam para as coordenadas da imagem e um NMS por classe
+        remove duplicatas entre as duas fontes.
+
+        Args:
+            preliminary: Detecções da passada em baixa resolução
+            regions: Recortes (x1, y1, x2, y2) refinados
+            region_results: Detecções de cada recorte, em coordenadas do recorte
+            refine_below: Mesmo limite usado em `plan`
+            orig_img: Imagem original, para `plot()`
+
+        Returns:
+            Detecções finais
+        """
+        xyxy = preliminary.boxes.xyxy.numpy()
+        centers = np.stack(
+            [(xyxy[:, 0] + xyxy[:, 2]) / 2, (xyxy[:, 1] + xyxy[:, 3]) / 2], axis=1
+        )
+        drop = np.zeros(len(preliminary), dtype=bool)
+        uncertain = preliminary.boxes.conf.numpy() < refine_below
+        for x1, y1, x2, y2 in regions:
+            inside = (
+                (centers[:, 0] >= x1)
+                & (centers[:, 0] < x2)
+                & (centers[:, 1] >= y1)
+                & (centers[:, 1] < y2)
+            )
+            drop |= inside & uncertain
+
+        parts = [preliminary.take(~drop)]
+        for (x1, y1, _, _), result in zip(regions, region_results):
+            parts.append(
+                Detections.from_results(result).scaled(
+                    1.0, 1.0, offset_x=x1, offset_y=y1
+                )
+            )
+
+        combined = _concat(parts, preliminary)
+        cls_ids = combined.boxes.cls.numpy().astype(np.int64)
+        keep = []
+        for cls_id in np.unique(cls_ids):
+            idx = np.flatnonzero(cls_ids == cls_id)
+            keep.append(
+                idx[
+                    nms_indices(
+                        combined.boxes.xyxy.numpy()[idx],
+                        combined.boxes.conf.numpy()[idx],
+                        self.iou,
+                    )
+                ]
+            )
+        final = combined.take(np.sort(np.concatenate(keep))) if keep else combined
+        final.orig_img = orig_img
+        return final
+
+
+def _concat(parts: List[Detections], reference: Detections) -> Detections:
+    parts = [p for p in parts if len(p)]
+    if not parts:
+        return reference.take(np.zeros(0, dtype=np.int64))
+    with_kpts = [p for p in parts if p.keypoints is not None and len(p)]
+    keypoints = None
+    if with_kpts:
+        shape = with_kpts[0].keypoints.data.shape[1:]
+        keypoints = np.concatenate(
+            [
+                (
+                    p.keypoints.data.numpy()
+                    if p.keypoints is not None
+                    else np.zeros((len(p), *shape), dtype=np.float32)
+                )
+                for p in parts
+            ]
+        )
+    return Detections(
+        xyxy=np.concatenate([p.boxes.xyxy.numpy() for p in parts]),
+        conf=np.concatenate([p.boxes.conf.numpy() for p in parts]),
+        cls=np.concatenate([p.boxes.cls.numpy() for p in parts]),
+        keypoints=keypoints,
+        orig_shape=reference.orig_shape,
+        names=reference.names,
+    )
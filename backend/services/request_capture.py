@@ -0,0 +1,202 @@
+import gzip
+import hashlib
+import json
+import os
+import queue
+import random
+import threading
+import time
+import uuid
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+
+import cv2
+import numpy as np
+
+from models.detections import Detections
+
+# Diretório das capturas; vazio (padrão) desativa
+DEFAULT_CAPTURE_DIR = os.environ.get("AUTOSTRIDE_CAPTURE_DIR", "")
+
+# Parâmetros da requisição que mudam o resultado e entram na captura
+CAPTURED_PARAMS = ("conf_threshold", "model_name", "dense_mode", "max_detections")
+
+
+class RequestCapture:
+    """
+    Captura de requisições reais para replay (benchmarks/replay_captures.py).
+
+    Cada captura guarda só o necessário para reexecutar e comparar:
+
+    - a imagem como PNG dos pixels decodificados, endereçada pelo SHA-256
+      dos pixels (`images/ab/<hash>.png`): sem EXIF, nome de arquivo ou
+      headers, e a mesma imagem enviada várias vezes ocupa disco uma vez;
+    - os parâmetros que afetam o resultado (`CAPTURED_PARAMS`) e os tempos
+      por etapa, em uma linha de `captures-<pid>.jsonl` (um arquivo por
+      processo, sem disputa entre workers);
+    - detecções, grafo e análise STRIDE em `outputs/<capture_id>.json.gz`.
+
+    PNG, hash e gravação rodam em uma thread própria; com a fila cheia a
+    captura é descartada e a requisição não espera.
+    """
+
+    def __init__(
+        self,
+        directory: Optional[str] = DEFAULT_CAPTURE_DIR,
+        rate: float = float(os.environ.get("AUTOSTRIDE_CAPTURE_RATE", 1.0)),
+        max_pending: int = 64,
+    ):
+        self.directory = Path(directory) if directory else None
+        self.rate = rate
+        self.dropped = 0
+        self._queue: "queue.Queue" = queue.Queue(maxsize=max_pending)
+        self._thread: Optional[threading.Thread] = None
+        self._pid: Optional[int] = None
+        self._lock = threading.Lock()
+
+    @property
+    def enabled(self) -> bool:
+        return self.directory is not None and self.rate > 0
+
+    def should_capture(self) -> bool:
+        return self.enabled and (self.rate >= 1 or random.random() < self.rate)
+
+    def submit(
+        self,
+        image: np.ndarray,
+        params: Dict[str, Any],
+        detections,
+        response,
+    ) -> bool:
+        """
+        Enfileira uma requisição para captura (não bloqueia).
+
+        Args:
+            image: Imagem decodificada (BGR) que foi ao modelo
+            params: Parâmetros da requisição (só `CAPTURED_PARAMS` são gravados)
+            detections: Resultado do modelo (YOLO Results ou Detections)
+            response: InferenceResponse devolvida ao cliente
+
+        Returns:
+            False se a fila está cheia
+        """
+        self._ensure_writer()
+        item = (
+            time.time(),
+            image,
+            {k: params.get(k) for k in CAPTURED_PARAMS},
+            Detections.from_results(detections),
+            response,
+        )
+        try:
+            self._queue.put_nowait(item)
+        except queue.Full:
+            self.dropped += 1
+            return False
+        return True
+
+    def _ensure_writer(self) -> None:
+        # Mesmo cuidado do HistoryStore: depois de um fork, uma thread por processo
+        if self._thread is not None and self._pid == os.getpid():
+            return
+        with self._lock:
+            if self._thread is not None and self._pid == os.getpid():
+                return
+            for sub in ("images", "outputs"):
+                (self.directory / sub).mkdir(parents=True, exist_ok=True)
+            self._pid = os.getpid()
+            self._thread = threading.Thread(
+                target=self._writer_loop, name="capture-writer", daemon=True
+            )
+            self._thread.start()
+
+    def _writer_loop(self) -> None:
+        log_path = self.directory / f"captures-{os.getpid()}.jsonl"
+        with open(log_path, "a", encoding="utf-8") as log:
+            while True:
+                item = self._queue.get()
+                try:
+                    if item is None:
+                        break
+                    log.write(json.dumps(self._write(*item)) + "\n")
+                    log.flush()
+                except (OSError, ValueError) as e:
+                    print(f"Request capture failed: {e}")
+                finally:
+                    self._queue.task_done()
+
+    def _write(self, captured_at, image, params, detections, response) -> Dict:
+        digest = hashlib.sha256(
+            f"{image.shape}|{image.dtype}|".encode()
+            + np.ascontiguousarray(image).tobytes()
+        ).hexdigest()
+        image_path = self.directory / "images" / digest[:2] / f"{digest}.png"
+        if not image_path.exists():
+            image_path.parent.mkdir(exist_ok=True)
+            ok, png = cv2.imencode(".png", image)
+            if not ok:
+                raise ValueError("Could not encode captured image")
+            tmp = image_path.with_suffix(f".{os.getpid()}.tmp")
+            tmp.write_bytes(png.tobytes())
+            os.replace(tmp, image_path)
+
+        capture_id = uuid.uuid4().hex
+        output = {
+            "detections": detections.to_dict(),
+            "graph": response.graph.model_dump(),
+            "stride_analysis": response.stride_analysis.model_dump(),
+        }
+        with gzip.open(self.directory / "outputs" / f"{capture_id}.json.gz", "wt") as f:
+            json.dump(output, f)
+
+        metadata = response.metadata
+        return {
+            "capture_id": capture_id,
+            "captured_at": round(captured_at, 3),
+            "image": digest,
+            "width": int(image.shape[1]),
+            "height": int(image.shape[0]),
+            "params": params,
+            "model_version": metadata.model_version,
+            "processing_time_ms": metadata.processing_time_ms,
+            "stage_timings_ms": metadata.stage_timings_ms,
+            "node_count": len(response.graph.nodes),
+            "edge_count": len(response.graph.edges),
+            "threat_count": response.stride_analysis.summary.total_threats,
+        }
+
+    def close(self) -> None:
+        """Grava o que estiver pendente e encerra a thread de escrita."""
+        if self._thread is None or self._pid != os.getpid():
+            return
+        self._queue.put(None)
+        self._thread.join(timeout=30)
+        self._thread = None
+
+
+# ---- leitura (replay) ----
+
+
+def load_captures(directory: str) -> List[Dict]:
+    """Todas as capturas do diretório, em ordem de captura (determinística)."""
+    captures = []
+    for path in sorted(Path(directory).glob("captures-*.jsonl")):
+        with open(path, encoding="utf-8") as f:
+            for line in f:
+                line = line.strip()
+                if line:
+                    captures.append(json.loads(line))
+    captures.sort(key=lambda c: (c["captured_at"], c["capture_id"]))
+    return captures
+
+
+def read_image(directory: str, capture: Dict) -> bytes:
+    digest = capture["image"]
+    return (Path(directory) / "images" / digest[:2] / f"{digest}.png").read_bytes()
+
+
+def read_output(directory: str, capture: Dict) -> Dict:
+    """Detecções, grafo e STRIDE gravados na captura."""
+    path = Path(directory) / "outputs" / f"{capture['capture_id']}.json.gz"
+    with gzip.open(path, "rt") as f:
+        return json.load(f)
@@ -0,0 +1,233 @@
+import hmac
+import json
+import os
+import random
+import re
+import sys
+import threading
+import time
+import uuid
+from collections import Counter
+from pathlib import Path
+from typing import Dict, List, Optional
+
+from services.stage_timer import StageTimer
+
+DEFAULT_PROFILE_DIR = os.environ.get(
+    "AUTOSTRIDE_PROFILE_DIR", str(Path(__file__).parent.parent / "data" / "profiles")
+)
+
+ADMIN_TOKEN_HEADER = "X-Admin-Token"
+
+_PROFILE_ID = re.compile(r"^[0-9a-f]{32}$")
+
+# Frames-folha de threads paradas (event loop sem trabalho, workers do pool
+# esperando tarefa, writer do histórico): não entram no perfil
+_IDLE_LEAVES = {
+    ("selectors.py", "select"),
+    ("threading.py", "wait"),
+    ("queue.py", "get"),
+}
+
+
+class ProfilingDisabled(Exception):
+    """Profiling pedido sem token de admin válido (ou sem token configurado)."""
+
+
+class ProfileSession:
+    """
+    Amostragem de uma requisição: uma thread lê `sys._current_frames()` a
+    cada `interval_s` e conta as pilhas no formato "folded" (raiz;...;folha),
+    usado pelo flamegraph.pl e pelo speedscope.
+
+    A raiz de cada pilha é a etapa do StageTimer ativa no momento da amostra
+    (decode, predict, graph, stride...). Todas as threads ocupadas do processo
+    são amostradas, então outras requisições simultâneas no mesmo worker
+    também aparecem.
+    """
+
+    def __init__(
+        self, timer: StageTimer, interval_s: float, reason: str, endpoint: str
+    ):
+        self.profile_id = uuid.uuid4().hex
+        self.timer = timer
+        self.interval_s = interval_s
+        self.reason = reason
+        self.endpoint = endpoint
+        self.created_at = time.time()
+        self.duration_ms = 0.0
+        self.samples = 0
+        self.stacks: Counter = Counter()
+        self._labels: Dict[object, str] = {}
+        self._stop = threading.Event()
+        self._thread = threading.Thread(
+            target=self._run, name="autostride-profiler", daemon=True
+        )
+
+    def start(self) -> "ProfileSession":
+        self._thread.start()
+        return self
+
+    def stop(self) -> None:
+        self._stop.set()
+        self._thread.join()
+        self.duration_ms = round((time.time() - self.created_at) * 1000, 2)
+
+    def _label(self, code) -> str:
+        label = self._labels.get(code)
+        if label is None:
+            label = f"{code.co_name} ({_short_path(code.co_filename)})"
+            self._labels[code] = label
+        return label
+
+    def _run(self) -> None:
+        own = threading.get_ident()
+        while not self._stop.wait(self.interval_s):
+            stage = self.timer.current or "other"
+            for thread_id, frame in sys._current_frames().items():
+                if thread_id == own:
+                    continue
+                code = frame.f_code
+                if (os.path.basename(code.co_filename), code.co_name) in _IDLE_LEAVES:
+                    continue
+                frames = []
+                while frame is not None:
+                    frames.append(self._label(frame.f_code))
+                    frame = frame.f_back
+                frames.append(stage)
+                self.stacks[";".join(reversed(frames))] += 1
+                self.samples += 1
+
+    def folded(self) -> str:
+        return "".join(
+            f"{stack} {count}\n" for stack, count in self.stacks.most_common()
+        )
+
+
+def _short_path(filename: str) -> str:
+    """Caminho relativo à entrada mais longa do sys.path que o contém."""
+    best = ""
+    for entry in sys.path:
+        if entry and filename.startswith(entry) and len(entry) > len(best):
+            best = entry
+    return filename[len(best) :].lstrip(os.sep) if best else os.path.basename(filename)
+
+
+class RequestProfiler:
+    """
+    Profiling sob demanda de requisições em produção.
+
+    Uma requisição é amostrada quando pede `profile=true` com o header
+    `X-Admin-Token` igual a `AUTOSTRIDE_ADMIN_TOKEN`, ou por sorteio com
+    probabilidade `AUTOSTRIDE_PROFILE_RATE`. Sem profiling, nenhuma thread
+    existe e o custo por requisição é uma comparação.
+
+    Os perfis ficam em `directory` (um `.folded` e um `.json` de metadados
+    por requisição), mantendo só os `keep` mais recentes.
+    """
+
+    def __init__(
+        self,
+        directory: str = DEFAULT_PROFILE_DIR,
+        admin_token: Optional[str] = os.environ.get("AUTOSTRIDE_ADMIN_TOKEN") or None,
+        rate: float = float(os.environ.get("AUTOSTRIDE_PROFILE_RATE", 0)),
+        interval_ms: float = float(os.environ.get("AUTOSTRIDE_PROFILE_INTERVAL_MS", 5)),
+        keep: int = int(os.environ.get("AUTOSTRIDE_PROFILE_KEEP", 50)),
+        max_active: int = 2,
+    ):
+        self.directory = Path(directory)
+        self.admin_token = admin_token
+        self.rate = rate
+        self.interval_s = interval_ms / 1000
+        self.keep = keep
+        # Limite de requisições sorteadas amostradas ao mesmo tempo
+        self.max_active = max_active
+        self._active = 0
+        self._lock = threading.Lock()
+
+    def is_admin(self, token: Optional[str]) -> bool:
+        if not self.admin_token or token is None:
+            return False
+        return hmac.compare_digest(token.encode(), self.admin_token.encode())
+
+    def start(
+        self, timer: StageTimer, endpoint: str, requested: bool, token: Optional[str]
+    ) -> Optional[ProfileSession]:
+        """
+        Inicia a amostragem da requisição, se pedida ou sorteada.
+
+        Returns:
+            A sessão de profiling, ou None se a requisição não será amostrada
+
+        Raises:
+            ProfilingDisabled: `requested` sem token de admin válido
+        """
+        if requested:
+            if not self.is_admin(token):
+                raise ProfilingDisabled()
+            reason = "requested"
+        elif self.rate > 0 and random.random() < self.rate:
+            reason = "sampled"
+        else:
+            return None
+
+        with self._lock:
+            if reason == "sampled" and self._active >= self.max_active:
+                return None
+            self._active += 1
+        return ProfileSession(timer, self.interval_s, reason, endpoint).start()
+
+    def finish(
+        self, session: ProfileSession, model_version: Optional[str] = None
+    ) -> None:
+        """Para a amostragem e grava o perfil (folded + metadados)."""
+        session.stop()
+        with self._lock:
+            self._active -= 1
+        info = {
+            "profile_id": session.profile_id,
+            "created_at": session.created_at,
+            "endpoint": session.endpoint,
+            "reason": session.reason,
+            "model_version": model_version,
+            "duration_ms": session.duration_ms,
+            "samples": session.samples,
+            "interval_ms": session.interval_s * 1000,
+            "stage_timings_ms": dict(session.timer.timings),
+        }
+        self.directory.mkdir(parents=True, exist_ok=True)
+        (self.directory / f"{session.profile_id}.folded").write_text(session.folded())
+        (self.directory / f"{session.profile_id}.json").write_text(json.dumps(info))
+        self._prune()
+
+    def _prune(self) -> None:
+        metadata = []
+        for path in self.directory.glob("*.json"):
+            try:
+                metadata.append((path.stat().st_mtime, path))
+            except OSError:
+                continue  # removido por outro worker
+        metadata.sort()
+        for _, path in metadata[: max(0, len(metadata) - self.keep)]:
+            path.unlink(missing_ok=True)
+            path.with_suffix(".folded").unlink(missing_ok=True)
+
+    def list_profiles(self, limit: int = 50) -> List[Dict]:
+        """Metadados dos perfis gravados, do mais recente ao mais antigo."""
+        if not self.directory.exists():
+            return []
+        profiles = []
+        for path in self.directory.glob("*.json"):
+            try:
+                profiles.append(json.loads(path.read_text()))
+            except (OSError, ValueError):
+                continue  # removido ou sendo gravado por outro worker
+        profiles.sort(key=lambda p: p["created_at"], reverse=True)
+        return profiles[:limit]
+
+    def profile_path(self, profile_id: str) -> Optional[Path]:
+        """Arquivo .folded do perfil, ou None se o id é inválido ou não existe."""
+        if not _PROFILE_ID.match(profile_id):
+            return None
+        path = self.directory / f"{profile_id}.folded"
+        return path if path.exists() else None
@@ -0,0 +1,137 @@
+import gzip
+import json
+import os
+from typing import Any, Dict, Optional
+
+from fastapi import Response
+
+try:
+    import orjson
+except ImportError:  # pragma: no cover - fallback para o json da stdlib
+    orjson = None
+
+try:
+    import msgpack
+except ImportError:  # pragma: no cover - MessagePack fica indisponível
+    msgpack = None
+
+try:
+    import brotli
+except ImportError:  # pragma: no cover - apenas gzip será oferecido
+    brotli = None
+
+
+JSON_MEDIA_TYPE = "application/json"
+MSGPACK_MEDIA_TYPES = ("application/msgpack", "application/x-msgpack")
+
+# Respostas menores que isso não compensam o custo de compressão
+DEFAULT_COMPRESSION_THRESHOLD = int(
+    os.environ.get("AUTOSTRIDE_COMPRESSION_THRESHOLD", 32 * 1024)
+)
+
+
+class ResponseEncoder:
+    """
+    Serializa respostas já construídas sem passar pela re-validação do
+    `response_model` nem pelo `jsonable_encoder` do FastAPI.
+    Negocia JSON/MessagePack via `Accept` e gzip/brotli via `Accept-Encoding`.
+    """
+
+    def __init__(
+        self,
+        compression_threshold: int = DEFAULT_COMPRESSION_THRESHOLD,
+        gzip_level: int = 6,
+        brotli_quality: int = 5,
+    ):
+        self.compression_threshold = compression_threshold
+        self.gzip_level = gzip_level
+        self.brotli_quality = brotli_quality
+
+    @staticmethod
+    def wants_msgpack(accept: Optional[str]) -> bool:
+        """Retorna True se o cliente pediu MessagePack no header Accept."""
+        if not accept or msgpack is None:
+            return False
+        accepted = [part.split(";")[0].strip().lower() for part in accept.split(",")]
+        return any(media in accepted for media in MSGPACK_MEDIA_TYPES)
+
+    def dumps(self, payload: Dict[str, Any], use_msgpack: bool = False) -> bytes:
+        """Serializa um dicionário (saída de `model_dump()`) para bytes."""
+        if use_msgpack:
+            return msgpack.packb(payload, use_bin_type=True)
+        if orjson is not None:
+            return orjson.dumps(payload)
+        return json.dumps(payload, ensure_ascii=False, separators=(",", ":")).encode(
+            "utf-8"
+        )
+
+    def _select_encoding(self, accept_encoding: Optional[str]) -> Optional[str]:
+        if not accept_encoding:
+            return None
+        offered = {}
+        for part in accept_encoding.split(","):
+            pieces = part.strip().split(";")
+            name = pieces[0].strip().lower()
+            q = 1.0
+            for param in pieces[1:]:
+                param = param.strip()
+                if param.startswith("q="):
+                    try:
+                        q = float(param[2:])
+                    except ValueError:
+                        q = 0.0
+            offered[name] = q
+
+        # Brotli comprime melhor que gzip para JSON repetitivo, então tem prioridade
+        if brotli is not None and offered.get("br", 0) > 0:
+            return "br"
+        if offered.get("gzip", 0) > 0:
+            return "gzip"
+        return None
+
+    def compress(self, body: bytes, accept_encoding: Optional[str]):
+        """
+        Comprime o corpo se ultrapassar o limite e o cliente aceitar.
+
+        Returns:
+            Tupla (corpo, content-encoding ou None)
+        """
+        if len(body) < self.compression_threshold:
+            return body, None
+
+        encoding = self._select_encoding(accept_encoding)
+        if encoding == "br":
+            return brotli.compress(body, quality=self.brotli_quality), "br"
+        if encoding == "gzip":
+            return gzip.compress(body, compresslevel=self.gzip_level), "gzip"
+        return body, None
+
+    def encode(
+        self,
+        model,
+        accept: Optional[str] = None,
+        accept_encoding: Optional[str] = None,
+    ) -> Response:
+        """
+        Converte um modelo Pydantic em uma Response pronta para envio.
+
+        Args:
+            model: Instância Pydantic (ex: InferenceResponse), de preferência
+                criada com `model_construct` para evitar validação
+            accept: Valor do header Accept da requisição
+            accept_encoding: Valor do header Accept-Encoding da requisição
+
+        Returns:
+            Response com o corpo serializado e headers de negociação
+        """
+        use_msgpack = self.wants_msgpack(accept)
+        payload = model.model_dump()
+        body = self.dumps(payload, use_msgpack=use_msgpack)
+        body, content_encoding = self.compress(body, accept_encoding)
+
+        headers = {"Vary": "Accept, Accept-Encoding"}
+        if content_encoding:
+            headers["Content-Encoding"] = content_encoding
+
+        media_type = MSGPACK_MEDIA_TYPES[0] if use_msgpack else JSON_MEDIA_TYPE
+        return Response(content=body, media_type=media_type, headers=headers)
@@ -0,0 +1,245 @@
+import os
+import threading
+import time
+import uuid
+from collections import OrderedDict
+from dataclasses import dataclass, field
+from typing import Dict, List, Optional
+
+import numpy as np
+
+from models.detections import Detections
+from schemas.api_models import (
+    Edge,
+    Graph,
+    GraphDiff,
+    Node,
+    Position,
+    StrideAnalysisResult,
+)
+
+# Detecções guardadas no menor limite aceito pela API: mudar o threshold
+# depois é só um filtro, sem nova inferência
+RAW_CONF_THRESHOLD = 0.1
+
+
+@dataclass
+class InteractiveSession:
+    """Estado de uma sessão interativa: imagem, detecções e grafo atual."""
+
+    session_id: str
+    image: np.ndarray
+    model_name: str
+    conf_threshold: float
+    # Detecções brutas (RAW_CONF_THRESHOLD) de cada modelo já usado
+    raw_detections: Dict[str, Detections] = field(default_factory=dict)
+    graph: Optional[Graph] = None
+    stride_analysis: Optional[StrideAnalysisResult] = None
+    edits: int = 0
+    last_used: float = field(default_factory=time.monotonic)
+
+    @property
+    def detections(self) -> Detections:
+        """Detecções do modelo atual acima do threshold atual."""
+        return self.raw_detections[self.model_name].filter(self.conf_threshold)
+
+    @property
+    def nbytes(self) -> int:
+        total = self.image.nbytes
+        for detections in self.raw_detections.values():
+            total += detections.boxes.xyxy.numpy().nbytes * 2
+            if detections.keypoints is not None:
+                total += detections.keypoints.data.numpy().nbytes
+        return total
+
+    def apply_edit(self, message: Dict) -> None:
+        """
+        Aplica uma edição manual ao grafo atual.
+
+        Operações: `add_node` (node_type, bbox, parent_id opcional),
+        `remove_node` (node_id), `update_node` (node_id, node_type),
+        `add_edge` (source, target) e `remove_edge` (edge_id).
+
+        Raises:
+            ValueError: Operação desconhecida ou id inexistente
+        """
+        nodes = {node.id: node for node in self.graph.nodes}
+        edges = list(self.graph.edges)
+        op = message.get("op")
+
+        if op == "add_node":
+            x1, y1, x2, y2 = (float(v) for v in message["bbox"])
+            parent_id = message.get("parent_id")
+            if parent_id is not None and parent_id not in nodes:
+                raise ValueError(f"Unknown node: {parent_id}")
+            node = Node(
+                id=f"node_user_{self.edits}",
+                type=message["node_type"],
+                position=Position(x=(x1 + x2) / 2, y=(y1 + y2) / 2),
+                confidence=1.0,
+                bbox=[x1, y1, x2, y2],
+                width=x2 - x1,
+                height=y2 - y1,
+                area=(x2 - x1) * (y2 - y1),
+                parent_id=parent_id,
+            )
+            nodes[node.id] = node
+            if parent_id is not None:
+                nodes[parent_id] = nodes[parent_id].model_copy(
+                    update={"children": [*nodes[parent_id].children, node.id]}
+                )
+        elif op == "remove_node":
+            node_id = self._require(nodes, message.get("node_id"))
+            removed = nodes.pop(node_id)
+            edges = [e for e in edges if node_id not in (e.source, e.target)]
+            for other_id, other in list(nodes.items()):
+                if other.parent_id == node_id:
+                    nodes[other_id] = other.model_copy(
+                        update={"parent_id": removed.parent_id}
+                    )
+                elif node_id in other.children:
+                    nodes[other_id] = other.model_copy(
+                        update={"children": [c for c in other.children if c != node_id]}
+                    )
+        elif op == "update_node":
+            node_id = self._require(nodes, message.get("node_id"))
+            nodes[node_id] = nodes[node_id].model_copy(
+                update={"type": message["node_type"], "confidence": 1.0}
+            )
+        elif op == "add_edge":
+            source = self._require(nodes, message.get("source"))
+            target = self._require(nodes, message.get("target"))
+            edges.append(
+                Edge(
+                    id=f"edge_user_{self.edits}",
+                    source=source,
+                    target=target,
+                    keypoints=[
+                        [nodes[source].position.x, nodes[source].position.y],
+                        [nodes[target].position.x, nodes[target].position.y],
+                    ],
+                    cross_boundary=nodes[source].parent_id != nodes[target].parent_id,
+                )
+            )
+        elif op == "remove_edge":
+            edge_id = message.get("edge_id")
+            if not any(e.id == edge_id for e in edges):
+                raise ValueError(f"Unknown edge: {edge_id}")
+            edges = [e for e in edges if e.id != edge_id]
+        else:
+            raise ValueError(f"Unknown edit op: {op}")
+
+        self.graph = Graph(nodes=list(nodes.values()), edges=edges)
+        self.edits += 1
+
+    @staticmethod
+    def _require(nodes: Dict[str, Node], node_id: Optional[str]) -> str:
+        if node_id not in nodes:
+            raise ValueError(f"Unknown node: {node_id}")
+        return node_id
+
+
+def compact_delta(diff: GraphDiff) -> GraphDiff:
+    """
+    Remove do diff os nós que não mudaram.
+
+    Dentro de uma sessão a imagem é a mesma, então o cliente só precisa dos
+    pares cujo id mudou (o GraphBuilder renumera os nós) ou que trocaram de
+    boundary.
+    """
+    diff.nodes.matched = [
+        m for m in diff.nodes.matched if m.before_id != m.after_id or m.parent_changed
+    ]
+    return diff
+
+
+class SessionStore:
+    """
+    Sessões interativas em memória, com timeout de inatividade e limite de
+    memória total (imagens decodificadas + detecções).
+
+    Ao passar do limite, as sessões usadas há mais tempo são descartadas
+    (LRU); sessões expiradas são removidas a cada acesso.
+    """
+
+    def __init__(
+        self,
+        idle_timeout_s: float = float(os.environ.get("AUTOSTRIDE_SESSION_IDLE_S", 300)),
+        max_bytes: int = int(os.environ.get("AUTOSTRIDE_SESSION_MAX_MB", 512)) * 2**20,
+    ):
+        self.idle_timeout_s = idle_timeout_s
+        self.max_bytes = max_bytes
+        self._sessions: "OrderedDict[str, InteractiveSession]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.evicted = 0
+
+    def __len__(self) -> int:
+        return len(self._sessions)
+
+    @property
+    def nbytes(self) -> int:
+        return sum(s.nbytes for s in self._sessions.values())
+
+    def create(
+        self, image: np.ndarray, model_name: str, conf_threshold: float
+    ) -> InteractiveSession:
+        """
+        Cria uma sessão para a imagem decodificada.
+
+        Raises:
+            ValueError: A imagem sozinha passa do limite de memória
+        """
+        if image.nbytes > self.max_bytes:
+            raise ValueError("Image exceeds the session memory limit")
+        session = InteractiveSession(
+            session_id=uuid.uuid4().hex,
+            image=image,
+            model_name=model_name,
+            conf_threshold=conf_threshold,
+        )
+        with self._lock:
+            self._expire()
+            self._sessions[session.session_id] = session
+            self._enforce_limit()
+        return session
+
+    def get(self, session_id: str) -> Optional[InteractiveSession]:
+        """Sessão ativa (renovando o timeout) ou None se expirou/não existe."""
+        with self._lock:
+            self._expire()
+            session = self._sessions.get(session_id)
+            if session is not None:
+                session.last_used = time.monotonic()
+                self._sessions.move_to_end(session_id)
+            return session
+
+    def touch(self, session: InteractiveSession) -> None:
+        """Renova a sessão e reaplica o limite (as detecções podem ter crescido)."""
+        with self._lock:
+            session.last_used = time.monotonic()
+            if session.session_id in self._sessions:
+                self._sessions.move_to_end(session.session_id)
+                self._enforce_limit(keep=session.session_id)
+
+    def remove(self, session_id: str) -> None:
+        with self._lock:
+            self._sessions.pop(session_id, None)
+
+    def _expire(self) -> None:
+        deadline = time.monotonic() - self.idle_timeout_s
+        expired: List[str] = [
+            sid for sid, s in self._sessions.items() if s.last_used < deadline
+        ]
+        for sid in expired:
+            del self._sessions[sid]
+        self.evicted += len(expired)
+
+    def _enforce_limit(self, keep: Optional[str] = None) -> None:
+        total = self.nbytes
+        for sid in list(self._sessions):
+            if total <= self.max_bytes:
+                break
+            if sid == keep or sid == next(reversed(self._sessions)):
+                continue
+            total -= self._sessions.pop(sid).nbytes
+            self.evicted += 1
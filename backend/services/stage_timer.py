@@ -0,0 +1,29 @@
+import time
+from contextlib import contextmanager
+from typing import Dict, Optional
+
+
+class StageTimer:
+    """Mede o tempo de cada etapa do pipeline de inferência (em milissegundos)."""
+
+    def __init__(self):
+        self.start = time.perf_counter()
+        self.timings: Dict[str, float] = {}
+        # Etapa em andamento (lida pelo profiler para rotular as amostras)
+        self.current: Optional[str] = None
+
+    @contextmanager
+    def stage(self, name: str):
+        """Context manager que acumula o tempo gasto na etapa `name`."""
+        stage_start = time.perf_counter()
+        previous, self.current = self.current, name
+        try:
+            yield
+        finally:
+            self.current = previous
+            elapsed = (time.perf_counter() - stage_start) * 1000
+            self.timings[name] = round(self.timings.get(name, 0.0) + elapsed, 2)
+
+    def elapsed_ms(self) -> float:
+        """Tempo total desde a criação do timer."""
+        return (time.perf_counter() - self.start) * 1000
@@ -110,7 +110,9 @@ class StrideAnalyzer:
             },
         }
 
-    def analyze(self, graph: Graph) -> StrideAnalysisResult:
+    def analyze(
+        self, graph: Graph, include_architecture: bool = True
+    ) -> StrideAnalysisResult:
         threats = []
 
         # Mapa rápido para acesso aos nós
@@ -123,7 +125,9 @@ class StrideAnalyzer:
         threats.extend(self._analyze_flows(graph, node_map))
 
         # 3. Análise de Padrões Arquiteturais (A visão macro)
-        threats.extend(self._analyze_architecture(graph, node_map))
+        # Pode ser descartada quando o orçamento de latência está no fim
+        if include_architecture:
+            threats.extend(self._analyze_architecture(graph, node_map))
 
         # Deduplicação e Sumário
         unique_threats = self._deduplicate_threats(threats)
@@ -299,13 +303,27 @@ class StrideAnalyzer:
         seen = set()
         unique = []
         for t in threats:
-            # Assinatura: Categoria + Componentes Afetados Ordenados
-            sig = f"{t.category}-{sorted(t.affected_components)}"
+            sig = self._threat_signature(t)
             if sig not in seen:
                 seen.add(sig)
                 unique.append(t)
         return unique
 
+    @staticmethod
+    def _threat_signature(
+        threat: ThreatAnalysis, rename: Optional[Dict[str, str]] = None
+    ) -> str:
+        """
+        Assinatura: Categoria + Componentes Afetados Ordenados.
+
+        `rename` traduz ids de componentes antes de montar a assinatura (usado
+        para comparar ameaças de dois grafos com ids diferentes).
+        """
+        components = threat.affected_components
+        if rename is not None:
+            components = [rename.get(c, c) for c in components]
+        return f"{threat.category}-{sorted(components)}"
+
     def _generate_summary(self, threats: List[ThreatAnalysis]) -> ThreatSummary:
         counts = {"High": 0, "Medium": 0, "Low": 0, "Critical": 0}
         cats = {}
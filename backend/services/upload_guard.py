@@ -0,0 +1,265 @@
+import os
+from dataclasses import dataclass
+from typing import Dict, Optional, Tuple
+
+from starlette.exceptions import HTTPException
+from starlette.responses import JSONResponse
+
+# Limite por arquivo enviado (imagens) e por documento (PDF/SVG)
+MAX_UPLOAD_BYTES = int(float(os.environ.get("AUTOSTRIDE_MAX_UPLOAD_MB", 10)) * 2**20)
+MAX_DOCUMENT_BYTES = int(
+    float(os.environ.get("AUTOSTRIDE_MAX_DOCUMENT_MB", 50)) * 2**20
+)
+
+# Limite de pixels antes de decodificar: um PNG de poucos KB pode declarar
+# 40000x40000 e alocar gigabytes no decode (decompression bomb)
+MAX_IMAGE_PIXELS = int(os.environ.get("AUTOSTRIDE_MAX_IMAGE_PIXELS", 50_000_000))
+
+# Folga para os cabeçalhos do multipart e os campos de formulário
+MULTIPART_OVERHEAD = 64 * 1024
+
+# Assinaturas (magic bytes) dos formatos aceitos
+MAGIC_BYTES = {
+    "png": b"\x89PNG\r\n\x1a\n",
+    "jpeg": b"\xff\xd8\xff",
+    "pdf": b"%PDF-",
+}
+
+# Formatos sem dimensão em pixels: rasterizados no tamanho de entrada do modelo
+DOCUMENT_FORMATS = ("pdf", "svg")
+
+# Marcadores SOF do JPEG (trazem altura e largura); C4, C8 e CC são outros segmentos
+_JPEG_SOF = {
+    0xC0,
+    0xC1,
+    0xC2,
+    0xC3,
+    0xC5,
+    0xC6,
+    0xC7,
+    0xC9,
+    0xCA,
+    0xCB,
+    0xCD,
+    0xCE,
+    0xCF,
+}
+
+
+class UploadRejected(Exception):
+    """Upload recusado antes do decode (tamanho, formato ou dimensões)."""
+
+    def __init__(self, status_code: int, detail: str):
+        super().__init__(detail)
+        self.status_code = status_code
+        self.detail = detail
+
+
+@dataclass
+class ImageHeader:
+    format: str
+    # None para documentos (PDF/SVG)
+    width: Optional[int] = None
+    height: Optional[int] = None
+
+    @property
+    def pixels(self) -> int:
+        return (self.width or 0) * (self.height or 0)
+
+
+def sniff_format(data: bytes) -> Optional[str]:
+    """Formato pelos magic bytes, ignorando o content-type declarado."""
+    for name, magic in MAGIC_BYTES.items():
+        if data.startswith(magic):
+            return name
+    # SVG é texto: declaração XML, comentários ou DOCTYPE podem vir antes
+    head = data[:4096].lstrip(b"\xef\xbb\xbf \t\r\n")
+    if head.startswith((b"<?xml", b"<svg", b"<!--", b"<!DOCTYPE")) and b"<svg" in head:
+        return "svg"
+    return None
+
+
+def image_dimensions(data: bytes, fmt: str) -> Optional[Tuple[int, int]]:
+    """
+    (largura, altura) lidas do cabeçalho, sem decodificar pixels.
+
+    Returns:
+        None se o trecho ainda não contém o cabeçalho completo
+    """
+    if fmt == "png":
+        # O chunk IHDR é sempre o primeiro, logo após a assinatura
+        if len(data) < 24 or data[12:16] != b"IHDR":
+            return None
+        return int.from_bytes(data[16:20], "big"), int.from_bytes(data[20:24], "big")
+
+    if fmt == "jpeg":
+        # Percorre os segmentos até o SOF (pode vir depois de EXIF/ICC grandes)
+        i = 2
+        while i + 4 <= len(data):
+            if data[i] != 0xFF:
+                return None
+            marker = data[i + 1]
+            if marker == 0xFF:
+                i += 1
+                continue
+            if marker == 0x01 or 0xD0 <= marker <= 0xD8:
+                i += 2
+                continue
+            if marker in _JPEG_SOF:
+                if i + 9 > len(data):
+                    return None
+                height = int.from_bytes(data[i + 5 : i + 7], "big")
+                width = int.from_bytes(data[i + 7 : i + 9], "big")
+                return width, height
+            i += 2 + int.from_bytes(data[i + 2 : i + 4], "big")
+    return None
+
+
+class UploadGuard:
+    """
+    Leitura de uploads em blocos com limite de bytes corrente, formato pelos
+    magic bytes e dimensões pelo cabeçalho, recusando tudo antes do decode.
+    PDF e SVG não têm dimensão em pixels (o raster usa o tamanho de entrada
+    do modelo) e têm um limite de bytes próprio.
+    """
+
+    def __init__(
+        self,
+        max_bytes: int = MAX_UPLOAD_BYTES,
+        max_document_bytes: int = MAX_DOCUMENT_BYTES,
+        max_pixels: int = MAX_IMAGE_PIXELS,
+        chunk_size: int = 64 * 1024,
+        header_bytes: int = 2**20,
+    ):
+        self.max_bytes = max_bytes
+        self.max_document_bytes = max_document_bytes
+        self.max_pixels = max_pixels
+        self.chunk_size = chunk_size
+        # Até onde procurar o cabeçalho durante a leitura (depois, só no final)
+        self.header_bytes = header_bytes
+
+    def request_limit(self, files: int = 1, document: bool = False) -> int:
+        """Limite do corpo inteiro de uma rota: `files` arquivos + multipart."""
+        per_file = self.max_document_bytes if document else self.max_bytes
+        return per_file * files + MULTIPART_OVERHEAD
+
+    def _check_format(self, head: bytes) -> str:
+        fmt = sniff_format(head)
+        if fmt is None:
+            raise UploadRejected(
+                415,
+                "Invalid file type. Only PNG, JPG, JPEG, PDF and SVG are supported.",
+            )
+        return fmt
+
+    def _limit(self, fmt: Optional[str]) -> int:
+        return self.max_document_bytes if fmt in DOCUMENT_FORMATS else self.max_bytes
+
+    def _check_dimensions(self, fmt: str, dimensions) -> ImageHeader:
+        if dimensions is None or 0 in dimensions:
+            raise UploadRejected(400, "Could not read image dimensions from header")
+        header = ImageHeader(fmt, *dimensions)
+        if header.pixels > self.max_pixels:
+            raise UploadRejected(
+                413,
+                f"Image dimensions {header.width}x{header.height} exceed the "
+                f"{self.max_pixels} pixel limit",
+            )
+        return header
+
+    def _too_large(self, fmt: Optional[str]) -> UploadRejected:
+        return UploadRejected(
+            413, f"File size exceeds {self._limit(fmt) // 2**20} MB limit"
+        )
+
+    async def read(self, file) -> Tuple[bytes, ImageHeader]:
+        """
+        Lê um UploadFile em blocos.
+
+        O formato é verificado no primeiro bloco e as dimensões assim que o
+        cabeçalho aparece, então uploads inválidos param sem ler o resto.
+
+        Raises:
+            UploadRejected: Tamanho, formato ou dimensões inválidos
+        """
+        chunks = []
+        total = 0
+        fmt, header = None, None
+        while True:
+            chunk = await file.read(self.chunk_size)
+            if not chunk:
+                break
+            total += len(chunk)
+            if fmt is None:
+                fmt = self._check_format(chunk)
+                if fmt in DOCUMENT_FORMATS:
+                    header = ImageHeader(fmt)
+            if total > self._limit(fmt):
+                raise self._too_large(fmt)
+            chunks.append(chunk)
+            if header is None and total <= self.header_bytes:
+                dimensions = image_dimensions(
+                    chunk if len(chunks) == 1 else b"".join(chunks), fmt
+                )
+                if dimensions is not None:
+                    header = self._check_dimensions(fmt, dimensions)
+
+        if fmt is None:
+            raise UploadRejected(400, "Empty upload")
+        data = b"".join(chunks)
+        if header is None:
+            header = self._check_dimensions(fmt, image_dimensions(data, fmt))
+        return data, header
+
+    def inspect(self, data: bytes) -> ImageHeader:
+        """Mesmas verificações de `read` para bytes já recebidos (WebSocket)."""
+        fmt = self._check_format(data)
+        if len(data) > self._limit(fmt):
+            raise self._too_large(fmt)
+        if fmt in DOCUMENT_FORMATS:
+            return ImageHeader(fmt)
+        return self._check_dimensions(fmt, image_dimensions(data, fmt))
+
+
+class UploadLimitMiddleware:
+    """
+    Middleware ASGI que recusa corpos grandes demais antes do parse do
+    multipart: pelo Content-Length, sem ler nada, ou contando os bytes
+    recebidos (uploads chunked ou Content-Length falso).
+
+    O limite é por rota (`limits`, pelo caminho exato), para que uma rota de
+    imagem não receba um corpo do tamanho aceito pela rota de documentos;
+    as demais rotas usam `default_bytes`.
+    """
+
+    def __init__(self, app, limits: Dict[str, int], default_bytes: int):
+        self.app = app
+        self.limits = limits
+        self.default_bytes = default_bytes
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        max_body_bytes = self.limits.get(scope["path"], self.default_bytes)
+        detail = f"Request body exceeds {max_body_bytes // 2**20} MB limit"
+        length = dict(scope["headers"]).get(b"content-length")
+        if length is not None and length.isdigit() and int(length) > max_body_bytes:
+            response = JSONResponse({"detail": detail}, status_code=413)
+            await response(scope, receive, send)
+            return
+
+        received = 0
+
+        async def limited_receive():
+            nonlocal received
+            message = await receive()
+            if message["type"] == "http.request":
+                received += len(message.get("body", b""))
+                if received > max_body_bytes:
+                    # HTTPException atravessa o parse do FastAPI e vira um 413
+                    raise HTTPException(status_code=413, detail=detail)
+            return message
+
+        await self.app(scope, limited_receive, send)
@@ -1,10 +1,46 @@
-# Script para gerar datasets de imagens de arquitetura
+# Script para gerar datasets de imagens de arquitetura já anotadas
+"""
+Gera diagramas de arquitetura sintéticos com labels YOLO-pose prontos.
+
+O layout vem do próprio Graphviz: cada diagrama é renderizado uma única vez
+com `dot -Tpng -Tjson`. Do JSON saem as caixas dos nós (componentes), as
+caixas dos clusters (boundary) e os pontos das splines das arestas. O
+primeiro ponto da spline é a cauda da seta e o ponto `e` é a ponta. Não há
+anotação manual.
+
+Cada diagrama usa um RNG derivado de `--seed` e do seu id. O mesmo seed gera
+o mesmo dataset, independente do número de workers e da ordem de execução.
+Diagramas já gerados são pulados, então uma geração interrompida continua de
+onde parou.
+
+Saída (dataset YOLO-pose, pronto para `dataset_store.py ingest` ou treino):
+
+    <out>/train/images/gen_arch_s<seed>_<id>.png
+    <out>/train/labels/gen_arch_s<seed>_<id>.txt
+    <out>/val/...
+    <out>/data.yaml, <out>/generator.json
+
+Uso:
+    python labelstudio/generate_arch.py --count 2000 --seed 7 --workers 8
+"""
+
+import argparse
+import json
 import os
 import random
+import shutil
+import struct
+import subprocess
+import sys
+import tempfile
+import time
+from contextlib import nullcontext
+from multiprocessing import Pool
+from pathlib import Path
 
 os.environ["PATH"] += os.pathsep + r"C:\Program Files\Graphviz\bin"
 
-from diagrams import Diagram, Cluster
+from diagrams import Cluster, Diagram, setdiagram
 from diagrams.aws.compute import EC2, Lambda, ECS, EKS
 from diagrams.aws.database import RDS, Redshift, ElastiCache, Dynamodb, Aurora
 from diagrams.aws.network import ELB, CloudFront, Route53, APIGateway
@@ -33,6 +69,12 @@ from diagrams.onprem.client import User, Users
 from diagrams.generic.network import Firewall
 from diagrams.generic.storage import Storage
 
+# Split determinístico e data.yaml iguais aos do ls_to_yolo
+sys.path.insert(0, str(Path(__file__).parent.parent / "src"))
+from dataset_store import write_data_yaml  # noqa: E402
+from ls_to_yolo import split_for  # noqa: E402
+
+# Mesma ordem do data.yaml dos datasets manuais
 CLASSES = [
     "boundary",
     "cache",
@@ -43,9 +85,14 @@ CLASSES = [
     "security",
     "service",
     "user",
+    "fluxo_seta",
 ]
+ARROW_CLASS = CLASSES.index("fluxo_seta")
+BOUNDARY_CLASS = CLASSES.index("boundary")
+KPT_SHAPE = [2, 3]
 
-# Mapeamento de classes para componentes
+# Mapeamento de classes para componentes. Boundary não é um ícone: vem dos
+# clusters (containers) do diagrama
 COMPONENTS = {
     "user": [User, Users],
     "load_balancer": [ELB, CloudFront, LoadBalancers, ApplicationGateway, FrontDoors],
@@ -81,45 +128,89 @@ COMPONENTS = {
     ],
     "monitoring": [Cloudwatch, CloudwatchEventTimeBased, ApplicationInsights],
     "external_service": [Route53, Storage, DNSZones, S3, BlobStorage, CDNProfiles],
-    "boundary": [Firewall, WAF],
 }
 
+BOUNDARY_LABELS = [
+    "VPC",
+    "Private Subnet",
+    "Trust Boundary",
+    "Kubernetes Cluster",
+    "On-Premises",
+]
+
+# Classes que ficam dentro do boundary (quando sorteado)
+INNER_CLASSES = ["service", "cache", "database"]
+
+# Folga (em pontos) em volta da spline na caixa da seta, ~10 px a 96 dpi
+ARROW_PAD = 8.0
+
+DEFAULT_OUT = Path(__file__).parent.parent / "datasets" / "synthetic"
 
-def generate_architecture(arch_id):
-    """Gera uma arquitetura aleatória"""
 
+class LayoutDiagram(Diagram):
+    """Diagram que não renderiza ao sair do contexto (o layout é feito em `render_labeled`)."""
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        setdiagram(None)
+
+
+def build_architecture(arch_id: int, rng: random.Random) -> tuple:
+    """
+    Gera uma arquitetura aleatória.
+
+    Returns:
+        (diagram, classe de cada nodeid, nomes dos clusters que são boundary)
+
+    Só o cluster sorteado como boundary vira label: o cluster que agrupa as
+    réplicas de um serviço é só visual, não uma fronteira de confiança.
+    """
     # Seleciona componentes aleatórios
-    selected_classes = random.sample(CLASSES, k=random.randint(3, len(CLASSES)))
+    selected_classes = rng.sample(list(COMPONENTS), k=rng.randint(3, len(COMPONENTS)))
+    node_classes = {}
 
-    filename = f"architecture-diagrams/train/gen_arch_{arch_id:04d}"
+    def make(cls, label):
+        # nodeid fixo (o padrão do diagrams é aleatório): mesmo seed, mesmo DOT
+        nodeid = f"{cls}_{len(node_classes)}"
+        node_classes[nodeid] = cls
+        return rng.choice(COMPONENTS[cls])(label, nodeid=nodeid)
 
-    with Diagram(
-        f"Architecture {arch_id}", show=False, filename=filename, direction="LR"
-    ):
+    diagram = LayoutDiagram(
+        f"Architecture {arch_id}",
+        show=False,
+        direction=rng.choice(["LR", "LR", "TB"]),
+        curvestyle=rng.choice(["ortho", "ortho", "curved"]),
+    )
+    with diagram:
         components = {}
 
-        # Criar componentes para cada classe selecionada
-        for cls in selected_classes:
-            if cls in COMPONENTS:
-                comp_class = random.choice(COMPONENTS[cls])
-                label = cls.replace("_", " ").title()
-
-                if cls in ["service"]:
-                    # Serviços podem ter múltiplas instâncias
-                    num_instances = random.randint(1, 3)
-                    if num_instances > 1:
-                        with Cluster(f"{label}s"):
-                            components[cls] = [
-                                comp_class(f"{label} {i+1}")
-                                for i in range(num_instances)
-                            ]
-                    else:
-                        components[cls] = comp_class(label)
-                else:
-                    components[cls] = comp_class(label)
+        def add(cls):
+            label = cls.replace("_", " ").title()
+            if cls == "service":
+                # Serviços podem ter múltiplas instâncias
+                num_instances = rng.randint(1, 3)
+                if num_instances > 1:
+                    with Cluster(f"{label}s"):
+                        components[cls] = [
+                            make(cls, f"{label} {i+1}") for i in range(num_instances)
+                        ]
+                    return
+            components[cls] = make(cls, label)
 
-        # Criar conexões lógicas entre componentes
-        comp_list = list(components.items())
+        # Criar componentes para cada classe selecionada; serviços, cache e
+        # banco ficam dentro de um boundary (cluster) em metade dos diagramas
+        inner = [c for c in selected_classes if c in INNER_CLASSES]
+        for cls in selected_classes:
+            if cls not in inner:
+                add(cls)
+        boundary = (
+            Cluster(rng.choice(BOUNDARY_LABELS))
+            if inner and rng.random() < 0.5
+            else None
+        )
+        boundaries = {boundary.name} if boundary else set()
+        with boundary or nullcontext():
+            for cls in inner:
+                add(cls)
 
         # Padrão típico: user -> security/load_balancer -> service -> cache/database -> monitoring
         if "user" in components:
@@ -127,7 +218,7 @@ def generate_architecture(arch_id):
 
             # User se conecta ao security ou load_balancer
             next_comp = None
-            for cls in ["security", "boundary", "load_balancer"]:
+            for cls in ["security", "load_balancer"]:
                 if cls in components:
                     next_comp = components[cls]
                     _ = user_comp >> next_comp
@@ -137,7 +228,7 @@ def generate_architecture(arch_id):
                 _ = user_comp >> components["service"]
 
         # Load balancer/Security -> Service
-        for cls in ["load_balancer", "security", "boundary"]:
+        for cls in ["load_balancer", "security"]:
             if cls in components and "service" in components:
                 _ = components[cls] >> components["service"]
 
@@ -167,10 +258,223 @@ def generate_architecture(arch_id):
             elif "service" in components:
                 _ = ext >> components["service"]
 
+    return diagram, node_classes, boundaries
+
+
+def png_size(path: Path) -> tuple:
+    """(largura, altura) do cabeçalho IHDR do PNG."""
+    with open(path, "rb") as f:
+        header = f.read(24)
+    return struct.unpack(">II", header[16:24])
+
+
+def _points(value: str) -> list:
+    return [float(v) for v in value.split(",")]
+
+
+def spline_endpoints(pos: str) -> tuple:
+    """
+    (cauda, ponta, todos os pontos) do atributo `pos` de uma aresta.
+
+    Formato do Graphviz: `[s,x,y] [e,x,y] x,y x,y ...`, uma spline por `;`.
+    A ponta é o ponto `e` (extremidade da cabeça da seta) quando existe.
+    """
+    start = end = None
+    controls = []
+    for spline in pos.split(";"):
+        for token in spline.split():
+            if token.startswith("s,"):
+                start = start or _points(token[2:])
+            elif token.startswith("e,"):
+                end = _points(token[2:])
+            else:
+                controls.append(_points(token))
+    tail = start or controls[0]
+    head = end or controls[-1]
+    return tail, head, controls + [p for p in (start, end) if p]
+
+
+def layout_labels(
+    layout: dict, node_classes: dict, boundaries: set, image_size: tuple
+) -> list:
+    """Linhas YOLO-pose (normalizadas) a partir do JSON do Graphviz."""
+    width, height = image_size
+    bb = _points(layout["bb"])
+    pad = _points(layout.get("pad", "0.0555"))
+    pad_x, pad_y = pad[0] * 72, pad[-1] * 72
+    # Pontos -> pixels: mesma escala nos dois eixos, medida pelo PNG gerado
+    scale_x = width / (bb[2] - bb[0] + 2 * pad_x)
+    scale_y = height / (bb[3] - bb[1] + 2 * pad_y)
+
+    def to_pixels(x, y):
+        # O Graphviz tem y para cima; a imagem, para baixo
+        return (x - bb[0] + pad_x) * scale_x, (bb[3] - y + pad_y) * scale_y
+
+    def box_line(cls, x1, y1, x2, y2, keypoints="0 0 0 0 0 0"):
+        x1, x2 = max(0.0, min(x1, x2)), min(width, max(x1, x2))
+        y1, y2 = max(0.0, min(y1, y2)), min(height, max(y1, y2))
+        return (
+            f"{cls} {(x1 + x2) / 2 / width:.6f} {(y1 + y2) / 2 / height:.6f} "
+            f"{(x2 - x1) / width:.6f} {(y2 - y1) / height:.6f} {keypoints}"
+        )
+
+    lines = []
+    for obj in layout.get("objects", []):
+        if obj.get("name") in boundaries and "bb" in obj:
+            x1, y1, x2, y2 = _points(obj["bb"])
+            lines.append(
+                box_line(BOUNDARY_CLASS, *to_pixels(x1, y2), *to_pixels(x2, y1))
+            )
+        elif obj.get("name") in node_classes and "pos" in obj:
+            cx, cy = _points(obj["pos"])
+            w, h = float(obj["width"]) * 72 / 2, float(obj["height"]) * 72 / 2
+            lines.append(
+                box_line(
+                    CLASSES.index(node_classes[obj["name"]]),
+                    *to_pixels(cx - w, cy + h),
+                    *to_pixels(cx + w, cy - h),
+                )
+            )
+
+    for edge in layout.get("edges", []):
+        if "pos" not in edge:
+            continue
+        tail, head, points = spline_endpoints(edge["pos"])
+        xs = [p[0] for p in points]
+        ys = [p[1] for p in points]
+        tx, ty = to_pixels(*tail)
+        hx, hy = to_pixels(*head)
+        keypoints = (
+            f"{tx / width:.6f} {ty / height:.6f} 2 {hx / width:.6f} {hy / height:.6f} 2"
+        )
+        lines.append(
+            box_line(
+                ARROW_CLASS,
+                *to_pixels(min(xs) - ARROW_PAD, max(ys) + ARROW_PAD),
+                *to_pixels(max(xs) + ARROW_PAD, min(ys) - ARROW_PAD),
+                keypoints,
+            )
+        )
+    return lines
+
+
+def render_labeled(
+    source: str,
+    image_path: Path,
+    label_path: Path,
+    node_classes: dict,
+    boundaries: set,
+    dot: str,
+):
+    """Um único layout do Graphviz gera a imagem e o JSON de onde saem os labels."""
+    with tempfile.TemporaryDirectory() as tmp:
+        dot_file, json_file = Path(tmp) / "diagram.dot", Path(tmp) / "layout.json"
+        png_file = Path(tmp) / "diagram.png"
+        dot_file.write_text(source, encoding="utf-8")
+        subprocess.run(
+            [
+                dot,
+                "-Tpng",
+                "-o",
+                str(png_file),
+                "-Tjson",
+                "-o",
+                str(json_file),
+                str(dot_file),
+            ],
+            check=True,
+            capture_output=True,
+        )
+        layout = json.loads(json_file.read_text(encoding="utf-8"))
+        lines = layout_labels(layout, node_classes, boundaries, png_size(png_file))
+        # Label antes da imagem: imagem presente significa diagrama completo
+        label_path.write_text("\n".join(lines) + "\n", encoding="utf-8")
+        shutil.move(str(png_file), image_path)
+    return lines
+
+
+def generate(job: tuple) -> tuple:
+    """Gera (ou pula, se já existe) um diagrama. Roda nos workers do pool."""
+    arch_id, seed, out_dir, val_ratio, dot = job
+    name = f"gen_arch_s{seed}_{arch_id:05d}"
+    split = split_for(f"{name}.png", val_ratio)
+    image_path = Path(out_dir) / split / "images" / f"{name}.png"
+    label_path = Path(out_dir) / split / "labels" / f"{name}.txt"
+    if image_path.exists() and label_path.exists():
+        return name, split, None
+
+    # RNG por diagrama: o resultado não depende de qual worker o gerou
+    rng = random.Random(f"{seed}-{arch_id}")
+    diagram, node_classes, boundaries = build_architecture(arch_id, rng)
+    lines = render_labeled(
+        diagram.dot.source, image_path, label_path, node_classes, boundaries, dot
+    )
+    return name, split, len(lines)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(
+        description="Generate synthetic architecture diagrams with YOLO-pose labels"
+    )
+    parser.add_argument("--count", type=int, default=50, help="Number of diagrams")
+    parser.add_argument(
+        "--seed", type=int, default=0, help="Base seed (same seed, same dataset)"
+    )
+    parser.add_argument("--start", type=int, default=1, help="First diagram id")
+    parser.add_argument(
+        "--out", type=Path, default=DEFAULT_OUT, help="Output dataset directory"
+    )
+    parser.add_argument("--val-ratio", type=float, default=0.2)
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 1)
+    parser.add_argument(
+        "--dot", type=str, default="dot", help="Graphviz dot executable"
+    )
+    args = parser.parse_args()
+
+    dot = shutil.which(args.dot)
+    if dot is None:
+        raise SystemExit(f"❌ Graphviz '{args.dot}' not found in PATH")
+    version = subprocess.run([dot, "-V"], capture_output=True, text=True).stderr.strip()
+
+    for split in ("train", "val"):
+        for kind in ("images", "labels"):
+            (args.out / split / kind).mkdir(parents=True, exist_ok=True)
 
-# Gerar 50 imagens de arquitetura variadas
-for i in range(50):
-    generate_architecture(i + 1)
-    print(f"Gerada arquitetura {i + 1}/50")
+    ids = range(args.start, args.start + args.count)
+    jobs = [(i, args.seed, str(args.out), args.val_ratio, dot) for i in ids]
+    start = time.perf_counter()
+    generated = skipped = 0
+    with Pool(args.workers) as pool:
+        for done, (name, split, n_labels) in enumerate(
+            pool.imap_unordered(generate, jobs, chunksize=4), 1
+        ):
+            if n_labels is None:
+                skipped += 1
+            else:
+                generated += 1
+            if done % 50 == 0 or done == len(jobs):
+                rate = generated / (time.perf_counter() - start) * 3600
+                print(
+                    f"Gerados {done}/{len(jobs)} ({skipped} já existiam, {rate:.0f} imagens/h)"
+                )
 
-print("\nTodas as arquiteturas foram geradas com sucesso!")
+    # O layout depende da versão do Graphviz: fica registrada junto do seed
+    meta = {
+        "seed": args.seed,
+        "start": args.start,
+        "count": args.count,
+        "val_ratio": args.val_ratio,
+        "graphviz": version,
+    }
+    (args.out / "generator.json").write_text(
+        json.dumps(meta, indent=2), encoding="utf-8"
+    )
+    splits = [s for s in ("train", "val") if any((args.out / s / "images").iterdir())]
+    write_data_yaml(
+        args.out,
+        splits,
+        dict(enumerate(CLASSES)),
+        KPT_SHAPE,
+        "Synthetic architecture diagrams (generate_arch.py, labels from the Graphviz layout)",
+    )
+    print(f"\nDataset: {args.out} ({generated} novos, {skipped} já existiam)")
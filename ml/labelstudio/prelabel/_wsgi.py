@@ -1,4 +1,5 @@
 import os
+import json
 import argparse
 import logging
 import logging.config
@@ -28,7 +29,7 @@ logging.config.dictConfig({
 })
 
 from label_studio_ml.api import init_app
-from main import YOLOArchitectureBackend
+from main import YOLOArchitectureBackend, warmup
 
 
 _DEFAULT_CONFIG_PATH = os.path.join(os.path.dirname(__file__), 'config.json')
@@ -104,6 +105,9 @@ if __name__ == "__main__":
         print('Check "' + YOLOArchitectureBackend.__name__ + '" instance creation..')
         model = YOLOArchitectureBackend(**kwargs)
 
+    # Modelo carregado e aquecido antes de aceitar requisições
+    warmup()
+
     app = init_app(
         model_class=YOLOArchitectureBackend,
         model_dir=os.environ.get('MODEL_DIR', args.model_dir),
@@ -117,6 +121,8 @@ if __name__ == "__main__":
 
 else:
     # for uWSGI use
+    # Warmup já no worker: sem --preload, o modelo não é carregado antes do fork
+    warmup()
     app = init_app(
         model_class=YOLOArchitectureBackend,
         model_dir=os.environ.get('MODEL_DIR', os.path.dirname(__file__)),
@@ -1,23 +1,223 @@
 # yolo_architecture_backend.py
 from label_studio_ml.model import LabelStudioMLBase
 from ultralytics.models import YOLO
+from requests.adapters import HTTPAdapter
+from concurrent.futures import ThreadPoolExecutor
+from collections import OrderedDict
+from pathlib import Path
+from urllib.parse import unquote
 import requests
+import hashlib
+import json
+import threading
 from io import BytesIO
 from PIL import Image
 import os
 
+# Configuração por variáveis de ambiente (mesmos valores padrão de antes)
+MODEL_PATH = os.environ.get(
+    "MODEL_PATH", os.path.join(os.path.dirname(__file__), "model", "model.pt")
+)
+CONF_THRESHOLD = float(os.environ.get("CONF_THRESHOLD", "0.25"))
+KEYPOINT_CONF_THRESHOLD = float(os.environ.get("KEYPOINT_CONF_THRESHOLD", "0.3"))
+
+# Imagens por forward do modelo e downloads simultâneos
+PREDICT_BATCH = int(os.environ.get("PREDICT_BATCH", "16"))
+FETCH_WORKERS = int(os.environ.get("FETCH_WORKERS", "8"))
+
+# Predições em memória (LRU) e, opcionalmente, em disco (sobrevive a restarts)
+PREDICTION_CACHE_SIZE = int(os.environ.get("PREDICTION_CACHE_SIZE", "4096"))
+PREDICTION_CACHE_DIR = os.environ.get("PREDICTION_CACHE_DIR")
+
+# Label Studio passa uploads como /data/upload/<projeto>/<arquivo> e arquivos
+# locais como /data/local-files/?d=<caminho relativo à document root>
+LOCAL_FILES_DOCUMENT_ROOT = os.environ.get("LOCAL_FILES_DOCUMENT_ROOT", "")
+LABEL_STUDIO_API_KEY = os.environ.get("LABEL_STUDIO_API_KEY")
+
+
+def default_media_dir():
+    """Diretório de mídia do Label Studio (env, ou o padrão de cada sistema)."""
+    if os.environ.get("LABEL_STUDIO_MEDIA_DIR"):
+        return os.environ["LABEL_STUDIO_MEDIA_DIR"]
+    if os.environ.get("LABEL_STUDIO_BASE_DATA_DIR"):
+        return os.path.join(os.environ["LABEL_STUDIO_BASE_DATA_DIR"], "media")
+    if os.name == "nt":
+        return os.path.join(
+            os.environ.get("LOCALAPPDATA", ""), "label-studio", "label-studio", "media"
+        )
+    return os.path.join(Path.home(), ".local", "share", "label-studio", "media")
+
+
+MEDIA_DIR = default_media_dir()
+
+
+class SharedPredictor:
+    """
+    Modelo, sessão HTTP e cache de predições compartilhados por todas as
+    instâncias do backend (o Label Studio pode criar uma por projeto).
+    """
+
+    def __init__(self, model_path=MODEL_PATH):
+        self.model = YOLO(model_path)
+
+        # Versão = pesos + limiares: mudar qualquer um invalida o cache
+        digest = hashlib.sha256()
+        with open(model_path, "rb") as f:
+            for chunk in iter(lambda: f.read(1 << 20), b""):
+                digest.update(chunk)
+        digest.update(f"{CONF_THRESHOLD}|{KEYPOINT_CONF_THRESHOLD}".encode())
+        self.model_version = f"yolov11-architecture-{digest.hexdigest()[:12]}"
+
+        # O forward do modelo não é thread-safe (gunicorn roda com threads)
+        self.model_lock = threading.Lock()
+
+        # Sessão com pool de conexões: keep-alive entre downloads
+        self.session = requests.Session()
+        adapter = HTTPAdapter(
+            pool_connections=FETCH_WORKERS, pool_maxsize=FETCH_WORKERS
+        )
+        self.session.mount("http://", adapter)
+        self.session.mount("https://", adapter)
+        if LABEL_STUDIO_API_KEY:
+            self.session.headers["Authorization"] = f"Token {LABEL_STUDIO_API_KEY}"
+        self.fetch_pool = ThreadPoolExecutor(max_workers=FETCH_WORKERS)
+
+        self.cache = OrderedDict()
+        self.cache_lock = threading.Lock()
+
+    def warmup(self):
+        """Um forward em imagem vazia: a primeira task não paga a inicialização."""
+        with self.model_lock:
+            self.model(
+                Image.new("RGB", (640, 640), "white"),
+                conf=CONF_THRESHOLD,
+                verbose=False,
+            )
+
+    def fetch(self, url):
+        """Bytes da imagem, da URL ou do disco do Label Studio"""
+        if url.startswith("http"):
+            response = self.session.get(url, timeout=30)
+            response.raise_for_status()
+            return response.content
+
+        if url.startswith("/data/local-files/"):
+            relative = unquote(url.split("?d=", 1)[-1])
+            base_path = LOCAL_FILES_DOCUMENT_ROOT
+        else:
+            relative = unquote(url.replace("/data/", "", 1))
+            base_path = MEDIA_DIR
+        full_path = os.path.join(base_path, *relative.replace("\\", "/").split("/"))
+
+        if not os.path.exists(full_path):
+            raise FileNotFoundError(f"Arquivo não encontrado: {full_path}")
+        with open(full_path, "rb") as f:
+            return f.read()
+
+    def _cache_path(self, key):
+        return os.path.join(PREDICTION_CACHE_DIR, self.model_version, f"{key}.json")
+
+    def cached(self, key):
+        with self.cache_lock:
+            if key in self.cache:
+                self.cache.move_to_end(key)
+                return self.cache[key]
+        if PREDICTION_CACHE_DIR and os.path.exists(self._cache_path(key)):
+            with open(self._cache_path(key), encoding="utf-8") as f:
+                prediction = json.load(f)
+            self.store(key, prediction, persist=False)
+            return prediction
+        return None
+
+    def store(self, key, prediction, persist=True):
+        with self.cache_lock:
+            self.cache[key] = prediction
+            self.cache.move_to_end(key)
+            while len(self.cache) > PREDICTION_CACHE_SIZE:
+                self.cache.popitem(last=False)
+        if persist and PREDICTION_CACHE_DIR:
+            path = self._cache_path(key)
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            tmp = f"{path}.{threading.get_ident()}.tmp"
+            with open(tmp, "w", encoding="utf-8") as f:
+                json.dump(prediction, f)
+            os.replace(tmp, path)
+
+    def predict(self, urls, convert):
+        """
+        Predições (formato Label Studio) de várias imagens.
+
+        Downloads em paralelo; imagens já vistas (mesmo conteúdo e mesma
+        versão do modelo) saem do cache; as demais passam pelo modelo em
+        lotes de PREDICT_BATCH.
+
+        Args:
+            urls: URL ou caminho de cada task
+            convert: Função (result, largura, altura) -> predição de uma imagem
+        """
+        contents = list(self.fetch_pool.map(self.fetch, urls))
+        keys = [hashlib.sha256(content).hexdigest() for content in contents]
+
+        predictions = {}
+        pending = {}
+        for key, content in zip(keys, contents):
+            if key in predictions or key in pending:
+                continue
+            hit = self.cached(key)
+            if hit is not None:
+                predictions[key] = hit
+            else:
+                pending[key] = content
+
+        pending = list(pending.items())
+        for start in range(0, len(pending), PREDICT_BATCH):
+            batch = pending[start : start + PREDICT_BATCH]
+            images = [
+                Image.open(BytesIO(content)).convert("RGB") for _, content in batch
+            ]
+            # Um forward para o lote inteiro
+            with self.model_lock:
+                results = self.model(images, conf=CONF_THRESHOLD, verbose=False)
+            for (key, _), image, result in zip(batch, images, results):
+                img_width, img_height = image.size
+                predictions[key] = convert(result, img_width, img_height)
+                self.store(key, predictions[key])
+
+        return [predictions[key] for key in keys]
+
+
+_predictor = None
+_predictor_lock = threading.Lock()
+
+
+def get_predictor():
+    """SharedPredictor do processo (criado na primeira chamada)."""
+    global _predictor
+    with _predictor_lock:
+        if _predictor is None:
+            _predictor = SharedPredictor()
+        return _predictor
+
+
+def warmup():
+    """Carrega o modelo e faz o warmup ao subir o backend."""
+    predictor = get_predictor()
+    predictor.warmup()
+    print(f"Modelo pronto: {MODEL_PATH} ({predictor.model_version})")
+
 
 class YOLOArchitectureBackend(LabelStudioMLBase):
 
     def __init__(self, **kwargs):
         super(YOLOArchitectureBackend, self).__init__(**kwargs)
 
-        # Carregue seu modelo YOLOv11-pose customizado
-        self.model = YOLO(r"model/model.pt")
+        # Modelo YOLOv11-pose customizado, compartilhado entre instâncias
+        self.predictor = get_predictor()
+        self.model = self.predictor.model
 
         # Configure confiança mínima
-        self.conf_threshold = 0.25
-        self.keypoint_conf_threshold = 0.3
+        self.conf_threshold = CONF_THRESHOLD
+        self.keypoint_conf_threshold = KEYPOINT_CONF_THRESHOLD
 
         # Mapeamento de classes de componentes (índice -> nome)
         # Ajuste conforme a ordem que você treinou o modelo
@@ -34,64 +234,17 @@ class YOLOArchitectureBackend(LabelStudioMLBase):
         ]
 
     def predict(self, tasks, **kwargs):
-        """Faz predições para uma lista de tasks"""
-        predictions = []
-
-        for task in tasks:
-            # Pega URL/caminho da imagem
-            image_url = task["data"]["image"]
-
-            # Baixa e processa imagem
-            image = self._get_image(image_url)
-            img_width, img_height = image.size
-
-            # Roda YOLO pose
-            results = self.model(image, conf=self.conf_threshold)
-
-            # Converte para formato Label Studio
-            prediction_result = self._convert_to_ls_format(
-                results[0], img_width, img_height
-            )
-
-            predictions.append(
-                {
-                    "result": prediction_result,
-                    "score": self._get_average_score(results[0]),
-                    "model_version": "yolov11-architecture-v1",
-                }
-            )
-
-        return predictions
-
-    def _get_image(self, url):
-        """Baixa imagem da URL ou carrega do caminho local"""
-        if url.startswith("http"):
-            response = requests.get(url)
-            image = Image.open(BytesIO(response.content))
-        else:
-            import os
-
-            # Remove prefixos do Label Studio
-            clean_url = url.replace("/data/upload/", "").replace(
-                "/data/local-files/?d=", ""
-            )
-            clean_url = clean_url.replace("\\", "/")  # Normaliza barras
-
-            base_path = (
-                r"C:\Users\Iago\AppData\Local\label-studio\label-studio\media\upload"
-            )
-
-            full_path = os.path.join(base_path, clean_url)
-
-            # Debug: mostra o caminho que está tentando abrir
-            print(f"Tentando abrir: {full_path}")
-
-            if not os.path.exists(full_path):
-                raise FileNotFoundError(f"Arquivo não encontrado: {full_path}")
-
-            image = Image.open(full_path)
-
-        return image
+        """Faz predições para uma lista de tasks (em lote, com cache)"""
+        image_urls = [task["data"]["image"] for task in tasks]
+        return self.predictor.predict(image_urls, self._to_prediction)
+
+    def _to_prediction(self, result, img_width, img_height):
+        """Predição de uma imagem no formato Label Studio"""
+        return {
+            "result": self._convert_to_ls_format(result, img_width, img_height),
+            "score": self._get_average_score(result),
+            "model_version": self.predictor.model_version,
+        }
 
     def _convert_to_ls_format(self, result, img_width, img_height):
         """Converte resultados YOLO-pose para formato Label Studio"""
@@ -0,0 +1,413 @@
+"""
+Active learning: rank the unlabeled pool by model uncertainty and queue
+the most informative images in Label Studio, with pre-labels attached.
+
+The current best model (highest mAP50-95 in results.csv, or --model) runs
+over the pool in batches. Each image gets an uncertainty score in [0, 1],
+the weighted mean of:
+
+- box: detections whose confidence is close to the backend threshold (0.5)
+- keypoints: arrow keypoints whose visibility is close to the 0.3 cutoff of
+  GraphBuilder._extract_edges (an arrow that may or may not become an edge)
+- disagreement: 1 - F1 between the components found by the best model and
+  by other model versions (--compare)
+
+Each term averages the most ambiguous objects of the image, so a few
+borderline detections are not diluted by many confident ones.
+
+Images already in the project or in --exclude datasets are skipped. The
+top --top images are imported in rank order, so task ids follow the ranking
+and "Sequential sampling" serves them in that order. Each prediction's
+score is 1 - uncertainty, so Label Studio's uncertainty sampling also
+serves the least certain first. The full ranking is saved to
+`runs/active_learning/<timestamp>/ranking.json`.
+
+Usage:
+    python src/active_learning.py --pool /srv/ls-files/unlabeled --top 50 --dry-run
+    python src/active_learning.py --pool /srv/ls-files/unlabeled --project 4 --top 50 \\
+        --document-root /srv/ls-files --compare yolo11m-pose_manual_v1_v1
+"""
+
+import argparse
+import json
+import re
+import time
+from pathlib import Path
+from typing import Dict, List, Optional
+
+import numpy as np
+
+from compare_models import analyze_model
+from evaluate import RUNS_DIR, Detections, box_iou, discover_models, resolve_models
+from ls_client import LabelStudioClient
+from train_cache import image_files, load_data_yaml
+
+DEFAULT_OUTPUT = Path(__file__).parent.parent / "runs" / "active_learning"
+
+ARROW_CLASS = 9
+
+# Limiar de confiança do backend (YOLOModel) e corte de visibilidade dos
+# keypoints em GraphBuilder._extract_edges
+CONF_THRESHOLD = 0.5
+KEYPOINT_CUTOFF = 0.3
+
+# Keypoints a mais de KEYPOINT_MARGIN do corte não são ambíguos
+KEYPOINT_MARGIN = 0.2
+
+# Objetos mais ambíguos considerados em cada termo
+TOP_K = 5
+
+
+def best_model(runs_dir: Path = RUNS_DIR) -> Path:
+    """Weights of the run with the highest mAP50-95 in its results.csv."""
+    scored = []
+    for weights in discover_models(runs_dir).values():
+        analysis = analyze_model(weights.parent.parent)
+        if analysis:
+            scored.append((analysis["best_mAP50-95"], weights))
+    if not scored:
+        raise FileNotFoundError(f"No run with results.csv in {runs_dir}; pass --model")
+    return max(scored)[1]
+
+
+def predict_pool(
+    weights: Path, images: List[Path], imgsz: int, batch: int, conf: float
+) -> Dict[str, Detections]:
+    """Detections of every pool image (by file name), predicted in batches."""
+    from ultralytics.models import YOLO
+
+    model = YOLO(str(weights))
+    detections = {}
+    results = model.predict(
+        [str(p) for p in images],
+        imgsz=imgsz,
+        batch=batch,
+        conf=conf,
+        stream=True,
+        verbose=False,
+    )
+    for image, result in zip(images, results):
+        # Só arrays: o pool inteiro fica em memória
+        det = Detections.from_results(result)
+        det.orig_img = None
+        detections[image.name] = det
+    return detections
+
+
+def _top_mean(values: np.ndarray) -> float:
+    return float(np.sort(values)[-TOP_K:].mean()) if len(values) else 0.0
+
+
+def box_uncertainty(det: Detections) -> float:
+    """Closeness of the detection confidences to CONF_THRESHOLD (nothing found: 1)."""
+    if len(det) == 0:
+        return 1.0
+    conf = det.boxes.conf
+    span = max(CONF_THRESHOLD, 1 - CONF_THRESHOLD)
+    return _top_mean(1 - np.abs(conf - CONF_THRESHOLD) / span)
+
+
+def keypoint_uncertainty(det: Detections) -> float:
+    """Closeness of the arrow keypoint visibilities to KEYPOINT_CUTOFF."""
+    if det.keypoints is None or len(det) == 0:
+        return 0.0
+    arrows = det.boxes.cls == ARROW_CLASS
+    visibility = det.keypoints.data[arrows][..., 2].ravel()
+    return _top_mean(
+        np.clip(1 - np.abs(visibility - KEYPOINT_CUTOFF) / KEYPOINT_MARGIN, 0, 1)
+    )
+
+
+def components(det: Detections):
+    keep = (det.boxes.conf >= CONF_THRESHOLD) & (det.boxes.cls != ARROW_CLASS)
+    return det.boxes.xyxy[keep], det.boxes.cls[keep]
+
+
+def disagreement(
+    det: Detections, other: Detections, iou_threshold: float = 0.5
+) -> float:
+    """1 - F1 of the components of two models (greedy same-class IoU matching)."""
+    boxes_a, cls_a = components(det)
+    boxes_b, cls_b = components(other)
+    if len(boxes_a) == 0 and len(boxes_b) == 0:
+        return 0.0
+    pairs = sorted(
+        (
+            (box_iou(boxes_a[i], boxes_b[j]), i, j)
+            for i in range(len(boxes_a))
+            for j in range(len(boxes_b))
+            if cls_a[i] == cls_b[j]
+        ),
+        reverse=True,
+    )
+    used_a, used_b = set(), set()
+    for iou, i, j in pairs:
+        if iou < iou_threshold:
+            break
+        if i not in used_a and j not in used_b:
+            used_a.add(i)
+            used_b.add(j)
+    return 1 - 2 * len(used_a) / (len(boxes_a) + len(boxes_b))
+
+
+def score_image(
+    det: Detections, others: List[Detections], weights: Dict[str, float]
+) -> Dict[str, float]:
+    terms = {"box": box_uncertainty(det), "keypoint": keypoint_uncertainty(det)}
+    if others:
+        terms["disagreement"] = float(np.mean([disagreement(det, o) for o in others]))
+    total = sum(weights[k] for k in terms)
+    terms["uncertainty"] = (
+        sum(weights[k] * v for k, v in terms.items()) / total if total else 0.0
+    )
+    return {k: round(v, 4) for k, v in terms.items()}
+
+
+def ls_result(det: Detections, names: Dict[int, str]) -> List[Dict]:
+    """
+    Pre-labels in the project's format: rectangles for components and, for
+    each arrow, its (tail, head) keypoint pair in order, as ls_to_yolo.py
+    reads them back. Arrows get no rectangle (clean.py would remove it).
+    """
+    h, w = det.orig_shape
+    result = []
+    for i in range(len(det)):
+        conf, cls = float(det.boxes.conf[i]), int(det.boxes.cls[i])
+        if conf < CONF_THRESHOLD:
+            continue
+        if cls == ARROW_CLASS:
+            kpts = det.keypoints.data[i] if det.keypoints is not None else None
+            # Par completo ou nada: um keypoint solto desalinharia os pares
+            if kpts is None or (kpts[:, 2] < KEYPOINT_CUTOFF).any():
+                continue
+            for x, y, v in kpts:
+                result.append(
+                    {
+                        "from_name": "kp-label",
+                        "to_name": "image",
+                        "type": "keypointlabels",
+                        "original_width": w,
+                        "original_height": h,
+                        "value": {
+                            "x": float(x / w * 100),
+                            "y": float(y / h * 100),
+                            "width": 0.8,
+                            "keypointlabels": ["fluxo_seta"],
+                        },
+                        "score": float(v),
+                    }
+                )
+            continue
+        x1, y1, x2, y2 = (float(v) for v in det.boxes.xyxy[i])
+        result.append(
+            {
+                "from_name": "label",
+                "to_name": "image",
+                "type": "rectanglelabels",
+                "original_width": w,
+                "original_height": h,
+                "value": {
+                    "x": x1 / w * 100,
+                    "y": y1 / h * 100,
+                    "width": (x2 - x1) / w * 100,
+                    "height": (y2 - y1) / h * 100,
+                    "rectanglelabels": [names.get(cls, str(cls))],
+                },
+                "score": conf,
+            }
+        )
+    return result
+
+
+def image_url(
+    image: Path, document_root: Optional[Path], url_prefix: Optional[str]
+) -> str:
+    """How Label Studio reaches the image: local files storage or a URL prefix."""
+    if url_prefix:
+        return f"{url_prefix.rstrip('/')}/{image.name}"
+    relative = image.resolve().relative_to(document_root.resolve()).as_posix()
+    return f"/data/local-files/?d={relative}"
+
+
+def original_name(name: str) -> str:
+    """File name without the "<8 hex>-" prefix Label Studio adds to uploads."""
+    return re.sub(r"^[0-9a-f]{8}-", "", name)
+
+
+def labeled_names(exclude: List[Path]) -> set:
+    """Image names already in the given datasets (data.yaml or directories)."""
+    names = set()
+    for path in exclude:
+        if path.suffix in (".yaml", ".yml"):
+            config = load_data_yaml(path)
+            for split in ("train", "val", "test"):
+                if config.get(split) and (config["path"] / config[split]).is_dir():
+                    names.update(
+                        p.name for p in image_files(config["path"] / config[split])
+                    )
+        else:
+            names.update(p.name for p in Path(path).rglob("*") if p.is_file())
+    return {original_name(n) for n in names}
+
+
+def task_name(task: Dict) -> str:
+    image = str(task.get("data", {}).get("image", ""))
+    return original_name(Path(image.split("?d=")[-1]).name)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(
+        description="Rank unlabeled images by uncertainty and queue them in Label Studio"
+    )
+    parser.add_argument(
+        "--pool", type=Path, required=True, help="Directory of unlabeled images"
+    )
+    parser.add_argument(
+        "--model", type=str, default=None, help="Run name or .pt (default: best run)"
+    )
+    parser.add_argument(
+        "--compare", nargs="*", default=[], help="Other model versions for disagreement"
+    )
+    parser.add_argument("--top", type=int, default=50, help="Images to queue")
+    parser.add_argument("--imgsz", type=int, default=640)
+    parser.add_argument("--batch", type=int, default=16, help="Images per forward")
+    parser.add_argument(
+        "--conf",
+        type=float,
+        default=0.1,
+        help="Lowest confidence considered for uncertainty",
+    )
+    parser.add_argument(
+        "--weights",
+        type=float,
+        nargs=3,
+        default=[1.0, 1.0, 1.0],
+        metavar=("BOX", "KEYPOINT", "DISAGREEMENT"),
+        help="Weights of the uncertainty terms",
+    )
+    parser.add_argument(
+        "--exclude",
+        type=Path,
+        nargs="*",
+        default=[],
+        help="Labeled datasets (data.yaml or dirs)",
+    )
+    parser.add_argument(
+        "--project", type=int, default=None, help="Label Studio project id"
+    )
+    parser.add_argument(
+        "--url", type=str, default=None, help="Label Studio URL (or LABEL_STUDIO_URL)"
+    )
+    parser.add_argument(
+        "--token", type=str, default=None, help="API token (or LABEL_STUDIO_API_KEY)"
+    )
+    parser.add_argument(
+        "--document-root",
+        type=Path,
+        default=None,
+        help="LOCAL_FILES_DOCUMENT_ROOT of Label Studio",
+    )
+    parser.add_argument(
+        "--url-prefix", type=str, default=None, help="Base URL serving the pool"
+    )
+    parser.add_argument("--dry-run", action="store_true", help="Rank only, do not push")
+    parser.add_argument("--output", type=Path, default=DEFAULT_OUTPUT)
+    args = parser.parse_args()
+
+    if not args.dry_run:
+        if args.project is None:
+            parser.error("--project is required unless --dry-run")
+        if not (args.document_root or args.url_prefix):
+            parser.error("--document-root or --url-prefix is required to push tasks")
+
+    weights = (
+        next(iter(resolve_models([args.model]).values()))
+        if args.model
+        else best_model()
+    )
+    compare = list(resolve_models(args.compare).values()) if args.compare else []
+
+    client = None
+    skip = labeled_names(args.exclude)
+    if not args.dry_run:
+        client = LabelStudioClient(args.url, args.token)
+        skip.update(task_name(t) for t in client.iter_tasks(args.project))
+    images = [p for p in image_files(args.pool) if original_name(p.name) not in skip]
+    print(f"Pool: {len(images)} images ({len(skip)} already labeled or queued)")
+    if not images:
+        raise SystemExit("Nothing to rank")
+
+    start = time.perf_counter()
+    print(f"Model: {weights}")
+    detections = predict_pool(weights, images, args.imgsz, args.batch, args.conf)
+    others = []
+    for other in compare:
+        print(f"Compare: {other}")
+        others.append(predict_pool(other, images, args.imgsz, args.batch, args.conf))
+    print(f"Predicted in {time.perf_counter() - start:.0f}s")
+
+    term_weights = dict(zip(("box", "keypoint", "disagreement"), args.weights))
+    ranking = sorted(
+        (
+            {
+                "image": str(image),
+                **score_image(
+                    detections[image.name],
+                    [o[image.name] for o in others],
+                    term_weights,
+                ),
+            }
+            for image in images
+        ),
+        key=lambda r: -r["uncertainty"],
+    )
+
+    output = args.output / time.strftime("%Y%m%d-%H%M%S")
+    output.mkdir(parents=True, exist_ok=True)
+    (output / "ranking.json").write_text(
+        json.dumps(
+            {
+                "model": str(weights),
+                "compare": [str(c) for c in compare],
+                "ranking": ranking,
+            },
+            indent=2,
+        ),
+        encoding="utf-8",
+    )
+
+    print(f"\n{'rank':>4}  {'uncert.':>8}{'box':>7}{'kpt':>7}{'disagr.':>9}  image")
+    for i, r in enumerate(ranking[: args.top], 1):
+        print(
+            f"{i:>4}  {r['uncertainty']:>8.3f}{r['box']:>7.3f}{r['keypoint']:>7.3f}"
+            f"{r.get('disagreement', 0):>9.3f}  {Path(r['image']).name}"
+        )
+
+    if client:
+        model_version = weights.parent.parent.name
+        tasks = []
+        for i, r in enumerate(ranking[: args.top], 1):
+            image = Path(r["image"])
+            det = detections[image.name]
+            tasks.append(
+                {
+                    "data": {
+                        "image": image_url(image, args.document_root, args.url_prefix),
+                        "uncertainty": r["uncertainty"],
+                        "al_rank": i,
+                    },
+                    "predictions": [
+                        {
+                            "model_version": model_version,
+                            "score": round(1 - r["uncertainty"], 4),
+                            "result": ls_result(det, det.names),
+                        }
+                    ],
+                }
+            )
+        for start in range(0, len(tasks), 100):
+            client.import_tasks(args.project, tasks[start : start + 100])
+        print(
+            f"\n✓ {len(tasks)} tasks queued in project {args.project} (model {model_version})"
+        )
+    print(f"Ranking: {output / 'ranking.json'}")
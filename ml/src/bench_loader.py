@@ -0,0 +1,94 @@
+"""
+Per-epoch image loading time: decoding PNG/JPG (what Ultralytics'
+load_image does every epoch) vs slicing the memory-mapped training cache.
+
+Both paths copy each image into a mosaic canvas, as the Mosaic augmentation
+does, so the comparison includes touching the pixels. Augmentation and the
+forward/backward pass cost the same with either path and are not measured.
+
+Usage:
+    python src/bench_loader.py --data datasets/manual_v3/data.yaml --epochs 3
+"""
+
+import argparse
+import math
+import statistics
+import tempfile
+import time
+from pathlib import Path
+
+import cv2
+import numpy as np
+
+from train_cache import TrainCache, image_files, load_data_yaml
+
+
+def decode_epoch(files, imgsz: int, canvas: np.ndarray) -> None:
+    for f in files:
+        image = cv2.imread(str(f))
+        h0, w0 = image.shape[:2]
+        r = imgsz / max(h0, w0)
+        if r != 1:
+            w, h = min(math.ceil(w0 * r), imgsz), min(math.ceil(h0 * r), imgsz)
+            image = cv2.resize(image, (w, h), interpolation=cv2.INTER_LINEAR)
+        canvas[: image.shape[0], : image.shape[1]] = image
+
+
+def cache_epoch(cache: TrainCache, canvas: np.ndarray) -> None:
+    for i in range(len(cache)):
+        image = cache.image(i)
+        canvas[: image.shape[0], : image.shape[1]] = image
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(
+        description="Benchmark decode vs cached image loading"
+    )
+    parser.add_argument("--data", type=Path, required=True, help="Dataset YAML file")
+    parser.add_argument("--split", type=str, default="train")
+    parser.add_argument("--imgsz", type=int, default=640)
+    parser.add_argument("--epochs", type=int, default=3)
+    parser.add_argument(
+        "--cache-dir",
+        type=Path,
+        default=None,
+        help="Cache directory (default: temporary)",
+    )
+    args = parser.parse_args()
+
+    config = load_data_yaml(args.data)
+    images_dir = config["path"] / config[args.split]
+    files = image_files(images_dir)
+    canvas = np.full((args.imgsz * 2, args.imgsz * 2, 3), 114, dtype=np.uint8)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        start = time.perf_counter()
+        cache = TrainCache.build(
+            images_dir, args.imgsz, args.cache_dir or Path(tmp), config
+        )
+        build_s = time.perf_counter() - start
+
+        decode, cached = [], []
+        for _ in range(args.epochs):
+            start = time.perf_counter()
+            decode_epoch(files, args.imgsz, canvas)
+            decode.append(time.perf_counter() - start)
+            start = time.perf_counter()
+            cache_epoch(cache, canvas)
+            cached.append(time.perf_counter() - start)
+        del cache
+
+    decode_s, cached_s = statistics.median(decode), statistics.median(cached)
+    print(
+        f"{len(files)} images ({args.split}), imgsz={args.imgsz}, {args.epochs} epochs"
+    )
+    print(f"  cache build (once):   {build_s:.2f}s")
+    print(
+        f"  decode + resize:      {decode_s:.3f}s/epoch ({decode_s / len(files) * 1000:.2f} ms/image)"
+    )
+    print(
+        f"  memory-mapped cache:  {cached_s:.3f}s/epoch ({cached_s / len(files) * 1000:.2f} ms/image)"
+    )
+    print(
+        f"  saved per epoch:      {decode_s - cached_s:.3f}s ({decode_s / cached_s:.0f}x faster loading)"
+    )
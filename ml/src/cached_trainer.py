@@ -0,0 +1,88 @@
+"""
+Ultralytics pose trainer reading images and labels from the memory-mapped
+training cache (train_cache.py) instead of decoding PNG/JPG every epoch.
+
+Augmentations, batching and validation are unchanged: only `load_image`
+(decode + resize) and `get_labels` (label files + .cache) are replaced.
+
+    from cached_trainer import CachedPoseTrainer
+    CachedPoseTrainer.cache_dir = Path("datasets/.cache")
+    model.train(data=..., trainer=CachedPoseTrainer)
+"""
+
+import functools
+from pathlib import Path
+
+from ultralytics.data import build as data_build
+from ultralytics.data.dataset import YOLODataset
+from ultralytics.data.utils import img2label_paths
+from ultralytics.models.yolo.pose import PoseTrainer
+
+from train_cache import DEFAULT_CACHE_DIR, TrainCache, load_data_yaml
+
+
+class CachedPoseDataset(YOLODataset):
+    """YOLODataset whose images and labels come from a TrainCache."""
+
+    def __init__(self, *args, train_cache: TrainCache, **kwargs):
+        # Antes do super().__init__, que já chama get_labels
+        self.train_cache = train_cache
+        super().__init__(*args, **kwargs)
+
+    def get_labels(self):
+        self.label_files = img2label_paths(self.im_files)
+        missing = [f for f in self.im_files if self.train_cache.index(f) is None]
+        if missing:
+            raise FileNotFoundError(
+                f"{len(missing)} images not in {self.train_cache.directory} "
+                f"(e.g. {missing[0]}); delete the cache to rebuild it"
+            )
+        self.cache_rows = [self.train_cache.index(f) for f in self.im_files]
+        return [
+            {
+                "im_file": im_file,
+                **self.train_cache.labels(row),
+                "segments": [],
+                "normalized": True,
+                "bbox_format": "xywh",
+            }
+            for im_file, row in zip(self.im_files, self.cache_rows)
+        ]
+
+    def load_image(self, i, rect_mode=True):
+        if not rect_mode:
+            return super().load_image(i, rect_mode)
+        row = self.cache_rows[i]
+        image = self.train_cache.image(row)
+        if self.augment:
+            # Mesmo buffer do load_image original: o Mosaic sorteia imagens dele
+            self.buffer.append(i)
+            if 1 < len(self.buffer) >= self.max_buffer_length:
+                self.buffer.pop(0)
+        return image, self.train_cache.shape(row), image.shape[:2]
+
+
+class CachedPoseTrainer(PoseTrainer):
+    """PoseTrainer building its datasets from TrainCache (built on first use)."""
+
+    cache_dir: Path = DEFAULT_CACHE_DIR
+
+    def build_dataset(self, img_path, mode="train", batch=None):
+        config = load_data_yaml(self.args.data)
+        train_cache = TrainCache.build(
+            img_path,
+            self.args.imgsz,
+            self.cache_dir,
+            config,
+            Path(self.args.data).parent.name,
+        )
+        # build_yolo_dataset monta o YOLODataset com os argumentos da versão
+        # instalada; só a classe é trocada durante a chamada
+        original = data_build.YOLODataset
+        data_build.YOLODataset = functools.partial(
+            CachedPoseDataset, train_cache=train_cache
+        )
+        try:
+            return super().build_dataset(img_path, mode, batch)
+        finally:
+            data_build.YOLODataset = original
@@ -1,110 +1,337 @@
 #!/usr/bin/env python3
 """
-Script para remover bounding boxes de 'fluxo_seta' via API do Label Studio.
-Necessário caso use o modelo de pre-labeling que adiciona essas caixas.
-Mantém os keypoints intactos, remove apenas os rectanglelabels.
+Script para limpar anotações via API do Label Studio.
+
+Por padrão remove as bounding boxes de 'fluxo_seta' (necessário caso use o
+modelo de pre-labeling que adiciona essas caixas), mantendo os keypoints
+intactos. Outras regras podem ser combinadas com --rule, na ordem dada:
+
+    drop-arrow-boxes           rectanglelabels de fluxo_seta (padrão)
+    drop-label:NOME            qualquer região com o label NOME
+    drop-small-boxes:AREA      retângulos com área < AREA (% da imagem)
+    dedupe                     regiões repetidas (mesmo tipo, label e posição)
+    modulo:funcao              regra própria: funcao(result) -> result
+
+As tasks são buscadas página a página e as anotações alteradas são
+enviadas em paralelo (pool de conexões, rate limit e retries do
+ls_client.py). Com --dry-run nada é enviado: só mostra o diff.
+
+Credenciais: --url/--token ou LABEL_STUDIO_URL/LABEL_STUDIO_API_KEY
+(Account & Settings → Access Token).
+
+Uso:
+    python src/clean.py --project 4 --dry-run
+    python src/clean.py --project 4 --rule drop-arrow-boxes --rule dedupe --workers 8 --rate-limit 20
+
+Para testar sem um Label Studio de verdade, veja src/ls_stub.py.
 """
 
-import requests
+import argparse
+import importlib
 import json
+import sys
+from collections import Counter
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from typing import Callable, Dict, Iterator, List, Optional, Tuple
+
+import requests
+
+from ls_client import LabelStudioClient
+
+Rule = Callable[[List[Dict]], List[Dict]]
+
+# nome -> fábrica(argumento opcional) -> regra
+RULES: Dict[str, Callable[[Optional[str]], Rule]] = {}
+
+
+def register(name: str):
+    """Registra uma fábrica de regra com o nome usado em --rule."""
+
+    def decorator(factory):
+        RULES[name] = factory
+        return factory
+
+    return decorator
+
+
+def item_labels(item: Dict) -> List[str]:
+    """Labels de um item do result (a chave é o próprio tipo)."""
+    return item.get("value", {}).get(item.get("type", ""), [])
+
 
-# ============ CONFIGURAÇÕES ============
-LABEL_STUDIO_URL = "http://localhost:8080"  # Ajuste se necessário
-API_TOKEN = "8dba6f8133bbc0846649312fdce0b9e6898005f4"  # Pegue em: Account & Settings → Access Token (Roda localmente, então não há risco de expor no GitHub :D)
-PROJECT_ID = 4  # ID do seu projeto (veja na URL quando abrir o projeto)
+@register("drop-arrow-boxes")
+def drop_arrow_boxes(arg: Optional[str] = None) -> Rule:
+    """Remove rectanglelabels de fluxo_seta; as setas vivem nos keypoints."""
 
-# =======================================
+    def rule(result):
+        return [
+            item
+            for item in result
+            if not (
+                item.get("type") == "rectanglelabels"
+                and "fluxo_seta" in item_labels(item)
+            )
+        ]
 
-headers = {"Authorization": f"Token {API_TOKEN}", "Content-Type": "application/json"}
+    return rule
 
 
-def get_all_tasks(project_id):
-    """Busca todas as tasks do projeto"""
-    url = f"{LABEL_STUDIO_URL}/api/projects/{project_id}/tasks"
-    response = requests.get(url, headers=headers)
-    response.raise_for_status()
-    return response.json()
+@register("drop-label")
+def drop_label(arg: Optional[str] = None) -> Rule:
+    """Remove qualquer região (retângulo ou keypoint) com o label dado."""
+    if not arg:
+        raise ValueError("drop-label precisa do nome do label: drop-label:NOME")
+    return lambda result: [item for item in result if arg not in item_labels(item)]
 
 
-def update_annotation(annotation_id, cleaned_result):
-    """Atualiza uma anotação específica"""
-    url = f"{LABEL_STUDIO_URL}/api/annotations/{annotation_id}"
-    data = {"result": cleaned_result}
-    response = requests.patch(url, headers=headers, json=data)
-    response.raise_for_status()
-    return response.json()
+@register("drop-small-boxes")
+def drop_small_boxes(arg: Optional[str] = None) -> Rule:
+    """Remove retângulos com área menor que arg (% da imagem, padrão 0.01)."""
+    min_area = float(arg) if arg else 0.01
 
+    def rule(result):
+        return [
+            item
+            for item in result
+            if item.get("type") != "rectanglelabels"
+            or item["value"].get("width", 0) * item["value"].get("height", 0) / 100
+            >= min_area
+        ]
 
-def clean_fluxo_seta_boxes(tasks):
-    """Remove bounding boxes de fluxo_seta das anotações"""
-    removed_count = 0
-    updated_annotations = 0
+    return rule
 
+
+@register("dedupe")
+def dedupe(arg: Optional[str] = None) -> Rule:
+    """Remove regiões repetidas (mesmo tipo, label e coordenadas)."""
+
+    def rule(result):
+        seen = set()
+        kept = []
+        for item in result:
+            value = item.get("value", {})
+            key = (
+                item.get("from_name"),
+                item.get("type"),
+                tuple(item_labels(item)),
+                *(round(value.get(k, 0), 4) for k in ("x", "y", "width", "height")),
+            )
+            if key in seen:
+                continue
+            seen.add(key)
+            kept.append(item)
+        return kept
+
+    return rule
+
+
+def load_rule(spec: str) -> Rule:
+    """'nome[:arg]' do registro ou 'modulo:funcao' importável."""
+    name, _, arg = spec.partition(":")
+    if name in RULES:
+        return RULES[name](arg or None)
+    if arg:
+        return getattr(importlib.import_module(name), arg)
+    raise ValueError(
+        f"Regra desconhecida: {spec} (disponíveis: {', '.join(sorted(RULES))})"
+    )
+
+
+def apply_rules(result: List[Dict], rules: List[Rule]) -> List[Dict]:
+    for rule in rules:
+        result = rule(result)
+    return result
+
+
+def describe(item: Dict) -> str:
+    value = item.get("value", {})
+    labels = ",".join(item_labels(item)) or "?"
+    coords = " ".join(
+        f"{k}={value[k]:.2f}" for k in ("x", "y", "width", "height") if k in value
+    )
+    return f"{item.get('type')} [{labels}] {coords}"
+
+
+def diff(original: List[Dict], cleaned: List[Dict]) -> Tuple[List[Dict], List[Dict]]:
+    """(removidos, adicionados), comparando os itens serializados (com repetição)."""
+    remaining = Counter(json.dumps(item, sort_keys=True) for item in cleaned)
+    removed = []
+    for item in original:
+        key = json.dumps(item, sort_keys=True)
+        if remaining[key]:
+            remaining[key] -= 1
+        else:
+            removed.append(item)
+    added = [json.loads(key) for key, count in remaining.items() for _ in range(count)]
+    return removed, added
+
+
+def plan_updates(
+    tasks: Iterator[Dict], rules: List[Rule]
+) -> Iterator[Tuple[Dict, Dict, List[Dict]]]:
+    """(task, anotação, result limpo) para cada anotação que muda."""
     for task in tasks:
-        task_id = task["id"]
+        for annotation in task.get("annotations") or []:
+            original = annotation.get("result", [])
+            cleaned = apply_rules(original, rules)
+            if cleaned != original:
+                yield task, annotation, cleaned
+
 
-        # Busca anotações da task
-        if "annotations" not in task or not task["annotations"]:
-            continue
+def run(
+    client: LabelStudioClient,
+    project_id: int,
+    rules: List[Rule],
+    workers: int = 8,
+    page_size: int = 100,
+    dry_run: bool = False,
+) -> Dict[str, int]:
+    stats = {"tasks": 0, "annotations": 0, "removed": 0, "added": 0, "failed": 0}
 
-        for annotation in task["annotations"]:
-            annotation_id = annotation["id"]
-            original_result = annotation.get("result", [])
+    def counted(tasks):
+        for task in tasks:
+            stats["tasks"] += 1
+            yield task
 
-            # Filtra: remove rectanglelabels que contenham fluxo_seta
-            cleaned_result = []
-            boxes_removed = 0
+    def report(task, annotation, cleaned):
+        removed, added = diff(annotation.get("result", []), cleaned)
+        stats["removed"] += len(removed)
+        stats["added"] += len(added)
+        print(
+            f"Task {task['id']}, Annotation {annotation['id']}: "
+            f"-{len(removed)} +{len(added)} região(ões)"
+        )
+        if dry_run:
+            for item in removed:
+                print(f"    - {describe(item)}")
+            for item in added:
+                print(f"    + {describe(item)}")
 
-            for item in original_result:
-                # Mantém se NÃO for um rectanglelabel com fluxo_seta
-                if item.get("type") == "rectanglelabels":
-                    labels = item.get("value", {}).get("rectanglelabels", [])
-                    if "fluxo_seta" in labels:
-                        boxes_removed += 1
-                        continue  # Pula este item (não adiciona ao cleaned_result)
+    updates = plan_updates(counted(client.iter_tasks(project_id, page_size)), rules)
+    if dry_run:
+        for task, annotation, cleaned in updates:
+            stats["annotations"] += 1
+            report(task, annotation, cleaned)
+        return stats
 
-                cleaned_result.append(item)
+    # No máximo workers*4 PATCHes em voo: a paginação segue em paralelo sem
+    # acumular o projeto inteiro em memória
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        pending = {}
 
-            # Se removeu algo, atualiza a anotação
-            if boxes_removed > 0:
-                print(
-                    f"Task {task_id}, Annotation {annotation_id}: removendo {boxes_removed} bbox(es) de fluxo_seta"
-                )
-                update_annotation(annotation_id, cleaned_result)
-                removed_count += boxes_removed
-                updated_annotations += 1
+        def collect(done):
+            for future in done:
+                task, annotation, cleaned = pending.pop(future)
+                try:
+                    future.result()
+                except requests.exceptions.RequestException as e:
+                    stats["failed"] += 1
+                    print(f"✗ Task {task['id']}, Annotation {annotation['id']}: {e}")
+                    continue
+                stats["annotations"] += 1
+                report(task, annotation, cleaned)
 
-    return removed_count, updated_annotations
+        for task, annotation, cleaned in updates:
+            if len(pending) >= workers * 4:
+                done, _ = wait(pending, return_when=FIRST_COMPLETED)
+                collect(done)
+            future = pool.submit(client.update_annotation, annotation["id"], cleaned)
+            pending[future] = (task, annotation, cleaned)
+        collect(list(pending))
+
+    return stats
 
 
 def main():
-    print(f"Conectando ao Label Studio em {LABEL_STUDIO_URL}...")
-    print(f"Buscando tasks do projeto {PROJECT_ID}...\n")
+    parser = argparse.ArgumentParser(
+        description="Clean Label Studio annotations with pluggable rules"
+    )
+    parser.add_argument(
+        "--project", type=int, required=True, help="Project ID (see the project URL)"
+    )
+    parser.add_argument(
+        "--url",
+        type=str,
+        default=None,
+        help="Label Studio URL (default: LABEL_STUDIO_URL)",
+    )
+    parser.add_argument(
+        "--token",
+        type=str,
+        default=None,
+        help="API token (default: LABEL_STUDIO_API_KEY)",
+    )
+    parser.add_argument(
+        "--rule",
+        action="append",
+        default=None,
+        help="Cleanup rule, repeatable and applied in order (default: drop-arrow-boxes)",
+    )
+    parser.add_argument(
+        "--workers", type=int, default=8, help="Concurrent PATCH requests"
+    )
+    parser.add_argument(
+        "--rate-limit", type=float, default=None, help="Max requests per second"
+    )
+    parser.add_argument(
+        "--retries",
+        type=int,
+        default=3,
+        help="Retries on connection errors, 429 and 5xx",
+    )
+    parser.add_argument("--page-size", type=int, default=100, help="Tasks per page")
+    parser.add_argument(
+        "--dry-run", action="store_true", help="Only print the diff, do not update"
+    )
+    args = parser.parse_args()
 
+    specs = args.rule or ["drop-arrow-boxes"]
     try:
-        tasks = get_all_tasks(PROJECT_ID)
-        print(f"✓ Encontradas {len(tasks)} tasks\n")
-
-        print("Removendo bounding boxes de 'fluxo_seta'...")
-        removed, updated = clean_fluxo_seta_boxes(tasks)
+        rules = [load_rule(spec) for spec in specs]
+        client = LabelStudioClient(
+            args.url,
+            args.token,
+            pool_size=args.workers,
+            rate_limit=args.rate_limit,
+            retries=args.retries,
+        )
+    except (ValueError, ImportError, AttributeError) as e:
+        print(f"✗ {e}")
+        sys.exit(2)
 
-        print(f"\n{'='*50}")
-        print(f"✓ Concluído!")
-        print(f"  - {removed} bounding box(es) removido(s)")
-        print(f"  - {updated} anotação(ões) atualizada(s)")
-        print(f"{'='*50}\n")
+    print(f"Conectando ao Label Studio em {client.url}...")
+    print(f"Regras: {', '.join(specs)}{' (dry-run)' if args.dry_run else ''}\n")
 
+    try:
+        stats = run(
+            client, args.project, rules, args.workers, args.page_size, args.dry_run
+        )
     except requests.exceptions.RequestException as e:
         print(f"\n✗ Erro na API: {e}")
         print("\nVerifique:")
         print("  1. Label Studio está rodando?")
         print("  2. URL está correta?")
         print("  3. Token de API está válido?")
-        print("  4. PROJECT_ID está correto?")
+        print("  4. --project está correto?")
+        sys.exit(1)
+
+    verb = "a atualizar" if args.dry_run else "atualizada(s)"
+    print(f"\n{'='*50}")
+    print(f"✓ Concluído!{' (nada foi enviado)' if args.dry_run else ''}")
+    print(f"  - {stats['tasks']} task(s) lida(s)")
+    print(
+        f"  - {stats['removed']} região(ões) removida(s), {stats['added']} adicionada(s)"
+    )
+    print(f"  - {stats['annotations']} anotação(ões) {verb}")
+    if stats["failed"]:
+        print(f"  - {stats['failed']} anotação(ões) com falha")
+    print(f"{'='*50}\n")
+    if stats["failed"]:
+        sys.exit(1)
 
 
 if __name__ == "__main__":
     print("\n" + "=" * 50)
-    print("  REMOVEDOR DE BBOXES FLUXO_SETA")
+    print("  LIMPEZA DE ANOTAÇÕES DO LABEL STUDIO")
     print("=" * 50 + "\n")
     main()
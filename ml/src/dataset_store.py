@@ -0,0 +1,535 @@
+"""
+Content-addressed store for dataset images and labels.
+
+Every image and label file is stored once under its SHA-256
+(`datasets/.store/objects/ab/<sha256>.<ext>`). A dataset version is a small
+JSON manifest (`datasets/.store/manifests/<name>.json`) listing, for each
+image, its original file name, image blob, label blob and split. Versions
+are materialized as hardlink (or symlink) trees in the layout Ultralytics
+reads, with a generated data.yaml, so a new version costs only its manifest.
+
+Blobs are made read-only: a tool that rewrites an image in place (Ultralytics
+re-saves corrupt JPEGs) fails on that image instead of silently changing it
+in every version that shares it.
+
+Usage:
+    # Import an existing YOLO tree (train/images or images/train layouts),
+    # replacing its copies with hardlinks to the store
+    python src/dataset_store.py ingest datasets/manual_v3 --replace
+
+    # New version from existing ones (later sources win on the same file name)
+    python src/dataset_store.py create manual_v4 --from manual_v3 --add datasets/new_batch
+
+    # Materialize for training and point train.py at the generated data.yaml
+    python src/dataset_store.py materialize manual_v4 --out datasets/manual_v4
+    python src/dataset_store.py list
+    python src/dataset_store.py gc
+"""
+
+import argparse
+import hashlib
+import json
+import os
+import shutil
+import stat
+import time
+from pathlib import Path
+from typing import Dict, Iterable, List, Optional, Tuple
+
+import yaml
+
+DEFAULT_STORE = Path(__file__).parent.parent / "datasets" / ".store"
+
+IMAGE_EXTENSIONS = {".png", ".jpg", ".jpeg", ".bmp", ".webp"}
+SPLITS = ("train", "val", "test")
+
+# Mesmo conjunto de classes de ls_to_yolo.py e dos data.yaml existentes
+DEFAULT_NAMES = {
+    0: "boundary",
+    1: "cache",
+    2: "database",
+    3: "external_service",
+    4: "load_balancer",
+    5: "monitoring",
+    6: "security",
+    7: "service",
+    8: "user",
+    9: "fluxo_seta",
+}
+DEFAULT_KPT_SHAPE = [2, 3]
+
+
+def file_sha256(path: Path, chunk_size: int = 1 << 20) -> str:
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(chunk_size), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+class DatasetStore:
+    """Blob store plus manifests for YOLO dataset versions."""
+
+    def __init__(self, root: Path = DEFAULT_STORE):
+        self.root = Path(root)
+        self.objects = self.root / "objects"
+        self.manifests = self.root / "manifests"
+
+    # ---- blobs ----
+
+    def object_path(self, key: str) -> Path:
+        """Path of a blob given its key (`<sha256><ext>`)."""
+        return self.objects / key[:2] / key
+
+    def put_file(self, path: Path, replace: bool = False) -> str:
+        """
+        Add a file to the store.
+
+        Args:
+            path: File to add
+            replace: Replace `path` with a hardlink to the stored blob, so the
+                original copy no longer takes disk space
+
+        Returns:
+            Blob key (`<sha256><ext>`)
+        """
+        path = Path(path)
+        key = file_sha256(path) + path.suffix.lower()
+        target = self.object_path(key)
+        if not target.exists():
+            target.parent.mkdir(parents=True, exist_ok=True)
+            tmp = target.with_name(f"{key}.{os.getpid()}.tmp")
+            try:
+                if not replace:
+                    raise OSError
+                os.link(
+                    path, tmp
+                )  # o arquivo vai virar link para o blob de qualquer forma
+            except OSError:
+                shutil.copyfile(path, tmp)
+            os.chmod(tmp, stat.S_IRUSR | stat.S_IRGRP | stat.S_IROTH)
+            os.replace(tmp, target)
+        if replace and not os.path.samefile(path, target):
+            _link(target, path, "hardlink")
+        return key
+
+    def put_bytes(self, data: bytes, ext: str) -> str:
+        """Add in-memory content (e.g. a generated label file); returns its key."""
+        key = hashlib.sha256(data).hexdigest() + ext.lower()
+        target = self.object_path(key)
+        if not target.exists():
+            target.parent.mkdir(parents=True, exist_ok=True)
+            tmp = target.with_name(f"{key}.{os.getpid()}.tmp")
+            tmp.write_bytes(data)
+            os.chmod(tmp, stat.S_IRUSR | stat.S_IRGRP | stat.S_IROTH)
+            os.replace(tmp, target)
+        return key
+
+    # ---- manifests ----
+
+    def manifest_path(self, name: str) -> Path:
+        return self.manifests / f"{name}.json"
+
+    def load_manifest(self, name: str) -> Dict:
+        path = self.manifest_path(name)
+        if not path.exists():
+            raise FileNotFoundError(
+                f"Dataset version '{name}' not found in {self.manifests}"
+            )
+        return json.loads(path.read_text(encoding="utf-8"))
+
+    def save_manifest(
+        self,
+        name: str,
+        items: Iterable[Dict],
+        names: Optional[Dict[int, str]] = None,
+        kpt_shape: Optional[List[int]] = None,
+        parents: Optional[List[str]] = None,
+        extra: Optional[Dict] = None,
+    ) -> Dict:
+        """
+        Write a dataset version manifest.
+
+        Args:
+            name: Version name (e.g. manual_v4)
+            items: Dicts with `name` (file name in the tree), `image` and
+                `label` (blob keys; `label` may be None) and `split`
+            names: Class names (defaults to DEFAULT_NAMES)
+            kpt_shape: Keypoint shape (defaults to [2, 3])
+            parents: Versions this one was derived from
+            extra: Additional fields stored as-is (e.g. converter state)
+
+        Returns:
+            The manifest
+        """
+        manifest = {
+            "name": name,
+            "created_at": time.strftime("%Y-%m-%dT%H:%M:%S"),
+            "parents": parents or [],
+            "names": {str(k): v for k, v in (names or DEFAULT_NAMES).items()},
+            "kpt_shape": kpt_shape or DEFAULT_KPT_SHAPE,
+            "items": sorted(items, key=lambda item: (item["split"], item["name"])),
+            **(extra or {}),
+        }
+        self.manifests.mkdir(parents=True, exist_ok=True)
+        tmp = self.manifest_path(name).with_suffix(".json.tmp")
+        tmp.write_text(json.dumps(manifest, indent=1), encoding="utf-8")
+        os.replace(tmp, self.manifest_path(name))
+        return manifest
+
+    def list_manifests(self) -> List[Dict]:
+        if not self.manifests.exists():
+            return []
+        return [
+            json.loads(path.read_text(encoding="utf-8"))
+            for path in sorted(self.manifests.glob("*.json"))
+        ]
+
+    # ---- import / export ----
+
+    def scan_yolo_dir(
+        self, dataset_dir: Path, replace: bool = False
+    ) -> Tuple[List[Dict], Optional[Dict[int, str]], Optional[List[int]]]:
+        """
+        Add the files of an existing YOLO dataset tree to the store.
+
+        Both layouts used in this repo are accepted (`train/images` and
+        `images/train`); class names and kpt_shape come from its data.yaml.
+
+        Args:
+            dataset_dir: Dataset directory
+            replace: Replace the tree's files with hardlinks to the store
+
+        Returns:
+            (manifest items, class names, kpt_shape); the last two are None
+            without a data.yaml
+        """
+        dataset_dir = Path(dataset_dir)
+        items = [
+            {
+                "name": image.name,
+                "image": self.put_file(image, replace=replace),
+                "label": self.put_file(label, replace=replace) if label else None,
+                "split": split,
+            }
+            for split, image, label in _yolo_tree_items(dataset_dir)
+        ]
+        if not items:
+            raise ValueError(f"No images found in {dataset_dir}")
+
+        names, kpt_shape = None, None
+        data_yaml = dataset_dir / "data.yaml"
+        if data_yaml.exists():
+            config = yaml.safe_load(data_yaml.read_text(encoding="utf-8")) or {}
+            names = {int(k): v for k, v in (config.get("names") or {}).items()} or None
+            kpt_shape = config.get("kpt_shape")
+        return items, names, kpt_shape
+
+    def ingest_yolo_dir(
+        self, dataset_dir: Path, name: Optional[str] = None, replace: bool = False
+    ) -> Dict:
+        """Import a YOLO dataset tree as a version (see `scan_yolo_dir`)."""
+        items, names, kpt_shape = self.scan_yolo_dir(dataset_dir, replace)
+        return self.save_manifest(
+            name or Path(dataset_dir).name, items, names, kpt_shape
+        )
+
+    def materialize(self, name: str, out_dir: Path, mode: str = "hardlink") -> Path:
+        """
+        Build the Ultralytics tree of a version: `<split>/images`,
+        `<split>/labels` and data.yaml (with an absolute `path`).
+
+        Files already linked to the right blob are kept, stale ones removed,
+        so re-materializing after a small change is cheap.
+
+        Args:
+            name: Version name
+            out_dir: Output directory
+            mode: "hardlink" (falls back to symlink across filesystems),
+                "symlink" or "copy"
+
+        Returns:
+            Path of the generated data.yaml
+        """
+        manifest = self.load_manifest(name)
+        out_dir = Path(out_dir).resolve()
+        wanted: Dict[Path, Path] = {}
+        for item in manifest["items"]:
+            split_dir = out_dir / item["split"]
+            wanted[split_dir / "images" / item["name"]] = self.object_path(
+                item["image"]
+            )
+            if item.get("label"):
+                label_name = Path(item["name"]).stem + ".txt"
+                wanted[split_dir / "labels" / label_name] = self.object_path(
+                    item["label"]
+                )
+
+        for split in {item["split"] for item in manifest["items"]}:
+            for sub in ("images", "labels"):
+                sub_dir = out_dir / split / sub
+                if not sub_dir.exists():
+                    continue
+                for existing in sub_dir.iterdir():
+                    if existing not in wanted and existing.suffix != ".cache":
+                        existing.unlink()
+
+        for dst, src in wanted.items():
+            if dst.exists() or dst.is_symlink():
+                if _same_file(src, dst):
+                    continue
+                dst.unlink()
+            dst.parent.mkdir(parents=True, exist_ok=True)
+            _link(src, dst, mode)
+
+        return write_data_yaml(
+            out_dir,
+            {item["split"] for item in manifest["items"]},
+            {int(k): v for k, v in manifest["names"].items()},
+            manifest["kpt_shape"],
+            f"Generated by dataset_store.py from manifest '{name}'",
+            extra={"manifest_sha256": manifest_hash(manifest)},
+        )
+
+    # ---- maintenance ----
+
+    def gc(self, dry_run: bool = False) -> Tuple[int, int]:
+        """
+        Remove blobs no manifest references.
+
+        Returns:
+            (removed blobs, bytes freed)
+        """
+        referenced = set()
+        for manifest in self.list_manifests():
+            for item in manifest["items"]:
+                referenced.add(item["image"])
+                if item.get("label"):
+                    referenced.add(item["label"])
+        removed, freed = 0, 0
+        if not self.objects.exists():
+            return removed, freed
+        for blob in self.objects.glob("*/*"):
+            if blob.name not in referenced:
+                removed += 1
+                freed += blob.stat().st_size
+                if not dry_run:
+                    blob.unlink()
+        return removed, freed
+
+    def stats(self) -> Dict[str, int]:
+        """Logical bytes (sum over all versions) vs bytes actually stored."""
+        sizes = {}
+        if self.objects.exists():
+            sizes = {
+                blob.name: blob.stat().st_size for blob in self.objects.glob("*/*")
+            }
+        logical = 0
+        for manifest in self.list_manifests():
+            for item in manifest["items"]:
+                logical += sizes.get(item["image"], 0) + sizes.get(
+                    item.get("label") or "", 0
+                )
+        return {
+            "blobs": len(sizes),
+            "stored_bytes": sum(sizes.values()),
+            "logical_bytes": logical,
+        }
+
+
+def manifest_hash(manifest: Dict) -> str:
+    """
+    Hash of a version's contents (files, splits, classes), independent of its
+    name and creation time. Written to data.yaml as `manifest_sha256` so
+    derived caches (train_cache.py) know when the dataset changed.
+    """
+    content = {key: manifest[key] for key in ("names", "kpt_shape", "items")}
+    return hashlib.sha256(
+        json.dumps(content, sort_keys=True).encode("utf-8")
+    ).hexdigest()
+
+
+def write_data_yaml(
+    out_dir: Path,
+    splits: Iterable[str],
+    names: Dict[int, str],
+    kpt_shape: List[int],
+    comment: str,
+    extra: Optional[Dict] = None,
+) -> Path:
+    """data.yaml of a `<split>/images` tree, with an absolute `path`."""
+    out_dir = Path(out_dir).resolve()
+    config = {
+        "path": str(out_dir),
+        **{split: f"{split}/images" for split in sorted(splits, key=SPLITS.index)},
+        "names": dict(names),
+        "kpt_shape": kpt_shape,
+        **(extra or {}),
+    }
+    data_yaml = out_dir / "data.yaml"
+    data_yaml.write_text(
+        f"# {comment}\n" + yaml.safe_dump(config, sort_keys=False), encoding="utf-8"
+    )
+    return data_yaml
+
+
+def _yolo_tree_items(dataset_dir: Path):
+    """(split, image, label or None) for both `split/images` and `images/split` layouts."""
+    for split in SPLITS:
+        for images_dir, labels_dir in (
+            (dataset_dir / split / "images", dataset_dir / split / "labels"),
+            (dataset_dir / "images" / split, dataset_dir / "labels" / split),
+        ):
+            if not images_dir.is_dir():
+                continue
+            for image in sorted(images_dir.iterdir()):
+                if image.suffix.lower() not in IMAGE_EXTENSIONS:
+                    continue
+                label = labels_dir / f"{image.stem}.txt"
+                yield split, image, label if label.exists() else None
+
+
+def _same_file(a: Path, b: Path) -> bool:
+    try:
+        return os.path.samefile(a, b)
+    except OSError:
+        return False
+
+
+def _link(src: Path, dst: Path, mode: str) -> None:
+    """Create `dst` pointing at `src` atomically (replacing any existing file)."""
+    tmp = dst.with_name(f".{dst.name}.{os.getpid()}.tmp")
+    if mode == "hardlink":
+        try:
+            os.link(src, tmp)
+        except OSError:
+            # Outro filesystem (ou sem suporte a hardlink): usa symlink
+            os.symlink(src.resolve(), tmp)
+    elif mode == "symlink":
+        os.symlink(src.resolve(), tmp)
+    else:
+        shutil.copyfile(src, tmp)
+    os.replace(tmp, dst)
+
+
+def _format_bytes(n: int) -> str:
+    for unit in ("B", "KB", "MB", "GB"):
+        if n < 1024 or unit == "GB":
+            return f"{n:.1f} {unit}" if unit != "B" else f"{n} B"
+        n /= 1024
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Content-addressed dataset store")
+    parser.add_argument(
+        "--store", type=Path, default=DEFAULT_STORE, help="Store directory"
+    )
+    sub = parser.add_subparsers(dest="command", required=True)
+
+    ingest = sub.add_parser("ingest", help="Import YOLO dataset trees as versions")
+    ingest.add_argument("dirs", type=Path, nargs="+", help="Dataset directories")
+    ingest.add_argument(
+        "--name", type=str, default=None, help="Version name (one dir only)"
+    )
+    ingest.add_argument(
+        "--replace",
+        action="store_true",
+        help="Replace the trees' files with hardlinks to the store (frees the duplicates)",
+    )
+
+    create = sub.add_parser(
+        "create", help="Create a version from existing versions/trees"
+    )
+    create.add_argument("name", type=str, help="New version name")
+    create.add_argument(
+        "--from", dest="bases", nargs="*", default=[], help="Versions to start from"
+    )
+    create.add_argument(
+        "--add", nargs="*", type=Path, default=[], help="YOLO trees to add on top"
+    )
+    create.add_argument(
+        "--exclude", nargs="*", default=[], help="File names to leave out"
+    )
+
+    materialize = sub.add_parser(
+        "materialize", help="Build the tree + data.yaml of a version"
+    )
+    materialize.add_argument("name", type=str, help="Version name")
+    materialize.add_argument(
+        "--out", type=Path, default=None, help="Output dir (default: datasets/<name>)"
+    )
+    materialize.add_argument(
+        "--mode", choices=["hardlink", "symlink", "copy"], default="hardlink"
+    )
+
+    sub.add_parser("list", help="List versions and disk usage")
+    gc = sub.add_parser("gc", help="Delete blobs no version references")
+    gc.add_argument("--dry-run", action="store_true")
+
+    args = parser.parse_args()
+    store = DatasetStore(args.store)
+
+    if args.command == "ingest":
+        if args.name and len(args.dirs) > 1:
+            parser.error("--name can only be used with a single directory")
+        for dataset_dir in args.dirs:
+            start = time.perf_counter()
+            manifest = store.ingest_yolo_dir(
+                dataset_dir, args.name, replace=args.replace
+            )
+            print(
+                f"✓ {manifest['name']}: {len(manifest['items'])} images "
+                f"({time.perf_counter() - start:.2f}s)"
+            )
+
+    elif args.command == "create":
+        start = time.perf_counter()
+        items: Dict[str, Dict] = {}
+        names, kpt_shape = None, None
+        for base in args.bases:
+            manifest = store.load_manifest(base)
+            names = names or {int(k): v for k, v in manifest["names"].items()}
+            kpt_shape = kpt_shape or manifest["kpt_shape"]
+            items.update({item["name"]: item for item in manifest["items"]})
+        for dataset_dir in args.add:
+            added, added_names, added_kpt_shape = store.scan_yolo_dir(dataset_dir)
+            names = names or added_names
+            kpt_shape = kpt_shape or added_kpt_shape
+            items.update({item["name"]: item for item in added})
+        for excluded in args.exclude:
+            items.pop(excluded, None)
+        manifest = store.save_manifest(
+            args.name, items.values(), names, kpt_shape, parents=args.bases
+        )
+        print(
+            f"✓ {args.name}: {len(manifest['items'])} images "
+            f"({time.perf_counter() - start:.2f}s)"
+        )
+
+    elif args.command == "materialize":
+        start = time.perf_counter()
+        out_dir = args.out or DEFAULT_STORE.parent / args.name
+        data_yaml = store.materialize(args.name, out_dir, args.mode)
+        print(f"✓ {data_yaml} ({time.perf_counter() - start:.2f}s)")
+
+    elif args.command == "list":
+        for manifest in store.list_manifests():
+            counts: Dict[str, int] = {}
+            for item in manifest["items"]:
+                counts[item["split"]] = counts.get(item["split"], 0) + 1
+            splits = ", ".join(f"{k}={v}" for k, v in sorted(counts.items()))
+            print(f"{manifest['name']:<24} {manifest['created_at']}  {splits}")
+        usage = store.stats()
+        print(
+            f"\n{usage['blobs']} blobs, {_format_bytes(usage['stored_bytes'])} stored "
+            f"for {_format_bytes(usage['logical_bytes'])} across all versions"
+        )
+
+    elif args.command == "gc":
+        removed, freed = store.gc(dry_run=args.dry_run)
+        verb = "Would remove" if args.dry_run else "Removed"
+        print(f"{verb} {removed} blobs ({_format_bytes(freed)})")
+
+
+if __name__ == "__main__":
+    main()
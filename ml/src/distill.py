@@ -0,0 +1,334 @@
+"""
+Knowledge distillation of a YOLO-pose teacher (yolo11m-pose) into a small
+student (n/s) for CPU serving.
+
+The student trains on the ground-truth labels as usual (v8 pose loss) plus
+a distillation term that matches, anchor by anchor, the teacher's raw head
+outputs on the same augmented batch:
+
+- classes: BCE against the teacher's softened class probabilities
+- boxes: KL divergence between the DFL bin distributions (L2 without DFL)
+- keypoints: L2 between the raw keypoint outputs
+
+Box and keypoint terms are weighted by the teacher's confidence at each
+anchor, so background anchors do not dominate. Student and teacher must
+share the head layout (same family, classes, keypoints and imgsz).
+
+The student is trained into `runs/detect/<student>_<dataset>_kd_vN`, where
+YOLOModel discovers it, and the run ends with student vs teacher mAP50 and
+CPU latency side by side (also saved to distill_report.json in the run).
+
+Usage:
+    python src/distill.py --data datasets/manual_v3/data.yaml --student yolo11n-pose.pt
+    python src/distill.py --data datasets/manual_v3/data.yaml --student yolo11s-pose.pt \\
+        --teacher runs/detect/yolo11m-pose_manual_v3_v1/weights/best.pt --kd-weight 2
+"""
+
+import argparse
+import json
+import statistics
+import time
+from pathlib import Path
+from typing import Dict, List, Optional
+
+import torch
+import torch.nn.functional as F
+from ultralytics.models import YOLO
+from ultralytics.models.yolo.pose import PoseTrainer
+
+from train import get_experiment_name
+
+DEFAULT_TEACHER = (
+    Path(__file__).parent.parent
+    / "runs"
+    / "detect"
+    / "yolo11m-pose_manual_v3_v1"
+    / "weights"
+    / "best.pt"
+)
+
+
+def head_outputs(preds, reg_max: int, nc: int):
+    """
+    (box, cls, kpt) per anchor from a pose model's raw outputs: box is
+    (B, 4 * reg_max, A), cls (B, nc, A) and kpt (B, nkpt * ndim, A).
+
+    Accepts the training-mode output (feature maps, keypoints), the
+    eval-mode output (decoded, raw) and the dict form of newer heads.
+    """
+    if (
+        isinstance(preds, (tuple, list))
+        and len(preds) == 2
+        and not torch.is_tensor(preds[1])
+    ):
+        preds = preds[1]  # eval: (decodificado, bruto)
+    if isinstance(preds, dict):
+        preds = preds.get("one2many", preds)
+        return preds["boxes"], preds["scores"], preds["kpts"]
+    feats, kpt = preds
+    batch = feats[0].shape[0]
+    x = torch.cat([f.view(batch, reg_max * 4 + nc, -1) for f in feats], 2)
+    box, cls = x.split((reg_max * 4, nc), 1)
+    return box, cls, kpt
+
+
+class DistillationLoss:
+    """
+    Student criterion plus the distillation term (see module docstring).
+
+    Returns the same (loss, loss_items) as the student criterion, so the
+    trainer, the logged columns and validation are unchanged; the average
+    distillation term per epoch is kept in `kd_sum / kd_count`.
+    """
+
+    def __init__(
+        self,
+        criterion,
+        teacher: torch.nn.Module,
+        reg_max: int,
+        nc: int,
+        weight: float = 1.0,
+        temperature: float = 2.0,
+    ):
+        self.criterion = criterion
+        self.teacher = teacher
+        self.reg_max = reg_max
+        self.nc = nc
+        self.weight = weight
+        self.temperature = temperature
+        self.kd_sum = 0.0
+        self.kd_count = 0
+
+    def distill(self, student_preds, teacher_preds) -> torch.Tensor:
+        s_box, s_cls, s_kpt = head_outputs(student_preds, self.reg_max, self.nc)
+        t_box, t_cls, t_kpt = head_outputs(teacher_preds, self.reg_max, self.nc)
+        if s_box.shape != t_box.shape or s_kpt.shape != t_kpt.shape:
+            raise ValueError(
+                f"Teacher and student heads differ ({tuple(t_box.shape)} vs {tuple(s_box.shape)}); "
+                "use the same family, dataset and imgsz"
+            )
+        T = self.temperature
+        s_box, s_cls, s_kpt = s_box.float(), s_cls.float(), s_kpt.float()
+        t_box, t_cls, t_kpt = t_box.float(), t_cls.float(), t_kpt.float()
+
+        cls_loss = (
+            F.binary_cross_entropy_with_logits(s_cls / T, (t_cls / T).sigmoid()) * T * T
+        )
+
+        # Peso por anchor: confiança do professor (fundo quase não conta)
+        weight = t_cls.sigmoid().amax(1)  # (B, A)
+        norm = weight.sum().clamp(min=1.0)
+        batch, _, anchors = s_box.shape
+        if self.reg_max > 1:
+            s_dist = s_box.view(batch, 4, self.reg_max, anchors)
+            t_dist = t_box.view(batch, 4, self.reg_max, anchors)
+            box = (
+                F.kl_div(
+                    F.log_softmax(s_dist / T, 2),
+                    F.softmax(t_dist / T, 2),
+                    reduction="none",
+                )
+                .sum(2)
+                .mean(1)
+                * T
+                * T
+            )
+        else:
+            box = (s_box - t_box).pow(2).mean(1)
+        box_loss = (box * weight).sum() / norm
+        kpt_loss = ((s_kpt - t_kpt).pow(2).mean(1) * weight).sum() / norm
+        return cls_loss + box_loss + kpt_loss
+
+    def __call__(self, preds, batch):
+        loss, loss_items = self.criterion(preds, batch)
+        with torch.no_grad():
+            teacher_preds = self.teacher(batch["img"])
+        kd = self.distill(preds, teacher_preds)
+        self.kd_sum += float(kd.detach())
+        self.kd_count += 1
+        # Mesma escala do critério do Ultralytics (soma x batch size)
+        return loss.sum() + self.weight * kd * batch["img"].shape[0], loss_items
+
+
+class DistillPoseTrainer(PoseTrainer):
+    """PoseTrainer whose training loss includes distillation from `teacher`."""
+
+    teacher: str = str(DEFAULT_TEACHER)
+    kd_weight: float = 1.0
+    temperature: float = 2.0
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.distillation: Optional[DistillationLoss] = None
+        # Depois do setup: o EMA (que vai para o checkpoint) já foi copiado do
+        # modelo, então nem o critério nem o professor entram no best.pt
+        self.add_callback("on_pretrain_routine_end", self._install_distillation)
+        self.add_callback("on_train_epoch_end", self._log_distillation)
+
+    def _install_distillation(self, trainer) -> None:
+        teacher = YOLO(self.teacher).model.to(self.device).eval()
+        for p in teacher.parameters():
+            p.requires_grad_(False)
+        model = self.model.module if hasattr(self.model, "module") else self.model
+        head = model.model[-1]
+        self.distillation = DistillationLoss(
+            model.init_criterion(),
+            teacher,
+            reg_max=head.reg_max,
+            nc=head.nc,
+            weight=self.kd_weight,
+            temperature=self.temperature,
+        )
+        model.criterion = self.distillation
+
+    def _log_distillation(self, trainer) -> None:
+        if self.distillation and self.distillation.kd_count:
+            kd = self.distillation.kd_sum / self.distillation.kd_count
+            print(f"  distillation loss (epoch {self.epoch + 1}): {kd:.4f}")
+            self.distillation.kd_sum, self.distillation.kd_count = 0.0, 0
+
+
+def cpu_latency_ms(model: YOLO, images: List[Path], imgsz: int, runs: int = 3) -> Dict:
+    """Per-image CPU predict latency (p50/p95 in ms) over the given images."""
+    model.predict(str(images[0]), imgsz=imgsz, device="cpu", verbose=False)  # warmup
+    times = []
+    for _ in range(runs):
+        for image in images:
+            start = time.perf_counter()
+            model.predict(str(image), imgsz=imgsz, device="cpu", verbose=False)
+            times.append((time.perf_counter() - start) * 1000)
+    times.sort()
+    return {
+        "p50_ms": round(statistics.median(times), 1),
+        "p95_ms": round(times[min(len(times) - 1, int(len(times) * 0.95))], 1),
+    }
+
+
+def evaluate(
+    weights: str, data: str, imgsz: int, batch: int, images: List[Path]
+) -> Dict:
+    # Pesos carregados uma vez; parâmetros contados antes do val (que funde Conv+BN)
+    model = YOLO(weights)
+    params = sum(p.numel() for p in model.model.parameters())
+    metrics = model.val(data=data, imgsz=imgsz, batch=batch, plots=False, verbose=False)
+    return {
+        "weights": weights,
+        "params_m": round(params / 1e6, 2),
+        "box_mAP50": round(float(metrics.box.map50), 4),
+        "box_mAP50-95": round(float(metrics.box.map), 4),
+        "pose_mAP50": round(float(metrics.pose.map50), 4),
+        **cpu_latency_ms(model, images, imgsz),
+    }
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(
+        description="Distill a YOLO-pose teacher into a small student"
+    )
+    parser.add_argument(
+        "--data", type=str, required=True, help="Path to the dataset YAML file"
+    )
+    parser.add_argument(
+        "--student",
+        type=str,
+        default="yolo11n-pose.pt",
+        help="Student model (n or s size)",
+    )
+    parser.add_argument(
+        "--teacher", type=str, default=str(DEFAULT_TEACHER), help="Teacher weights"
+    )
+    parser.add_argument("--epochs", type=int, default=100)
+    parser.add_argument("--imgsz", type=int, default=640)
+    parser.add_argument("--batch", type=int, default=24)
+    parser.add_argument(
+        "--kd-weight", type=float, default=1.0, help="Weight of the distillation term"
+    )
+    parser.add_argument(
+        "--temperature", type=float, default=2.0, help="Softening of teacher outputs"
+    )
+    parser.add_argument(
+        "--cache-dir",
+        type=Path,
+        default=None,
+        help="Memory-mapped image cache (train_cache.py)",
+    )
+    parser.add_argument(
+        "--latency-images", type=int, default=20, help="Val images used for CPU latency"
+    )
+    args = parser.parse_args()
+
+    script_dir = Path(__file__).parent
+    experiments_dir = script_dir.parent / "runs" / "detect"
+    experiments_dir.mkdir(parents=True, exist_ok=True)
+    experiment_name = get_experiment_name(
+        args.student, args.data, experiments_dir, suffix="_kd"
+    )
+
+    trainer = DistillPoseTrainer
+    if args.cache_dir:
+        from cached_trainer import CachedPoseTrainer
+
+        CachedPoseTrainer.cache_dir = args.cache_dir
+        trainer = type(
+            "CachedDistillPoseTrainer", (DistillPoseTrainer, CachedPoseTrainer), {}
+        )
+    trainer.teacher = args.teacher
+    trainer.kd_weight = args.kd_weight
+    trainer.temperature = args.temperature
+
+    local = Path("models") / args.student
+    student = YOLO(str(local) if local.exists() else args.student)
+
+    print("Starting distillation...")
+    print(f"Teacher: {args.teacher}")
+    print(f"Student: {args.student}")
+    print(f"Training dataset: {args.data}")
+    print(f"Experiment name: {experiment_name}")
+    print("-" * 80)
+
+    student.train(
+        data=args.data,
+        epochs=args.epochs,
+        imgsz=args.imgsz,
+        batch=args.batch,
+        name=experiment_name,
+        project=str(experiments_dir),
+        trainer=trainer,
+    )
+
+    from train_cache import image_files, load_data_yaml
+
+    config = load_data_yaml(Path(args.data))
+    images = image_files(config["path"] / config["val"])[: args.latency_images]
+    run_dir = experiments_dir / experiment_name
+    report = {
+        "teacher": evaluate(args.teacher, args.data, args.imgsz, args.batch, images),
+        "student": evaluate(
+            str(run_dir / "weights" / "best.pt"),
+            args.data,
+            args.imgsz,
+            args.batch,
+            images,
+        ),
+        "kd_weight": args.kd_weight,
+        "temperature": args.temperature,
+    }
+    (run_dir / "distill_report.json").write_text(json.dumps(report, indent=2))
+
+    print("=" * 80)
+    print(
+        f"{'':<10}{'params':>9}{'box mAP50':>11}{'pose mAP50':>12}{'CPU p50':>10}{'CPU p95':>10}"
+    )
+    for role in ("teacher", "student"):
+        r = report[role]
+        print(
+            f"{role:<10}{r['params_m']:>8}M{r['box_mAP50']:>11.4f}{r['pose_mAP50']:>12.4f}"
+            f"{r['p50_ms']:>8}ms{r['p95_ms']:>8}ms"
+        )
+    t, s = report["teacher"], report["student"]
+    print(
+        f"\nStudent keeps {s['box_mAP50'] / max(t['box_mAP50'], 1e-9):.0%} of the teacher's box mAP50 "
+        f"at {t['p50_ms'] / s['p50_ms']:.1f}x lower CPU latency"
+    )
+    print(f"Published: {run_dir / 'weights' / 'best.pt'} (model '{experiment_name}')")
+    print("=" * 80)
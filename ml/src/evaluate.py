@@ -0,0 +1,682 @@
+"""
+Offline evaluation of every trained model and runtime variant on a held-out
+split, as deployed: accuracy, end-to-end graph accuracy and CPU latency.
+
+For each (model, runtime, imgsz) variant:
+
+- box/pose mAP with Ultralytics' validator
+- graph accuracy: the backend's GraphBuilder runs on the predictions
+  (backend confidence threshold) and on the ground-truth labels; nodes are
+  matched by type and IoU, and node/edge precision, recall and F1 are
+  micro-averaged over the split
+- CPU latency p50/p90/p99 of predict on decoded images
+
+Runtimes: `pytorch` (best.pt), `onnx` (exported per imgsz) and `onnx-int8`
+(dynamic quantization of the ONNX export, needs onnxruntime). Exports are
+kept in `weights/exports/<imgsz>/` of each run and reused while newer than
+best.pt.
+
+Exports and accuracy run in parallel worker processes with a thread budget
+each; latency runs one variant at a time, pinned to the same budget, so the
+variants do not slow each other down. The leaderboard (leaderboard.json and
+leaderboard.html, with the latency vs accuracy Pareto front) goes to
+`runs/evaluation/<timestamp>`.
+
+Usage:
+    python src/evaluate.py --data datasets/manual_v3/data.yaml
+    python src/evaluate.py --data datasets/manual_v3/data.yaml \\
+        --models yolo11n-pose_manual_v3_v1 yolo11s-pose_manual_v3_kd_v1 \\
+        --runtimes pytorch onnx --imgsz 480 640 --parallel 2 --threads 4
+"""
+
+import argparse
+import html
+import importlib.util
+import json
+import multiprocessing
+import os
+import shutil
+import statistics
+import sys
+import time
+from collections import Counter
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+
+import cv2
+import numpy as np
+
+from train_cache import image_files, label_file, load_data_yaml, read_label
+
+# Mesmo GraphBuilder e Detections do backend: a acurácia do grafo é a que o
+# usuário vê
+BACKEND_DIR = Path(__file__).parent.parent.parent / "backend"
+sys.path.insert(0, str(BACKEND_DIR))
+from models.detections import Detections  # noqa: E402
+from services.graph_builder import GraphBuilder  # noqa: E402
+
+RUNS_DIR = Path(__file__).parent.parent / "runs" / "detect"
+DEFAULT_OUTPUT = Path(__file__).parent.parent / "runs" / "evaluation"
+
+RUNTIMES = ("pytorch", "onnx", "onnx-int8")
+
+# Colunas que podem ser o eixo de acurácia do Pareto
+METRICS = (
+    "edge_f1",
+    "node_f1",
+    "box_mAP50",
+    "box_mAP50-95",
+    "pose_mAP50",
+    "pose_mAP50-95",
+)
+
+
+def discover_models(runs_dir: Path = RUNS_DIR) -> Dict[str, Path]:
+    """Trained runs with weights (same layout YOLOModel discovers)."""
+    return {
+        p.parent.parent.name: p
+        for p in sorted(Path(runs_dir).glob("*/weights/best.pt"))
+    }
+
+
+def resolve_models(
+    names: Optional[List[str]], runs_dir: Path = RUNS_DIR
+) -> Dict[str, Path]:
+    """Run names or .pt paths given on the command line (all runs if empty)."""
+    discovered = discover_models(runs_dir)
+    if not names:
+        return discovered
+    models = {}
+    for name in names:
+        if name in discovered:
+            models[name] = discovered[name]
+        elif Path(name).is_file():
+            path = Path(name)
+            models[
+                path.parent.parent.name if path.parent.name == "weights" else path.stem
+            ] = path
+        else:
+            raise FileNotFoundError(
+                f"Model not found: {name} (runs in {runs_dir} or a .pt file)"
+            )
+    return models
+
+
+def limit_threads(threads: int, pin: bool = False) -> None:
+    """Thread budget of this process (before importing torch); `pin` also sets CPU affinity."""
+    for var in ("OMP_NUM_THREADS", "MKL_NUM_THREADS", "OPENBLAS_NUM_THREADS"):
+        os.environ[var] = str(threads)
+    cv2.setNumThreads(threads)
+    if pin and hasattr(os, "sched_setaffinity"):
+        # O onnxruntime ignora OMP_NUM_THREADS; a afinidade limita qualquer runtime
+        cpus = sorted(os.sched_getaffinity(0))
+        os.sched_setaffinity(0, cpus[:threads])
+    import torch
+
+    torch.set_num_threads(threads)
+
+
+def export_path(weights: Path, runtime: str, imgsz: int) -> Path:
+    if runtime == "pytorch":
+        return weights
+    directory = weights.parent / "exports" / str(imgsz)
+    return directory / ("best.onnx" if runtime == "onnx" else "best_int8.onnx")
+
+
+def is_fresh(path: Path, source: Path) -> bool:
+    return path.exists() and path.stat().st_mtime >= source.stat().st_mtime
+
+
+def export_job(job: Dict) -> Dict:
+    """
+    Export the ONNX (and int8) variants of one model at one imgsz, if stale.
+
+    Errors are returned per runtime: a failed ONNX export also fails int8
+    (quantized from it), a failed quantization only fails int8.
+    """
+    limit_threads(job["threads"])
+    from ultralytics.models import YOLO
+
+    weights = Path(job["weights"])
+    onnx_path = export_path(weights, "onnx", job["imgsz"])
+    int8_path = export_path(weights, "onnx-int8", job["imgsz"])
+    try:
+        if not is_fresh(onnx_path, weights):
+            # Cópia do .pt por imgsz: o export escreve ao lado do checkpoint e
+            # exports paralelos do mesmo modelo não podem colidir
+            onnx_path.parent.mkdir(parents=True, exist_ok=True)
+            local = onnx_path.with_suffix(".pt")
+            shutil.copy2(weights, local)
+            exported = YOLO(str(local)).export(
+                format="onnx", imgsz=job["imgsz"], verbose=False
+            )
+            os.replace(exported, onnx_path)
+            local.unlink()
+    except Exception as e:
+        error = f"{type(e).__name__}: {e}"
+        return {**job, "errors": {"onnx": error, "onnx-int8": error}}
+    try:
+        if job["int8"] and not is_fresh(int8_path, onnx_path):
+            import onnx
+            from onnxruntime.quantization import QuantType, quantize_dynamic
+
+            quantize_dynamic(
+                str(onnx_path), str(int8_path), weight_type=QuantType.QUInt8
+            )
+            # names/imgsz/task do Ultralytics ficam nos metadados do modelo
+            source, quantized = onnx.load(str(onnx_path)), onnx.load(str(int8_path))
+            del quantized.metadata_props[:]
+            quantized.metadata_props.extend(source.metadata_props)
+            onnx.save(quantized, str(int8_path))
+    except Exception as e:
+        return {**job, "errors": {"onnx-int8": f"{type(e).__name__}: {e}"}}
+    return job
+
+
+def ground_truth(
+    image: Path, shape: Tuple[int, int], kpt_shape: List[int]
+) -> Detections:
+    """Label file of an image as Detections in pixels (confidence 1)."""
+    cls, bboxes, keypoints = read_label(label_file(image), kpt_shape)
+    h, w = shape
+    xy, wh = bboxes[:, :2] * [w, h], bboxes[:, 2:] * [w, h]
+    keypoints = keypoints.copy()
+    keypoints[..., :2] *= [w, h]
+    if keypoints.shape[-1] == 2:
+        keypoints = np.concatenate([keypoints, np.ones_like(keypoints[..., :1])], -1)
+    return Detections(
+        xyxy=np.concatenate([xy - wh / 2, xy + wh / 2], 1),
+        conf=np.ones(len(cls), dtype=np.float32),
+        cls=cls[:, 0],
+        keypoints=keypoints,
+        orig_shape=shape,
+    )
+
+
+def box_iou(a: List[float], b: List[float]) -> float:
+    iw = max(0.0, min(a[2], b[2]) - max(a[0], b[0]))
+    ih = max(0.0, min(a[3], b[3]) - max(a[1], b[1]))
+    inter = iw * ih
+    union = (a[2] - a[0]) * (a[3] - a[1]) + (b[2] - b[0]) * (b[3] - b[1]) - inter
+    return inter / union if union > 0 else 0.0
+
+
+def match_nodes(pred_nodes, gt_nodes, iou_threshold: float = 0.5) -> Dict[str, str]:
+    """Greedy one-to-one matching (highest IoU first) of nodes of the same type."""
+    pairs = sorted(
+        (
+            (box_iou(p.bbox, g.bbox), p.id, g.id)
+            for p in pred_nodes
+            for g in gt_nodes
+            if p.type == g.type
+        ),
+        reverse=True,
+    )
+    matches, used = {}, set()
+    for iou, pred_id, gt_id in pairs:
+        if iou < iou_threshold:
+            break
+        if pred_id not in matches and gt_id not in used:
+            matches[pred_id] = gt_id
+            used.add(gt_id)
+    return matches
+
+
+def graph_counts(pred_graph, gt_graph, iou_threshold: float = 0.5) -> Counter:
+    """True positives and totals of nodes and directed edges of one image."""
+    matches = match_nodes(pred_graph.nodes, gt_graph.nodes, iou_threshold)
+    gt_edges = Counter((e.source, e.target) for e in gt_graph.edges)
+    edge_tp = 0
+    for e in pred_graph.edges:
+        key = (matches.get(e.source), matches.get(e.target))
+        if gt_edges[key] > 0:
+            gt_edges[key] -= 1
+            edge_tp += 1
+    return Counter(
+        node_tp=len(matches),
+        node_pred=len(pred_graph.nodes),
+        node_gt=len(gt_graph.nodes),
+        edge_tp=edge_tp,
+        edge_pred=len(pred_graph.edges),
+        edge_gt=len(gt_graph.edges),
+    )
+
+
+def prf(tp: int, pred: int, gt: int) -> Tuple[float, float, float]:
+    precision = tp / pred if pred else 0.0
+    recall = tp / gt if gt else 0.0
+    f1 = 2 * precision * recall / (precision + recall) if precision + recall else 0.0
+    return round(precision, 4), round(recall, 4), round(f1, 4)
+
+
+def accuracy_job(job: Dict) -> Dict:
+    """mAP and graph accuracy of one variant over the evaluation split."""
+    limit_threads(job["threads"])
+    from ultralytics.models import YOLO
+
+    try:
+        model = YOLO(job["path"], task="pose")
+        metrics = model.val(
+            data=job["data"],
+            split=job["split"],
+            imgsz=job["imgsz"],
+            batch=job["batch"] if job["runtime"] == "pytorch" else 1,
+            device=job["device"],
+            workers=0,
+            plots=False,
+            verbose=False,
+            project=str(Path(job["output"]) / "val"),
+            name=job["id"],
+            exist_ok=True,
+        )
+        builder = GraphBuilder()
+        counts = Counter()
+        for image in map(Path, job["images"]):
+            results = model.predict(
+                str(image),
+                imgsz=job["imgsz"],
+                conf=job["conf"],
+                device=job["device"],
+                verbose=False,
+            )[0]
+            pred = builder.build_graph(Detections.from_results(results))
+            gt = builder.build_graph(
+                ground_truth(image, results.orig_shape, job["kpt_shape"])
+            )
+            counts += graph_counts(pred, gt, job["iou"])
+    except Exception as e:
+        return {"id": job["id"], "error": f"{type(e).__name__}: {e}"}
+
+    node_p, node_r, node_f1 = prf(
+        counts["node_tp"], counts["node_pred"], counts["node_gt"]
+    )
+    edge_p, edge_r, edge_f1 = prf(
+        counts["edge_tp"], counts["edge_pred"], counts["edge_gt"]
+    )
+    return {
+        "id": job["id"],
+        "box_mAP50": round(float(metrics.box.map50), 4),
+        "box_mAP50-95": round(float(metrics.box.map), 4),
+        "pose_mAP50": round(float(metrics.pose.map50), 4),
+        "pose_mAP50-95": round(float(metrics.pose.map), 4),
+        "node_precision": node_p,
+        "node_recall": node_r,
+        "node_f1": node_f1,
+        "edge_precision": edge_p,
+        "edge_recall": edge_r,
+        "edge_f1": edge_f1,
+        "edges_gt": counts["edge_gt"],
+    }
+
+
+def percentile(values: List[float], q: float) -> float:
+    values = sorted(values)
+    return values[min(len(values) - 1, int(len(values) * q))]
+
+
+def latency_job(job: Dict) -> Dict:
+    """CPU predict latency (decoded images, pre + inference + post) of one variant."""
+    limit_threads(job["threads"], pin=True)
+    from ultralytics.models import YOLO
+
+    try:
+        model = YOLO(job["path"], task="pose")
+        images = [cv2.imread(p) for p in job["latency_images"]]
+        for image in images[:3]:  # warmup
+            model.predict(
+                image, imgsz=job["imgsz"], conf=job["conf"], device="cpu", verbose=False
+            )
+        times = []
+        for _ in range(job["runs"]):
+            for image in images:
+                start = time.perf_counter()
+                model.predict(
+                    image,
+                    imgsz=job["imgsz"],
+                    conf=job["conf"],
+                    device="cpu",
+                    verbose=False,
+                )
+                times.append((time.perf_counter() - start) * 1000)
+    except Exception as e:
+        return {"id": job["id"], "error": f"{type(e).__name__}: {e}"}
+    return {
+        "id": job["id"],
+        "latency_p50_ms": round(statistics.median(times), 2),
+        "latency_p90_ms": round(percentile(times, 0.90), 2),
+        "latency_p99_ms": round(percentile(times, 0.99), 2),
+        "latency_mean_ms": round(statistics.fmean(times), 2),
+    }
+
+
+def pareto_front(rows: List[Dict], metric: str) -> List[Dict]:
+    """Rows no other row beats on both latency (lower) and `metric` (higher)."""
+    valid = [
+        r
+        for r in rows
+        if r.get(metric) is not None and r.get("latency_p50_ms") is not None
+    ]
+    front, best = [], -1.0
+    for r in sorted(valid, key=lambda r: (r["latency_p50_ms"], -r[metric])):
+        if r[metric] > best:
+            front.append(r)
+            best = r[metric]
+    return front
+
+
+def _scatter_svg(
+    rows: List[Dict], metric: str, width: int = 720, height: int = 420
+) -> str:
+    points = [
+        r
+        for r in rows
+        if r.get(metric) is not None and r.get("latency_p50_ms") is not None
+    ]
+    if not points:
+        return "<p>No variant has both latency and accuracy.</p>"
+    margin = 56
+    max_x = max(r["latency_p50_ms"] for r in points) * 1.1
+    min_y = min(r[metric] for r in points)
+    max_y = max(r[metric] for r in points)
+    span_y = (max_y - min_y) or 1.0
+    min_y, max_y = max(0.0, min_y - span_y * 0.1), max_y + span_y * 0.1
+
+    def sx(v: float) -> float:
+        return margin + v / max_x * (width - 2 * margin)
+
+    def sy(v: float) -> float:
+        return height - margin - (v - min_y) / (max_y - min_y) * (height - 2 * margin)
+
+    colors = {"pytorch": "#1f77b4", "onnx": "#2ca02c", "onnx-int8": "#ff7f0e"}
+    parts = [
+        f'<svg width="{width}" height="{height}" xmlns="http://www.w3.org/2000/svg">',
+        f'<line x1="{margin}" y1="{height - margin}" x2="{width - margin}" y2="{height - margin}" stroke="#333"/>',
+        f'<line x1="{margin}" y1="{margin}" x2="{margin}" y2="{height - margin}" stroke="#333"/>',
+        f'<text x="{width / 2}" y="{height - 16}" text-anchor="middle">CPU latency p50 (ms)</text>',
+        f'<text x="16" y="{height / 2}" text-anchor="middle" transform="rotate(-90 16 {height / 2})">'
+        f"{html.escape(metric)}</text>",
+    ]
+    for i in range(5):
+        x, y = max_x * i / 4, min_y + (max_y - min_y) * i / 4
+        parts.append(
+            f'<text x="{sx(x)}" y="{height - margin + 16}" text-anchor="middle" font-size="11">{x:.0f}</text>'
+        )
+        parts.append(
+            f'<text x="{margin - 6}" y="{sy(y) + 4}" text-anchor="end" font-size="11">{y:.2f}</text>'
+        )
+    front = [r for r in points if r["pareto"]]
+    if len(front) > 1:
+        path = " ".join(
+            f"{sx(r['latency_p50_ms']):.1f},{sy(r[metric]):.1f}" for r in front
+        )
+        parts.append(
+            f'<polyline points="{path}" fill="none" stroke="#d62728" stroke-dasharray="4 3"/>'
+        )
+    for r in points:
+        stroke = ' stroke="#d62728" stroke-width="2"' if r["pareto"] else ""
+        label = html.escape(
+            f"{r['model']} {r['runtime']} {r['imgsz']}: {r['latency_p50_ms']} ms, {r[metric]}"
+        )
+        parts.append(
+            f'<circle cx="{sx(r["latency_p50_ms"]):.1f}" cy="{sy(r[metric]):.1f}" r="6" '
+            f'fill="{colors.get(r["runtime"], "#7f7f7f")}"{stroke}><title>{label}</title></circle>'
+        )
+    parts.append("</svg>")
+    return "\n".join(parts)
+
+
+def write_html(report: Dict, path: Path) -> None:
+    """Self-contained HTML leaderboard: Pareto scatter plus the full table."""
+    metric, rows = report["metric"], report["rows"]
+    columns = [
+        "model",
+        "runtime",
+        "imgsz",
+        "size_mb",
+        *METRICS[2:],
+        "node_f1",
+        "edge_precision",
+        "edge_recall",
+        "edge_f1",
+        "latency_p50_ms",
+        "latency_p90_ms",
+        "latency_p99_ms",
+    ]
+    header = "".join(f"<th>{html.escape(c)}</th>" for c in columns)
+    body = []
+    for r in rows:
+        cells = "".join(f"<td>{html.escape(str(r.get(c, '')))}</td>" for c in columns)
+        error = (
+            f'<td class="error">{html.escape(r["error"])}</td>'
+            if r.get("error")
+            else "<td></td>"
+        )
+        body.append(
+            f'<tr class="{"pareto" if r.get("pareto") else ""}">{cells}{error}</tr>'
+        )
+    path.write_text(
+        f"""<!DOCTYPE html>
+<html><head><meta charset="utf-8"><title>Model evaluation</title>
+<style>
+body {{ font-family: sans-serif; margin: 24px; }}
+table {{ border-collapse: collapse; font-size: 13px; }}
+th, td {{ border: 1px solid #ccc; padding: 4px 8px; text-align: right; }}
+td:first-child, td:nth-child(2) {{ text-align: left; }}
+tr.pareto {{ background: #fdecea; font-weight: bold; }}
+td.error {{ color: #b00; text-align: left; }}
+</style></head><body>
+<h1>Model evaluation</h1>
+<p>Split <code>{html.escape(report["split"])}</code> of <code>{html.escape(report["data"])}</code>
+({report["images"]} images), {html.escape(report["created_at"])}.
+Pareto front (red): no other variant is both faster and better on <b>{html.escape(metric)}</b>.</p>
+{_scatter_svg(rows, metric)}
+<table><tr>{header}<th>error</th></tr>
+{chr(10).join(body)}
+</table></body></html>
+""",
+        encoding="utf-8",
+    )
+
+
+def print_leaderboard(rows: List[Dict], metric: str) -> None:
+    print(
+        f"{'':<2}{'model':<36}{'runtime':<11}{'imgsz':>6}{'box mAP50':>11}{'pose mAP50':>12}"
+        f"{'edge P':>8}{'edge R':>8}{'p50 ms':>9}{'p99 ms':>9}"
+    )
+    for r in rows:
+        if r.get("error"):
+            print(
+                f"  {r['model']:<36}{r['runtime']:<11}{r['imgsz']:>6}  ❌ {r['error'][:60]}"
+            )
+            continue
+        print(
+            f"{'★ ' if r['pareto'] else '  '}{r['model'][:35]:<36}{r['runtime']:<11}{r['imgsz']:>6}"
+            f"{r['box_mAP50']:>11.4f}{r['pose_mAP50']:>12.4f}"
+            f"{r['edge_precision']:>8.3f}{r['edge_recall']:>8.3f}"
+            f"{r['latency_p50_ms']:>9.1f}{r['latency_p99_ms']:>9.1f}"
+        )
+    print(f"★ = Pareto front (latency p50 vs {metric})")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(
+        description="Evaluate models and runtimes (mAP, graph accuracy, CPU latency)"
+    )
+    parser.add_argument("--data", type=Path, required=True, help="Dataset YAML file")
+    parser.add_argument(
+        "--split",
+        type=str,
+        default=None,
+        help="Held-out split (default: test if present, else val)",
+    )
+    parser.add_argument(
+        "--models",
+        nargs="*",
+        default=None,
+        help="Run names or .pt files (default: all runs)",
+    )
+    parser.add_argument(
+        "--runtimes", nargs="+", choices=RUNTIMES, default=list(RUNTIMES)
+    )
+    parser.add_argument(
+        "--imgsz", nargs="+", type=int, default=[640], help="Input sizes"
+    )
+    parser.add_argument(
+        "--parallel", type=int, default=2, help="Concurrent export/accuracy jobs"
+    )
+    parser.add_argument(
+        "--threads", type=int, default=4, help="Threads per job (and for latency)"
+    )
+    parser.add_argument(
+        "--device", type=str, default="cpu", help="Device for the accuracy pass"
+    )
+    parser.add_argument(
+        "--batch", type=int, default=16, help="Validation batch (PyTorch only)"
+    )
+    parser.add_argument(
+        "--conf",
+        type=float,
+        default=0.5,
+        help="Confidence for graphs and latency (backend default)",
+    )
+    parser.add_argument(
+        "--iou", type=float, default=0.5, help="IoU to match graph nodes"
+    )
+    parser.add_argument("--latency-images", type=int, default=20)
+    parser.add_argument("--latency-runs", type=int, default=3)
+    parser.add_argument(
+        "--metric", choices=METRICS, default="edge_f1", help="Pareto accuracy axis"
+    )
+    parser.add_argument("--output", type=Path, default=DEFAULT_OUTPUT)
+    args = parser.parse_args()
+
+    config = load_data_yaml(args.data)
+    split = args.split or ("test" if config.get("test") else "val")
+    images = image_files(config["path"] / config[split])
+    kpt_shape = list(config.get("kpt_shape") or [2, 3])
+    models = resolve_models(args.models)
+    if not models:
+        raise SystemExit(f"❌ No models found in {RUNS_DIR}")
+
+    runtimes = list(args.runtimes)
+    if "onnx-int8" in runtimes and importlib.util.find_spec("onnxruntime") is None:
+        print("⚠️  onnxruntime not installed: skipping onnx-int8")
+        runtimes.remove("onnx-int8")
+
+    output = args.output / time.strftime("%Y%m%d-%H%M%S")
+    output.mkdir(parents=True, exist_ok=True)
+    ctx = multiprocessing.get_context("spawn")
+    print(
+        f"{len(models)} models x {runtimes} x imgsz {args.imgsz} on {split} ({len(images)} images)"
+    )
+
+    # 1. Exports (ONNX/int8), reaproveitados entre avaliações
+    failed = {}
+    if any(r != "pytorch" for r in runtimes):
+        export_jobs = [
+            {
+                "weights": str(w),
+                "imgsz": s,
+                "int8": "onnx-int8" in runtimes,
+                "threads": args.threads,
+            }
+            for w in models.values()
+            for s in args.imgsz
+        ]
+        with ctx.Pool(args.parallel, maxtasksperchild=1) as pool:
+            for result in pool.imap_unordered(export_job, export_jobs):
+                for runtime, error in result.get("errors", {}).items():
+                    failed[(result["weights"], result["imgsz"], runtime)] = error
+                    print(
+                        f"❌ export {runtime} {result['weights']} @ {result['imgsz']}: {error}"
+                    )
+
+    rows = []
+    for name, weights in models.items():
+        for runtime in runtimes:
+            for imgsz in args.imgsz:
+                path = export_path(weights, runtime, imgsz)
+                row = {
+                    "id": f"{name}-{runtime}-{imgsz}",
+                    "model": name,
+                    "runtime": runtime,
+                    "imgsz": imgsz,
+                    "path": str(path),
+                }
+                error = failed.get((str(weights), imgsz, runtime))
+                if error:
+                    row["error"] = f"export: {error}"
+                else:
+                    row["size_mb"] = round(path.stat().st_size / 2**20, 1)
+                rows.append(row)
+    by_id = {r["id"]: r for r in rows}
+    todo = [r for r in rows if not r.get("error")]
+    common = {
+        "data": str(args.data),
+        "split": split,
+        "threads": args.threads,
+        "device": args.device,
+        "batch": args.batch,
+        "conf": args.conf,
+        "iou": args.iou,
+        "kpt_shape": kpt_shape,
+        "output": str(output),
+    }
+
+    # 2. Acurácia em paralelo (mAP + grafo)
+    start = time.perf_counter()
+    accuracy_jobs = [{**common, **r, "images": [str(p) for p in images]} for r in todo]
+    with ctx.Pool(args.parallel, maxtasksperchild=1) as pool:
+        for result in pool.imap_unordered(accuracy_job, accuracy_jobs):
+            by_id[result["id"]].update(result)
+            print(
+                f"  accuracy {result['id']}: {result.get('error') or result['edge_f1']}"
+            )
+    print(f"Accuracy: {time.perf_counter() - start:.0f}s")
+
+    # 3. Latência uma variante por vez: medições concorrentes se distorcem
+    latency_images = [str(p) for p in images[: args.latency_images]]
+    for r in todo:
+        if r.get("error"):
+            continue
+        job = {
+            **common,
+            **r,
+            "latency_images": latency_images,
+            "runs": args.latency_runs,
+        }
+        with ctx.Pool(1, maxtasksperchild=1) as pool:
+            result = pool.apply(latency_job, (job,))
+        by_id[result["id"]].update(result)
+        print(
+            f"  latency {result['id']}: {result.get('error') or result['latency_p50_ms']} ms"
+        )
+
+    front = {
+        r["id"]
+        for r in pareto_front([r for r in rows if not r.get("error")], args.metric)
+    }
+    for r in rows:
+        r["pareto"] = r["id"] in front
+    rows.sort(key=lambda r: (r.get("error") is not None, -(r.get(args.metric) or 0)))
+
+    report = {
+        "data": str(args.data),
+        "split": split,
+        "images": len(images),
+        "metric": args.metric,
+        "conf": args.conf,
+        "threads": args.threads,
+        "created_at": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "rows": rows,
+        "pareto": [r["id"] for r in rows if r["pareto"]],
+    }
+    (output / "leaderboard.json").write_text(
+        json.dumps(report, indent=2), encoding="utf-8"
+    )
+    write_html(report, output / "leaderboard.html")
+
+    print("=" * 80)
+    print_leaderboard(rows, args.metric)
+    print(f"\nLeaderboard: {output / 'leaderboard.html'}")
+    print("=" * 80)
@@ -0,0 +1,142 @@
+"""
+Small Label Studio REST client shared by the ml scripts.
+
+One pooled `requests.Session` per client (keep-alive across calls),
+automatic retries with backoff on connection errors, 429 and 5xx (only for
+idempotent methods), an optional request rate limit shared by all threads,
+and paginated task listing.
+
+Credentials come from the arguments or from the environment:
+
+    LABEL_STUDIO_URL      (default http://localhost:8080)
+    LABEL_STUDIO_API_KEY  Account & Settings -> Access Token
+"""
+
+import os
+import threading
+import time
+from typing import Dict, Iterator, List, Optional
+
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+DEFAULT_URL = "http://localhost:8080"
+
+
+class RateLimiter:
+    """At most `rate` calls per second across threads (None or 0: unlimited)."""
+
+    def __init__(self, rate: Optional[float] = None):
+        self.interval = 1.0 / rate if rate else 0.0
+        self.next_slot = 0.0
+        self.lock = threading.Lock()
+
+    def wait(self) -> None:
+        if not self.interval:
+            return
+        with self.lock:
+            now = time.monotonic()
+            slot = max(now, self.next_slot)
+            self.next_slot = slot + self.interval
+        # Dorme fora do lock: cada thread já reservou o seu horário
+        if slot > now:
+            time.sleep(slot - now)
+
+
+class LabelStudioClient:
+    """
+    Args:
+        url: Label Studio URL (default: LABEL_STUDIO_URL or localhost:8080)
+        token: API token (default: LABEL_STUDIO_API_KEY)
+        pool_size: Connections kept open (use the number of worker threads)
+        rate_limit: Max requests per second, shared by all threads
+        retries: Retries per request on connection errors, 429 and 5xx
+        timeout: Seconds per request
+    """
+
+    def __init__(
+        self,
+        url: Optional[str] = None,
+        token: Optional[str] = None,
+        pool_size: int = 8,
+        rate_limit: Optional[float] = None,
+        retries: int = 3,
+        timeout: float = 30.0,
+    ):
+        self.url = (url or os.environ.get("LABEL_STUDIO_URL") or DEFAULT_URL).rstrip(
+            "/"
+        )
+        token = token or os.environ.get("LABEL_STUDIO_API_KEY")
+        if not token:
+            raise ValueError(
+                "Label Studio token missing: pass --token or set LABEL_STUDIO_API_KEY"
+            )
+        self.timeout = timeout
+        self.limiter = RateLimiter(rate_limit)
+
+        # POST (import) fica fora: repetir criaria tasks duplicadas
+        retry = Retry(
+            total=retries,
+            backoff_factor=0.5,
+            status_forcelist=(429, 500, 502, 503, 504),
+            allowed_methods=frozenset({"GET", "PATCH", "PUT", "DELETE"}),
+            raise_on_status=False,
+        )
+        adapter = HTTPAdapter(
+            pool_connections=pool_size, pool_maxsize=pool_size, max_retries=retry
+        )
+        self.session = requests.Session()
+        self.session.mount("http://", adapter)
+        self.session.mount("https://", adapter)
+        self.session.headers.update(
+            {"Authorization": f"Token {token}", "Content-Type": "application/json"}
+        )
+
+    def request(self, method: str, path: str, **kwargs):
+        """JSON response of `method /api/...` (raises on HTTP errors)."""
+        self.limiter.wait()
+        response = self.session.request(
+            method, f"{self.url}{path}", timeout=self.timeout, **kwargs
+        )
+        response.raise_for_status()
+        return response.json() if response.content else None
+
+    def iter_tasks(self, project_id: int, page_size: int = 100) -> Iterator[Dict]:
+        """All tasks of a project (with annotations and predictions), page by page."""
+        page = 1
+        while True:
+            try:
+                data = self.request(
+                    "GET",
+                    "/api/tasks",
+                    params={
+                        "project": project_id,
+                        "page": page,
+                        "page_size": page_size,
+                        "fields": "all",
+                    },
+                )
+            except requests.HTTPError as e:
+                # Depois da última página o Label Studio responde 404
+                if (
+                    e.response is not None
+                    and e.response.status_code == 404
+                    and page > 1
+                ):
+                    return
+                raise
+            tasks = data.get("tasks", []) if isinstance(data, dict) else data
+            yield from tasks
+            if len(tasks) < page_size:
+                return
+            page += 1
+
+    def update_annotation(self, annotation_id: int, result: List[Dict]) -> Dict:
+        return self.request(
+            "PATCH", f"/api/annotations/{annotation_id}", json={"result": result}
+        )
+
+    def import_tasks(self, project_id: int, tasks: List[Dict]) -> Dict:
+        """Create tasks (with `predictions` attached); ids follow the list order."""
+        return self.request("POST", f"/api/projects/{project_id}/import", json=tasks)
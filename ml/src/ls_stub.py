@@ -0,0 +1,192 @@
+#!/usr/bin/env python3
+"""
+Servidor stub da API do Label Studio, para testar clean.py e
+active_learning.py sem um Label Studio de verdade.
+
+Carrega as tasks de um export JSON do Label Studio e implementa só o que o
+ls_client.py usa:
+
+    GET   /api/tasks?project=&page=&page_size=   (404 depois da última página)
+    PATCH /api/annotations/<id>                  ({"result": [...]})
+    POST  /api/projects/<id>/import              (lista de tasks)
+
+Falhas e latência podem ser injetadas (seed fixo) para exercitar os
+retries e o rate limit do cliente. Ao sair (Ctrl+C), as tasks com as
+alterações recebidas podem ser gravadas com --save e comparadas ao export
+original.
+
+Uso:
+    python src/ls_stub.py --tasks datasets/raw/ls.json --port 8081 --fail-rate 0.1
+    LABEL_STUDIO_URL=http://localhost:8081 LABEL_STUDIO_API_KEY=stub \\
+        python src/clean.py --project 4 --dry-run
+"""
+
+import argparse
+import json
+import random
+import re
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+from urllib.parse import parse_qs, urlparse
+
+
+class StubState:
+    """Tasks em memória, com índice das anotações por id."""
+
+    def __init__(
+        self, tasks, fail_rate: float = 0.0, latency_ms: float = 0.0, seed: int = 0
+    ):
+        self.tasks = tasks
+        self.annotations = {a["id"]: a for t in tasks for a in t.get("annotations", [])}
+        self.fail_rate = fail_rate
+        self.latency_ms = latency_ms
+        self.rng = random.Random(seed)
+        self.lock = threading.Lock()
+        self.counts = {"GET": 0, "PATCH": 0, "POST": 0, "failed": 0}
+
+    def should_fail(self) -> bool:
+        with self.lock:
+            return self.rng.random() < self.fail_rate
+
+
+def make_handler(state: StubState, token: str):
+    class Handler(BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1"  # keep-alive, como o Label Studio
+
+        def log_message(self, format, *args):
+            pass
+
+        def _send(self, status: int, body) -> None:
+            payload = json.dumps(body).encode("utf-8")
+            self.send_response(status)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(payload)))
+            self.end_headers()
+            self.wfile.write(payload)
+
+        def _body(self):
+            length = int(self.headers.get("Content-Length", 0))
+            return json.loads(self.rfile.read(length) or b"null")
+
+        def _check(self, method: str) -> bool:
+            """Autenticação, latência e falhas injetadas; False se já respondeu."""
+            # Corpo lido antes de responder: a conexão continua utilizável
+            self.body = self._body() if method != "GET" else None
+            with state.lock:
+                state.counts[method] += 1
+            if state.latency_ms:
+                time.sleep(state.latency_ms / 1000)
+            if token and self.headers.get("Authorization") != f"Token {token}":
+                self._send(401, {"detail": "Invalid token."})
+                return False
+            if state.should_fail():
+                with state.lock:
+                    state.counts["failed"] += 1
+                self._send(503, {"detail": "Injected failure"})
+                return False
+            return True
+
+        def do_GET(self):
+            if not self._check("GET"):
+                return
+            url = urlparse(self.path)
+            if url.path.rstrip("/") != "/api/tasks":
+                return self._send(404, {"detail": "Not found."})
+            query = parse_qs(url.query)
+            project = query.get("project", [None])[0]
+            page = int(query.get("page", ["1"])[0])
+            page_size = int(query.get("page_size", ["100"])[0])
+            tasks = [
+                t
+                for t in state.tasks
+                if project is None or str(t.get("project")) == project
+            ]
+            chunk = tasks[(page - 1) * page_size : page * page_size]
+            if not chunk and page > 1:
+                return self._send(404, {"detail": "Invalid page."})
+            self._send(200, {"tasks": chunk, "total": len(tasks)})
+
+        def do_PATCH(self):
+            if not self._check("PATCH"):
+                return
+            match = re.fullmatch(r"/api/annotations/(\d+)/?", urlparse(self.path).path)
+            annotation = state.annotations.get(int(match.group(1))) if match else None
+            if annotation is None:
+                return self._send(404, {"detail": "Not found."})
+            with state.lock:
+                annotation["result"] = self.body["result"]
+                annotation["result_count"] = len(annotation["result"])
+            self._send(200, annotation)
+
+        def do_POST(self):
+            if not self._check("POST"):
+                return
+            match = re.fullmatch(
+                r"/api/projects/(\d+)/import/?", urlparse(self.path).path
+            )
+            if not match:
+                return self._send(404, {"detail": "Not found."})
+            with state.lock:
+                next_id = max((t["id"] for t in state.tasks), default=0) + 1
+                for i, task in enumerate(self.body):
+                    state.tasks.append(
+                        {
+                            **task,
+                            "id": next_id + i,
+                            "project": int(match.group(1)),
+                            "annotations": [],
+                        }
+                    )
+            self._send(201, {"task_count": len(self.body)})
+
+    return Handler
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Stub Label Studio API server")
+    parser.add_argument(
+        "--tasks", type=Path, required=True, help="Label Studio JSON export"
+    )
+    parser.add_argument("--host", type=str, default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8081)
+    parser.add_argument(
+        "--token", type=str, default="stub", help="Expected API token ('' = any)"
+    )
+    parser.add_argument(
+        "--fail-rate", type=float, default=0.0, help="Fraction of 503 responses"
+    )
+    parser.add_argument(
+        "--latency-ms", type=float, default=0.0, help="Delay per request"
+    )
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument(
+        "--save", type=Path, default=None, help="Write the tasks here on exit"
+    )
+    args = parser.parse_args()
+
+    state = StubState(
+        json.loads(args.tasks.read_text(encoding="utf-8")),
+        args.fail_rate,
+        args.latency_ms,
+        args.seed,
+    )
+    server = ThreadingHTTPServer(
+        (args.host, args.port), make_handler(state, args.token)
+    )
+    print(
+        f"Stub Label Studio em http://{args.host}:{args.port} ({len(state.tasks)} tasks)"
+    )
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+        print(f"\nRequisições: {state.counts}")
+        if args.save:
+            args.save.write_text(
+                json.dumps(state.tasks, ensure_ascii=False), encoding="utf-8"
+            )
+            print(f"Tasks gravadas em {args.save}")
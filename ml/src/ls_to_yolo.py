@@ -1,15 +1,36 @@
+"""
+Convert a Label Studio export (ls.json) to a YOLO-pose dataset.
+
+The export is parsed as a stream (one task at a time), so memory does not
+grow with the annotation set. Splits come from a hash of the image name, so
+an image keeps its split across runs and new tasks do not reshuffle the old
+ones. A manifest of processed tasks (`.ls_to_yolo.json` in the output dir)
+stores a fingerprint of each task's annotations: only new or changed tasks
+are converted, and tasks removed from the export are removed from the tree.
+Image copies and label writes run in a thread pool.
+
+With `--version`, images and labels go to the dataset store
+(dataset_store.py) instead of being copied, and the version is materialized
+as a hardlink tree.
+
+Usage:
+    python src/ls_to_yolo.py --root datasets/raw
+    python src/ls_to_yolo.py --root datasets/raw --out datasets/manual_v4 --val-ratio 0.2
+    python src/ls_to_yolo.py --root datasets/raw --version manual_v4
+"""
+
+import argparse
+import hashlib
 import json
 import os
+import re
 import shutil
-import random
+import time
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from pathlib import Path
+from typing import Dict, Iterator, List, Optional
 
-# ==========================================
-# 1. CONFIGURAÇÕES - AJUSTE SEUS CAMINHOS
-# ==========================================
-ROOT_DIR = r"C:\Users\Iago\Documents\Projects\autostride\ml\datasets\raw"
-JSON_INPUT = os.path.join(ROOT_DIR, "ls.json")
-# Esta é a pasta onde estão as imagens que você baixou (com os nomes estranhos)
-IMAGES_SRC = os.path.join(ROOT_DIR, "images")
+from dataset_store import DEFAULT_KPT_SHAPE, DatasetStore, write_data_yaml
 
 CLASS_MAP = {
     "boundary": 0,
@@ -24,79 +45,339 @@ CLASS_MAP = {
     "fluxo_seta": 9,
 }
 
+STATE_FILE = ".ls_to_yolo.json"
+
+# Entra no fingerprint: mudar a conversão invalida todas as tarefas
+CONVERTER_VERSION = 1
+
+_SEPARATORS = re.compile(r"[\s,]*")
+
+
+def iter_tasks(json_path: Path, chunk_size: int = 1 << 20) -> Iterator[Dict]:
+    """
+    Yield the tasks of a Label Studio JSON export one at a time.
+
+    The file is read in chunks and each array element is decoded with
+    `JSONDecoder.raw_decode`, so only the current task is kept in memory.
+    """
+    decoder = json.JSONDecoder()
+    with open(json_path, "r", encoding="utf-8") as f:
+        buffer = f.read(chunk_size).lstrip()
+        if not buffer.startswith("["):
+            raise ValueError(
+                f"{json_path} is not a Label Studio JSON export (expected a list)"
+            )
+        pos, eof = 1, False
+        while True:
+            pos = _SEPARATORS.match(buffer, pos).end()
+            if buffer.startswith("]", pos):
+                return
+            try:
+                task, pos = decoder.raw_decode(buffer, pos)
+            except json.JSONDecodeError:
+                if eof:
+                    raise
+                # Tarefa incompleta no fim do buffer: descarta o que já foi lido e lê mais
+                chunk = f.read(chunk_size)
+                eof = not chunk
+                buffer, pos = buffer[pos:] + chunk, 0
+                continue
+            yield task
+
+
+def split_for(image_name: str, val_ratio: float) -> str:
+    """Deterministic split from the image name (stable across runs and machines)."""
+    bucket = int(hashlib.sha256(image_name.encode("utf-8")).hexdigest()[:8], 16) / 2**32
+    return "val" if bucket < val_ratio else "train"
+
+
+def task_fingerprint(raw_path: str, results: List[Dict]) -> str:
+    payload = json.dumps(
+        {"v": CONVERTER_VERSION, "image": raw_path, "result": results}, sort_keys=True
+    )
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+def label_lines(results: List[Dict]) -> List[str]:
+    """YOLO-pose label lines from the results of one annotation."""
+    lines = []
+    kp_list = []
+    for res in results:
+        val = res["value"]
+        if res["type"] == "rectanglelabels":
+            cls_id = CLASS_MAP[val["rectanglelabels"][0]]
+            xn, yn, wn, hn = (
+                (val["x"] + val["width"] / 2) / 100,
+                (val["y"] + val["height"] / 2) / 100,
+                val["width"] / 100,
+                val["height"] / 100,
+            )
+            lines.append(f"{cls_id} {xn:.6f} {yn:.6f} {wn:.6f} {hn:.6f} 0 0 0 0 0 0")
+        elif res["type"] == "keypointlabels":
+            kp_list.append({"x": val["x"] / 100, "y": val["y"] / 100})
+
+    # Keypoints em pares (cauda, ponta): cada par vira uma seta com bbox envolvente
+    for j in range(0, len(kp_list), 2):
+        if j + 1 < len(kp_list):
+            p1, p2 = kp_list[j], kp_list[j + 1]
+            xc, yc = (p1["x"] + p2["x"]) / 2, (p1["y"] + p2["y"]) / 2
+            wc, hc = abs(p1["x"] - p2["x"]) + 0.02, abs(p1["y"] - p2["y"]) + 0.02
+            lines.append(
+                f"9 {xc:.6f} {yc:.6f} {wc:.6f} {hc:.6f} {p1['x']:.6f} {p1['y']:.6f} 2 {p2['x']:.6f} {p2['y']:.6f} 2"
+            )
+    return lines
+
+
+class Converter:
+    """
+    Incremental conversion of a Label Studio export into `out_dir`.
+
+    Args:
+        images_dir: Images downloaded from Label Studio (names as in the export)
+        out_dir: YOLO tree (`train/images`, `val/labels`...)
+        val_ratio: Fraction of images assigned to val
+        store: Dataset store; when given, files are added to it instead of
+            copied and `out_dir` is materialized from the version manifest
+    """
+
+    def __init__(
+        self,
+        images_dir: Path,
+        out_dir: Path,
+        val_ratio: float = 0.2,
+        store: Optional[DatasetStore] = None,
+    ):
+        self.images_dir = Path(images_dir)
+        self.out_dir = Path(out_dir)
+        self.val_ratio = val_ratio
+        self.store = store
+        self.state_path = self.out_dir / STATE_FILE
 
-def prepare_dataset():
-    if not os.path.exists(JSON_INPUT):
-        print(f"Erro: Arquivo {JSON_INPUT} não encontrado!")
+    def load_state(self) -> Dict[str, Dict]:
+        if not self.state_path.exists():
+            return {}
+        state = json.loads(self.state_path.read_text(encoding="utf-8"))
+        # Outro modo de saída (cópia x store): refaz tudo
+        if state.get("store") != (str(self.store.root) if self.store else None):
+            return {}
+        return state["tasks"]
+
+    def save_state(self, tasks: Dict[str, Dict]) -> None:
+        self.out_dir.mkdir(parents=True, exist_ok=True)
+        tmp = self.state_path.with_suffix(".tmp")
+        tmp.write_text(
+            json.dumps(
+                {"store": str(self.store.root) if self.store else None, "tasks": tasks},
+                indent=1,
+            ),
+            encoding="utf-8",
+        )
+        os.replace(tmp, self.state_path)
+
+    def _paths(self, entry: Dict):
+        split_dir = self.out_dir / entry["split"]
+        return (
+            split_dir / "images" / entry["name"],
+            split_dir / "labels" / (Path(entry["name"]).stem + ".txt"),
+        )
+
+    def _is_current(self, previous: Optional[Dict], entry: Dict) -> bool:
+        if previous is None or any(
+            previous[k] != entry[k] for k in ("fingerprint", "split", "name")
+        ):
+            return False
+        if self.store:
+            return self.store.object_path(previous["image"]).exists()
+        return all(path.exists() for path in self._paths(previous))
+
+    def _remove(self, entry: Dict) -> None:
+        # No modo store, o materialize remove os arquivos que saíram do manifesto
+        if not self.store:
+            for path in self._paths(entry):
+                path.unlink(missing_ok=True)
+
+    def _process(self, entry: Dict, results: List[Dict]) -> Dict:
+        """Copy (or store) the image and write the label of one task."""
+        src_img = self.images_dir / entry["name"]
+        label = "\n".join(label_lines(results))
+        if self.store:
+            entry["image"] = self.store.put_file(src_img)
+            entry["label"] = self.store.put_bytes(label.encode("utf-8"), ".txt")
+            return entry
+
+        dst_img, dst_label = self._paths(entry)
+        dst_img.parent.mkdir(parents=True, exist_ok=True)
+        dst_label.parent.mkdir(parents=True, exist_ok=True)
+        shutil.copyfile(src_img, dst_img)
+        dst_label.write_text(label, encoding="utf-8")
+        return entry
+
+    def run(
+        self, json_path: Path, workers: int = 8, force: bool = False
+    ) -> Dict[str, Dict]:
+        """
+        Convert new and changed tasks of `json_path`.
+
+        Returns:
+            The manifest of processed tasks (task id -> name, split, fingerprint
+            and, in store mode, image/label blob keys)
+        """
+        previous = {} if force else self.load_state()
+        tasks: Dict[str, Dict] = {}
+        counts = {"converted": 0, "unchanged": 0, "missing": 0, "removed": 0}
+        start = time.perf_counter()
+        finished = False
+
+        def collect(futures) -> None:
+            for future in futures:
+                tasks[pending.pop(future)] = future.result()
+                counts["converted"] += 1
+
+        pending: Dict = {}
+        try:
+            with ThreadPoolExecutor(max_workers=workers) as pool:
+                for task in iter_tasks(json_path):
+                    if not task.get("annotations"):
+                        continue
+                    # PEGA O NOME EXATO DO ARQUIVO QUE ESTÁ NO JSON
+                    # O Label Studio guarda assim: "/data/upload/1/2b9102cf-arch_50.png"
+                    raw_path = task["data"]["image"]
+                    name = os.path.basename(raw_path)
+                    results = task["annotations"][0]["result"]
+                    task_id = str(task["id"])
+                    entry = {
+                        "name": name,
+                        "split": split_for(name, self.val_ratio),
+                        "fingerprint": task_fingerprint(raw_path, results),
+                    }
+                    old = previous.get(task_id)
+
+                    if self._is_current(old, entry):
+                        tasks[task_id] = old
+                        counts["unchanged"] += 1
+                        continue
+                    if old is not None and (old["split"], old["name"]) != (
+                        entry["split"],
+                        name,
+                    ):
+                        self._remove(old)
+                    if not (self.images_dir / name).exists():
+                        # Caso o arquivo no disco não tenha o hash, mas o JSON tenha
+                        print(
+                            f"Aviso: {name} não encontrado. Verifique a pasta images."
+                        )
+                        counts["missing"] += 1
+                        continue
+
+                    pending[pool.submit(self._process, entry, results)] = task_id
+                    # Limita as tarefas em voo: o parse não se adianta demais à escrita
+                    if len(pending) >= workers * 4:
+                        collect(wait(pending, return_when=FIRST_COMPLETED).done)
+                collect(list(pending))
+            finished = True
+        finally:
+            # Interrompida no meio: mantém o manifesto anterior das tarefas não
+            # concluídas, então a próxima execução continua de onde parou
+            self.save_state(tasks if finished else {**previous, **tasks})
+
+        for task_id, old in previous.items():
+            if task_id not in tasks:
+                self._remove(old)
+                counts["removed"] += 1
+
+        counts["seconds"] = round(time.perf_counter() - start, 2)
+        print(
+            "✓ {converted} converted, {unchanged} unchanged, {removed} removed, "
+            "{missing} missing images ({seconds}s)".format(**counts)
+        )
+        return tasks
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(
+        description="Convert a Label Studio export to YOLO-pose"
+    )
+    parser.add_argument(
+        "--root",
+        type=Path,
+        default=Path(__file__).parent.parent / "datasets" / "raw",
+        help="Directory with ls.json and images/ (default: ml/datasets/raw)",
+    )
+    parser.add_argument(
+        "--json", type=Path, default=None, help="Export file (default: <root>/ls.json)"
+    )
+    parser.add_argument(
+        "--images",
+        type=Path,
+        default=None,
+        help="Downloaded images (default: <root>/images)",
+    )
+    parser.add_argument(
+        "--out",
+        type=Path,
+        default=None,
+        help="Output dataset dir (default: <root>, or datasets/<version> with --version)",
+    )
+    parser.add_argument(
+        "--val-ratio", type=float, default=0.2, help="Fraction of images in val"
+    )
+    parser.add_argument(
+        "--workers", type=int, default=8, help="Threads copying/writing files"
+    )
+    parser.add_argument(
+        "--force",
+        action="store_true",
+        help="Ignore the manifest and convert every task",
+    )
+    parser.add_argument(
+        "--version",
+        type=str,
+        default=None,
+        help="Save the result as this dataset store version (no copies)",
+    )
+    args = parser.parse_args()
+
+    json_input = args.json or args.root / "ls.json"
+    if not json_input.exists():
+        print(f"Erro: Arquivo {json_input} não encontrado!")
         return
 
-    with open(JSON_INPUT, "r", encoding="utf-8") as f:
-        data = json.load(f)
-
-    # Cria estrutura de pastas YOLO
-    for split in ["train", "val"]:
-        os.makedirs(os.path.join(ROOT_DIR, split, "images"), exist_ok=True)
-        os.makedirs(os.path.join(ROOT_DIR, split, "labels"), exist_ok=True)
-
-    random.shuffle(data)
-    split_idx = int(len(data) * 0.8)
-
-    for i, entry in enumerate(data):
-        split = "train" if i < split_idx else "val"
-
-        # PEGA O NOME EXATO DO ARQUIVO QUE ESTÁ NO JSON
-        # O Label Studio guarda assim: "/data/upload/1/2b9102cf-arch_50.png"
-        raw_path = entry["data"]["image"]
-        full_img_name = os.path.basename(raw_path)  # Retorna "2b9102cf-arch_50.png"
-        img_name_no_ext = os.path.splitext(full_img_name)[0]
-
-        src_img = os.path.join(IMAGES_SRC, full_img_name)
-        dst_img = os.path.join(ROOT_DIR, split, "images", full_img_name)
-
-        if os.path.exists(src_img):
-            shutil.copy(src_img, dst_img)
-        else:
-            # Caso o arquivo no disco não tenha o hash, mas o JSON tenha
-            print(f"Aviso: {full_img_name} não encontrado. Verifique a pasta images.")
-            continue
-
-        label_lines = []
-        kp_list = []
-
-        # O resto da lógica de extrair pontos e caixas continua igual
-        results = entry["annotations"][0]["result"]
-        for res in results:
-            val = res["value"]
-            if res["type"] == "rectanglelabels":
-                cls_id = CLASS_MAP[val["rectanglelabels"][0]]
-                xn, yn, wn, hn = (
-                    (val["x"] + val["width"] / 2) / 100,
-                    (val["y"] + val["height"] / 2) / 100,
-                    val["width"] / 100,
-                    val["height"] / 100,
-                )
-                label_lines.append(
-                    f"{cls_id} {xn:.6f} {yn:.6f} {wn:.6f} {hn:.6f} 0 0 0 0 0 0"
-                )
-            elif res["type"] == "keypointlabels":
-                kp_list.append({"x": val["x"] / 100, "y": val["y"] / 100})
-
-        for j in range(0, len(kp_list), 2):
-            if j + 1 < len(kp_list):
-                p1, p2 = kp_list[j], kp_list[j + 1]
-                xc, yc = (p1["x"] + p2["x"]) / 2, (p1["y"] + p2["y"]) / 2
-                wc, hc = abs(p1["x"] - p2["x"]) + 0.02, abs(p1["y"] - p2["y"]) + 0.02
-                label_lines.append(
-                    f"9 {xc:.6f} {yc:.6f} {wc:.6f} {hc:.6f} {p1['x']:.6f} {p1['y']:.6f} 2 {p2['x']:.6f} {p2['y']:.6f} 2"
-                )
-
-        with open(
-            os.path.join(ROOT_DIR, split, "labels", img_name_no_ext + ".txt"), "w"
-        ) as f:
-            f.write("\n".join(label_lines))
-
-    print(f"\nFinalizado! Dataset organizado com os nomes originais do Label Studio.")
+    store = DatasetStore() if args.version else None
+    if args.out:
+        out_dir = args.out
+    elif args.version:
+        out_dir = store.root.parent / args.version
+    else:
+        out_dir = args.root
+
+    converter = Converter(
+        args.images or args.root / "images", out_dir, args.val_ratio, store
+    )
+    tasks = converter.run(json_input, workers=args.workers, force=args.force)
+
+    names = {v: k for k, v in CLASS_MAP.items()}
+    if store:
+        store.save_manifest(
+            args.version,
+            (
+                {k: entry[k] for k in ("name", "image", "label", "split")}
+                for entry in tasks.values()
+            ),
+            names,
+            DEFAULT_KPT_SHAPE,
+            extra={"source": str(json_input.resolve())},
+        )
+        data_yaml = store.materialize(args.version, out_dir)
+    else:
+        data_yaml = write_data_yaml(
+            out_dir,
+            {entry["split"] for entry in tasks.values()},
+            names,
+            DEFAULT_KPT_SHAPE,
+            f"Generated by ls_to_yolo.py from {json_input.name}",
+        )
+    print(f"\nFinalizado! Dataset em {data_yaml.parent} ({len(tasks)} imagens).")
 
 
 if __name__ == "__main__":
-    prepare_dataset()
+    main()
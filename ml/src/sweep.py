@@ -0,0 +1,490 @@
+"""
+Hyperparameter sweep for YOLO-pose with successive halving.
+
+Trials are sampled from a search space, trained in a process pool (each
+with its own CPU-thread budget) and stopped early when their intermediate
+metric, read from the trial's results.csv while it trains, falls outside
+the top 1/eta of the trials that reached the same epoch (asynchronous
+successive halving). Everything lives under `runs/sweeps/<name>/`, so an
+interrupted sweep resumes where it stopped: finished trials are skipped and
+partial ones continue from their last.pt.
+
+Sweep config (YAML):
+
+    name: pose_sizes
+    data: datasets/manual_v3/data.yaml
+    trials: 12            # random samples; omit for the full grid of lists
+    seed: 0
+    space:                # any model.train() argument, plus `model`
+      model: [yolo11n-pose.pt, yolo11s-pose.pt, yolo11m-pose.pt]
+      imgsz: [512, 640]
+      lr0: {log_uniform: [0.0005, 0.02]}
+      mosaic: {uniform: [0.5, 1.0]}
+      degrees: [0, 5]
+      epochs: 60
+      batch: 16
+    halving:
+      metric: metrics/mAP50-95(B)
+      min_epochs: 10      # first rung; next rungs at min_epochs * eta^k
+      eta: 3
+    cache_dir: datasets/.cache   # optional, see train_cache.py
+
+Usage:
+    python src/sweep.py sweeps/pose_sizes.yaml --parallel 2 --threads 4
+    python src/sweep.py sweeps/pose_sizes.yaml --dry-run     # list the trials
+    python src/sweep.py --leaderboard runs/sweeps/pose_sizes
+"""
+
+import argparse
+import csv
+import itertools
+import json
+import math
+import multiprocessing
+import os
+import random
+import time
+import traceback
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+
+import yaml
+
+DEFAULT_SWEEPS_DIR = Path(__file__).parent.parent / "runs" / "sweeps"
+DEFAULT_METRIC = "metrics/mAP50-95(B)"
+
+STOP_FILE = "STOP"
+STATUS_FILE = "status.json"
+
+
+# ---- search space ----
+
+
+def _sample(spec: Any, rng: random.Random) -> Any:
+    if isinstance(spec, list):
+        return rng.choice(spec)
+    if isinstance(spec, dict):
+        kind, (low, high) = next(iter(spec.items()))
+        if kind == "uniform":
+            return round(rng.uniform(low, high), 6)
+        if kind == "log_uniform":
+            return float(f"{math.exp(rng.uniform(math.log(low), math.log(high))):.6g}")
+        if kind == "int":
+            return rng.randint(low, high)
+        raise ValueError(
+            f"Unknown distribution '{kind}' (use uniform, log_uniform or int)"
+        )
+    return spec
+
+
+def sample_trials(
+    space: Dict[str, Any], trials: Optional[int], seed: int = 0
+) -> List[Dict]:
+    """
+    Trial parameters: `trials` random samples (seeded), or the full grid of
+    the list-valued parameters when `trials` is not set.
+    """
+    if trials is None:
+        if any(isinstance(spec, dict) for spec in space.values()):
+            raise ValueError("Distributions need 'trials' (random search)")
+        keys = list(space)
+        values = [spec if isinstance(spec, list) else [spec] for spec in space.values()]
+        return [dict(zip(keys, combo)) for combo in itertools.product(*values)]
+    rng = random.Random(seed)
+    return [
+        {key: _sample(spec, rng) for key, spec in space.items()} for _ in range(trials)
+    ]
+
+
+# ---- intermediate metrics ----
+
+
+def read_history(trial_dir: Path, metric: str) -> List[float]:
+    """Metric per completed epoch, from the trial's results.csv."""
+    results_csv = trial_dir / "results.csv"
+    if not results_csv.exists():
+        return []
+    history = []
+    with open(results_csv, newline="") as f:
+        reader = csv.DictReader(f)
+        # Versões antigas do Ultralytics alinham as colunas com espaços
+        column = next((k for k in reader.fieldnames or [] if k.strip() == metric), None)
+        if column is None:
+            return []
+        for row in reader:
+            try:
+                history.append(float(row[column]))
+            except (TypeError, ValueError):
+                break  # linha ainda sendo escrita pelo trial
+    return history
+
+
+class SuccessiveHalving:
+    """
+    Asynchronous successive halving (ASHA).
+
+    Rungs are at `min_epochs * eta^k` epochs. A trial reaching a rung keeps
+    training only if its best metric so far is in the top 1/eta of all
+    trials that reached that rung; until `eta` trials have, it continues.
+    """
+
+    def __init__(self, min_epochs: int = 10, eta: int = 3):
+        self.min_epochs = min_epochs
+        self.eta = eta
+
+    def rungs(self, max_epochs: int) -> List[int]:
+        rungs, epochs = [], self.min_epochs
+        while epochs < max_epochs:
+            rungs.append(epochs)
+            epochs *= self.eta
+        return rungs
+
+    def keep(self, trial: str, rung: int, histories: Dict[str, List[float]]) -> bool:
+        scores = {
+            name: max(history[:rung])
+            for name, history in histories.items()
+            if len(history) >= rung
+        }
+        if len(scores) < self.eta:
+            return True
+        ranked = sorted(scores, key=scores.get, reverse=True)
+        return ranked.index(trial) < max(1, len(ranked) // self.eta)
+
+
+# ---- trial (runs in a pool worker) ----
+
+
+def run_trial(
+    trial: Dict, trials_dir: str, data: str, threads: int, cache_dir: Optional[str]
+) -> Dict:
+    """Train one trial (or resume it from last.pt) and write its status.json."""
+    # Antes de importar torch: cada trial usa só o seu orçamento de threads
+    for var in ("OMP_NUM_THREADS", "MKL_NUM_THREADS", "OPENBLAS_NUM_THREADS"):
+        os.environ[var] = str(threads)
+    import torch
+    from ultralytics.models import YOLO
+
+    torch.set_num_threads(threads)
+    trial_dir = Path(trials_dir) / trial["id"]
+    stop_file = trial_dir / STOP_FILE
+    params = dict(trial["params"])
+    model_name = params.pop("model")
+    start = time.time()
+
+    def stop_if_requested(trainer) -> None:
+        if stop_file.exists():
+            trainer.stop = True
+
+    try:
+        last = trial_dir / "weights" / "last.pt"
+        if last.exists():
+            model = YOLO(str(last))
+            kwargs = {"resume": True}
+        else:
+            local = Path("models") / model_name
+            model = YOLO(str(local) if local.exists() else model_name)
+            kwargs = {
+                "data": data,
+                "project": trials_dir,
+                "name": trial["id"],
+                "exist_ok": True,
+                "seed": trial["index"],
+                "workers": min(threads, 8),
+                "plots": False,
+                **params,
+            }
+        if cache_dir:
+            from cached_trainer import CachedPoseTrainer
+
+            CachedPoseTrainer.cache_dir = Path(cache_dir)
+            kwargs["trainer"] = CachedPoseTrainer
+        model.add_callback("on_fit_epoch_end", stop_if_requested)
+        model.train(**kwargs)
+        status = {"status": "stopped" if stop_file.exists() else "done"}
+    except Exception as e:
+        status = {"status": "failed", "error": f"{type(e).__name__}: {e}"}
+        traceback.print_exc()
+
+    status["seconds"] = round(time.time() - start, 1)
+    trial_dir.mkdir(parents=True, exist_ok=True)
+    (trial_dir / STATUS_FILE).write_text(json.dumps(status))
+    return status
+
+
+# ---- sweep ----
+
+
+class Sweep:
+    """
+    A sweep directory: `sweep.json` (config and the sampled trials, frozen
+    at creation), `trials/<id>/` (Ultralytics run of each trial) and
+    `leaderboard.csv`.
+    """
+
+    def __init__(self, sweep_dir: Path):
+        self.dir = Path(sweep_dir)
+        self.trials_dir = self.dir / "trials"
+        spec = json.loads((self.dir / "sweep.json").read_text(encoding="utf-8"))
+        self.config = spec["config"]
+        self.trials: List[Dict] = spec["trials"]
+        halving = self.config.get("halving") or {}
+        self.metric = halving.get("metric", DEFAULT_METRIC)
+        self.halving = SuccessiveHalving(
+            halving.get("min_epochs", 10), halving.get("eta", 3)
+        )
+
+    @classmethod
+    def create(
+        cls, config_path: Path, sweeps_dir: Path = DEFAULT_SWEEPS_DIR
+    ) -> "Sweep":
+        """Open the sweep of a config, creating it on the first run."""
+        config = yaml.safe_load(Path(config_path).read_text(encoding="utf-8"))
+        sweep_dir = Path(sweeps_dir) / config.get("name", Path(config_path).stem)
+        spec_path = sweep_dir / "sweep.json"
+        if spec_path.exists():
+            previous = json.loads(spec_path.read_text(encoding="utf-8"))["config"]
+            if previous != config:
+                print(
+                    f"⚠️  {config_path} changed since the sweep started; resuming with the original config"
+                )
+            return cls(sweep_dir)
+
+        if "model" not in config["space"]:
+            raise ValueError("The search space needs a 'model' entry")
+        params = sample_trials(
+            config["space"], config.get("trials"), config.get("seed", 0)
+        )
+        trials = [
+            {"id": f"t{index:03d}", "index": index, "params": p}
+            for index, p in enumerate(params)
+        ]
+        sweep_dir.mkdir(parents=True, exist_ok=True)
+        spec_path.write_text(json.dumps({"config": config, "trials": trials}, indent=1))
+        return cls(sweep_dir)
+
+    def status(self, trial: Dict) -> Optional[Dict]:
+        path = self.trials_dir / trial["id"] / STATUS_FILE
+        return json.loads(path.read_text()) if path.exists() else None
+
+    def histories(self) -> Dict[str, List[float]]:
+        return {
+            t["id"]: read_history(self.trials_dir / t["id"], self.metric)
+            for t in self.trials
+        }
+
+    def _apply_halving(self, running: List[Dict], decided: Dict[str, int]) -> None:
+        """Stop running trials that fell behind at the highest rung they reached."""
+        histories = self.histories()
+        for trial in running:
+            history = histories[trial["id"]]
+            reached = [
+                r for r in self.halving.rungs(_max_epochs(trial)) if len(history) >= r
+            ]
+            if not reached or decided.get(trial["id"]) == reached[-1]:
+                continue
+            rung = reached[-1]
+            decided[trial["id"]] = rung
+            if not self.halving.keep(trial["id"], rung, histories):
+                (self.trials_dir / trial["id"] / STOP_FILE).touch()
+                print(
+                    f"✂️  {trial['id']} stopped at epoch {rung} ({self.metric} below top 1/{self.halving.eta})"
+                )
+
+    def run(
+        self,
+        parallel: int = 1,
+        threads: Optional[int] = None,
+        poll_s: float = 10.0,
+        retry_failed: bool = False,
+    ) -> None:
+        """Run (or resume) the pending trials."""
+        threads = threads or max(1, (os.cpu_count() or 1) // parallel)
+        pending = []
+        for trial in self.trials:
+            status = self.status(trial)
+            if status and not (retry_failed and status["status"] == "failed"):
+                continue
+            trial_dir = self.trials_dir / trial["id"]
+            if (trial_dir / STATUS_FILE).exists():
+                (trial_dir / STATUS_FILE).unlink()
+            # Interrompido depois de treinar tudo (ou de receber STOP): nada a retomar
+            history = read_history(trial_dir, self.metric)
+            if (trial_dir / STOP_FILE).exists() or (
+                history and len(history) >= _max_epochs(trial)
+            ):
+                stopped = (trial_dir / STOP_FILE).exists()
+                (trial_dir / STATUS_FILE).write_text(
+                    json.dumps(
+                        {"status": "stopped" if stopped else "done", "seconds": 0}
+                    )
+                )
+                continue
+            pending.append(trial)
+
+        done = len(self.trials) - len(pending)
+        print(
+            f"Sweep {self.dir.name}: {len(self.trials)} trials, {done} already finished, "
+            f"{parallel} in parallel x {threads} threads"
+        )
+        if not pending:
+            self.write_leaderboard()
+            return
+
+        data = str(Path(self.config["data"]).resolve())
+        cache_dir = self.config.get("cache_dir")
+        cache_dir = str(Path(cache_dir).resolve()) if cache_dir else None
+        decided: Dict[str, int] = {}
+        # spawn + um processo por trial: threads do torch não herdam estado e a
+        # memória do treino volta ao sistema ao fim de cada trial
+        pool = multiprocessing.get_context("spawn").Pool(parallel, maxtasksperchild=1)
+        try:
+            results = {
+                trial["id"]: (
+                    trial,
+                    pool.apply_async(
+                        run_trial,
+                        (trial, str(self.trials_dir), data, threads, cache_dir),
+                    ),
+                )
+                for trial in pending
+            }
+            while results:
+                time.sleep(poll_s)
+                finished = [
+                    tid for tid, (_, result) in results.items() if result.ready()
+                ]
+                for tid in finished:
+                    status = results.pop(tid)[1].get()
+                    print(f"{tid}: {status['status']} ({status['seconds']}s)")
+                running = [
+                    trial
+                    for trial, _ in results.values()
+                    if (self.trials_dir / trial["id"] / "results.csv").exists()
+                ]
+                self._apply_halving(running, decided)
+                if finished:
+                    self.write_leaderboard()
+            pool.close()
+        except KeyboardInterrupt:
+            # Os trials em andamento retomam do last.pt na próxima execução
+            print("\nInterrupted; run the same command again to resume the sweep")
+            pool.terminate()
+            raise
+        finally:
+            pool.join()
+            self.write_leaderboard()
+
+    def leaderboard(self) -> List[Dict]:
+        """All trials, best metric first."""
+        rows = []
+        for trial in self.trials:
+            trial_dir = self.trials_dir / trial["id"]
+            history = read_history(trial_dir, self.metric)
+            status = self.status(trial) or {
+                "status": "running" if history else "pending"
+            }
+            best = (
+                max(range(len(history)), key=history.__getitem__) if history else None
+            )
+            rows.append(
+                {
+                    "trial": trial["id"],
+                    "status": status["status"],
+                    "epochs_run": f"{len(history)}/{_max_epochs(trial)}",
+                    "best_epoch": best + 1 if best is not None else None,
+                    self.metric: round(history[best], 5) if best is not None else None,
+                    "seconds": status.get("seconds"),
+                    **{k: v for k, v in trial["params"].items()},
+                    "weights": str(trial_dir / "weights" / "best.pt"),
+                }
+            )
+        rows.sort(
+            key=lambda r: r[self.metric] if r[self.metric] is not None else -1,
+            reverse=True,
+        )
+        return rows
+
+    def write_leaderboard(self) -> List[Dict]:
+        rows = self.leaderboard()
+        fields = list(dict.fromkeys(key for row in rows for key in row))
+        with open(self.dir / "leaderboard.csv", "w", newline="") as f:
+            writer = csv.DictWriter(f, fieldnames=fields)
+            writer.writeheader()
+            writer.writerows(rows)
+        return rows
+
+
+def _max_epochs(trial: Dict) -> int:
+    # Padrão do model.train() do Ultralytics
+    return int(trial["params"].get("epochs", 100))
+
+
+def print_leaderboard(sweep: Sweep, rows: List[Dict]) -> None:
+    params = list(dict.fromkeys(k for t in sweep.trials for k in t["params"]))
+    print("=" * 100)
+    print(f"🏆 SWEEP {sweep.dir.name} — ranked by {sweep.metric}")
+    print("=" * 100)
+    for i, row in enumerate(rows, 1):
+        score = f"{row[sweep.metric]:.4f}" if row[sweep.metric] is not None else "-"
+        settings = ", ".join(f"{k}={row.get(k)}" for k in params)
+        print(
+            f"{i:>3}. {row['trial']}  {score}  {row['status']:<8} {row['epochs_run']:>7}  {settings}"
+        )
+    print(f"\nLeaderboard: {sweep.dir / 'leaderboard.csv'}")
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(
+        description="YOLO hyperparameter sweep with successive halving"
+    )
+    parser.add_argument("config", type=Path, nargs="?", help="Sweep config (YAML)")
+    parser.add_argument(
+        "--parallel", type=int, default=1, help="Trials running at once"
+    )
+    parser.add_argument(
+        "--threads",
+        type=int,
+        default=None,
+        help="CPU threads per trial (default: cpus / parallel)",
+    )
+    parser.add_argument(
+        "--poll", type=float, default=10.0, help="Seconds between results.csv checks"
+    )
+    parser.add_argument("--sweeps-dir", type=Path, default=DEFAULT_SWEEPS_DIR)
+    parser.add_argument(
+        "--retry-failed", action="store_true", help="Run failed trials again"
+    )
+    parser.add_argument(
+        "--dry-run", action="store_true", help="Only list the sampled trials"
+    )
+    parser.add_argument(
+        "--leaderboard",
+        type=Path,
+        default=None,
+        help="Print the leaderboard of a sweep directory",
+    )
+    args = parser.parse_args()
+
+    if args.leaderboard:
+        sweep = Sweep(args.leaderboard)
+        print_leaderboard(sweep, sweep.write_leaderboard())
+        return
+    if not args.config:
+        parser.error("config is required (or --leaderboard)")
+
+    if args.dry_run:
+        config = yaml.safe_load(args.config.read_text(encoding="utf-8"))
+        params = sample_trials(
+            config["space"], config.get("trials"), config.get("seed", 0)
+        )
+        for index, p in enumerate(params):
+            print(f"t{index:03d}: {p}")
+        return
+
+    sweep = Sweep.create(args.config, args.sweeps_dir)
+    sweep.run(args.parallel, args.threads, args.poll, args.retry_failed)
+    print_leaderboard(sweep, sweep.leaderboard())
+
+
+if __name__ == "__main__":
+    main()
@@ -4,11 +4,11 @@ from ultralytics.models import YOLO
 
 
 def get_experiment_name(
-    model_name: str, dataset_path: str, experiments_dir: Path
+    model_name: str, dataset_path: str, experiments_dir: Path, suffix: str = ""
 ) -> str:
     """Generate experiment name with auto-incrementing version number."""
     model_base = model_name.replace(".pt", "")
-    dataset_name = Path(dataset_path).parent.name
+    dataset_name = Path(dataset_path).parent.name + suffix
 
     # Find existing experiments with same model and dataset
     pattern = f"{model_base}_{dataset_name}_v"
@@ -54,6 +54,25 @@ if __name__ == "__main__":
         required=True,
         help="The YOLO model configuration file",
     )
+    parser.add_argument(
+        "--imgsz",
+        type=int,
+        default=640,
+        help="Training image size (default: 640)",
+    )
+    parser.add_argument(
+        "--batch",
+        type=int,
+        default=24,
+        help="Batch size (default: 24)",
+    )
+    parser.add_argument(
+        "--cache-dir",
+        type=Path,
+        default=None,
+        help="Read images from a preprocessed memory-mapped cache in this directory "
+        "(built on first use, see train_cache.py)",
+    )
 
     args = parser.parse_args()
 
@@ -72,14 +91,25 @@ if __name__ == "__main__":
     print(f"Training dataset: {args.data}")
     print(f"Number of epochs: {args.epochs}")
     print(f"Model configuration: {args.model}")
+    print(f"Image size: {args.imgsz}, batch: {args.batch}")
     print(f"Experiment name: {experiment_name}")
+    if args.cache_dir:
+        print(f"Image cache: {args.cache_dir}")
     print("-" * 80)
 
+    train_kwargs = {}
+    if args.cache_dir:
+        from cached_trainer import CachedPoseTrainer
+
+        CachedPoseTrainer.cache_dir = args.cache_dir
+        train_kwargs["trainer"] = CachedPoseTrainer
+
     results = model.train(
         data=args.data,
         epochs=args.epochs,
-        imgsz=640,
-        batch=24,
+        imgsz=args.imgsz,
+        batch=args.batch,
         name=experiment_name,
         project=str(experiments_dir),  # Nome do projeto
+        **train_kwargs,
     )
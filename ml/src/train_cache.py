@@ -0,0 +1,329 @@
+"""
+Preprocessed training cache: every image of a split decoded and letterboxed
+once into a memory-mapped uint8 array, with labels in flat NumPy arrays.
+
+Layout of a cache directory (`<dataset>-<split>-<imgsz>-<key>/`):
+
+    images.npy   (N, imgsz, imgsz, 3) uint8, BGR, letterboxed (pad 114)
+    labels.npz   cls (M, 1), bboxes (M, 4), keypoints (M, nkpt, ndim),
+                 offsets (N + 1,) into the label rows, shapes (N, 2)
+                 original (h, w), boxes (N, 4) top/left/h/w of the image
+                 inside its letterbox
+    meta.json    file names, source hash, imgsz
+
+Reading an image is a slice of the memory map (no decode, no resize, no
+copy); the OS page cache keeps the array in memory across epochs and across
+dataloader workers. The cache key combines the dataset's `manifest_sha256`
+(written to data.yaml by dataset_store.py), or a hash of file sizes and
+mtimes for plain trees, with the split and imgsz, so any change to the
+dataset builds a new cache and the stale one is removed.
+
+Used by cached_trainer.py (`train.py --cache-dir`); `build` runs on the first
+epoch if the cache is missing, or ahead of time:
+
+    python src/train_cache.py --data datasets/manual_v4/data.yaml --cache-dir .cache/train
+"""
+
+import argparse
+import hashlib
+import json
+import math
+import os
+import shutil
+import time
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from typing import Dict, List, Optional
+
+import cv2
+import numpy as np
+import yaml
+
+from dataset_store import DEFAULT_KPT_SHAPE, IMAGE_EXTENSIONS
+
+DEFAULT_CACHE_DIR = Path(__file__).parent.parent / "datasets" / ".cache"
+
+# Entra na chave: mudar o formato ou o pré-processamento invalida os caches
+CACHE_VERSION = 1
+
+# Cor do padding do letterbox no Ultralytics
+PAD_VALUE = 114
+
+
+def load_data_yaml(data_yaml: Path) -> Dict:
+    """data.yaml with `path` resolved (falls back to the yaml's directory)."""
+    data_yaml = Path(data_yaml)
+    config = yaml.safe_load(data_yaml.read_text(encoding="utf-8")) or {}
+    root = Path(config.get("path") or data_yaml.parent)
+    if not root.is_absolute():
+        root = data_yaml.parent / root
+    if not root.is_dir():
+        # data.yaml gerado em outra máquina (ex.: caminho Windows)
+        root = data_yaml.parent
+    config["path"] = root.resolve()
+    return config
+
+
+def image_files(images_dir: Path) -> List[Path]:
+    return sorted(
+        p for p in Path(images_dir).iterdir() if p.suffix.lower() in IMAGE_EXTENSIONS
+    )
+
+
+def label_file(image: Path) -> Path:
+    """Same rule as Ultralytics: the last `images` dir becomes `labels`, suffix .txt."""
+    parts = list(image.parts)
+    idx = len(parts) - 1 - parts[::-1].index("images")
+    parts[idx] = "labels"
+    return Path(*parts).with_suffix(".txt")
+
+
+def source_hash(config: Dict, images_dir: Path) -> str:
+    """
+    Identity of the cached content: the dataset manifest hash when data.yaml
+    has one, else sizes and mtimes of the split's images and labels.
+    """
+    if config.get("manifest_sha256"):
+        return config["manifest_sha256"]
+    digest = hashlib.sha256()
+    for image in image_files(images_dir):
+        for path in (image, label_file(image)):
+            try:
+                st = path.stat()
+                digest.update(f"{path.name}|{st.st_size}|{st.st_mtime_ns}\n".encode())
+            except FileNotFoundError:
+                digest.update(f"{path.name}|-\n".encode())
+    return digest.hexdigest()
+
+
+def read_label(path: Path, kpt_shape: List[int]):
+    """(cls, bboxes, keypoints) of a YOLO-pose label file as float32 arrays."""
+    nkpt, ndim = kpt_shape
+    rows = []
+    if path.exists():
+        for line in path.read_text(encoding="utf-8").splitlines():
+            values = line.split()
+            if values:
+                rows.append([float(v) for v in values])
+    width = 5 + nkpt * ndim
+    table = np.zeros((len(rows), width), dtype=np.float32)
+    for i, row in enumerate(rows):
+        # Linhas sem keypoints (só bbox) ficam com keypoints zerados
+        row = row[:width]
+        table[i, : len(row)] = row
+    return table[:, :1], table[:, 1:5], table[:, 5:].reshape(-1, nkpt, ndim)
+
+
+def letterbox_into(dst: np.ndarray, image: np.ndarray, imgsz: int):
+    """
+    Resize `image` so its long side is `imgsz` (as Ultralytics' load_image)
+    and center it in `dst` (imgsz x imgsz, padded with PAD_VALUE).
+
+    Returns:
+        (top, left, h, w) of the image inside `dst`
+    """
+    h0, w0 = image.shape[:2]
+    r = imgsz / max(h0, w0)
+    if r != 1:
+        w, h = min(math.ceil(w0 * r), imgsz), min(math.ceil(h0 * r), imgsz)
+        image = cv2.resize(image, (w, h), interpolation=cv2.INTER_LINEAR)
+    h, w = image.shape[:2]
+    top, left = (imgsz - h) // 2, (imgsz - w) // 2
+    dst[:] = PAD_VALUE
+    dst[top : top + h, left : left + w] = image
+    return top, left, h, w
+
+
+class TrainCache:
+    """A built cache, opened read-only."""
+
+    def __init__(self, directory: Path):
+        self.directory = Path(directory)
+        self.meta = json.loads(
+            (self.directory / "meta.json").read_text(encoding="utf-8")
+        )
+        # Somente leitura: uma augmentation que escreva no lugar falha em vez
+        # de corromper o cache
+        self.images = np.load(self.directory / "images.npy", mmap_mode="r")
+        with np.load(self.directory / "labels.npz") as labels:
+            self.cls = labels["cls"]
+            self.bboxes = labels["bboxes"]
+            self.keypoints = labels["keypoints"]
+            self.offsets = labels["offsets"]
+            self.shapes = labels["shapes"]
+            self.boxes = labels["boxes"]
+        self._index = {name: i for i, name in enumerate(self.meta["files"])}
+
+    def __len__(self) -> int:
+        return len(self._index)
+
+    def index(self, image_path) -> Optional[int]:
+        """Row of an image (by file name), or None if it is not cached."""
+        return self._index.get(os.path.basename(image_path))
+
+    def image(self, i: int) -> np.ndarray:
+        """Resized image without the letterbox padding (a view of the memmap)."""
+        top, left, h, w = self.boxes[i]
+        return self.images[i, top : top + h, left : left + w]
+
+    def shape(self, i: int):
+        """Original (h, w) before resizing."""
+        return tuple(int(v) for v in self.shapes[i])
+
+    def labels(self, i: int) -> Dict[str, np.ndarray]:
+        start, end = self.offsets[i], self.offsets[i + 1]
+        return {
+            "shape": self.shape(i),
+            "cls": self.cls[start:end],
+            "bboxes": self.bboxes[start:end],
+            "keypoints": self.keypoints[start:end],
+        }
+
+    @classmethod
+    def build(
+        cls,
+        images_dir: Path,
+        imgsz: int,
+        cache_dir: Path = DEFAULT_CACHE_DIR,
+        config: Optional[Dict] = None,
+        dataset: Optional[str] = None,
+        workers: int = 8,
+    ) -> "TrainCache":
+        """
+        Open the cache of a split, building it if missing or stale.
+
+        Args:
+            images_dir: Split images directory (e.g. `<dataset>/train/images`)
+            imgsz: Training image size
+            cache_dir: Where caches are kept
+            config: Parsed data.yaml (for `manifest_sha256` and `kpt_shape`)
+            dataset: Dataset name used in the cache directory name
+            workers: Decode threads (cv2 releases the GIL)
+        """
+        images_dir = Path(images_dir).resolve()
+        config = config or {}
+        split = (
+            images_dir.parent.name if images_dir.name == "images" else images_dir.name
+        )
+        # <dataset>/train/images e <dataset>/images/train
+        dataset = dataset or images_dir.parent.parent.name
+        kpt_shape = list(config.get("kpt_shape") or DEFAULT_KPT_SHAPE)
+        key = hashlib.sha256(
+            f"{CACHE_VERSION}|{source_hash(config, images_dir)}|{split}|{imgsz}|{kpt_shape}".encode()
+        ).hexdigest()[:16]
+        prefix = f"{dataset}-{split}-{imgsz}-"
+        directory = Path(cache_dir) / f"{prefix}{key}"
+
+        if not (directory / "meta.json").exists():
+            _build(directory, images_dir, imgsz, kpt_shape, key, workers)
+            # Caches antigos do mesmo dataset/split: o dataset mudou
+            for stale in Path(cache_dir).glob(f"{prefix}*"):
+                if stale != directory and stale.is_dir():
+                    shutil.rmtree(stale, ignore_errors=True)
+        return cls(directory)
+
+
+def _build(
+    directory: Path,
+    images_dir: Path,
+    imgsz: int,
+    kpt_shape: List[int],
+    key: str,
+    workers: int,
+) -> None:
+    files = image_files(images_dir)
+    if not files:
+        raise FileNotFoundError(f"No images found in {images_dir}")
+    start = time.perf_counter()
+    tmp = directory.with_name(f".{directory.name}.{os.getpid()}.tmp")
+    shutil.rmtree(tmp, ignore_errors=True)
+    tmp.mkdir(parents=True)
+
+    images = np.lib.format.open_memmap(
+        tmp / "images.npy",
+        mode="w+",
+        dtype=np.uint8,
+        shape=(len(files), imgsz, imgsz, 3),
+    )
+    shapes = np.zeros((len(files), 2), dtype=np.int32)
+    boxes = np.zeros((len(files), 4), dtype=np.int32)
+
+    def load(i: int) -> None:
+        image = cv2.imread(str(files[i]))
+        if image is None:
+            raise ValueError(f"Could not decode {files[i]}")
+        shapes[i] = image.shape[:2]
+        boxes[i] = letterbox_into(images[i], image, imgsz)
+
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        list(pool.map(load, range(len(files))))
+    images.flush()
+    del images
+
+    labels = [read_label(label_file(f), kpt_shape) for f in files]
+    offsets = np.zeros(len(files) + 1, dtype=np.int64)
+    offsets[1:] = np.cumsum([len(lb[0]) for lb in labels])
+    np.savez(
+        tmp / "labels.npz",
+        cls=np.concatenate([lb[0] for lb in labels]),
+        bboxes=np.concatenate([lb[1] for lb in labels]),
+        keypoints=np.concatenate([lb[2] for lb in labels]),
+        offsets=offsets,
+        shapes=shapes,
+        boxes=boxes,
+    )
+    meta = {
+        "version": CACHE_VERSION,
+        "key": key,
+        "source": str(images_dir),
+        "imgsz": imgsz,
+        "kpt_shape": kpt_shape,
+        "files": [f.name for f in files],
+        "created_at": time.strftime("%Y-%m-%dT%H:%M:%S"),
+    }
+    (tmp / "meta.json").write_text(json.dumps(meta), encoding="utf-8")
+    shutil.rmtree(directory, ignore_errors=True)
+    os.replace(tmp, directory)
+    print(
+        f"Train cache: {len(files)} images from {images_dir} -> {directory} "
+        f"({time.perf_counter() - start:.1f}s)"
+    )
+
+
+def build_dataset_caches(
+    data_yaml: Path,
+    imgsz: int,
+    cache_dir: Path = DEFAULT_CACHE_DIR,
+    splits=("train", "val"),
+) -> Dict[str, TrainCache]:
+    """Caches of the splits of a data.yaml (built if missing or stale)."""
+    config = load_data_yaml(data_yaml)
+    return {
+        split: TrainCache.build(
+            config["path"] / config[split],
+            imgsz,
+            cache_dir,
+            config,
+            Path(data_yaml).parent.name,
+        )
+        for split in splits
+        if config.get(split)
+    }
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(
+        description="Build the memory-mapped training cache"
+    )
+    parser.add_argument("--data", type=Path, required=True, help="Dataset YAML file")
+    parser.add_argument("--imgsz", type=int, default=640, help="Training image size")
+    parser.add_argument(
+        "--cache-dir", type=Path, default=DEFAULT_CACHE_DIR, help="Cache directory"
+    )
+    args = parser.parse_args()
+
+    for split, cache in build_dataset_caches(
+        args.data, args.imgsz, args.cache_dir
+    ).items():
+        size = os.path.getsize(cache.directory / "images.npy") / 2**20
+        print(f"✓ {split}: {len(cache)} images, {size:.0f} MB ({cache.directory})")